@@ -1,9 +1,16 @@
 from django.contrib import admin
 
-from contacts.models import MenuReport
+from contacts.models import MenuReport, OutboxEmail
 
 
 @admin.register(MenuReport)
 class MenuReportAdmin(admin.ModelAdmin):
     list_display = ["name", "receiver", "created_at"]
     list_filter = ["receiver", "created_at"]
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ["subject", "status", "attempts", "next_attempt_at", "sent_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["subject", "last_error"]
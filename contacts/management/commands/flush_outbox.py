@@ -0,0 +1,47 @@
+"""
+Management command to flush the email outbox.
+
+Sends every due email of the outbox in batches, e.g. after the mail server or
+the task queue were down. With --retry-now the emails waiting for a retry are
+sent too, without waiting for their backoff.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from contacts.models import OutboxEmail
+from contacts.tasks import send_outbox
+
+
+class Command(BaseCommand):
+    help = "Send the pending emails of the outbox"
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--retry-now",
+            action="store_true",
+            help="Also send the emails waiting for a retry",
+        )
+
+    def handle(self, *args, **options):
+        """Send the outbox batch by batch, until no email is due."""
+        if options["retry_now"]:
+            OutboxEmail.objects.filter(status=OutboxEmail.Status.PENDING).update(
+                next_attempt_at=timezone.now()
+            )
+
+        totals = [0, 0, 0]
+        # Sent and failed emails leave the queue, rescheduled ones are not due
+        while any(counts := send_outbox()):
+            totals = [
+                total + count for total, count in zip(totals, counts, strict=True)
+            ]
+
+        sent, failed, rescheduled = totals
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outbox flushed: {sent} sent, {failed} failed, "
+                f"{rescheduled} rescheduled"
+            )
+        )
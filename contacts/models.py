@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class MenuReport(models.Model):
@@ -16,3 +17,42 @@ class MenuReport(models.Model):
 
     def __str__(self):
         return f"Segnalazione da {self.name}"
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent, or already sent, by contacts.tasks.send_outbox.
+
+    Views queue their emails here instead of talking to the mail server in
+    the request; failed sends are retried with exponential backoff until
+    OUTBOX_MAX_ATTEMPTS attempts.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "In attesa"
+        SENT = "sent", "Inviata"
+        FAILED = "failed", "Non inviata"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(
+        max_length=255, blank=True, help_text="Vuoto per DEFAULT_FROM_EMAIL"
+    )
+    recipients = models.JSONField()
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["next_attempt_at"]
+        verbose_name = "email in uscita"
+        verbose_name_plural = "email in uscita"
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.subject} a {', '.join(self.recipients)}"
@@ -0,0 +1,157 @@
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from contacts.models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Emails sent by a single send_outbox run, over one mail server connection
+OUTBOX_BATCH_SIZE = 100
+# Retry backoff: 1, 2, 4, 8 minutes... up to 1 hour, for at most 5 attempts
+OUTBOX_RETRY_BASE_DELAY = 60
+OUTBOX_RETRY_MAX_DELAY = 60 * 60
+OUTBOX_MAX_ATTEMPTS = 5
+# Seconds a send_outbox run owns the emails it claimed
+OUTBOX_CLAIM_TIMEOUT = 10 * 60
+
+
+def _enqueue_send_outbox():
+    """Queue a send_outbox run, the outbox schedule covers a broker failure"""
+    try:
+        async_task("contacts.tasks.send_outbox")
+    except Exception as e:
+        logger.warning(f"Could not queue send_outbox, left to its schedule: {e}")
+
+
+def queue_email(subject, body, recipients, from_email=None):
+    """
+    Queue an email in the outbox and have django-q send it.
+
+    The email is saved first and send_outbox is queued once the transaction
+    commits. If the task queue is down the request still succeeds: the
+    "Send outbox" schedule (every minute, see migration 0004) sends it.
+
+    Args:
+        subject: email subject
+        body: plain text body
+        recipients: list of email addresses
+        from_email: sender, None for DEFAULT_FROM_EMAIL
+
+    Returns:
+        OutboxEmail: the queued email
+    """
+    email = OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        recipients=list(recipients),
+        from_email=from_email or "",
+    )
+    transaction.on_commit(_enqueue_send_outbox)
+    return email
+
+
+def get_outbox_retry_delay(attempts):
+    """
+    Return the seconds to wait before the next attempt of a failed email.
+
+    Example:
+        >>> [get_outbox_retry_delay(attempts) for attempts in range(1, 5)]
+        [60, 120, 240, 480]
+    """
+    return min(OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_DELAY)
+
+
+def _claim_outbox_emails(now, batch_size):
+    """
+    Claim the due emails of a send_outbox run in a short transaction.
+
+    Claimed emails get their attempt counted and next_attempt_at moved
+    OUTBOX_CLAIM_TIMEOUT ahead, so other runs skip them while they are sent
+    without keeping the rows locked; emails of a run that crashed become due
+    again after the timeout.
+    """
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now
+            )[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            attempts=F("attempts") + 1,
+            next_attempt_at=now + timedelta(seconds=OUTBOX_CLAIM_TIMEOUT),
+        )
+    for email in emails:
+        email.attempts += 1
+    return emails
+
+
+def send_outbox(batch_size=None):
+    """
+    Sends the outbox emails that are due, over a single connection.
+
+    Scheduled every minute, and queued by queue_email. The due emails are
+    claimed first (see _claim_outbox_emails), then sent outside of any
+    transaction, each result saved on its own. A failed email is retried
+    with exponential backoff, and marked as failed after OUTBOX_MAX_ATTEMPTS.
+
+    Args:
+        batch_size: maximum number of emails sent, defaults to OUTBOX_BATCH_SIZE
+
+    Returns:
+        tuple: (sent_count, failed_count, rescheduled_count)
+    """
+    now = timezone.now()
+    emails = _claim_outbox_emails(now, batch_size or OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0, 0, 0
+
+    sent_count = failed_count = rescheduled_count = 0
+    # Opened once: a backend opened by its caller keeps the connection across
+    # send_messages() calls, instead of opening one per email
+    connection = get_connection()
+    try:
+        connection.open()
+        for email in emails:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email or None,
+                email.recipients,
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                result = {"last_error": str(e)[:255]}
+                if email.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    result["status"] = OutboxEmail.Status.FAILED
+                    failed_count += 1
+                    logger.error(
+                        f"Giving up email {email.pk} to {email.recipients} "
+                        f"after {email.attempts} attempt(s): {e}"
+                    )
+                else:
+                    delay = get_outbox_retry_delay(email.attempts)
+                    result["next_attempt_at"] = now + timedelta(seconds=delay)
+                    rescheduled_count += 1
+            else:
+                result = {
+                    "status": OutboxEmail.Status.SENT,
+                    "sent_at": timezone.now(),
+                }
+                sent_count += 1
+            OutboxEmail.objects.filter(pk=email.pk).update(**result)
+    finally:
+        connection.close()
+
+    logger.info(
+        f"Outbox: {sent_count} sent, {failed_count} failed, "
+        f"{rescheduled_count} rescheduled"
+    )
+    return sent_count, failed_count, rescheduled_count
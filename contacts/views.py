@@ -1,12 +1,12 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 
 from contacts.forms import ContactForm, MenuReportForm, ReportFeedbackForm
 from contacts.models import MenuReport
+from contacts.tasks import queue_email
 from school_menu.models import School
 
 
@@ -16,12 +16,10 @@ def contact(request):
         name = form.cleaned_data["name"]
         email = form.cleaned_data["email"]
         message = form.cleaned_data["message"]
-        send_mail(
+        queue_email(
             f"Contatto da {name} su menu.webbografico.com",
             f"{message}\n\nRispondi a {email}",
-            None,
             ["e.bonardi@me.com"],
-            fail_silently=False,
         )
         messages.add_message(
             request,
@@ -42,17 +40,15 @@ def menu_report(request, school_id):
         report.receiver = school.user
         report.save()
         name = report.name
-        email = report.receiver
+        email = report.receiver.email
         if report.get_notified:
             message = f"{report.message}\n\n{name} ha chiesto di poter ricevere una risposta alla sua segnalazione. Puoi farlo entro 30gg nella sezione Account/Visualizza segnalazioni del tuo profilo."
         else:
             message = f"{report.message}"
-        send_mail(
+        queue_email(
             f"Segnalazione ricevuta da {name} su menu.webbografico.com",
             message,
-            None,
             [email],
-            fail_silently=False,
         )
         messages.add_message(
             request,
@@ -85,12 +81,10 @@ def report_feedback(request, report_id):
     form = ReportFeedbackForm(request.POST or None)
     if form.is_valid():
         message = form.cleaned_data["message"]
-        send_mail(
+        queue_email(
             f"Risposta a segnalazione ricevuta da {report.name} su menu.webbografico.com",
             message,
-            None,
             [report.email],
-            fail_silently=False,
         )
         messages.add_message(
             request,
@@ -257,6 +257,11 @@ WEBPUSH_SETTINGS = {
     "VAPID_PUBLIC_KEY": env("VAPID_PUBLIC_KEY"),
     "VAPID_PRIVATE_KEY": env("VAPID_PRIVATE_KEY"),
     "VAPID_ADMIN_EMAIL": env("ADMIN_EMAIL"),
+    # Pushes in flight at once and per-push timeout (seconds), see notifications.push
+    "CONCURRENCY": env.int("WEBPUSH_CONCURRENCY", default=16),
+    "TIMEOUT": env.int("WEBPUSH_TIMEOUT", default=10),
+    # Pushes per second to each push service, 0 disables the limit
+    "RATE_LIMIT": env.int("WEBPUSH_RATE_LIMIT", default=200),
 }
 PWA_SERVICE_WORKER_PATH = os.path.join(BASE_DIR, "static/js/serviceworker.js")
 
@@ -273,6 +278,8 @@ INTERNAL_IPS = [
 
 # APP-SPECIFIC SETTINGS
 ENABLE_SCHOOL_DATE_CHECK = env.bool("ENABLE_SCHOOL_DATE_CHECK", default=True)
+# Seconds the menu notifications of a slot are spread over, 0 sends them at once
+NOTIFICATION_SEND_WINDOW = env.int("NOTIFICATION_SEND_WINDOW", default=600)
 
 
 # DEVELOPMENT SPECIFIC SETTINGS
@@ -457,6 +464,9 @@ elif ENVIRONMENT == "test":
         "retry": 120,
     }
 
+    # Send the menu notifications at once, without schedules
+    NOTIFICATION_SEND_WINDOW = 0
+
     # CACHES - Use dummy cache in testing (no actual caching)
     CACHES = {
         "default": {
@@ -1,6 +1,7 @@
 """Admin interface for backup history."""
 
 from django.contrib import admin
+from django.template.defaultfilters import filesizeformat
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
@@ -19,6 +20,7 @@ class BackupRunAdmin(admin.ModelAdmin):
         "started_at",
         "completed_at",
         "duration_display",
+        "size_display",
     ]
     list_filter = [
         "status",
@@ -34,6 +36,15 @@ class BackupRunAdmin(admin.ModelAdmin):
         "started_at",
         "completed_at",
         "duration_seconds",
+        "dump_seconds",
+        "verify_seconds",
+        "compress_seconds",
+        "upload_seconds",
+        "size_bytes",
+        "filename",
+        "full_snapshot",
+        "bytes_scanned",
+        "bytes_written",
         "error_message",
     ]
     date_hierarchy = "started_at"
@@ -74,6 +85,13 @@ class BackupRunAdmin(admin.ModelAdmin):
             return f"{minutes}m {seconds}s"
         return f"{seconds}s"
 
+    @admin.display(description=_("Size"))
+    def size_display(self, obj):
+        """Display the backup size in human-readable format."""
+        if obj.size_bytes is None:
+            return "-"
+        return filesizeformat(obj.size_bytes)
+
     actions = ["trigger_database_backup", "trigger_media_backup", "cleanup_old_records"]
 
     @admin.action(description=_("Trigger database backup now"))
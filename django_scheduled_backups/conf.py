@@ -28,11 +28,26 @@ DEFAULT_SETTINGS = {
     "DATABASE_BACKUP": {
         "enabled": True,
         "schedule": "0 2 * * *",  # Daily at 2 AM
+        # Parallel pg_dump jobs, more than 1 dumps PostgreSQL in directory format
+        "jobs": 1,
+        # Streaming compression: "gzip", "bz2", "xz", "zstd" (Python 3.14) or None
+        "compression": None,
+        "compression_level": 6,
+        # Database alias the dump is restored into to verify it, None to skip
+        "verify_database": None,
     },
     # Media backup configuration
     "MEDIA_BACKUP": {
         "enabled": False,
         "schedule": "0 3 * * 0",  # Weekly on Sunday at 3 AM
+        # Store only new or changed files by content hash instead of archiving
+        # the whole media tree with mediabackup --clean
+        "incremental": False,
+        # With incremental backups, every how many runs to take a full snapshot
+        "full_every": 4,
+        # With incremental backups, the latest manifests kept (None keeps all),
+        # objects no kept manifest references are deleted
+        "keep_manifests": 8,
     },
     # How many days to keep backup history records
     "HISTORY_RETENTION_DAYS": 90,
@@ -70,10 +85,16 @@ def is_enabled():
 
 
 def get_database_backup_config():
-    """Get database backup configuration."""
-    return get_setting("DATABASE_BACKUP", DEFAULT_SETTINGS["DATABASE_BACKUP"])
+    """Get database backup configuration, missing keys are taken from defaults."""
+    return {
+        **DEFAULT_SETTINGS["DATABASE_BACKUP"],
+        **get_setting("DATABASE_BACKUP", DEFAULT_SETTINGS["DATABASE_BACKUP"]),
+    }
 
 
 def get_media_backup_config():
-    """Get media backup configuration."""
-    return get_setting("MEDIA_BACKUP", DEFAULT_SETTINGS["MEDIA_BACKUP"])
+    """Get media backup configuration, missing keys are taken from defaults."""
+    return {
+        **DEFAULT_SETTINGS["MEDIA_BACKUP"],
+        **get_setting("MEDIA_BACKUP", DEFAULT_SETTINGS["MEDIA_BACKUP"]),
+    }
@@ -0,0 +1,280 @@
+"""Database backups with parallel dumps, streaming compression and verification."""
+
+import bz2
+import logging
+import lzma
+import os
+import shlex
+import subprocess  # nosec B404
+import tarfile
+import tempfile
+import zlib
+from contextlib import contextmanager
+from time import perf_counter
+
+from dbbackup import utils
+from dbbackup.db.base import get_connector
+from dbbackup.db.postgresql import parse_postgres_settings
+from dbbackup.storage import get_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+try:
+    from compression import zstd
+except ImportError:  # pragma: no cover - Python < 3.14
+    zstd = None
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the dump at a time while compressing
+CHUNK_SIZE = 1024 * 1024
+
+# Streaming codecs: (file extension, compressor factory taking the level,
+# decompressor factory)
+CODECS = {
+    "gzip": (
+        "gz",
+        lambda level: zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS),
+        lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    ),
+    "bz2": ("bz2", lambda level: bz2.BZ2Compressor(level), bz2.BZ2Decompressor),
+    "xz": (
+        "xz",
+        lambda level: lzma.LZMACompressor(preset=level),
+        lzma.LZMADecompressor,
+    ),
+}
+if zstd is not None:  # pragma: no cover - Python >= 3.14
+    CODECS["zstd"] = (
+        "zst",
+        lambda level: zstd.ZstdCompressor(level=level),
+        zstd.ZstdDecompressor,
+    )
+
+# Extension of the tar archive of a pg_dump directory format dump
+DIRECTORY_DUMP_EXTENSION = "pgdir"
+
+
+@contextmanager
+def timed_phase(backup_run, phase):
+    """
+    Record the seconds a backup phase takes on its BackupRun field.
+
+    The duration is recorded even when the phase fails, to see where a failed
+    backup spent its time.
+
+    Args:
+        backup_run: BackupRun instance, not saved
+        phase: phase name, e.g. "dump" for BackupRun.dump_seconds
+    """
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        setattr(backup_run, f"{phase}_seconds", round(perf_counter() - started, 3))
+
+
+def compress_dump(dump, codec, level):
+    """
+    Compress a dump streaming it in chunks, without reading it all in memory.
+
+    Args:
+        dump: file object with the dump
+        codec: one of CODECS, or None to leave the dump as it is
+        level: compression level of the codec
+
+    Returns:
+        tuple: (compressed file object, extension to append to the filename
+        or None)
+
+    Example:
+        >>> compress_dump(dump, "gzip", 6)
+        (<SpooledTemporaryFile>, "gz")
+    """
+    if codec is None:
+        return dump, None
+    if codec not in CODECS:
+        raise ImproperlyConfigured(
+            f"Unknown backup compression {codec!r}, use one of {', '.join(CODECS)}"
+        )
+    extension, factory, _ = CODECS[codec]
+    compressor = factory(level)
+    output = utils.create_spooled_temporary_file()
+    dump.seek(0)
+    for chunk in iter(lambda: dump.read(CHUNK_SIZE), b""):
+        output.write(compressor.compress(chunk))
+    output.write(compressor.flush())
+    output.seek(0)
+    return output, extension
+
+
+def decompress_dump(backup, codec):
+    """
+    Decompress a backup written by compress_dump, streaming it in chunks.
+
+    Args:
+        backup: file object with the compressed backup
+        codec: codec of the backup, or None when it is not compressed
+
+    Returns:
+        file object with the dump, backup itself when it is not compressed
+
+    Raises:
+        RuntimeError: when the compressed stream ends before its end marker
+    """
+    backup.seek(0)
+    if codec is None:
+        return backup
+    decompressor = CODECS[codec][2]()
+    dump = utils.create_spooled_temporary_file()
+    for chunk in iter(lambda: backup.read(CHUNK_SIZE), b""):
+        dump.write(decompressor.decompress(chunk))
+    if not decompressor.eof:
+        raise RuntimeError(f"The {codec} backup is truncated")
+    backup.seek(0)
+    dump.seek(0)
+    return dump
+
+
+def extract_directory_dump(archive, workdir):
+    """Extract the tar of a directory format dump, returning the directory"""
+    directory = os.path.join(workdir, "restore")
+    archive.seek(0)
+    with tarfile.open(fileobj=archive) as tar:
+        tar.extractall(directory, filter="data")
+    return directory
+
+
+def run_postgres_command(command, connector, *args):
+    """Run a PostgreSQL client command against the database of a connector"""
+    dbname, env = parse_postgres_settings(connector)
+    try:
+        subprocess.run(  # nosec B603
+            [command, *shlex.split(dbname), *args],
+            env={**os.environ, **env},
+            check=True,
+            capture_output=True,
+        )
+    except subprocess.CalledProcessError as e:
+        error = e.stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"{command} failed: {error}") from e
+
+
+def dump_database(database, jobs, workdir):
+    """
+    Dump a database.
+
+    With more than one job on PostgreSQL, pg_dump writes a directory format
+    dump with that many parallel jobs into workdir, which is then archived in
+    an uncompressed tar (restore it with pg_restore --jobs). Otherwise the
+    django-dbbackup connector of the database creates the dump.
+
+    Args:
+        database: database alias
+        jobs: pg_dump parallel jobs
+        workdir: temporary directory for directory format dumps
+
+    Returns:
+        tuple: (dump file object, filename, dump directory or None)
+    """
+    connector = get_connector(database)
+    if jobs <= 1 or connections[database].vendor != "postgresql":
+        return connector.create_dump(), connector.generate_filename(), None
+
+    directory = os.path.join(workdir, "dump")
+    run_postgres_command(
+        "pg_dump",
+        connector,
+        "--format=directory",
+        f"--jobs={jobs}",
+        f"--file={directory}",
+    )
+    archive = utils.create_spooled_temporary_file()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        tar.add(directory, arcname=".")
+    archive.seek(0)
+    filename = utils.filename_generate(DIRECTORY_DUMP_EXTENSION, database)
+    return archive, filename, directory
+
+
+def verify_dump(dump, directory, database, verify_database, jobs):
+    """
+    Restore a dump into a scratch database, to know the backup can be restored.
+
+    Args:
+        dump: file object with the dump
+        directory: pg_dump directory format dump, None for connector dumps
+        database: alias of the database the dump comes from
+        verify_database: alias of the scratch database, overwritten
+        jobs: pg_restore parallel jobs for directory format dumps
+    """
+    if verify_database == database:
+        raise ImproperlyConfigured(
+            "The backup verification database must not be the backed up one"
+        )
+    connector = get_connector(verify_database)
+    if directory is None:
+        dump.seek(0)
+        connector.restore_dump(dump)
+        return
+    run_postgres_command(
+        "pg_restore",
+        connector,
+        "--clean",
+        "--if-exists",
+        "--no-owner",
+        f"--jobs={jobs}",
+        directory,
+    )
+
+
+def run_database_backup(backup_run, config, database="default"):
+    """
+    Back up a database into the django-dbbackup storage, phase by phase.
+
+    Every phase (dump, compress, verify, upload) is timed on backup_run,
+    together with the uploaded filename and size; backup_run is not saved.
+    The verification restores the compressed backup that is then uploaded,
+    decompressed back, so a broken compression fails the backup too.
+    Old backups are then cleaned up like `dbbackup --clean` does.
+
+    Args:
+        backup_run: BackupRun instance of the backup
+        config: DATABASE_BACKUP settings, see conf.get_database_backup_config
+        database: database alias
+
+    Returns:
+        str: the filename of the backup in the storage
+    """
+    jobs = config.get("jobs", 1)
+    codec = config.get("compression")
+    with tempfile.TemporaryDirectory() as workdir:
+        with timed_phase(backup_run, "dump"):
+            dump, filename, directory = dump_database(database, jobs, workdir)
+
+        with timed_phase(backup_run, "compress"):
+            output, extension = compress_dump(
+                dump, codec, config.get("compression_level", 6)
+            )
+        if extension:
+            filename = f"{filename}.{extension}"
+
+        verify_database = config.get("verify_database")
+        if verify_database:
+            with timed_phase(backup_run, "verify"):
+                restored = decompress_dump(output, codec)
+                if directory is not None:
+                    directory = extract_directory_dump(restored, workdir)
+                verify_dump(restored, directory, database, verify_database, jobs)
+
+    backup_run.size_bytes = output.seek(0, os.SEEK_END)
+    output.seek(0)
+    storage = get_storage()
+    with timed_phase(backup_run, "upload"):
+        storage.write_file(output, filename)
+    backup_run.filename = filename
+    logger.info(
+        f"Database backup uploaded as {filename} ({backup_run.size_bytes} bytes)"
+    )
+    storage.clean_old_backups(content_type="db", database=database)
+    return filename
@@ -0,0 +1,204 @@
+"""Incremental, content-addressed media backups."""
+
+import hashlib
+import json
+import logging
+import posixpath
+
+from dbbackup.storage import get_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.timezone import now
+
+logger = logging.getLogger(__name__)
+
+# Layout of the media backups in the django-dbbackup storage
+OBJECTS_DIR = "media/objects"
+MANIFESTS_DIR = "media/manifests"
+
+# Bytes read from a media file at a time while hashing
+CHUNK_SIZE = 1024 * 1024
+
+
+def iter_media_files(storage, path=""):
+    """Yield the name of every file of a storage, walking its directories"""
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from iter_media_files(storage, posixpath.join(path, directory))
+
+
+def hash_file(storage, name):
+    """Return the SHA-256 hex digest of a storage file, read in chunks"""
+    digest = hashlib.sha256()
+    with storage.open(name, "rb") as media_file:
+        for chunk in iter(lambda: media_file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_object_name(digest):
+    """Return where the content with a digest is stored, e.g. media/objects/ab/ab12..."""
+    return f"{OBJECTS_DIR}/{digest[:2]}/{digest}"
+
+
+def list_manifests(backup_storage):
+    """
+    Return the manifest names, oldest first.
+
+    Manifest names start with their creation time, so they sort by age. A
+    missing directory is empty: file system storages raise for it, while
+    object storages such as S3 have no directories and list nothing.
+    """
+    try:
+        return sorted(backup_storage.list_directory(MANIFESTS_DIR))
+    except FileNotFoundError:
+        return []
+
+
+def load_manifest(backup_storage, name):
+    """Return the content of a manifest of MANIFESTS_DIR"""
+    with backup_storage.read_file(f"{MANIFESTS_DIR}/{name}") as manifest:
+        return json.load(manifest)
+
+
+def load_latest_manifest(backup_storage):
+    """Return the manifest of the previous media backup, None before the first one"""
+    names = list_manifests(backup_storage)
+    if not names:
+        return None
+    return load_manifest(backup_storage, names[-1])
+
+
+def iter_objects(backup_storage):
+    """Yield the digest of every object of OBJECTS_DIR"""
+    try:
+        prefixes = backup_storage.storage.listdir(OBJECTS_DIR)[0]
+    except FileNotFoundError:
+        return
+    for prefix in prefixes:
+        yield from backup_storage.list_directory(f"{OBJECTS_DIR}/{prefix}")
+
+
+def clean_old_media_backups(backup_storage, keep_manifests):
+    """
+    Delete all but the latest keep_manifests manifests, then the objects left
+    without a manifest.
+
+    Objects are only collected when a manifest was deleted, reading the kept
+    manifests to know which contents they still reference. An object written
+    by a run that failed before its manifest is collected the same way.
+
+    Args:
+        backup_storage: django-dbbackup Storage of the backups
+        keep_manifests: manifests to keep, None to keep them all
+
+    Returns:
+        tuple: (deleted manifests, deleted objects)
+    """
+    if keep_manifests is None:
+        return 0, 0
+    if keep_manifests < 1:
+        raise ImproperlyConfigured(
+            "MEDIA_BACKUP keep_manifests must be at least 1, or None to keep all"
+        )
+    names = list_manifests(backup_storage)
+    old_names, kept_names = names[:-keep_manifests], names[-keep_manifests:]
+    if not old_names:
+        return 0, 0
+    for name in old_names:
+        backup_storage.delete_file(f"{MANIFESTS_DIR}/{name}")
+
+    referenced = {
+        entry["sha256"]
+        for name in kept_names
+        for entry in load_manifest(backup_storage, name)["files"].values()
+    }
+    deleted_objects = 0
+    for digest in list(iter_objects(backup_storage)):
+        if digest not in referenced:
+            backup_storage.delete_file(get_object_name(digest))
+            deleted_objects += 1
+    return len(old_names), deleted_objects
+
+
+def run_media_backup(backup_run, config):
+    """
+    Back up the media files incrementally into the django-dbbackup storage.
+
+    Every file is stored once by content under OBJECTS_DIR, and each run
+    writes a manifest mapping file names to their hash, size and mtime. A
+    file with the size and mtime of the previous manifest is not read again,
+    and only contents missing from the storage are written, so a run costs
+    what changed since the previous one instead of the whole media tree.
+
+    Every config["full_every"] runs (and on the first one) a full snapshot
+    hashes every file again and writes back any object missing from the
+    storage, so a lost object or a wrong mtime never lasts for long. Only the
+    latest config["keep_manifests"] manifests are kept, and the objects no
+    kept manifest references are deleted (see clean_old_media_backups).
+
+    The bytes read, the bytes written and the manifest name are recorded on
+    backup_run, which is not saved.
+
+    Args:
+        backup_run: BackupRun instance of the backup
+        config: MEDIA_BACKUP settings, see conf.get_media_backup_config
+
+    Returns:
+        str: the name of the manifest in the storage
+    """
+    backup_storage = get_storage()
+    previous = load_latest_manifest(backup_storage)
+    full = previous is None or previous["runs_since_full"] + 1 >= config["full_every"]
+    previous_files = {} if full else previous["files"]
+    # Contents already stored: a full snapshot checks every one of them
+    stored = set() if full else {entry["sha256"] for entry in previous_files.values()}
+
+    files = {}
+    bytes_scanned = bytes_written = 0
+    for name in iter_media_files(default_storage):
+        size = default_storage.size(name)
+        mtime = default_storage.get_modified_time(name).timestamp()
+        entry = previous_files.get(name)
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            files[name] = entry
+            continue
+
+        bytes_scanned += size
+        digest = hash_file(default_storage, name)
+        files[name] = {"sha256": digest, "size": size, "mtime": mtime}
+        if digest in stored:
+            continue
+        stored.add(digest)
+        object_name = get_object_name(digest)
+        if not backup_storage.storage.exists(object_name):
+            with default_storage.open(name, "rb") as media_file:
+                backup_storage.write_file(media_file, object_name)
+            bytes_written += size
+
+    manifest_name = f"{MANIFESTS_DIR}/{now():%Y%m%d-%H%M%S}.json"
+    manifest = {
+        "created_at": now().isoformat(),
+        "full": full,
+        "runs_since_full": 0 if full else previous["runs_since_full"] + 1,
+        "files": files,
+    }
+    backup_storage.write_file(ContentFile(json.dumps(manifest).encode()), manifest_name)
+
+    deleted_manifests, deleted_objects = clean_old_media_backups(
+        backup_storage, config.get("keep_manifests")
+    )
+
+    backup_run.full_snapshot = full
+    backup_run.bytes_scanned = bytes_scanned
+    backup_run.bytes_written = bytes_written
+    backup_run.filename = manifest_name
+    logger.info(
+        f"Media backup {manifest_name}: {len(files)} files, "
+        f"{bytes_scanned} bytes scanned, {bytes_written} bytes written, "
+        f"{deleted_manifests} old manifests and {deleted_objects} objects deleted"
+    )
+    return manifest_name
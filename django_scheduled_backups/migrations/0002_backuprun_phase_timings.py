@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_scheduled_backups", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="backuprun",
+            name="compress_seconds",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Compression (seconds)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="backuprun",
+            name="dump_seconds",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Dump (seconds)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="backuprun",
+            name="filename",
+            field=models.CharField(blank=True, max_length=255, verbose_name="Filename"),
+        ),
+        migrations.AddField(
+            model_name="backuprun",
+            name="size_bytes",
+            field=models.PositiveBigIntegerField(
+                blank=True, null=True, verbose_name="Size (bytes)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="backuprun",
+            name="upload_seconds",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Upload (seconds)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="backuprun",
+            name="verify_seconds",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Verification (seconds)"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_scheduled_backups", "0002_backuprun_phase_timings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="backuprun",
+            name="bytes_scanned",
+            field=models.PositiveBigIntegerField(
+                blank=True, null=True, verbose_name="Bytes Scanned"
+            ),
+        ),
+        migrations.AddField(
+            model_name="backuprun",
+            name="bytes_written",
+            field=models.PositiveBigIntegerField(
+                blank=True, null=True, verbose_name="Bytes Written"
+            ),
+        ),
+        migrations.AddField(
+            model_name="backuprun",
+            name="full_snapshot",
+            field=models.BooleanField(
+                blank=True, null=True, verbose_name="Full Snapshot"
+            ),
+        ),
+    ]
@@ -47,6 +47,51 @@ class BackupRun(models.Model):
         blank=True,
         verbose_name=_("Duration (seconds)"),
     )
+    dump_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_("Dump (seconds)"),
+    )
+    verify_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_("Verification (seconds)"),
+    )
+    compress_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_("Compression (seconds)"),
+    )
+    upload_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name=_("Upload (seconds)"),
+    )
+    size_bytes = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Size (bytes)"),
+    )
+    filename = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Filename"),
+    )
+    full_snapshot = models.BooleanField(
+        null=True,
+        blank=True,
+        verbose_name=_("Full Snapshot"),
+    )
+    bytes_scanned = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Bytes Scanned"),
+    )
+    bytes_written = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Bytes Written"),
+    )
 
     class Meta:
         verbose_name = _("Backup Run")
@@ -61,6 +106,17 @@ class BackupRun(models.Model):
     def __str__(self):
         return f"{self.get_backup_type_display()} - {self.get_status_display()} - {self.started_at}"
 
+    @property
+    def phase_timings(self):
+        """Return the (phase, seconds) pairs of the phases that ran."""
+        phases = [
+            (_("Dump"), self.dump_seconds),
+            (_("Verification"), self.verify_seconds),
+            (_("Compression"), self.compress_seconds),
+            (_("Upload"), self.upload_seconds),
+        ]
+        return [(phase, seconds) for phase, seconds in phases if seconds is not None]
+
     def calculate_duration(self):
         """Calculate duration in seconds if backup is completed."""
         if self.completed_at and self.started_at:
@@ -7,7 +7,14 @@ from django.core import management
 from django.core.mail import mail_admins
 from django.utils.timezone import now
 
-from .conf import get_notification_emails, get_setting
+from .conf import (
+    get_database_backup_config,
+    get_media_backup_config,
+    get_notification_emails,
+    get_setting,
+)
+from .database import run_database_backup
+from .media import run_media_backup
 from .models import BackupRun
 
 logger = logging.getLogger(__name__)
@@ -31,12 +38,24 @@ def send_success_email(backup_run):
     subject = f"{subject_prefix} {backup_run.get_backup_type_display()} Backup Successful - {timestamp}"
 
     duration = backup_run.duration_seconds or 0
+    details = "".join(
+        f"{phase}: {seconds} seconds\n" for phase, seconds in backup_run.phase_timings
+    )
+    if backup_run.size_bytes is not None:
+        details += f"Size: {backup_run.size_bytes} bytes\n"
+    if backup_run.bytes_scanned is not None:
+        snapshot = "full" if backup_run.full_snapshot else "incremental"
+        details += (
+            f"Snapshot: {snapshot}\n"
+            f"Scanned: {backup_run.bytes_scanned} bytes\n"
+            f"Written: {backup_run.bytes_written} bytes\n"
+        )
     message = f"""
 {backup_run.get_backup_type_display()} backup completed successfully.
 
 Timestamp: {timestamp}
 Duration: {duration} seconds
-Environment: {getattr(settings, "ENVIRONMENT", "unknown")}
+{details}Environment: {getattr(settings, "ENVIRONMENT", "unknown")}
 Storage Backend: {getattr(settings, "DBBACKUP_STORAGE", "default")}
 
 This is an automated message from the Django Scheduled Backups system.
@@ -104,6 +123,10 @@ def scheduled_database_backup():
     It tracks the backup execution, sends email notifications,
     and logs all events.
 
+    The dump can run parallel jobs, is compressed while streamed and can be
+    verified by a restore into a scratch database, see the DATABASE_BACKUP
+    settings. Every phase is timed on the BackupRun, with the backup size.
+
     Returns:
         str: Success message for task tracking
 
@@ -118,8 +141,7 @@ def scheduled_database_backup():
     logger.info(f"Starting database backup (run #{backup_run.id})")
 
     try:
-        # Perform the backup using django-dbbackup
-        management.call_command("dbbackup", "--clean")
+        run_database_backup(backup_run, get_database_backup_config())
 
         # Mark as successful
         backup_run.status = "success"
@@ -129,7 +151,8 @@ def scheduled_database_backup():
 
         logger.info(
             f"Database backup completed successfully (run #{backup_run.id}, "
-            f"duration: {backup_run.duration_seconds}s)"
+            f"duration: {backup_run.duration_seconds}s, "
+            f"size: {backup_run.size_bytes} bytes)"
         )
 
         # Send success email if enabled
@@ -167,6 +190,10 @@ def scheduled_media_backup():
     It tracks the backup execution, sends email notifications,
     and logs all events.
 
+    With MEDIA_BACKUP["incremental"] only new or changed files are stored,
+    by content hash, and the bytes scanned and written are recorded on the
+    BackupRun; otherwise the whole media tree is archived by mediabackup.
+
     Returns:
         str: Success message for task tracking
 
@@ -181,8 +208,12 @@ def scheduled_media_backup():
     logger.info(f"Starting media backup (run #{backup_run.id})")
 
     try:
-        # Perform the backup using django-dbbackup's mediabackup command
-        management.call_command("mediabackup", "--clean")
+        config = get_media_backup_config()
+        if config["incremental"]:
+            run_media_backup(backup_run, config)
+        else:
+            # Perform the backup using django-dbbackup's mediabackup command
+            management.call_command("mediabackup", "--clean")
 
         # Mark as successful
         backup_run.status = "success"
@@ -192,7 +223,8 @@ def scheduled_media_backup():
 
         logger.info(
             f"Media backup completed successfully (run #{backup_run.id}, "
-            f"duration: {backup_run.duration_seconds}s)"
+            f"duration: {backup_run.duration_seconds}s, "
+            f"written: {backup_run.bytes_written} bytes)"
         )
 
         # Send success email if enabled
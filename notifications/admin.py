@@ -1,7 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import admin
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from django_q.tasks import async_task
 
-from notifications.models import BroadcastNotification
+from notifications.models import (
+    BroadcastNotification,
+    NotificationBatchRun,
+    PushRetry,
+)
 
 
 @admin.register(BroadcastNotification)
@@ -14,6 +24,8 @@ class BroadcastNotificationAdmin(admin.ModelAdmin):
         "recipients_count",
         "success_count",
         "failure_count",
+        "expired_count",
+        "retry_count",
     ]
     list_filter = ["status", "created_at", "sent_at"]
     filter_horizontal = ["target_schools"]
@@ -24,6 +36,9 @@ class BroadcastNotificationAdmin(admin.ModelAdmin):
         "recipients_count",
         "success_count",
         "failure_count",
+        "expired_count",
+        "retry_count",
+        "last_processed_pk",
         "status",
     ]
 
@@ -47,6 +62,9 @@ class BroadcastNotificationAdmin(admin.ModelAdmin):
                     "recipients_count",
                     "success_count",
                     "failure_count",
+                    "expired_count",
+                    "retry_count",
+                    "last_processed_pk",
                 ),
                 "classes": ("collapse",),
             },
@@ -82,14 +100,158 @@ class BroadcastNotificationAdmin(admin.ModelAdmin):
                 )
                 continue
 
+            # Mark as sending before queueing, the task updates the counters
+            broadcast.status = BroadcastNotification.Status.SENDING
+            broadcast.save(update_fields=["status"])
+
             # Trigger async task to send
             async_task("notifications.tasks.send_broadcast_notification", broadcast.pk)
-
-            broadcast.status = BroadcastNotification.Status.SENDING
-            broadcast.save()
             sent_count += 1
 
         if sent_count > 0:
             self.message_user(
                 request, f"Sending {sent_count} broadcast(s) to subscribed users..."
             )
+
+
+@admin.register(NotificationBatchRun)
+class NotificationBatchRunAdmin(admin.ModelAdmin):
+    list_display = [
+        "notification_time",
+        "broadcast",
+        "target_date",
+        "status",
+        "subscribers",
+        "success_count",
+        "failure_count",
+        "expired_count",
+        "retry_count",
+        "sends_per_second",
+        "wall_sends_per_second",
+        "p50_latency_ms",
+        "p95_latency_ms",
+        "started_at",
+        "finished_at",
+    ]
+    list_filter = ["status", "notification_time", "target_date"]
+    list_select_related = ["broadcast"]
+    readonly_fields = [
+        "notification_time",
+        "broadcast",
+        "target_date",
+        "status",
+        "chunks",
+        "subscribers",
+        "success_count",
+        "failure_count",
+        "expired_count",
+        "retry_count",
+        "latency_histogram",
+        "failures_by_status",
+        "slowest_chunk_seconds",
+        "send_seconds",
+        "started_at",
+        "finished_at",
+    ]
+    actions = ["retry_failed_chunks"]
+
+    # Days of runs shown by the trends view
+    TRENDS_DAYS = 30
+    # Slowest chunk share of the django-q timeout highlighted in the trends
+    TIMEOUT_WARNING_PERCENT = 80
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "trends/",
+                self.admin_site.admin_view(self.trends_view),
+                name="notifications_notificationbatchrun_trends",
+            ),
+            *super().get_urls(),
+        ]
+
+    def trends_view(self, request):
+        """
+        Show the delivery metrics of the last TRENDS_DAYS days of runs, grouped
+        by notification time (broadcasts last), to spot a batch whose slowest
+        chunk is drifting toward the django-q task timeout.
+        """
+        timeout = settings.Q_CLUSTER.get("timeout")
+        runs = NotificationBatchRun.objects.filter(
+            started_at__gte=timezone.now() - timedelta(days=self.TRENDS_DAYS)
+        ).select_related("broadcast")
+        groups = {}
+        for run in runs:
+            label = run.get_notification_time_display() or "Broadcast"
+            timeout_percent = (
+                round(run.slowest_chunk_seconds * 100 / timeout)
+                if timeout and run.slowest_chunk_seconds is not None
+                else None
+            )
+            groups.setdefault(label, []).append((run, timeout_percent))
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Notification delivery trends",
+            "opts": self.model._meta,
+            "groups": sorted(
+                groups.items(), key=lambda group: (group[0] == "Broadcast", group[0])
+            ),
+            "timeout": timeout,
+            "days": self.TRENDS_DAYS,
+            "warning_percent": self.TIMEOUT_WARNING_PERCENT,
+        }
+        return TemplateResponse(
+            request, "admin/notifications/notificationbatchrun/trends.html", context
+        )
+
+    @admin.action(description="Retry failed chunks")
+    def retry_failed_chunks(self, request, queryset):
+        """
+        Admin action to enqueue again only the failed chunks of the selected batches
+        """
+        retried = 0
+        for batch in queryset:
+            for chunk, state in batch.chunks.items():
+                if state != NotificationBatchRun.CHUNK_FAILED:
+                    continue
+                first_pk, last_pk = (int(pk) for pk in chunk.split("-"))
+                async_task(
+                    "notifications.tasks.send_menu_notification_chunk",
+                    batch.pk,
+                    first_pk,
+                    last_pk,
+                )
+                retried += 1
+        self.message_user(request, f"Retrying {retried} failed chunk(s)...")
+
+
+@admin.register(PushRetry)
+class PushRetryAdmin(admin.ModelAdmin):
+    list_display = [
+        "subscription_endpoint",
+        "attempts",
+        "next_attempt_at",
+        "last_error",
+        "batch",
+        "broadcast",
+        "created_at",
+    ]
+    list_filter = ["attempts", "next_attempt_at"]
+    list_select_related = ["batch", "broadcast"]
+    readonly_fields = [
+        "subscription_endpoint",
+        "payload",
+        "attempts",
+        "next_attempt_at",
+        "last_error",
+        "batch",
+        "broadcast",
+        "created_at",
+    ]
+
+    def has_add_permission(self, request):
+        return False
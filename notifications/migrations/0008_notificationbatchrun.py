@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0007_broadcastnotification"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationBatchRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "notification_time",
+                    models.CharField(
+                        choices=[
+                            ("previous_day_6pm", "alle 18:00 del giorno prima"),
+                            ("same_day_9am", "alle 9:00"),
+                            ("same_day_12pm", "alle 12:00"),
+                            ("same_day_6pm", "alle 18:00"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("target_date", models.DateField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="running",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "chunks",
+                    models.JSONField(
+                        default=dict,
+                        help_text="State of every chunk, keyed by 'first_pk-last_pk'",
+                    ),
+                ),
+                ("subscribers", models.PositiveIntegerField(default=0)),
+                ("success_count", models.PositiveIntegerField(default=0)),
+                ("failure_count", models.PositiveIntegerField(default=0)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Notification Batch Run",
+                "verbose_name_plural": "Notification Batch Runs",
+                "ordering": ["-started_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0008_notificationbatchrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="broadcastnotification",
+            name="expired_count",
+            field=models.IntegerField(
+                default=0, help_text="Expired subscriptions deleted while sending"
+            ),
+        ),
+        migrations.AddField(
+            model_name="notificationbatchrun",
+            name="expired_count",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Expired subscriptions deleted while sending"
+            ),
+        ),
+    ]
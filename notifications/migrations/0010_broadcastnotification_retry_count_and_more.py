@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0009_broadcastnotification_expired_count_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="broadcastnotification",
+            name="retry_count",
+            field=models.IntegerField(
+                default=0, help_text="Sends waiting in the retry queue"
+            ),
+        ),
+        migrations.AddField(
+            model_name="notificationbatchrun",
+            name="retry_count",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Sends waiting in the retry queue"
+            ),
+        ),
+        migrations.CreateModel(
+            name="PushRetry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "subscription_endpoint",
+                    models.CharField(
+                        db_index=True,
+                        help_text="Hash of the subscription endpoint, see AnonymousMenuNotification",
+                        max_length=64,
+                    ),
+                ),
+                ("payload", models.JSONField()),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=1, help_text="Sends attempted so far"
+                    ),
+                ),
+                ("next_attempt_at", models.DateTimeField(db_index=True)),
+                ("last_error", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="push_retries",
+                        to="notifications.notificationbatchrun",
+                    ),
+                ),
+                (
+                    "broadcast",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="push_retries",
+                        to="notifications.broadcastnotification",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Push Retry",
+                "verbose_name_plural": "Push Retries",
+                "ordering": ["next_attempt_at"],
+            },
+        ),
+    ]
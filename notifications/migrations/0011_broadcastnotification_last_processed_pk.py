@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0010_broadcastnotification_retry_count_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="broadcastnotification",
+            name="last_processed_pk",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Last subscription sent, an interrupted broadcast resumes after it",
+                null=True,
+            ),
+        ),
+    ]
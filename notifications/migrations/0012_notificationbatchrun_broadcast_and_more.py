@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0011_broadcastnotification_last_processed_pk"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationbatchrun",
+            name="broadcast",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="runs",
+                to="notifications.broadcastnotification",
+            ),
+        ),
+        migrations.AddField(
+            model_name="notificationbatchrun",
+            name="failures_by_status",
+            field=models.JSONField(
+                default=dict, help_text="Failed pushes by HTTP status code"
+            ),
+        ),
+        migrations.AddField(
+            model_name="notificationbatchrun",
+            name="latency_histogram",
+            field=models.JSONField(
+                default=dict, help_text="Pushes by latency bucket upper bound in ms"
+            ),
+        ),
+        migrations.AddField(
+            model_name="notificationbatchrun",
+            name="slowest_chunk_seconds",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="notificationbatchrun",
+            name="notification_time",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("previous_day_6pm", "alle 18:00 del giorno prima"),
+                    ("same_day_9am", "alle 9:00"),
+                    ("same_day_12pm", "alle 12:00"),
+                    ("same_day_6pm", "alle 18:00"),
+                ],
+                help_text="Empty for broadcast runs",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_schedule(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.update_or_create(
+        name="Precompute menu notification payloads",
+        defaults={
+            "func": "notifications.tasks.precompute_menu_notification_payloads",
+            "schedule_type": "C",  # Schedule.CRON
+            "cron": "0 3 * * *",
+            "repeats": -1,
+        },
+    )
+
+
+def delete_schedule(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(name="Precompute menu notification payloads").delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0013_schedule_process_push_retries"),
+        ("django_q", "0019_alter_task_options_alter_ormq_key_alter_ormq_lock_and_more"),
+    ]
+
+    operations = [migrations.RunPython(create_schedule, delete_schedule)]
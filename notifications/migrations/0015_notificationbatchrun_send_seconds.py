@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0014_schedule_precompute_menu_notification_payloads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationbatchrun",
+            name="send_seconds",
+            field=models.FloatField(
+                default=0, help_text="Seconds spent sending, summed over the chunks"
+            ),
+        ),
+    ]
@@ -1,7 +1,10 @@
 import hashlib
+from bisect import bisect_left
+from itertools import accumulate
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 from school_menu.models import School
 
@@ -63,14 +66,20 @@ class AnonymousMenuNotification(models.Model):
             return subscription_info.get("endpoint", "")
         return ""
 
+    @classmethod
+    def hash_subscription(cls, subscription_info):
+        """
+        Get the subscription_endpoint hash of a subscription_info, None without endpoint
+        """
+        endpoint = cls.extract_endpoint(subscription_info)
+        return cls.hash_endpoint(endpoint) if endpoint else None
+
     def save(self, *args, **kwargs):
         """
         Override save to automatically set subscription_endpoint from subscription_info
         """
         if not self.subscription_endpoint:
-            endpoint = self.extract_endpoint(self.subscription_info)
-            if endpoint:
-                self.subscription_endpoint = self.hash_endpoint(endpoint)
+            self.subscription_endpoint = self.hash_subscription(self.subscription_info)
         super().save(*args, **kwargs)
 
 
@@ -120,6 +129,17 @@ class BroadcastNotification(models.Model):
     )
     success_count = models.IntegerField(default=0)
     failure_count = models.IntegerField(default=0)
+    expired_count = models.IntegerField(
+        default=0, help_text="Expired subscriptions deleted while sending"
+    )
+    retry_count = models.IntegerField(
+        default=0, help_text="Sends waiting in the retry queue"
+    )
+    last_processed_pk = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Last subscription sent, an interrupted broadcast resumes after it",
+    )
 
     status = models.CharField(
         max_length=10, choices=Status.choices, default=Status.DRAFT
@@ -132,3 +152,272 @@ class BroadcastNotification(models.Model):
 
     def __str__(self):
         return f"{self.title} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class NotificationBatchRun(models.Model):
+    """
+    A scheduled menu notification batch or a broadcast run, with its metrics.
+
+    Every chunk of a menu batch is a django-q task covering a range of
+    subscription pks. The batch tracks the state of each chunk, so a failed
+    chunk can be retried on its own and the batch completes when every chunk
+    is done. A broadcast gets a run every time its task executes, the chunks
+    being recorded as they are sent.
+
+    Besides the counters, a run keeps the push latencies as a histogram (see
+    LATENCY_BUCKETS_MS), the failures by HTTP status code, the time spent
+    sending and the duration of its slowest chunk, which must stay below the
+    django-q task timeout.
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    CHUNK_PENDING = "pending"
+    CHUNK_DONE = "done"
+    CHUNK_FAILED = "failed"
+
+    # Upper bounds of the latency histogram buckets, slower pushes go in "inf"
+    LATENCY_BUCKETS_MS = (
+        10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 2000, 5000, 10000
+    )  # fmt: skip
+    # Key of the failures without an HTTP response (timeouts, throttling, ...)
+    NO_RESPONSE = "no_response"
+
+    broadcast = models.ForeignKey(
+        BroadcastNotification,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="runs",
+    )
+    notification_time = models.CharField(
+        max_length=20,
+        choices=AnonymousMenuNotification.NOTIFICATION_TIME_CHOICES,
+        blank=True,
+        help_text="Empty for broadcast runs",
+    )
+    target_date = models.DateField()
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.RUNNING
+    )
+    chunks = models.JSONField(
+        default=dict, help_text="State of every chunk, keyed by 'first_pk-last_pk'"
+    )
+    subscribers = models.PositiveIntegerField(default=0)
+    success_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    expired_count = models.PositiveIntegerField(
+        default=0, help_text="Expired subscriptions deleted while sending"
+    )
+    retry_count = models.PositiveIntegerField(
+        default=0, help_text="Sends waiting in the retry queue"
+    )
+    latency_histogram = models.JSONField(
+        default=dict, help_text="Pushes by latency bucket upper bound in ms"
+    )
+    failures_by_status = models.JSONField(
+        default=dict, help_text="Failed pushes by HTTP status code"
+    )
+    slowest_chunk_seconds = models.FloatField(null=True, blank=True)
+    send_seconds = models.FloatField(
+        default=0, help_text="Seconds spent sending, summed over the chunks"
+    )
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+        verbose_name = "Notification Batch Run"
+        verbose_name_plural = "Notification Batch Runs"
+
+    def __str__(self):
+        if self.broadcast_id:
+            return f"Broadcast {self.broadcast_id} - {self.target_date}"
+        return f"{self.get_notification_time_display()} - {self.target_date}"
+
+    @staticmethod
+    def chunk_key(first_pk, last_pk):
+        return f"{first_pk}-{last_pk}"
+
+    @classmethod
+    def latency_bucket(cls, seconds):
+        """Return the histogram key of a push latency"""
+        milliseconds = seconds * 1000
+        for bucket in cls.LATENCY_BUCKETS_MS:
+            if milliseconds <= bucket:
+                return str(bucket)
+        return "inf"
+
+    def count_chunks(self, state):
+        return sum(1 for chunk_state in self.chunks.values() if chunk_state == state)
+
+    def record_metrics(self, latencies=(), failures_by_status=None, duration=None):
+        """
+        Add the metrics of a chunk to the run, without saving it.
+
+        Args:
+            latencies: duration in seconds of every push of the chunk
+            failures_by_status: failed pushes by HTTP status code (or NO_RESPONSE)
+            duration: seconds the chunk took
+        """
+        for latency in latencies:
+            bucket = self.latency_bucket(latency)
+            self.latency_histogram[bucket] = self.latency_histogram.get(bucket, 0) + 1
+        for status, count in (failures_by_status or {}).items():
+            status = str(status)
+            self.failures_by_status[status] = (
+                self.failures_by_status.get(status, 0) + count
+            )
+        if duration is not None:
+            self.slowest_chunk_seconds = max(self.slowest_chunk_seconds or 0, duration)
+            self.send_seconds += duration
+
+    def finish_chunk(
+        self,
+        chunk,
+        success_count=0,
+        failure_count=0,
+        expired_count=0,
+        retry_count=0,
+        failed=False,
+        latencies=(),
+        failures_by_status=None,
+        duration=None,
+    ):
+        """
+        Record the result of a chunk and close the batch after the last one.
+
+        The batch row is locked, so chunks finishing at the same time on
+        different workers do not overwrite each other.
+
+        Returns:
+            NotificationBatchRun: the updated batch
+        """
+        with transaction.atomic():
+            batch = NotificationBatchRun.objects.select_for_update().get(pk=self.pk)
+            batch.chunks[chunk] = self.CHUNK_FAILED if failed else self.CHUNK_DONE
+            batch.success_count += success_count
+            batch.failure_count += failure_count
+            batch.expired_count += expired_count
+            batch.retry_count += retry_count
+            batch.record_metrics(latencies, failures_by_status, duration)
+            states = set(batch.chunks.values())
+            if self.CHUNK_PENDING not in states:
+                batch.status = (
+                    self.Status.FAILED
+                    if self.CHUNK_FAILED in states
+                    else self.Status.COMPLETED
+                )
+                batch.finished_at = timezone.now()
+            batch.save()
+        return batch
+
+    @property
+    def duration(self):
+        """Seconds from start to end of the run, None while it is running"""
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+    @property
+    def sends(self):
+        """Pushes attempted by the run"""
+        return self.success_count + self.failure_count + self.retry_count
+
+    @property
+    def sends_per_second(self):
+        """
+        Pushes attempted per second of sending, over the chunk durations only.
+
+        The wait between the chunks spread over NOTIFICATION_SEND_WINDOW is
+        left out, so the figure measures the push throughput of a worker.
+        """
+        if not self.send_seconds:
+            return None
+        return round(self.sends / self.send_seconds, 1)
+
+    @property
+    def wall_sends_per_second(self):
+        """Pushes attempted per second from start to end of the run"""
+        if not self.duration:
+            return None
+        return round(self.sends / self.duration, 1)
+
+    def latency_percentile(self, percent):
+        """
+        Return the push latency in ms below which percent% of the pushes fall.
+
+        The histogram only keeps buckets, so the result is the upper bound of
+        the bucket holding the percentile (float("inf") for the slowest one).
+
+        Example:
+            >>> run.latency_histogram = {"50": 90, "200": 10}
+            >>> run.latency_percentile(50), run.latency_percentile(95)
+            (50.0, 200.0)
+        """
+        if not self.latency_histogram:
+            return None
+        buckets = sorted(self.latency_histogram, key=float)
+        cumulative = list(accumulate(self.latency_histogram[b] for b in buckets))
+        return float(buckets[bisect_left(cumulative, cumulative[-1] * percent / 100)])
+
+    @property
+    def p50_latency_ms(self):
+        return self.latency_percentile(50)
+
+    @property
+    def p95_latency_ms(self):
+        return self.latency_percentile(95)
+
+
+class PushRetry(models.Model):
+    """
+    A push refused with a temporary error, waiting to be sent again.
+
+    Retries live in the database so they survive worker restarts; they are
+    sent by notifications.tasks.process_push_retries with exponential backoff
+    (see notifications.push.get_retry_delay). The batch or broadcast the push
+    belongs to gets its counters updated when the retry is resolved.
+
+    The subscription is referenced by its endpoint hash, without a foreign
+    key, so expired subscriptions are still deleted with a single statement;
+    a retry whose subscription is gone is dropped when it comes due.
+    """
+
+    subscription_endpoint = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text="Hash of the subscription endpoint, see AnonymousMenuNotification",
+    )
+    payload = models.JSONField()
+    attempts = models.PositiveSmallIntegerField(
+        default=1, help_text="Sends attempted so far"
+    )
+    next_attempt_at = models.DateTimeField(db_index=True)
+    last_error = models.CharField(max_length=255, blank=True)
+    batch = models.ForeignKey(
+        NotificationBatchRun,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="push_retries",
+    )
+    broadcast = models.ForeignKey(
+        BroadcastNotification,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="push_retries",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["next_attempt_at"]
+        verbose_name = "Push Retry"
+        verbose_name_plural = "Push Retries"
+
+    def __str__(self):
+        return f"Retry {self.attempts} of {self.subscription_endpoint} at {self.next_attempt_at}"
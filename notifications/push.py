@@ -0,0 +1,357 @@
+"""
+Web Push delivery engine.
+
+Pushes are sent concurrently by a bounded thread pool, so a batch takes about
+(subscribers / concurrency) x push service round trip instead of subscribers x
+round trip. Every push service origin (FCM, Mozilla, Apple, ...) gets its own
+requests.Session whose keep-alive pool holds one connection per worker, so TLS
+handshakes are paid once per connection instead of once per push.
+
+VAPID authorization headers only depend on the push service origin (the JWT
+audience) and an expiry, so they are signed once per audience for
+VAPID_HEADER_TTL and cached in-process: the per-message cost is just the
+payload encryption.
+
+Every origin is also rate limited by a token bucket (WEBPUSH_SETTINGS
+["RATE_LIMIT"] pushes per second) and paused when the push service answers
+with a Retry-After header. Throttled (429), unavailable (5xx) and unreachable
+push services are retriable errors: the caller queues those messages for a
+later retry with exponential backoff (see get_retry_delay).
+
+Workers only talk HTTP: results are returned to the caller, which updates the
+database (e.g. deletes expired subscriptions) from its own thread.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from py_vapid import Vapid
+from pywebpush import WebPushException, webpush
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Push service responses meaning the subscription no longer exists
+EXPIRED_STATUS_CODES = (404, 410)
+# Push service responses worth a retry: throttled or temporarily unavailable
+RETRIABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Longest time a push waits for its origin's rate limiter before giving up
+MAX_THROTTLE_WAIT = 5
+# Retry backoff: 1, 2, 4, 8 minutes... up to 1 hour, for at most 5 attempts
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 60 * 60
+RETRY_MAX_ATTEMPTS = 5
+
+# Validity of a signed VAPID header (the 12 hours used by pywebpush), renewed
+# VAPID_RENEW_MARGIN seconds before expiring so no push leaves with a stale one
+VAPID_HEADER_TTL = 12 * 60 * 60
+VAPID_RENEW_MARGIN = 10 * 60
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+_vapid_headers = {}
+_vapid_lock = threading.Lock()
+
+_rate_limiters = {}
+
+
+class PushThrottled(Exception):
+    """The rate limiter of a push service origin did not let the push through"""
+
+    def __init__(self, origin, retry_after):
+        super().__init__(f"{origin} throttled for {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` pushes per second, in bursts of
+    at most `capacity`, to a push service origin.
+
+    The bucket can be paused, e.g. for the delay of a Retry-After header.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Stop sending for the next `seconds` seconds"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def reserve(self):
+        """
+        Take a token if one is available.
+
+        Returns:
+            float: 0 if the token was taken, otherwise the seconds to wait
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.paused_until > now:
+                return self.paused_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, origin="", max_wait=MAX_THROTTLE_WAIT):
+        """
+        Wait for a token, for at most max_wait seconds.
+
+        Raises:
+            PushThrottled: the token would not be available in time
+        """
+        deadline = self.clock() + max_wait
+        while wait := self.reserve():
+            if self.clock() + wait > deadline:
+                raise PushThrottled(origin, wait)
+            self.sleep(wait)
+
+
+def get_push_concurrency():
+    """Return the number of concurrent pushes, from WEBPUSH_SETTINGS["CONCURRENCY"]"""
+    return max(1, settings.WEBPUSH_SETTINGS.get("CONCURRENCY", 16))
+
+
+def get_push_origin(endpoint):
+    """Return the scheme://host[:port] origin of a push endpoint"""
+    url = urlsplit(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+
+def get_push_session(endpoint):
+    """
+    Return the pooled requests.Session of the push service of an endpoint.
+
+    Sessions are created once per origin and reused by every thread: their
+    connection pool keeps up to CONCURRENCY keep-alive connections.
+    """
+    origin = get_push_origin(endpoint)
+    with _sessions_lock:
+        session = _sessions.get(origin)
+        if session is None:
+            pool_size = get_push_concurrency()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount(origin, adapter)
+            _sessions[origin] = session
+    return session
+
+
+def close_push_sessions():
+    """Close every pooled session and reset the rate limiters, e.g. after a benchmark"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _rate_limiters.clear()
+
+
+def get_rate_limiter(endpoint):
+    """
+    Return the token bucket of the push service of an endpoint.
+
+    Returns None when WEBPUSH_SETTINGS["RATE_LIMIT"] is 0 (no limit).
+    """
+    rate = settings.WEBPUSH_SETTINGS.get("RATE_LIMIT", 200)
+    if not rate:
+        return None
+    origin = get_push_origin(endpoint)
+    with _sessions_lock:
+        limiter = _rate_limiters.get(origin)
+        if limiter is None or limiter.rate != rate:
+            limiter = _rate_limiters[origin] = TokenBucket(rate)
+    return limiter
+
+
+def get_vapid_headers(endpoint, now=None):
+    """
+    Return the VAPID authorization headers for the push service of an endpoint.
+
+    Headers are signed once per audience and reused by every push until they
+    are about to expire. The cache is keyed by private key and subject too, so
+    a key rotation takes effect immediately.
+
+    Args:
+        endpoint: push subscription endpoint
+        now: current UNIX time, defaults to time.time()
+
+    Returns:
+        dict: {"Authorization": "vapid t=<jwt>,k=<public key>"}
+    """
+    private_key = settings.WEBPUSH_SETTINGS["VAPID_PRIVATE_KEY"]
+    subject = f"mailto:{settings.WEBPUSH_SETTINGS['VAPID_ADMIN_EMAIL']}"
+    audience = get_push_origin(endpoint)
+    now = int(time.time() if now is None else now)
+    key = (private_key, subject, audience)
+    with _vapid_lock:
+        cached = _vapid_headers.get(key)
+        if cached is None or cached[0] - VAPID_RENEW_MARGIN <= now:
+            expires_at = now + VAPID_HEADER_TTL
+            vapid = Vapid.from_string(private_key=private_key)
+            claims = {"aud": audience, "exp": expires_at, "sub": subject}
+            cached = (expires_at, vapid.sign(claims))
+            _vapid_headers[key] = cached
+    return cached[1]
+
+
+def clear_vapid_headers():
+    """Forget every cached VAPID header"""
+    with _vapid_lock:
+        _vapid_headers.clear()
+
+
+def send_push(subscription_info, payload):
+    """
+    Send a single Web Push message through the pooled session of its origin.
+
+    Raises:
+        WebPushException: the push service refused the message
+    """
+    endpoint = subscription_info.get("endpoint", "")
+    webpush(
+        subscription_info=subscription_info,
+        data=json.dumps(payload),
+        headers=get_vapid_headers(endpoint),
+        timeout=settings.WEBPUSH_SETTINGS.get("TIMEOUT", 10),
+        requests_session=get_push_session(endpoint),
+    )
+
+
+def is_expired_subscription(error):
+    """Return True if a send error means the subscription must be deleted"""
+    return (
+        isinstance(error, WebPushException)
+        and error.response is not None
+        and error.response.status_code in EXPIRED_STATUS_CODES
+    )
+
+
+def is_retriable_error(error):
+    """Return True if a send error is temporary and the push should be retried"""
+    if isinstance(error, PushThrottled | requests.ConnectionError | requests.Timeout):
+        return True
+    return (
+        isinstance(error, WebPushException)
+        and error.response is not None
+        and error.response.status_code in RETRIABLE_STATUS_CODES
+    )
+
+
+def get_error_status(error):
+    """Return the HTTP status code of a send error, None if no response came back"""
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else None
+
+
+def get_retry_after(error):
+    """
+    Return the seconds a push service asked to wait before retrying, or None.
+
+    Both forms of the Retry-After header are supported: delay in seconds and
+    HTTP date.
+    """
+    if isinstance(error, PushThrottled):
+        return error.retry_after
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except ValueError:
+        return None
+    return max(0, retry_at.timestamp() - time.time())
+
+
+def get_retry_delay(attempts, retry_after=None):
+    """
+    Return the seconds to wait before the next attempt of a failed push.
+
+    The delay doubles at every attempt, from RETRY_BASE_DELAY up to
+    RETRY_MAX_DELAY, and is never shorter than the push service Retry-After.
+
+    Example:
+        >>> [get_retry_delay(attempts) for attempts in range(1, 5)]
+        [60, 120, 240, 480]
+    """
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return max(delay, retry_after or 0)
+
+
+def send_pushes(messages, concurrency=None, latencies=None):
+    """
+    Send Web Push messages concurrently.
+
+    Args:
+        messages: iterable of (key, subscription_info, payload), key identifies
+            the message in the results (e.g. the subscription pk)
+        concurrency: maximum number of pushes in flight, defaults to
+            WEBPUSH_SETTINGS["CONCURRENCY"]
+        latencies: optional list, the duration in seconds of every push
+            request is appended to it (time spent in the rate limiter excluded)
+
+    Every push waits for the rate limiter of its origin; a push that would
+    wait longer than MAX_THROTTLE_WAIT fails with PushThrottled instead.
+
+    Returns:
+        list: (key, error) for every message, in the same order, error is None
+        when the push was accepted
+
+    Example:
+        >>> send_pushes([(1, subscription_info, {"head": "Menu", "body": "..."})])
+        [(1, None)]
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+
+    def deliver(message):
+        key, subscription_info, payload = message
+        endpoint = subscription_info.get("endpoint", "")
+        limiter = get_rate_limiter(endpoint)
+        try:
+            if limiter:
+                limiter.acquire(get_push_origin(endpoint))
+            started = time.perf_counter()
+            try:
+                send_push(subscription_info, payload)
+            finally:
+                if latencies is not None:
+                    latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            retry_after = get_retry_after(e)
+            if limiter and retry_after and not isinstance(e, PushThrottled):
+                # Hold back every other push to this origin too
+                limiter.pause(retry_after)
+            return key, e
+        return key, None
+
+    workers = min(concurrency or get_push_concurrency(), len(messages))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(deliver, messages))
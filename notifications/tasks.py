@@ -1,41 +1,72 @@
-import json
 import logging
-from datetime import date, timedelta
+import math
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from itertools import groupby, islice
+from operator import attrgetter
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
-from pywebpush import WebPushException, webpush
-
-from notifications.models import AnonymousMenuNotification, BroadcastNotification
-from notifications.utils import build_menu_notification_payload
-from school_menu.models import AnnualMeal, DetailedMeal, SimpleMeal
+from django_q.models import Schedule
+from django_q.tasks import async_task
+from pywebpush import WebPushException
+
+from notifications.models import (
+    AnonymousMenuNotification,
+    BroadcastNotification,
+    NotificationBatchRun,
+    PushRetry,
+)
+from notifications.push import (
+    RETRY_MAX_ATTEMPTS,
+    get_error_status,
+    get_retry_after,
+    get_retry_delay,
+    is_expired_subscription,
+    is_retriable_error,
+    send_push,
+    send_pushes,
+)
+from notifications.utils import get_menu_notification_payload
+from school_menu.models import School
+from school_menu.utils import get_schools_in_session
 
 logger = logging.getLogger(__name__)
 
+# Subscriptions sent by a single django-q task of a menu notification batch
+NOTIFICATION_CHUNK_SIZE = 500
+# Seconds between two sub-batches of a notification slot spread over
+# settings.NOTIFICATION_SEND_WINDOW: the django-q scheduler looks for due
+# schedules about this often, shorter sub-batches would start together anyway
+NOTIFICATION_SEND_STEP = 30
+# Queued retries sent by a single process_push_retries run
+PUSH_RETRY_BATCH_SIZE = 500
+# Seconds a process_push_retries run owns the retries it claimed
+PUSH_RETRY_CLAIM_TIMEOUT = 10 * 60
+# Subscriptions sent by a broadcast between two checkpoints
+BROADCAST_CHUNK_SIZE = 500
+
 
 def send_test_notification(subscription_info, payload):
     """
     Task che invia una notifica di prova in maniera asincrona
     """
     try:
-        webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(payload),
-            vapid_private_key=settings.WEBPUSH_SETTINGS["VAPID_PRIVATE_KEY"],
-            vapid_claims={
-                "sub": f"mailto:{settings.WEBPUSH_SETTINGS['VAPID_ADMIN_EMAIL']}"
-            },
-        )
+        send_push(subscription_info, payload)
         logger.info("Notifica di prova inviata con successo.")
     except WebPushException as e:
         # If a subscription is expired or invalid, it should be deleted
-        if e.response.status_code in [404, 410]:
+        if is_expired_subscription(e):
             logger.info(
                 f"Subscription expired or invalid: {e.response.text}. Deleting..."
             )
-            AnonymousMenuNotification.objects.filter(
-                subscription_info=subscription_info
-            ).delete()
+            _prune_expired_subscriptions(
+                [AnonymousMenuNotification.hash_subscription(subscription_info)]
+            )
         else:
             logger.error(f"Errore durante l'invio della notifica: {e}")
             raise
@@ -45,90 +76,520 @@ def send_test_notification(subscription_info, payload):
     logger.info("notifica di prova inviata")
 
 
-def _has_menu_for_date(school, target_date):
+def _prune_expired_subscriptions(endpoint_hashes):
+    """
+    Delete expired subscriptions with a single statement on the indexed endpoint hash.
+
+    Returns:
+        int: number of deleted subscriptions
+    """
+    endpoint_hashes = [endpoint for endpoint in endpoint_hashes if endpoint]
+    if not endpoint_hashes:
+        return 0
+    deleted, _ = AnonymousMenuNotification.objects.filter(
+        subscription_endpoint__in=endpoint_hashes
+    ).delete()
+    logger.info(f"Deleted {deleted} expired or invalid subscription(s)")
+    return deleted
+
+
+def _get_next_attempt_at(error, attempts, now):
+    """Return when a push that failed with a retriable error is retried"""
+    delay = get_retry_delay(attempts, get_retry_after(error))
+    return now + timedelta(seconds=delay)
+
+
+def _deliver_notifications(
+    messages, batch=None, broadcast=None, latencies=None, failures_by_status=None
+):
+    """
+    Send notifications concurrently, queue the retriable failures and delete
+    the expired subscriptions.
+
+    Expired endpoints are collected while reading the results and deleted at
+    the end in one statement (see _prune_expired_subscriptions). Pushes
+    refused with a temporary error (throttling, push service down) are stored
+    as PushRetry rows, linked to the batch or broadcast they belong to.
+
+    Args:
+        messages: iterable of (subscription endpoint hash, subscription_info, payload)
+        batch: NotificationBatchRun the messages belong to, if any
+        broadcast: BroadcastNotification the messages belong to, if any
+        latencies: optional list the duration of every push is appended to
+        failures_by_status: optional Counter of the failed pushes (retriable
+            ones included) by HTTP status code
+
+    Returns:
+        tuple: (success_count, failure_count, expired_count, retry_count)
+    """
+    messages = list(messages)
+    payloads = {endpoint_hash: payload for endpoint_hash, _, payload in messages}
+    results = send_pushes(messages, latencies=latencies)
+    now = timezone.now()
+    expired = []
+    retries = []
+    failure_count = 0
+    for endpoint_hash, error in results:
+        if error is None:
+            continue
+        if failures_by_status is not None:
+            status = get_error_status(error) or NotificationBatchRun.NO_RESPONSE
+            failures_by_status[status] += 1
+        if endpoint_hash and is_retriable_error(error):
+            retries.append(
+                PushRetry(
+                    subscription_endpoint=endpoint_hash,
+                    payload=payloads[endpoint_hash],
+                    next_attempt_at=_get_next_attempt_at(error, 1, now),
+                    last_error=str(error)[:255],
+                    batch=batch,
+                    broadcast=broadcast,
+                )
+            )
+            continue
+        failure_count += 1
+        if is_expired_subscription(error):
+            expired.append(endpoint_hash)
+        else:
+            logger.error(
+                f"Failed to send notification to subscription {endpoint_hash}: {error}"
+            )
+    if retries:
+        PushRetry.objects.bulk_create(retries)
+        logger.info(f"Queued {len(retries)} notification(s) for retry")
+    expired_count = _prune_expired_subscriptions(expired)
+    success_count = len(results) - failure_count - len(retries)
+    return success_count, failure_count, expired_count, len(retries)
+
+
+def process_push_retries():
+    """
+    Sends the queued push retries that are due.
+
+    Scheduled every minute (see migration 0013). A retry is done when the push is
+    accepted, the subscription expired or RETRY_MAX_ATTEMPTS attempts failed;
+    otherwise it is rescheduled with a longer delay. Done retries update the
+    counters of their batch or broadcast: success or failure instead of retry.
+
+    Returns:
+        tuple: (success_count, failure_count, rescheduled_count)
+    """
+    now = timezone.now()
+    # Claim the due retries so an overlapping run does not send them too; a
+    # crashed run's retries become due again after PUSH_RETRY_CLAIM_TIMEOUT
+    with transaction.atomic():
+        retries = list(
+            PushRetry.objects.select_for_update(skip_locked=True).filter(
+                next_attempt_at__lte=now
+            )[:PUSH_RETRY_BATCH_SIZE]
+        )
+        PushRetry.objects.filter(pk__in=[retry.pk for retry in retries]).update(
+            next_attempt_at=now + timedelta(seconds=PUSH_RETRY_CLAIM_TIMEOUT)
+        )
+    if not retries:
+        return 0, 0, 0
+
+    subscriptions = AnonymousMenuNotification.objects.in_bulk(
+        {retry.subscription_endpoint for retry in retries},
+        field_name="subscription_endpoint",
+    )
+    errors = dict(
+        send_pushes(
+            (
+                retry.pk,
+                subscriptions[retry.subscription_endpoint].subscription_info,
+                retry.payload,
+            )
+            for retry in retries
+            if retry.subscription_endpoint in subscriptions
+        )
+    )
+    done = []
+    rescheduled = []
+    expired = []
+    counters = {}
+    success_count = 0
+    for retry in retries:
+        if retry.subscription_endpoint not in subscriptions:
+            # Unsubscribed or expired meanwhile
+            error = AnonymousMenuNotification.DoesNotExist("Subscription deleted")
+        else:
+            error = errors[retry.pk]
+        if (
+            error is not None
+            and is_retriable_error(error)
+            and retry.attempts < RETRY_MAX_ATTEMPTS
+        ):
+            retry.attempts += 1
+            retry.next_attempt_at = _get_next_attempt_at(error, retry.attempts, now)
+            retry.last_error = str(error)[:255]
+            rescheduled.append(retry)
+            continue
+
+        done.append(retry.pk)
+        outcome = Counter(retry_count=-1)
+        if error is None:
+            success_count += 1
+            outcome["success_count"] += 1
+        else:
+            outcome["failure_count"] += 1
+            if is_expired_subscription(error):
+                outcome["expired_count"] += 1
+                expired.append(retry.subscription_endpoint)
+            else:
+                logger.error(
+                    f"Giving up notification to subscription {retry.subscription_endpoint} "
+                    f"after {retry.attempts} attempt(s): {error}"
+                )
+        for model, pk in (
+            (NotificationBatchRun, retry.batch_id),
+            (BroadcastNotification, retry.broadcast_id),
+        ):
+            if pk is not None:
+                counters.setdefault((model, pk), Counter()).update(outcome)
+
+    PushRetry.objects.filter(pk__in=done).delete()
+    PushRetry.objects.bulk_update(
+        rescheduled, ["attempts", "next_attempt_at", "last_error"]
+    )
+    _prune_expired_subscriptions(expired)
+    for (model, pk), counter in counters.items():
+        model.objects.filter(pk=pk).update(
+            **{field: F(field) + delta for field, delta in counter.items()}
+        )
+
+    failure_count = len(done) - success_count
+    logger.info(
+        f"Push retries: {success_count} sent, {failure_count} failed, "
+        f"{len(rescheduled)} rescheduled"
+    )
+    return success_count, failure_count, len(rescheduled)
+
+
+def _get_notified_school_ids(schools, target_date):
     """
-    Checks if a menu exists for a specific school on a given date.
+    Return the ids of the schools whose subscribers get a menu notification
+    for target_date: the schools in session, or all of them when the
+    ENABLE_SCHOOL_DATE_CHECK setting is off. Checked in memory, no query.
+
+    Weekends are not skipped: on Saturday and Sunday the payload shows
+    Monday's menu (see get_current_date). Schools without a menu are left
+    out later, when their payload is None.
     """
-    day_of_week = target_date.weekday() + 1  # Monday is 1, Sunday is 7
+    if not settings.ENABLE_SCHOOL_DATE_CHECK:
+        return {school.pk for school in schools}
+    return get_schools_in_session(schools, target_date)
 
-    # Check for AnnualMeal first
-    if AnnualMeal.objects.filter(
-        school=school, date=target_date, is_active=True
-    ).exists():
-        return True
 
-    # Check for SimpleMeal or DetailedMeal
-    if school.menu_type == "S":
-        return SimpleMeal.objects.filter(school=school, day=day_of_week).exists()
-    else:
-        return DetailedMeal.objects.filter(school=school, day=day_of_week).exists()
+def _get_pk_ranges(queryset, chunk_size):
+    """
+    Split a queryset into (first_pk, last_pk) ranges of at most chunk_size rows.
+
+    Only primary keys are fetched; every range can then be processed on its own
+    with a pk__range filter.
+    """
+    pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+    return [
+        (pks[start], pks[min(start + chunk_size, len(pks)) - 1])
+        for start in range(0, len(pks), chunk_size)
+    ]
+
 
+def _get_target_date(notification_time, today=None):
+    """Return the day the menu of a notification refers to"""
+    today = today or timezone.localdate()
+    if notification_time == AnonymousMenuNotification.PREVIOUS_DAY_6PM:
+        return today + timedelta(days=1)
+    return today
 
-def _is_school_in_session(school, target_date):
+
+def _get_chunk_size(subscribers, window):
     """
-    Checks if the school is in session on a given date based on start/end month/day.
+    Return the size of the chunks a slot of subscribers is split into.
+
+    Chunks hold at most NOTIFICATION_CHUNK_SIZE subscriptions; when the slot
+    is spread over a window, they are also made small enough to fill one
+    sub-batch every NOTIFICATION_SEND_STEP seconds of it.
     """
-    start_month = school.start_month
-    start_day = school.start_day
-    end_month = school.end_month
-    end_day = school.end_day
+    sub_batches = max(1, window // NOTIFICATION_SEND_STEP)
+    return max(1, min(NOTIFICATION_CHUNK_SIZE, math.ceil(subscribers / sub_batches)))
 
-    # Create comparable tuples for dates (month, day)
-    today_tuple = (target_date.month, target_date.day)
-    start_tuple = (start_month, start_day)
-    end_tuple = (end_month, end_day)
 
-    # Case 1: School year is within the same calendar year (e.g., Feb to June)
-    if start_tuple <= end_tuple:
-        return start_tuple <= today_tuple <= end_tuple
-    # Case 2: School year spans across calendar years (e.g., Sept to June)
-    else:
-        return today_tuple >= start_tuple or today_tuple <= end_tuple
+def _get_send_offsets(count, window):
+    """
+    Spread count sub-batches over a window of seconds.
+
+    Every sub-batch gets its own slot of window / count seconds and is sent at
+    a random moment of it, so deliveries are even over the window and the
+    traffic they cause does not peak at the same second every day.
+
+    Returns:
+        list: the offset in seconds of every sub-batch, all 0 without a window
+    """
+    slot = window / count if count else 0
+    return [int(index * slot + random.uniform(0, slot)) for index in range(count)]
 
 
 def _send_menu_notifications(notification_time):
     """
-    Sends menu notifications for a specific time.
+    Schedules the menu notifications for a specific time.
+
+    Matching subscriptions are split into chunks by primary key range and
+    every chunk is enqueued as its own django-q task, so the work spreads over
+    all the cluster workers and a slow chunk cannot make the whole batch time
+    out. Progress is tracked in a NotificationBatchRun.
+
+    With settings.NOTIFICATION_SEND_WINDOW the chunks become sub-batches sent
+    at jittered offsets over that many seconds (e.g. 12:00-12:10) as one-off
+    django-q schedules, flattening the spike of parents opening the menu.
+
+    With the school date check, subscriptions of schools not in session on
+    the target date are left out before chunking.
     """
     logger.info(f"Invio notifiche per l'orario: {notification_time}...")
+    target_date = _get_target_date(notification_time)
     subscriptions = AnonymousMenuNotification.objects.filter(
         daily_notification=True, notification_time=notification_time
     )
-    today = date.today()
-    is_previous_day = notification_time == AnonymousMenuNotification.PREVIOUS_DAY_6PM
+    if settings.ENABLE_SCHOOL_DATE_CHECK:
+        schools = School.objects.filter(pk__in=subscriptions.values("school_id"))
+        subscriptions = subscriptions.filter(
+            school_id__in=_get_notified_school_ids(schools, target_date)
+        )
+    window = settings.NOTIFICATION_SEND_WINDOW
+    subscribers = subscriptions.count()
+    ranges = _get_pk_ranges(subscriptions, _get_chunk_size(subscribers, window))
+    batch = NotificationBatchRun.objects.create(
+        notification_time=notification_time,
+        target_date=target_date,
+        chunks={
+            NotificationBatchRun.chunk_key(first_pk, last_pk): (
+                NotificationBatchRun.CHUNK_PENDING
+            )
+            for first_pk, last_pk in ranges
+        },
+        subscribers=subscribers,
+    )
+
+    logger.info(
+        f"[Notification Debug] Starting notification batch {batch.pk}: "
+        f"notification_time={notification_time}, target_date={batch.target_date}, "
+        f"total_subscriptions={batch.subscribers}, chunks={len(ranges)}, "
+        f"window={window}s"
+    )
+
+    if not ranges:
+        batch.status = NotificationBatchRun.Status.COMPLETED
+        batch.finished_at = timezone.now()
+        batch.save()
+        return batch
+
+    now = timezone.now()
+    schedules = []
+    for (first_pk, last_pk), offset in zip(
+        ranges, _get_send_offsets(len(ranges), window), strict=True
+    ):
+        if not offset:
+            async_task(
+                "notifications.tasks.send_menu_notification_chunk",
+                batch.pk,
+                first_pk,
+                last_pk,
+            )
+            continue
+        # One-off schedules are deleted by django-q once they run
+        schedules.append(
+            Schedule(
+                func="notifications.tasks.send_menu_notification_chunk",
+                args=f"{batch.pk}, {first_pk}, {last_pk}",
+                schedule_type=Schedule.ONCE,
+                repeats=-1,
+                next_run=now + timedelta(seconds=offset),
+            )
+        )
+    Schedule.objects.bulk_create(schedules)
+    return batch
+
+
+def send_menu_notification_chunk(batch_pk, first_pk, last_pk):
+    """
+    Sends the menu notifications of the subscriptions in a pk range of a batch.
+
+    A chunk that is already done is skipped, so retrying a task never sends the
+    same notifications twice. A failed chunk is recorded in the batch and the
+    error re-raised, so django-q reports it and it can be resubmitted alone.
+    """
+    batch = NotificationBatchRun.objects.get(pk=batch_pk)
+    chunk = NotificationBatchRun.chunk_key(first_pk, last_pk)
+    if batch.chunks.get(chunk) == NotificationBatchRun.CHUNK_DONE:
+        logger.info(f"Chunk {chunk} of batch {batch_pk} already sent, skipping")
+        return
 
+    subscriptions = AnonymousMenuNotification.objects.filter(
+        daily_notification=True,
+        notification_time=batch.notification_time,
+        pk__range=(first_pk, last_pk),
+    )
+    started = time.perf_counter()
+    latencies = []
+    failures_by_status = Counter()
+    try:
+        success_count, failure_count, expired_count, retry_count = (
+            _send_menu_notifications_to(
+                subscriptions,
+                batch.notification_time,
+                batch.target_date,
+                batch,
+                latencies=latencies,
+                failures_by_status=failures_by_status,
+            )
+        )
+    except Exception as e:
+        logger.error(f"Chunk {chunk} of batch {batch_pk} failed: {e}")
+        batch.finish_chunk(
+            chunk,
+            failed=True,
+            latencies=latencies,
+            failures_by_status=failures_by_status,
+            duration=time.perf_counter() - started,
+        )
+        raise
+
+    batch = batch.finish_chunk(
+        chunk,
+        success_count,
+        failure_count,
+        expired_count,
+        retry_count,
+        latencies=latencies,
+        failures_by_status=failures_by_status,
+        duration=time.perf_counter() - started,
+    )
     logger.info(
-        f"[Notification Debug] Starting notification batch: "
-        f"notification_time={notification_time}, today={today}, "
-        f"is_previous_day={is_previous_day}, total_subscriptions={subscriptions.count()}"
+        f"Notifiche per l'orario {batch.notification_time} inviate (chunk {chunk}): "
+        f"{success_count} success, {failure_count} failures, {expired_count} expired, "
+        f"{retry_count} queued for retry"
     )
 
-    for subscription in subscriptions:
-        school = subscription.school
-        target_date = today + timedelta(days=1) if is_previous_day else today
+
+def _send_menu_notifications_to(
+    subscriptions,
+    notification_time,
+    target_date,
+    batch=None,
+    latencies=None,
+    failures_by_status=None,
+):
+    """
+    Sends the menu notification to the given subscriptions.
+
+    Subscriptions are loaded with their school in a single query and grouped by
+    school. The session check runs once for all the schools (see
+    _get_notified_school_ids) and the payload, including the meals lookup, is
+    computed once per school. The messages of every school are then delivered
+    concurrently (see notifications.push), collecting the push latencies and
+    failures by status code when latencies and failures_by_status are given.
+
+    Returns:
+        tuple: (success_count, failure_count, expired_count, retry_count)
+    """
+    subscriptions = subscriptions.select_related("school").order_by("school_id", "pk")
+    is_previous_day = notification_time == AnonymousMenuNotification.PREVIOUS_DAY_6PM
+
+    groups = [
+        list(group)
+        for _, group in groupby(subscriptions.iterator(), key=attrgetter("school_id"))
+    ]
+    notified_school_ids = _get_notified_school_ids(
+        (group[0].school for group in groups), target_date
+    )
+
+    messages = []
+    for school_subscriptions in groups:
+        school = school_subscriptions[0].school
 
         logger.info(
-            f"[Notification Debug] Processing subscription for school '{school.name}' "
-            f"(ID={school.id}), target_date={target_date}, "
-            f"weekday={target_date.strftime('%A')}"
+            f"[Notification Debug] Processing {len(school_subscriptions)} "
+            f"subscription(s) for school '{school.name}' (ID={school.id}), "
+            f"target_date={target_date}, weekday={target_date.strftime('%A')}"
         )
 
         # Check if school is in session
-        if settings.ENABLE_SCHOOL_DATE_CHECK and not _is_school_in_session(
-            school, target_date
-        ):
+        if school.pk not in notified_school_ids:
             logger.info(
                 f"Skipping notification for {school.name} on {target_date.strftime('%A')} "
                 "as the school is not in session."
             )
             continue
 
-        payload = build_menu_notification_payload(school, is_previous_day)
+        payload = get_menu_notification_payload(school, is_previous_day)
+        if payload is None:
+            logger.info(
+                f"Skipping notification for {school.name} on {target_date.strftime('%A')} "
+                "as no menu is available."
+            )
+            continue
+
+        messages.extend(
+            (
+                subscription.subscription_endpoint,
+                subscription.subscription_info,
+                payload,
+            )
+            for subscription in school_subscriptions
+        )
+
+    return _deliver_notifications(
+        messages,
+        batch=batch,
+        latencies=latencies,
+        failures_by_status=failures_by_status,
+    )
+
+
+def precompute_menu_notification_payloads():
+    """
+    Precomputes today's menu notification payloads of every subscribed school.
+
+    Scheduled off-peak, every night at 3:00 (see migration 0014): the 9:00, 12:00
+    and 18:00 batches then find their payloads in the cache, so sending is
+    pure I/O while the web tier serves the parents checking the menu. Only the
+    payload kinds (same day / previous day) with subscribers are computed, for
+    the schools notified on the day the payload refers to.
+
+    Returns:
+        int: number of payloads computed
+    """
+    subscribed = (
+        AnonymousMenuNotification.objects.filter(daily_notification=True)
+        .order_by()
+        .values_list("school_id", "notification_time")
+        .distinct()
+    )
+    kinds = {}
+    for school_id, notification_time in subscribed:
+        kinds.setdefault(school_id, set()).add(
+            notification_time == AnonymousMenuNotification.PREVIOUS_DAY_6PM
+        )
 
-        payload["icon"] = "/static/img/notification-bell.png"
-        payload["url"] = school.get_absolute_url()
-        send_test_notification(subscription.subscription_info, payload)
-    logger.info(f"Notifiche per l'orario {notification_time} inviate.")
+    schools = list(School.objects.filter(pk__in=kinds))
+    today = timezone.localdate()
+    # Keyed by is_previous_day: previous day payloads are about tomorrow
+    notified_school_ids = {
+        False: _get_notified_school_ids(schools, today),
+        True: _get_notified_school_ids(schools, today + timedelta(days=1)),
+    }
+
+    computed = 0
+    for school in schools:
+        for is_previous_day in sorted(kinds[school.pk]):
+            if school.pk in notified_school_ids[is_previous_day]:
+                get_menu_notification_payload(school, is_previous_day)
+                computed += 1
+    logger.info(
+        f"Precomputed {computed} menu notification payload(s) for {len(kinds)} school(s)"
+    )
+    return computed
 
 
 def send_previous_day_6pm_menu_notification():
@@ -159,9 +620,25 @@ def send_same_day_6pm_menu_notification():
     _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_6PM)
 
 
+def _iter_chunks(iterable, size):
+    """Yield lists of at most size items from iterable"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
 def send_broadcast_notification(broadcast_pk):
     """
     Send a broadcast notification to all matching subscriptions
+
+    Subscriptions are streamed in pk order, BROADCAST_CHUNK_SIZE at a time.
+    After every chunk the last processed pk and the counters are saved on the
+    broadcast, so the admin can follow the progress and a run killed halfway
+    (worker crash, django-q timeout) resumes where it stopped when the task
+    runs again instead of notifying the same subscriptions twice.
+
+    Every execution is recorded as a NotificationBatchRun of the broadcast,
+    with its own counters and delivery metrics.
     """
     try:
         broadcast = BroadcastNotification.objects.get(pk=broadcast_pk)
@@ -169,7 +646,43 @@ def send_broadcast_notification(broadcast_pk):
         logger.error(f"BroadcastNotification {broadcast_pk} not found")
         return
 
+    if broadcast.status == BroadcastNotification.Status.SENT:
+        logger.info(f"Broadcast '{broadcast.title}' already sent, skipping")
+        return
+
+    run = NotificationBatchRun.objects.create(
+        broadcast=broadcast, target_date=timezone.localdate()
+    )
     try:
+        update_fields = ["status"]
+        if broadcast.sent_at is not None:
+            # A finished broadcast sent again starts from scratch
+            broadcast.sent_at = None
+            broadcast.last_processed_pk = None
+            broadcast.recipients_count = 0
+            broadcast.success_count = 0
+            broadcast.failure_count = 0
+            broadcast.expired_count = 0
+            broadcast.retry_count = 0
+            update_fields += [
+                "sent_at",
+                "last_processed_pk",
+                "recipients_count",
+                "success_count",
+                "failure_count",
+                "expired_count",
+                "retry_count",
+            ]
+            # The fresh run sends again the pushes still waiting for a retry
+            broadcast.push_retries.all().delete()
+        broadcast.status = BroadcastNotification.Status.SENDING
+        broadcast.save(update_fields=update_fields)
+        if broadcast.last_processed_pk is not None:
+            logger.info(
+                f"Resuming broadcast '{broadcast.title}' after subscription "
+                f"{broadcast.last_processed_pk}"
+            )
+
         # Build base query
         subscriptions = AnonymousMenuNotification.objects.filter(
             daily_notification=True
@@ -181,6 +694,10 @@ def send_broadcast_notification(broadcast_pk):
                 school__in=broadcast.target_schools.all()
             )
 
+        # Skip the subscriptions already processed by a previous run
+        if broadcast.last_processed_pk is not None:
+            subscriptions = subscriptions.filter(pk__gt=broadcast.last_processed_pk)
+
         # Build payload
         payload = {
             "head": broadcast.title,
@@ -193,55 +710,101 @@ def send_broadcast_notification(broadcast_pk):
         else:
             payload["url"] = "/"
 
-        # Send to all matching subscriptions
-        success_count = 0
-        failure_count = 0
-        total_recipients = subscriptions.count()
-
-        for subscription in subscriptions:
-            try:
-                send_test_notification(subscription.subscription_info, payload)
-                success_count += 1
-            except Exception as e:
-                logger.error(
-                    f"Failed to send broadcast to subscription {subscription.pk}: {e}"
+        # Stream the matching subscriptions and checkpoint after every chunk
+        subscriptions = (
+            subscriptions.order_by("pk")
+            .only("subscription_endpoint", "subscription_info")
+            .iterator(chunk_size=BROADCAST_CHUNK_SIZE)
+        )
+        for chunk in _iter_chunks(subscriptions, BROADCAST_CHUNK_SIZE):
+            started = time.perf_counter()
+            latencies = []
+            failures_by_status = Counter()
+            success_count, failure_count, expired_count, retry_count = (
+                _deliver_notifications(
+                    (
+                        (
+                            subscription.subscription_endpoint,
+                            subscription.subscription_info,
+                            payload,
+                        )
+                        for subscription in chunk
+                    ),
+                    batch=run,
+                    broadcast=broadcast,
+                    latencies=latencies,
+                    failures_by_status=failures_by_status,
                 )
-                failure_count += 1
+            )
+            # F() expressions: process_push_retries updates the same counters
+            BroadcastNotification.objects.filter(pk=broadcast.pk).update(
+                last_processed_pk=chunk[-1].pk,
+                recipients_count=F("recipients_count") + len(chunk),
+                success_count=F("success_count") + success_count,
+                failure_count=F("failure_count") + failure_count,
+                expired_count=F("expired_count") + expired_count,
+                retry_count=F("retry_count") + retry_count,
+            )
+            run.chunks[run.chunk_key(chunk[0].pk, chunk[-1].pk)] = run.CHUNK_DONE
+            run.record_metrics(
+                latencies, failures_by_status, time.perf_counter() - started
+            )
+            NotificationBatchRun.objects.filter(pk=run.pk).update(
+                chunks=run.chunks,
+                latency_histogram=run.latency_histogram,
+                failures_by_status=run.failures_by_status,
+                slowest_chunk_seconds=run.slowest_chunk_seconds,
+                send_seconds=run.send_seconds,
+                subscribers=F("subscribers") + len(chunk),
+                success_count=F("success_count") + success_count,
+                failure_count=F("failure_count") + failure_count,
+                expired_count=F("expired_count") + expired_count,
+                retry_count=F("retry_count") + retry_count,
+            )
+
+        broadcast.refresh_from_db()
 
         # Determine final status based on results (Option B)
-        if total_recipients == 0:
+        if broadcast.recipients_count == 0:
             # No recipients found - still mark as SENT for audit trail
             final_status = BroadcastNotification.Status.SENT
-        elif success_count == 0:
+        elif broadcast.success_count == 0 and broadcast.retry_count == 0:
             # All sends failed
             final_status = BroadcastNotification.Status.FAILED
-        elif failure_count > success_count:
+        elif broadcast.failure_count > broadcast.success_count:
             # More failures than successes
             final_status = BroadcastNotification.Status.FAILED
         else:
             # Success (even with some failures)
             final_status = BroadcastNotification.Status.SENT
 
-        # Update broadcast record
+        # Update broadcast record, the counters are already up to date
         broadcast.sent_at = timezone.now()
         broadcast.status = final_status
-        broadcast.recipients_count = total_recipients
-        broadcast.success_count = success_count
-        broadcast.failure_count = failure_count
-        broadcast.save()
+        broadcast.save(update_fields=["sent_at", "status"])
+        run.status = NotificationBatchRun.Status.COMPLETED
+        run.finished_at = broadcast.sent_at
+        run.save(update_fields=["status", "finished_at"])
 
         logger.info(
             f"Broadcast '{broadcast.title}' completed with status {final_status}: "
-            f"{success_count} success, {failure_count} failures"
+            f"{broadcast.success_count} success, {broadcast.failure_count} failures, "
+            f"{broadcast.expired_count} expired, "
+            f"{broadcast.retry_count} queued for retry"
         )
 
     except Exception as e:
         # Catch-all for unexpected errors during task execution
         logger.error(f"Unexpected error in send_broadcast_notification: {e}")
 
-        # Mark as FAILED so admin knows something went wrong
-        broadcast.status = BroadcastNotification.Status.FAILED
-        broadcast.save()
+        # Mark as FAILED so admin knows something went wrong, the checkpoint
+        # is kept so sending it again resumes from there
+        BroadcastNotification.objects.filter(pk=broadcast.pk).update(
+            status=BroadcastNotification.Status.FAILED
+        )
+        NotificationBatchRun.objects.filter(pk=run.pk).update(
+            status=NotificationBatchRun.Status.FAILED, finished_at=timezone.now()
+        )
 
         # Re-raise so Django-Q can log it
         raise
@@ -2,6 +2,7 @@ import logging
 
 from django.utils import timezone
 
+from school_menu.cache import get_cached_or_query, get_notification_payload_cache_key
 from school_menu.models import School
 from school_menu.utils import (
     calculate_week,
@@ -13,6 +14,10 @@ from school_menu.utils import (
 
 logger = logging.getLogger(__name__)
 
+NOTIFICATION_ICON = "/static/img/notification-bell.png"
+# A precomputed payload is only valid for the day it is sent on
+NOTIFICATION_PAYLOAD_TTL = 24 * 60 * 60
+
 
 def build_menu_notification_payload(school, is_previous_day=False):
     """
@@ -88,3 +93,42 @@ def build_menu_notification_payload(school, is_previous_day=False):
             body = "Nessun menu previsto."
 
     return {"head": head, "body": body}
+
+
+def get_menu_notification_payload(school, is_previous_day=False):
+    """
+    Get the complete menu notification payload of a school for today.
+
+    Payloads are precomputed off-peak (see
+    notifications.tasks.precompute_menu_notification_payloads) and read from
+    the cache, so the notification batches do no meal lookup nor URL
+    reversal. On a miss the payload is built and stored for the following
+    batches of the day. Cached payloads are dropped when the school or its
+    meals change (see school_menu.cache.invalidate_notification_payloads).
+
+    Args:
+        school: School instance
+        is_previous_day: True for the "menu di domani" notification
+
+    Returns:
+        dict: head, body, icon and url, or None when no menu is available
+
+    Example:
+        >>> get_menu_notification_payload(school, is_previous_day=True)
+        {'head': 'Menu di domani ...', 'body': '...', 'icon': '...', 'url': '/menu/...'}
+    """
+    key = get_notification_payload_cache_key(
+        school.id, timezone.localdate(), is_previous_day
+    )
+
+    def build_payload():
+        payload = build_menu_notification_payload(school, is_previous_day)
+        if payload is None:
+            # Cached as well: None would be a cache miss
+            return {}
+        payload["icon"] = NOTIFICATION_ICON
+        payload["url"] = school.get_absolute_url()
+        return payload
+
+    payload = get_cached_or_query(key, build_payload, timeout=NOTIFICATION_PAYLOAD_TTL)
+    return dict(payload) or None
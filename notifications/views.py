@@ -9,6 +9,7 @@ from pywebpush import WebPushException
 from notifications.forms import AnonymousMenuNotificationForm
 from notifications.models import AnonymousMenuNotification
 from notifications.utils import build_menu_notification_payload
+from school_menu.utils import NOTIFICATIONS_STATUS_COOKIE, set_notifications_status
 
 
 def notification_settings(request):
@@ -41,6 +42,9 @@ def notification_settings(request):
     # Clear invalid cookie if subscription wasn't found
     if not pk and request.COOKIES.get("subscription_endpoint"):
         response.delete_cookie("subscription_endpoint")
+    # Refresh the status shown on the menu pages, e.g. after a recovery
+    if "notification" in context:
+        set_notifications_status(request, response, context["notification"])
 
     return response
 
@@ -71,20 +75,32 @@ def save_subscription(request):
 
         endpoint_hash = AnonymousMenuNotification.hash_endpoint(endpoint)
 
-        # Use update_or_create to prevent duplicates
-        notification, created = AnonymousMenuNotification.objects.update_or_create(
-            subscription_endpoint=endpoint_hash,
-            defaults={
-                "school": school,
-                "subscription_info": subscription_info,
-                "notification_time": notification_time,
-                "daily_notification": True,
-            },
+        # A browser already subscribed sends back its endpoint cookie
+        created = request.COOKIES.get("subscription_endpoint") != endpoint_hash
+
+        # Upsert with a single INSERT ... ON CONFLICT to prevent duplicates
+        (notification,) = AnonymousMenuNotification.objects.bulk_create(
+            [
+                AnonymousMenuNotification(
+                    subscription_endpoint=endpoint_hash,
+                    school=school,
+                    subscription_info=subscription_info,
+                    notification_time=notification_time,
+                    daily_notification=True,
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["subscription_endpoint"],
+            update_fields=[
+                "school",
+                "subscription_info",
+                "notification_time",
+                "daily_notification",
+            ],
         )
 
-        # Store notification PK in session
+        # Store notification PK in session, saved by the session middleware
         request.session["anon_notification_pk"] = notification.pk
-        request.session.save()
 
         # Store endpoint hash in persistent cookie (1 year expiry) for recovery
         response = HttpResponse(status=204, headers={"HX-Refresh": "true"})
@@ -96,6 +112,7 @@ def save_subscription(request):
             secure=request.is_secure(),
             samesite="Lax",
         )
+        set_notifications_status(request, response, notification)
 
         if created:
             messages.add_message(
@@ -132,6 +149,7 @@ def delete_subscription(request):
             # Clear the persistent cookie as well
             response = HttpResponse(status=204, headers={"HX-Refresh": "true"})
             response.delete_cookie("subscription_endpoint")
+            response.delete_cookie(NOTIFICATIONS_STATUS_COOKIE)
             return response
         except AnonymousMenuNotification.DoesNotExist:
             return HttpResponse(status=404)
@@ -216,6 +234,7 @@ def toggle_daily_notification(request):
         {"success": True, "message": message},
     )
     response["HX-Trigger"] = "notificationChanged"
+    set_notifications_status(request, response, notification)
     return response
 
 
@@ -232,6 +251,7 @@ def change_school(request, pk):
                 {"success": True, "message": message},
             )
             response["HX-Trigger"] = "notificationChanged"
+            set_notifications_status(request, response, form.instance)
             return response
     else:
         form = AnonymousMenuNotificationForm(instance=notification)
@@ -1,8 +1,10 @@
 from django.contrib import admin
+from django.utils import timezone
 from import_export.admin import ImportExportModelAdmin
 
 from .models import AnnualMeal, DetailedMeal, School, SimpleMeal
 from .resources import DetailedMealResource, SimpleMealResource
+from .utils import get_schools_in_session, get_schools_with_menu
 
 # from .forms import CustomExportForm
 
@@ -29,6 +31,11 @@ class AnnualMealAdmin(admin.ModelAdmin):
 
 @admin.register(School)
 class SchoolAdmin(admin.ModelAdmin):
+    list_display = ["name", "city", "is_published", "in_session_today", "menu_today"]
+    list_filter = ["is_published", "menu_type"]
+    # School.__str__ shows the user, e.g. in the action checkboxes
+    list_select_related = ["user"]
+
     fieldsets = (
         (
             None,
@@ -68,3 +75,40 @@ class SchoolAdmin(admin.ModelAdmin):
             },
         ),
     )
+
+    def get_changelist_instance(self, request):
+        """
+        Prefetch the "today" columns for the whole page at once, instead of
+        with queries per row (see prefetch_today).
+        """
+        changelist = super().get_changelist_instance(request)
+        self.prefetch_today(changelist.result_list)
+        return changelist
+
+    def prefetch_today(self, schools):
+        """
+        Store on every school whether it is in session and has a menu today,
+        as a (in_session, has_menu) tuple shared by both columns. The menus of
+        all the schools are checked with at most 3 queries.
+        """
+        schools = list(schools)
+        today = timezone.localdate()
+        in_session = get_schools_in_session(schools, today)
+        with_menu = get_schools_with_menu(schools, today)
+        for school in schools:
+            school.today = (school.pk in in_session, school.pk in with_menu)
+
+    def get_today(self, obj):
+        """Return the prefetched (in_session, has_menu) of a school"""
+        if not hasattr(obj, "today"):
+            # Not on a changelist page, e.g. a single school
+            self.prefetch_today([obj])
+        return obj.today
+
+    @admin.display(description="In periodo scolastico", boolean=True)
+    def in_session_today(self, obj):
+        return self.get_today(obj)[0]
+
+    @admin.display(description="Menu oggi", boolean=True)
+    def menu_today(self, obj):
+        return self.get_today(obj)[1]
@@ -9,18 +9,30 @@ Cache Key Patterns:
 - Meals: meal:{school_id}:{week}:{day}:{season}:{meal_type}
 - Types Menu: types_menu:{school_id}
 - School Menu Page: school_page:{school_slug}
+- Notification Payload: notification_payload:{school_id}:{date}:{kind}
 
 Default TTL: 24 hours (86400 seconds)
 """
 
 import logging
 from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from functools import partial
 from typing import Any
 
 from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+# School IDs whose meal cache invalidation is postponed (see defer_meal_cache_invalidation)
+_deferred_meal_invalidations: ContextVar[set | None] = ContextVar(
+    "deferred_meal_invalidations", default=None
+)
+
 
 def get_meal_cache_key(
     school_id: int,
@@ -83,6 +95,53 @@ def get_school_menu_cache_key(school_slug: str) -> str:
     return f"school_page:{school_slug}"
 
 
+def get_notification_payload_cache_key(
+    school_id: int,
+    day: date,
+    is_previous_day: bool,
+) -> str:
+    """
+    Generate a cache key for a precomputed menu notification payload.
+
+    Args:
+        school_id: The school's database ID
+        day: Day the payload is sent on
+        is_previous_day: True for the "menu di domani" notification
+
+    Returns:
+        Cache key string in format: notification_payload:{school_id}:{date}:{kind}
+
+    Example:
+        >>> get_notification_payload_cache_key(1, date(2025, 9, 15), True)
+        'notification_payload:1:2025-09-15:previous_day'
+    """
+    kind = "previous_day" if is_previous_day else "same_day"
+    return f"notification_payload:{school_id}:{day.isoformat()}:{kind}"
+
+
+def invalidate_notification_payloads(school_id: int) -> None:
+    """
+    Clear the menu notification payloads of a school precomputed for today.
+
+    Payloads include school fields (name, URL) as well as meals, so they are
+    cleared whenever the school or its meals change. Their keys are known,
+    so this works on every cache backend, without delete_pattern.
+
+    Args:
+        school_id: The school's database ID
+
+    Example:
+        >>> invalidate_notification_payloads(1)
+    """
+    today = timezone.localdate()
+    cache.delete_many(
+        [
+            get_notification_payload_cache_key(school_id, today, is_previous_day)
+            for is_previous_day in (False, True)
+        ]
+    )
+
+
 def invalidate_school_meals(school_id: int) -> int:
     """
     Clear all cached meals for a specific school using pattern matching.
@@ -190,6 +249,7 @@ def invalidate_meal_cache(school_id: int) -> int:
     - Annual meal caches (annual_meals:*)
     - Types menu caches (types_menu:*)
     - JSON API cache (json_api:*)
+    - Notification payloads (notification_payload:*)
 
     Args:
         school_id: The school's database ID
@@ -201,6 +261,15 @@ def invalidate_meal_cache(school_id: int) -> int:
         >>> invalidate_meal_cache(1)
         45  # Deleted 45 cache keys
     """
+    # Inside defer_meal_cache_invalidation() just record the school
+    pending = _deferred_meal_invalidations.get()
+    if pending is not None:
+        pending.add(school_id)
+        return 0
+
+    # Today's notification payloads, also where patterns are not supported
+    invalidate_notification_payloads(school_id)
+
     total_deleted = 0
 
     # Patterns to delete
@@ -210,6 +279,7 @@ def invalidate_meal_cache(school_id: int) -> int:
         f"*annual_meals:{school_id}:*",  # Annual meals
         f"*types_menu:{school_id}*",  # Types menus
         "*json_api*",  # JSON API cache (all schools, as cache_page uses complex keys)
+        f"*notification_payload:{school_id}:*",  # Precomputed notifications
     ]
 
     # Check if cache backend supports delete_pattern (Redis backend)
@@ -222,6 +292,39 @@ def invalidate_meal_cache(school_id: int) -> int:
     return total_deleted
 
 
+@contextmanager
+def defer_meal_cache_invalidation():
+    """
+    Postpone meal cache invalidation until the end of the block.
+
+    Every meal save() invalidates the cache of its school, so importing a menu
+    row by row would run the same delete_pattern() calls once per row. Inside
+    this block invalidate_meal_cache() only records the school and the cache
+    is invalidated once per school when the block exits (also on errors, since
+    rows saved before the failure may have been committed).
+    Inside a transaction the invalidation waits for the commit, so a request
+    served meanwhile cannot cache the old meals again, and it is dropped if
+    the transaction rolls back. Nested blocks are merged into the outermost one.
+
+    Example:
+        >>> with defer_meal_cache_invalidation():
+        ...     for meal in meals:
+        ...         meal.save()  # cache invalidated once, on exit or commit
+    """
+    if _deferred_meal_invalidations.get() is not None:
+        yield
+        return
+
+    pending = set()
+    token = _deferred_meal_invalidations.set(pending)
+    try:
+        yield
+    finally:
+        _deferred_meal_invalidations.reset(token)
+        for school_id in pending:
+            transaction.on_commit(partial(invalidate_meal_cache, school_id))
+
+
 def invalidate_school_cache(school_id: int, school_slug: str = None) -> int:
     """
     Clear ALL caches for a specific school.
@@ -0,0 +1,222 @@
+"""
+Menu CSV export.
+
+Menus are written row by row with csv.writer from a values_list() iterator,
+so an export never holds the whole queryset or the whole file in memory.
+The output matches the one of the former django-import-export resources
+(same headers, weekday labels and CRLF line endings), except for annual
+dates, written as GG/MM/AAAA like the upload expects: exported files can be
+uploaded again unchanged.
+
+The full export streams a ZIP archive with one CSV per meal type and season,
+named like the bulk upload expects (see school_menu.importers).
+"""
+
+import csv
+import io
+import zipfile
+from itertools import chain, groupby
+
+from django.utils import timezone
+
+from school_menu.importers import ARCHIVE_TYPES
+from school_menu.models import AnnualMeal, DetailedMeal, Meal, School, SimpleMeal
+from school_menu.utils import ANNUAL_MENU_COLUMNS
+
+# Rows written to the buffer before a chunk is yielded to the response
+EXPORT_CHUNK_ROWS = 500
+
+DAY_LABELS = dict(Meal.Days.choices)
+
+# Date format of annual menus, the one accepted by the upload
+ANNUAL_DATE_FORMAT = "%d/%m/%Y"
+
+# Names used in the archive export, the same accepted by the bulk upload
+ARCHIVE_TYPE_NAMES = {meal_type: name for name, meal_type in ARCHIVE_TYPES.items()}
+ARCHIVE_SEASON_NAMES = {
+    Meal.Seasons.ESTIVO: "estivo",
+    Meal.Seasons.INVERNALE: "invernale",
+}
+
+# (model, CSV header, model fields) of each weekly menu kind
+WEEKLY_EXPORTS = {
+    School.Types.SIMPLE: (
+        SimpleMeal,
+        ["settimana", "giorno", "pranzo", "spuntino", "merenda"],
+        ["week", "day", "menu", "morning_snack", "afternoon_snack"],
+    ),
+    School.Types.DETAILED: (
+        DetailedMeal,
+        ["settimana", "giorno", "primo", "secondo", "contorno", "frutta", "spuntino"],
+        [
+            "week",
+            "day",
+            "first_course",
+            "second_course",
+            "side_dish",
+            "fruit",
+            "snack",
+        ],
+    ),
+}
+ANNUAL_EXPORT_HEADER = ["data", "giorno", *ANNUAL_MENU_COLUMNS]
+
+
+def to_text(value):
+    """Render a value like import-export did: None becomes an empty string"""
+    return "" if value is None else str(value)
+
+
+def format_weekly_row(week, day, *courses):
+    """Return the CSV row of a weekly meal"""
+    return [to_text(week), DAY_LABELS.get(day, ""), *map(to_text, courses)]
+
+
+def format_annual_row(meal_date, day, menu):
+    """Return the CSV row of an annual meal, one course per column"""
+    columns = len(ANNUAL_MENU_COLUMNS)
+    # Split once; missing courses are exported as empty columns
+    courses = menu.split("\n") if menu else []
+    courses = (courses + [""] * columns)[:columns]
+    return [meal_date.strftime(ANNUAL_DATE_FORMAT), DAY_LABELS.get(day, ""), *courses]
+
+
+def get_export_spec(school):
+    """
+    Get what is needed to export the menus of a school.
+
+    Returns:
+        tuple: (model, CSV header, model fields, row formatter)
+    """
+    if school.annual_menu:
+        return (
+            AnnualMeal,
+            ANNUAL_EXPORT_HEADER,
+            ["date", "day", "menu"],
+            format_annual_row,
+        )
+    model, header, fields = WEEKLY_EXPORTS[school.menu_type]
+    return model, header, fields, format_weekly_row
+
+
+def iter_menu_rows(school, season, meal_type):
+    """Yield the rows of the menu export of a school, header first"""
+    model, header, fields, format_row = get_export_spec(school)
+    yield header
+    meals = model.objects.filter(
+        school=school, season=season, type=meal_type
+    ).values_list(*fields)
+    for values in meals.iterator():
+        yield format_row(*values)
+
+
+def iter_csv_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write rows with csv.writer, yielding the CSV text every chunk_rows rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for index, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if index % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_menu_csv(school, season, meal_type, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream the CSV export of a school menu.
+
+    Args:
+        school: School instance
+        season: Meal.Seasons value
+        meal_type: Meal.Types value
+        chunk_rows: number of rows per yielded chunk
+
+    Returns:
+        Iterator of CSV text chunks, suitable for a StreamingHttpResponse
+
+    Example:
+        >>> "".join(iter_menu_csv(school, Meal.Seasons.INVERNALE, Meal.Types.STANDARD))
+        'settimana,giorno,primo,...\\r\\n1,Lunedì,Pasta,...\\r\\n'
+    """
+    return iter_csv_chunks(iter_menu_rows(school, season, meal_type), chunk_rows)
+
+
+class ZipStream:
+    """Write-only file object buffering the bytes written by ZipFile"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Return and forget the bytes written so far"""
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def get_archive_name(school, meal_type, season=None):
+    """
+    Get the name of a menu inside the archive export.
+
+    Names follow the bulk upload convention, so the archive can be uploaded again:
+    <TIPO>/<stagione>.csv for weekly menus, <TIPO>.csv for annual menus.
+    """
+    type_name = ARCHIVE_TYPE_NAMES[meal_type]
+    if school.annual_menu:
+        return f"{type_name}.csv"
+    return f"{type_name}/{ARCHIVE_SEASON_NAMES[season]}.csv"
+
+
+def iter_menu_archive(school, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream a ZIP archive with one CSV for every meal type and season of a school.
+
+    All the meals are fetched with a single query ordered by type and season,
+    then grouped while iterating: every group becomes a CSV entry, written in
+    chunks. Annual menus are grouped by type only.
+
+    Args:
+        school: School instance
+        chunk_rows: number of rows written between yielded chunks
+
+    Returns:
+        Iterator of ZIP bytes, suitable for a StreamingHttpResponse
+
+    Example:
+        >>> zipfile.ZipFile(io.BytesIO(b"".join(iter_menu_archive(school)))).namelist()
+        ['STANDARD/estivo.csv', 'STANDARD/invernale.csv', 'NO_GLUTEN/estivo.csv']
+    """
+    model, header, fields, format_row = get_export_spec(school)
+    group_fields = ["type"] if school.annual_menu else ["type", "season"]
+    # Keep the row order of the single menu export inside each group
+    ordering = model._meta.ordering or ["pk"]
+    meals = (
+        model.objects.filter(school=school)
+        .order_by(*group_fields, *ordering)
+        .values_list(*group_fields, *fields)
+    )
+    size = len(group_fields)
+    date_time = timezone.localtime().timetuple()[:6]
+
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for key, group in groupby(meals.iterator(), key=lambda values: values[:size]):
+            entry = zipfile.ZipInfo(get_archive_name(school, *key), date_time)
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            rows = chain([header], (format_row(*values[size:]) for values in group))
+            with archive.open(entry, "w") as file:
+                for chunk in iter_csv_chunks(rows, chunk_rows):
+                    file.write(chunk.encode())
+                    if data := stream.drain():
+                        yield data
+    yield stream.drain()
@@ -188,8 +188,10 @@ class UploadMenuForm(forms.Form):
     def clean_file(self):
         file = self.cleaned_data.get("file")
         ext = file.name.split(".")[-1].lower()
-        if ext not in ["csv"]:
-            raise forms.ValidationError("Il file deve essere in formato csv")
+        if ext not in ["csv", "xlsx", "ods"]:
+            raise forms.ValidationError(
+                "Il file deve essere in formato csv, xlsx o ods"
+            )
         return file
 
     def __init__(self, *args, **kwargs):
@@ -202,7 +204,7 @@ class UploadMenuForm(forms.Form):
                 Field(
                     "file",
                     css_class="file-input file-input-sm file-input-bordered mb-2",
-                    accept=".csv",
+                    accept=".csv,.xlsx,.ods",
                 ),
                 Div(
                     css_id="spinner",
@@ -219,8 +221,42 @@ class UploadAnnualMenuForm(forms.Form):
     def clean_file(self):
         file = self.cleaned_data.get("file")
         ext = file.name.split(".")[-1].lower()
-        if ext not in ["csv"]:
-            raise forms.ValidationError("Il file deve essere in formato csv")
+        if ext not in ["csv", "xlsx", "ods"]:
+            raise forms.ValidationError(
+                "Il file deve essere in formato csv, xlsx o ods"
+            )
+        return file
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.form_tag = False
+        self.helper.layout = Layout(
+            Div(
+                Field(
+                    "file",
+                    css_class="file-input file-input-sm file-input-bordered mb-2",
+                    accept=".csv,.xlsx,.ods",
+                ),
+                Div(
+                    css_id="spinner",
+                    css_class="loading loading-bars loading-md ms-6 mt-2 text-primary htmx-indicator",
+                ),
+                css_class="flex flex-row gap-2",
+            )
+        )
+
+
+class UploadMenuArchiveForm(forms.Form):
+    file = forms.FileField(label="Carica Archivio")
+
+    def clean_file(self):
+        file = self.cleaned_data.get("file")
+        ext = file.name.split(".")[-1].lower()
+        if ext not in ["zip", "xlsx", "ods"]:
+            raise forms.ValidationError(
+                "Il file deve essere in formato zip, xlsx o ods"
+            )
         return file
 
     def __init__(self, *args, **kwargs):
@@ -232,7 +268,7 @@ class UploadAnnualMenuForm(forms.Form):
                 Field(
                     "file",
                     css_class="file-input file-input-sm file-input-bordered mb-2",
-                    accept=".csv",
+                    accept=".zip,.xlsx,.ods",
                 ),
                 Div(
                     css_id="spinner",
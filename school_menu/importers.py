@@ -0,0 +1,790 @@
+"""
+Menu import engine shared by the upload views and the import_meals command.
+
+Menu files are parsed into tablib Datasets, validated with check_menu_dataset()
+and imported through the django-import-export resources. Meal cache invalidation
+is deferred, so each import invalidates the school cache once instead of once
+per saved row.
+
+Menus can be uploaded as CSV or as XLSX/ODS spreadsheets. Spreadsheets are
+streamed row by row (openpyxl read-only mode, iterparse for ODS) without
+building the whole workbook model, then follow the same pipeline as CSV.
+
+Bulk uploads contain one menu per meal type and season, either as files of a
+ZIP archive or as sheets of a workbook:
+- Weekly menus: <TIPO>/<stagione>.csv, <TIPO>_<stagione>.csv or sheet <TIPO>_<stagione>
+- Annual menus: <TIPO>.csv, <TIPO>/<nome>.csv or sheet <TIPO>
+
+TIPO: STANDARD, NO_GLUTEN, NO_LACTOSE, VEGETARIAN, SPECIAL
+stagione: estivo, invernale (also menu_estivo, menu_invernale)
+
+This is the same layout as data/<school>/<TIPO>/<stagione>.csv.
+"""
+
+import hashlib
+import json
+import logging
+import zipfile
+from datetime import date, datetime
+from pathlib import Path, PurePosixPath
+from time import perf_counter
+from xml.etree.ElementTree import iterparse  # nosec B405 - ODS content from zip
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from openpyxl import load_workbook
+from tablib import Dataset
+
+from school_menu.cache import defer_meal_cache_invalidation, invalidate_meal_cache
+from school_menu.models import AnnualMeal, Meal, School
+from school_menu.resources import (
+    AnnualMenuResource,
+    DetailedMealResource,
+    SimpleMealResource,
+)
+from school_menu.utils import (
+    ANNUAL_MENU_COLUMNS,
+    check_menu_dataset,
+    detect_csv_format,
+    fill_missing_dates,
+    format_dataset_error,
+    summarize_dataset_errors,
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_TYPES = {
+    "STANDARD": Meal.Types.STANDARD,
+    "NO_GLUTEN": Meal.Types.GLUTEN_FREE,
+    "NO_LACTOSE": Meal.Types.LACTOSE_FREE,
+    "VEGETARIAN": Meal.Types.VEGETARIAN,
+    "SPECIAL": Meal.Types.SPECIAL,
+}
+
+ARCHIVE_SEASONS = {
+    "estivo": Meal.Seasons.ESTIVO,
+    "menu_estivo": Meal.Seasons.ESTIVO,
+    "invernale": Meal.Seasons.INVERNALE,
+    "menu_invernale": Meal.Seasons.INVERNALE,
+}
+
+# Limits protecting the server from oversized or malicious archives
+ARCHIVE_MAX_FILES = 20
+ARCHIVE_MAX_SIZE = 20 * 1024 * 1024  # 20 MB uncompressed
+
+# School fields that can be set from a bulk import manifest
+MANIFEST_SCHOOL_FIELDS = (
+    "name",
+    "city",
+    "menu_type",
+    "annual_menu",
+    "is_published",
+    "no_gluten",
+    "no_lactose",
+    "vegetarian",
+    "special",
+    "season_choice",
+    "week_bias",
+    "start_day",
+    "start_month",
+    "end_day",
+    "end_month",
+)
+
+WEEKDAY_NUMBERS = {label: value for value, label in Meal.Days.choices}
+
+SPREADSHEET_EXTENSIONS = ("xlsx", "ods")
+
+# Data rows read from a spreadsheet sheet: an annual menu fits easily
+SPREADSHEET_MAX_ROWS = 5000
+# ODS stores trailing empty cells as a single cell repeated up to the sheet width
+ODS_MAX_REPEAT = 100
+ODS_TABLE = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+ODS_OFFICE = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
+ODS_TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+
+
+def load_csv_dataset(content):
+    """
+    Load CSV text into a tablib Dataset, detecting delimiter and quote character.
+
+    Raises the tablib/csv exceptions (InvalidDimensions, ValueError) on malformed files.
+    """
+    delimiter, quotechar = detect_csv_format(content)
+    dataset = Dataset()
+    dataset.load(content, format="csv", delimiter=delimiter, quotechar=quotechar)
+    return dataset
+
+
+def get_file_extension(name):
+    """Return the lowercase extension of a file name, without the dot"""
+    return name.rsplit(".", 1)[-1].lower()
+
+
+def cell_to_text(value):
+    """
+    Convert a spreadsheet cell value to the text a CSV export would contain.
+
+    Dates become DD/MM/YYYY and integral numbers lose the decimal part,
+    so that week numbers and dates validate exactly like CSV values.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def rows_to_dataset(rows):
+    """
+    Build a Dataset from an iterable of spreadsheet rows.
+
+    The first non empty row is the header, empty rows are skipped and data rows
+    are padded or truncated to the header length. Raises ValueError past
+    SPREADSHEET_MAX_ROWS data rows.
+    """
+    dataset = Dataset()
+    headers = None
+    for row in rows:
+        values = [cell_to_text(value) for value in row]
+        if not any(values):
+            continue
+        if headers is None:
+            while not values[-1]:
+                values.pop()
+            headers = values
+            dataset.headers = headers
+            continue
+        if len(dataset) >= SPREADSHEET_MAX_ROWS:
+            raise ValueError("Il foglio di calcolo è troppo grande.")
+        values = values[: len(headers)]
+        values.extend([""] * (len(headers) - len(values)))
+        dataset.append(values)
+    return dataset
+
+
+def iter_xlsx_sheets(file):
+    """
+    Yield (sheet_name, rows) for every sheet of an XLSX workbook.
+
+    The workbook is opened in read-only mode: rows are streamed from the file
+    instead of loading the whole workbook model in memory.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _ods_cell_value(cell):
+    """Return the value of an ODS table cell element"""
+    value_type = cell.get(f"{ODS_OFFICE}value-type")
+    if value_type == "float":
+        return float(cell.get(f"{ODS_OFFICE}value"))
+    if value_type == "date":
+        return date.fromisoformat(cell.get(f"{ODS_OFFICE}date-value")[:10])
+    paragraphs = cell.findall(f"{ODS_TEXT}p")
+    return "\n".join("".join(p.itertext()) for p in paragraphs)
+
+
+def iter_ods_sheets(file):
+    """
+    Yield (sheet_name, rows) for every sheet of an ODS spreadsheet.
+
+    content.xml is parsed incrementally and each row element is discarded once
+    read, so only one sheet is held in memory at a time.
+    """
+    with zipfile.ZipFile(file) as ods:
+        if ods.getinfo("content.xml").file_size > ARCHIVE_MAX_SIZE:
+            raise ValueError("Il foglio di calcolo è troppo grande.")
+        with ods.open("content.xml") as content:
+            yield from _iter_ods_tables(content)
+
+
+def _ods_repeat(element, attribute, value):
+    """
+    Return how many times an ODS row or cell is repeated.
+
+    Empty rows and cells are capped to ODS_MAX_REPEAT, since they only pad the
+    sheet; a non empty one repeated more than that is rejected.
+    """
+    repeat = int(element.get(f"{ODS_TABLE}{attribute}", 1))
+    if repeat <= ODS_MAX_REPEAT:
+        return repeat
+    if value:
+        raise ValueError("Il foglio di calcolo è troppo grande.")
+    return ODS_MAX_REPEAT
+
+
+def _iter_ods_tables(content):
+    """Stream the tables of an ODS content.xml as (name, rows)"""
+    name, rows, row = None, [], []
+    for event, element in iterparse(content, events=("start", "end")):  # nosec B314
+        tag = element.tag
+        if event == "start":
+            if tag == f"{ODS_TABLE}table":
+                name, rows = element.get(f"{ODS_TABLE}name"), []
+            elif tag == f"{ODS_TABLE}table-row":
+                row = []
+            continue
+        if tag in (f"{ODS_TABLE}table-cell", f"{ODS_TABLE}covered-table-cell"):
+            value = _ods_cell_value(element)
+            repeat = _ods_repeat(element, "number-columns-repeated", value != "")
+            row.extend([value] * repeat)
+        elif tag == f"{ODS_TABLE}table-row":
+            if any(value != "" for value in row):
+                repeat = _ods_repeat(element, "number-rows-repeated", True)
+                rows.extend([row] * repeat)
+            element.clear()
+        elif tag == f"{ODS_TABLE}table":
+            element.clear()
+            yield name, rows
+
+
+def iter_spreadsheet_sheets(file, extension):
+    """Yield (sheet_name, rows) for every sheet of an XLSX or ODS file"""
+    if extension == "ods":
+        return iter_ods_sheets(file)
+    return iter_xlsx_sheets(file)
+
+
+def load_menu_file(file):
+    """
+    Load an uploaded menu file (CSV, XLSX or ODS) into a Dataset.
+
+    Only the first sheet of a spreadsheet is read: use the bulk upload to
+    import several menus from a multi-sheet workbook.
+    """
+    extension = get_file_extension(file.name)
+    if extension not in SPREADSHEET_EXTENSIONS:
+        return load_csv_dataset(file.read().decode("utf-8"))
+    sheets = iter_spreadsheet_sheets(file, extension)
+    try:
+        _, rows = next(sheets)
+        return rows_to_dataset(rows)
+    finally:
+        sheets.close()
+
+
+def get_menu_kind(school):
+    """Return the menu kind ('simple', 'detailed' or 'annual') imported by the school"""
+    if school.annual_menu:
+        return "annual"
+    if school.menu_type == School.Types.SIMPLE:
+        return "simple"
+    return "detailed"
+
+
+def get_import_resource(school, annual=None):
+    """Return the import resource matching the school's menu kind"""
+    if annual is None:
+        annual = school.annual_menu
+    if annual:
+        return AnnualMenuResource()
+    if school.menu_type == School.Types.SIMPLE:
+        return SimpleMealResource()
+    return DetailedMealResource()
+
+
+def get_menu_row_hash(values):
+    """Return a stable content hash of the normalized values of a menu row"""
+    return hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def diff_menu_dataset(dataset, school, meal_type, season=None, annual=None):
+    """
+    Split a validated dataset into changed and unchanged rows.
+
+    Every row is normalized to the values stored on the meal (annual courses are
+    joined like AnnualMenuResource does) and its content hash is compared with
+    the hash of the stored meal for the same week/day or date. Stored meals are
+    fetched with a single query. Columns missing from the dataset are not
+    compared, since the import leaves them untouched.
+
+    Args:
+        dataset: validated tablib Dataset
+        school: School object
+        meal_type: Meal.Types value
+        season: Meal.Seasons value (ignored for annual menus)
+        annual: annual menu dataset, defaults to school.annual_menu
+
+    Returns:
+        tuple: (changed_dataset, unchanged)
+            - changed_dataset: Dataset with only the new or modified rows
+            - unchanged: number of rows identical to the stored meals
+    """
+    if annual is None:
+        annual = school.annual_menu
+    headers = dataset.headers
+
+    if annual:
+        stored = {
+            meal["date"]: get_menu_row_hash([meal["menu"]])
+            for meal in AnnualMeal.objects.filter(school=school, type=meal_type).values(
+                "date", "menu"
+            )
+        }
+
+        def normalize(row):
+            key = datetime.strptime(row["data"], "%d/%m/%Y").date()
+            menu = "\n".join(
+                row[column] for column in ANNUAL_MENU_COLUMNS if row.get(column)
+            )
+            return key, [menu]
+
+    else:
+        resource = get_import_resource(school, annual)
+        attributes = {
+            field.column_name: field.attribute
+            for field in resource.get_import_fields()
+            if field.column_name in headers
+            and field.column_name not in ("giorno", "settimana")
+        }
+        stored = {
+            (meal["week"], meal["day"]): get_menu_row_hash(
+                [meal[attribute] or "" for attribute in attributes.values()]
+            )
+            for meal in resource._meta.model.objects.filter(
+                school=school, type=meal_type, season=season
+            ).values("week", "day", *attributes.values())
+        }
+
+        def normalize(row):
+            key = (int(row["settimana"]), WEEKDAY_NUMBERS[row["giorno"]])
+            return key, [str(row[column] or "") for column in attributes]
+
+    changed_dataset = Dataset(headers=headers)
+    unchanged = 0
+    for values in dataset:
+        key, normalized = normalize(dict(zip(headers, values, strict=True)))
+        if stored.get(key) == get_menu_row_hash(normalized):
+            unchanged += 1
+        else:
+            changed_dataset.append(values)
+    return changed_dataset, unchanged
+
+
+def import_menu_dataset(
+    dataset, school, meal_type, season=None, annual=None, raise_errors=False
+):
+    """
+    Import a validated dataset for the given school, meal type and season.
+
+    Only rows that differ from the stored meals are written (see
+    diff_menu_dataset()). The import runs in a single pass: django-import-export
+    rolls the transaction back when a row fails, so no preliminary dry run is
+    needed. The meal cache of the school is invalidated once at the end, and
+    not at all when no row changed.
+
+    Args:
+        dataset: validated tablib Dataset
+        school: School object
+        meal_type: Meal.Types value
+        season: Meal.Seasons value (ignored for annual menus)
+        annual: import an annual menu, defaults to school.annual_menu
+        raise_errors: raise on the first failing row instead of collecting errors
+
+    Returns:
+        tuple: (result, changed, unchanged)
+            - result: import_export Result object, None if no row changed
+            - changed: number of written rows
+            - unchanged: number of rows skipped because identical
+    """
+    if annual is None:
+        annual = school.annual_menu
+    changed_dataset, unchanged = diff_menu_dataset(
+        dataset, school, meal_type, season, annual
+    )
+    if not len(changed_dataset):
+        logger.info(f"Menu unchanged for school {school.id}, import skipped")
+        return None, 0, unchanged
+
+    resource = get_import_resource(school, annual)
+    kwargs = {"school": school, "type": meal_type}
+    if not annual:
+        kwargs["season"] = season
+
+    with defer_meal_cache_invalidation():
+        result = resource.import_data(
+            changed_dataset, dry_run=False, raise_errors=raise_errors, **kwargs
+        )
+        if annual and not result.has_errors():
+            fill_missing_dates(school, meal_type)
+        # Resources may use bulk_create which bypasses save(): always invalidate
+        invalidate_meal_cache(school.id)
+    return result, len(changed_dataset), unchanged
+
+
+def parse_archive_name(name, annual=False):
+    """
+    Get meal type and season from the name of a file inside a bulk archive.
+
+    Returns:
+        tuple: (meal_type, season), season is None for annual menus,
+               or None if the name does not follow the naming convention
+    """
+    path = PurePosixPath(name)
+    folder = path.parent.name.upper()
+    stem = path.stem
+
+    if folder in ARCHIVE_TYPES:
+        meal_type, season_name = ARCHIVE_TYPES[folder], stem
+    else:
+        for key in sorted(ARCHIVE_TYPES, key=len, reverse=True):
+            if stem.upper() == key or stem.upper().startswith(f"{key}_"):
+                meal_type, season_name = ARCHIVE_TYPES[key], stem[len(key) + 1 :]
+                break
+        else:
+            return None
+
+    if annual:
+        return meal_type, None
+    season = ARCHIVE_SEASONS.get(season_name.lower())
+    if season is None:
+        return None
+    return meal_type, season
+
+
+def _read_menu_sources(sources, school, name_hint):
+    """
+    Validate the menus of a bulk upload.
+
+    Args:
+        sources: iterable of (name, menu_name, load), where menu_name follows the
+            naming convention and load() returns the menu Dataset
+        school: School object the menus belong to
+        name_hint: example of a valid name, shown when a name is not recognised
+
+    Returns:
+        tuple: (entries, errors), see read_menu_archive()
+    """
+    entries = []
+    errors = []
+    menu_kind = get_menu_kind(school)
+    seen = {}
+    for name, menu_name, load in sources:
+        parsed = parse_archive_name(menu_name, annual=school.annual_menu)
+        if parsed is None:
+            errors.append(f"{name}: nome non riconosciuto. Usa il formato {name_hint}.")
+            continue
+        if parsed in seen:
+            errors.append(f"{name}: menu già presente in {seen[parsed]}.")
+            continue
+        seen[parsed] = name
+
+        try:
+            dataset = load()
+        except Exception as e:
+            errors.append(f"{name}: file non valido. Errore: {str(e)}")
+            continue
+
+        dataset_errors, filtered_dataset = check_menu_dataset(dataset, menu_kind)
+        if dataset_errors:
+            errors.append(f"{name}: {summarize_dataset_errors(dataset_errors)}")
+            errors.extend(
+                f"{name}: {format_dataset_error(error)}"
+                for error in dataset_errors
+                if error["row"]
+            )
+            continue
+        meal_type, season = parsed
+        entries.append((name, meal_type, season, filtered_dataset))
+    return entries, errors
+
+
+def read_menu_archive(archive, school):
+    """
+    Read and validate every menu file of a ZIP archive.
+
+    Nothing is written to the database: the returned entries can be imported
+    with import_menu_entries() once all of them are valid.
+
+    Args:
+        archive: path or file-like object of the ZIP archive
+        school: School object the menus belong to
+
+    Returns:
+        tuple: (entries, errors)
+            - entries: list of (file_name, meal_type, season, dataset)
+            - errors: list of messages, each one prefixed by the file name
+    """
+    try:
+        zip_file = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        return [], ["Il file caricato non è un archivio ZIP valido."]
+
+    with zip_file:
+        members = [
+            info
+            for info in zip_file.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith(".csv")
+            and not any(
+                part.startswith((".", "__MACOSX"))
+                for part in PurePosixPath(info.filename).parts
+            )
+        ]
+        if not members:
+            return [], ["L'archivio non contiene file CSV."]
+        if len(members) > ARCHIVE_MAX_FILES:
+            return [], [
+                f"L'archivio contiene troppi file (massimo {ARCHIVE_MAX_FILES})."
+            ]
+        if sum(info.file_size for info in members) > ARCHIVE_MAX_SIZE:
+            return [], ["L'archivio è troppo grande."]
+
+        sources = (
+            (
+                info.filename,
+                info.filename,
+                lambda info=info: load_csv_dataset(zip_file.read(info).decode("utf-8")),
+            )
+            for info in members
+        )
+        return _read_menu_sources(
+            sources, school, "TIPO/stagione.csv (es. STANDARD/invernale.csv)"
+        )
+
+
+def read_menu_workbook(workbook, school):
+    """
+    Read and validate every sheet of an XLSX or ODS workbook.
+
+    Each sheet is a menu, named with the bulk upload convention
+    (e.g. STANDARD_invernale). Sheets are streamed one at a time.
+
+    Args:
+        workbook: uploaded file of the workbook
+        school: School object the menus belong to
+
+    Returns:
+        tuple: (entries, errors), see read_menu_archive()
+    """
+    try:
+        sheets = iter_spreadsheet_sheets(workbook, get_file_extension(workbook.name))
+        sources = (
+            (name, name, lambda rows=rows: rows_to_dataset(rows))
+            for name, rows in sheets
+        )
+        return _read_menu_sources(
+            sources, school, "TIPO_stagione (es. STANDARD_invernale)"
+        )
+    except Exception as e:
+        return [], [f"Il foglio di calcolo non è valido. Errore: {str(e)}"]
+
+
+def import_menu_entries(entries, school):
+    """
+    Import validated menu entries in a single transaction.
+
+    If any row fails the whole import is rolled back. The meal cache of the
+    school is invalidated once, after every entry has been imported, and only
+    if at least one row changed.
+
+    Args:
+        entries: list of (file_name, meal_type, season, dataset) from read_menu_archive()
+        school: School object
+
+    Returns:
+        tuple: (changed, unchanged) total number of written and skipped rows
+    """
+    total_changed = total_unchanged = 0
+    with defer_meal_cache_invalidation(), transaction.atomic():
+        for name, meal_type, season, dataset in entries:
+            _, changed, unchanged = import_menu_dataset(
+                dataset, school, meal_type, season, raise_errors=True
+            )
+            total_changed += changed
+            total_unchanged += unchanged
+            logger.info(
+                f"Imported {name} for school {school.id} ({changed} changed, {unchanged} unchanged)"
+            )
+    return total_changed, total_unchanged
+
+
+def delete_missing_meals(dataset, school, meal_type, season=None):
+    """
+    Delete the stored meals of a menu that are missing from its dataset.
+
+    Weekly meals are matched by week and day within the meal type and season,
+    annual meals by date within the meal type. The inactive days that
+    fill_missing_dates() adds between the dates of the dataset are kept.
+
+    Args:
+        dataset: validated tablib Dataset of the whole menu
+        school: School object
+        meal_type: Meal.Types value
+        season: Meal.Seasons value (ignored for annual menus)
+
+    Returns:
+        int: number of deleted meals
+    """
+    rows = dataset.dict
+    if school.annual_menu:
+        dates = {datetime.strptime(row["data"], "%d/%m/%Y").date() for row in rows}
+        stale = AnnualMeal.objects.filter(school=school, type=meal_type).exclude(
+            date__in=dates
+        )
+        if dates:
+            stale = stale.exclude(is_active=False, date__range=(min(dates), max(dates)))
+    else:
+        model = get_import_resource(school)._meta.model
+        keys = {(int(row["settimana"]), WEEKDAY_NUMBERS[row["giorno"]]) for row in rows}
+        stale = model.objects.filter(
+            school=school,
+            type=meal_type,
+            season=season,
+            pk__in=[
+                pk
+                for pk, week, day in model.objects.filter(
+                    school=school, type=meal_type, season=season
+                ).values_list("pk", "week", "day")
+                if (week, day) not in keys
+            ],
+        )
+    deleted = stale.delete()[0]
+    if deleted:
+        # Queryset deletes bypass Meal.delete()
+        invalidate_meal_cache(school.id)
+    return deleted
+
+
+def load_manifest(path):
+    """
+    Load and check a bulk import manifest.
+
+    The manifest is a JSON file listing the schools to create or update and
+    their menu files. File paths are relative to the manifest directory; the
+    menu of each file is taken from its path (e.g. STANDARD/menu_estivo.csv)
+    or from the optional "menu" key (e.g. STANDARD_invernale). Schools without
+    "user" are assigned to the superuser, other users are created when missing.
+
+    Example:
+        {
+            "schools": [
+                {
+                    "name": "Convitto Carlo Alberto",
+                    "city": "Novara",
+                    "menu_type": "D",
+                    "no_gluten": true,
+                    "files": [
+                        {"path": "carlo_alberto/STANDARD/menu_estivo.csv"},
+                        {"path": "carlo_alberto/menu.csv", "menu": "NO_GLUTEN_estivo"}
+                    ]
+                }
+            ]
+        }
+
+    Returns:
+        list: school specifications
+
+    Raises:
+        ValueError: if the manifest is not valid
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    schools = manifest.get("schools") if isinstance(manifest, dict) else None
+    if not schools:
+        raise ValueError("Manifest must contain a non empty 'schools' list")
+    users = set()
+    for index, spec in enumerate(schools, start=1):
+        label = spec.get("name", f"#{index}")
+        unknown = set(spec) - set(MANIFEST_SCHOOL_FIELDS) - {"user", "files"}
+        if unknown:
+            raise ValueError(f"School {label}: unknown keys {sorted(unknown)}")
+        if not spec.get("name") or not spec.get("city"):
+            raise ValueError(f"School {label}: 'name' and 'city' are required")
+        if not spec.get("files") or not all("path" in f for f in spec["files"]):
+            raise ValueError(f"School {label}: every file needs a 'path'")
+        if spec.get("user") in users:
+            raise ValueError(f"School {label}: user already used by another school")
+        users.add(spec.get("user"))
+    return schools
+
+
+def get_manifest_user(email):
+    """Return the user owning a manifest school, creating it when missing"""
+    User = get_user_model()
+    if email is None:
+        user = User.objects.filter(is_superuser=True).order_by("pk").first()
+        if user is None:
+            raise ValueError("No superuser found for a school without 'user'")
+        return user
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        # No password: the owner sets it with the password reset
+        user = User.objects.create_user(email=email)
+    return user
+
+
+def import_manifest_school(spec, base_dir, keep_missing=False):
+    """
+    Create or update a manifest school and import all its menus.
+
+    Every file is validated first; the school and its menus are then written
+    in a single transaction, so a failing school leaves no partial data. The
+    meals missing from a file are deleted (see delete_missing_meals()), so the
+    menus match the manifest, unless keep_missing is set. The meal cache of
+    the school is invalidated once the transaction commits.
+    Errors are reported instead of raised, so that one school does not stop
+    the others when running in a worker process.
+
+    Args:
+        spec: school specification from load_manifest()
+        base_dir: directory the file paths are relative to
+        keep_missing: only create and update meals, never delete them
+
+    Returns:
+        dict: school name, number of files, changed/unchanged/deleted rows,
+              errors and duration in seconds
+    """
+    start_time = perf_counter()
+    stats = {
+        "school": spec["name"],
+        "files": len(spec["files"]),
+        "changed": 0,
+        "unchanged": 0,
+        "deleted": 0,
+        "errors": [],
+    }
+    fields = {key: spec[key] for key in MANIFEST_SCHOOL_FIELDS if key in spec}
+    try:
+        sources = (
+            (
+                item["path"],
+                item.get("menu", item["path"]),
+                lambda path=Path(base_dir) / item["path"]: _load_menu_path(path),
+            )
+            for item in spec["files"]
+        )
+        entries, errors = _read_menu_sources(
+            sources, School(**fields), "TIPO/stagione.csv o il campo menu"
+        )
+        if errors:
+            stats["errors"] = errors
+        else:
+            with defer_meal_cache_invalidation(), transaction.atomic():
+                user = get_manifest_user(spec.get("user"))
+                school, _ = School.objects.update_or_create(user=user, defaults=fields)
+                stats["changed"], stats["unchanged"] = import_menu_entries(
+                    entries, school
+                )
+                if not keep_missing:
+                    stats["deleted"] = sum(
+                        delete_missing_meals(dataset, school, meal_type, season)
+                        for _, meal_type, season, dataset in entries
+                    )
+    except Exception as e:
+        stats["errors"].append(str(e))
+    stats["duration"] = perf_counter() - start_time
+    return stats
+
+
+def _load_menu_path(path):
+    with open(path, "rb") as file:
+        return load_menu_file(file)
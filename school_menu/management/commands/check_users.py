@@ -1,17 +1,76 @@
 from datetime import timedelta
+from time import perf_counter
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
+from contacts.models import MenuReport
+from notifications.models import AnonymousMenuNotification, DailyNotification
+from school_menu.cache import (
+    invalidate_meal_cache,
+    invalidate_school_list_cache,
+    invalidate_school_page,
+)
+from school_menu.models import AnnualMeal, DetailedMeal, School, SimpleMeal
+
 User = get_user_model()
 
+# Inactive users deleted in a single transaction
+DELETE_CHUNK_SIZE = 200
+
 
 class Command(BaseCommand):
     help = "Check if users have logged in at least once in 12 months. Send an email to the user if they haven't to notify them that their account will be deleted in 1 month. Delete users who haven't logged in in 13 months."
 
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DELETE_CHUNK_SIZE,
+            help="Inactive users deleted in a single transaction",
+        )
+
+    def get_pk_ranges(self, queryset, chunk_size):
+        """Split a queryset into (first_pk, last_pk) ranges of at most chunk_size rows."""
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+        return [
+            (pks[start], pks[min(start + chunk_size, len(pks)) - 1])
+            for start in range(0, len(pks), chunk_size)
+        ]
+
+    def delete_users(self, users):
+        """
+        Delete users with their schools, meals, subscriptions and reports.
+
+        The leaf tables are emptied first with set-based deletes (a single
+        DELETE each, no rows loaded), so the cascade of the final delete only
+        has the schools left to collect. The cache of every deleted school is
+        invalidated once, after the commit.
+
+        Returns:
+            tuple: (deleted users, deleted schools)
+        """
+        with transaction.atomic():
+            schools = dict(
+                School.objects.filter(user__in=users).values_list("pk", "slug")
+            )
+            for model in (SimpleMeal, DetailedMeal, AnnualMeal):
+                model.objects.filter(school_id__in=schools).delete()
+            AnonymousMenuNotification.objects.filter(school_id__in=schools).delete()
+            DailyNotification.objects.filter(school_id__in=schools).delete()
+            MenuReport.objects.filter(receiver__in=users).delete()
+            deleted_count = users.delete()[1].get(User._meta.label, 0)
+
+        for school_id, slug in schools.items():
+            invalidate_meal_cache(school_id)
+            invalidate_school_page(slug)
+        return deleted_count, len(schools)
+
     def handle(self, *args, **options):
         now = timezone.now()
         one_year_ago = now - timedelta(days=365)
@@ -20,36 +79,57 @@ class Command(BaseCommand):
         # Get total number of users
         total_users = User.objects.count()
 
-        # Delete users who haven't logged in for 13 months
+        # Delete users who haven't logged in for 13 months, chunk by chunk
         users_to_delete = User.objects.filter(last_login__lte=thirteen_months_ago)
-        deleted_count = users_to_delete.count()
-        users_to_delete.delete()
+        pk_ranges = self.get_pk_ranges(users_to_delete, options["chunk_size"])
+        deleted_count = deleted_schools = 0
+        start_time = perf_counter()
+        for index, (first_pk, last_pk) in enumerate(pk_ranges, start=1):
+            chunk_start = perf_counter()
+            users, schools = self.delete_users(
+                users_to_delete.filter(pk__range=(first_pk, last_pk))
+            )
+            deleted_count += users
+            deleted_schools += schools
+            self.stdout.write(
+                f"Chunk {index}/{len(pk_ranges)}: deleted {users} users and "
+                f"{schools} schools in {perf_counter() - chunk_start:.2f}s"
+            )
+        if deleted_schools:
+            invalidate_school_list_cache()
+        self.stdout.write(
+            f"Deleted {deleted_count} users and {deleted_schools} schools "
+            f"in {perf_counter() - start_time:.2f}s"
+        )
 
         # Notify users who haven't logged in for 12 months
         users_to_notify = User.objects.filter(
             last_login__lte=one_year_ago, last_login__gt=thirteen_months_ago
         )
-        notified_count = users_to_notify.count()
-        for user in users_to_notify:
-            send_mail(
+        notices = [
+            EmailMessage(
                 "Notifica di inattività",
                 "Abbiamo notato che non hai effettuato nessuna attività sul nostro sito negli ultimi 12 mesi.\n Se intendi continuare ad utilizzare i nostri servizi, ti preghiamo di effettuare l'accesso al tuo account entro il prossimo mese.\n\nSe non intendi continuare ad utilizzare i nostri servizi, puoi cancellare il tuo account in qualsiasi momento.\n\nGrazie per aver utilizzato i nostri servizi.",
                 settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=False,
+                [email],
             )
+            for email in users_to_notify.values_list("email", flat=True)
+        ]
+        notified_count = len(notices)
 
         # Prepare and send result email
         result_message = f"Controllo Utenti Inattivi su menu.webbografico.com\n\nUtenti totali: {total_users}\nUtenti cancellati: {deleted_count}\nUtenti avvisati: {notified_count}"
         self.stdout.write(self.style.SUCCESS(result_message))
-
-        send_mail(
+        result_email = EmailMessage(
             "Controllo Utenti Inattivi su menu.webbografico.com",
             result_message,
             settings.DEFAULT_FROM_EMAIL,
             [settings.ADMIN_EMAIL],
-            fail_silently=False,
         )
 
+        # The notices and the result email share a single connection
+        with get_connection() as connection:
+            connection.send_messages([*notices, result_email])
+
         self.stdout.write(self.style.SUCCESS("Results email sent to admin."))
         self.stdout.write(self.style.SUCCESS("Results email sent to admin."))
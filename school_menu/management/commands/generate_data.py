@@ -1,16 +1,10 @@
-import factory
 from allauth.account.models import EmailAddress
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
-from school_menu.models import DetailedMeal, School, SimpleMeal
-from tests.school_menu.factories import (
-    DetailedMealFactory,
-    SchoolFactory,
-    SimpleMealFactory,
-)
-from tests.users.factories import UserFactory
+from school_menu.models import School
+from tests.generators import DEFAULT_CHUNK_SIZE, generate_dataset
 
 NUMBER_OF_USERS = 10
 
@@ -18,16 +12,62 @@ User = get_user_model()
 
 
 class Command(BaseCommand):
-    help = "Generates dummy data for visual testing."
+    help = "Generates dummy data for visual testing and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schools",
+            type=int,
+            default=NUMBER_OF_USERS,
+            help=f"Number of schools (default: {NUMBER_OF_USERS})",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=None,
+            help="Number of users, at least one per school (default: one per school)",
+        )
+        parser.add_argument(
+            "--annual-ratio",
+            type=float,
+            default=0.1,
+            help="Fraction of schools with an annual menu (default: 0.1)",
+        )
+        parser.add_argument(
+            "--subscriptions",
+            type=int,
+            default=5,
+            help="Anonymous push subscriptions per school (default: 5)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Random seed, the same seed generates the same data (default: 42)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"Objects per bulk insert (default: {DEFAULT_CHUNK_SIZE})",
+        )
+        parser.add_argument(
+            "--school-year",
+            type=int,
+            default=None,
+            help="Year the school year of annual menus starts in, e.g. 2024 for "
+            "2024/25: set it to reproduce the same data later (default: current)",
+        )
 
     @transaction.atomic
-    @factory.Faker.override_default_locale("it_IT")
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
         self.stdout.write("Verifying Superuser email..")
         if User.objects.filter(is_superuser=True).exists():
             user = User.objects.get(is_superuser=True)
-            EmailAddress.objects.create(
-                user=user, email=user.email, verified=True, primary=True
+            EmailAddress.objects.get_or_create(
+                user=user,
+                email=user.email,
+                defaults={"verified": True, "primary": True},
             )
             self.stdout.write("Email verified")
         else:
@@ -41,51 +81,16 @@ class Command(BaseCommand):
 
         self.stdout.write("Creating new data...")
         # creating users with email=user_*@test.com and password=1234
-        UserFactory.create_batch(NUMBER_OF_USERS)
-        # creating schools
-        for user in User.objects.exclude(is_superuser=True):
-            SchoolFactory.create(user=user)
-        # creating meals
-        for school in School.objects.exclude(user__is_superuser=True):
-            if school.menu_type == School.Types.SIMPLE:
-                meal_types = [SimpleMeal.Types.STANDARD]
-                if school.no_gluten:
-                    meal_types.append(SimpleMeal.Types.GLUTEN_FREE)
-                if school.no_lactose:
-                    meal_types.append(SimpleMeal.Types.LACTOSE_FREE)
-                if school.vegetarian:
-                    meal_types.append(SimpleMeal.Types.VEGETARIAN)
-                if school.special:
-                    meal_types.append(SimpleMeal.Types.SPECIAL)
-                for meal_type in meal_types:
-                    for season in SimpleMeal.Seasons.choices:
-                        for week in SimpleMeal.Weeks.choices:
-                            for day in SimpleMeal.Days.choices:
-                                SimpleMealFactory.create(
-                                    school=school,
-                                    day=day[0],
-                                    week=week[0],
-                                    season=season[0],
-                                    type=meal_type[0],
-                                )
-            elif school.menu_type == School.Types.DETAILED:
-                meal_types = [DetailedMeal.Types.STANDARD]
-                if school.no_gluten:
-                    meal_types.append(DetailedMeal.Types.GLUTEN_FREE)
-                if school.no_lactose:
-                    meal_types.append(DetailedMeal.Types.LACTOSE_FREE)
-                if school.vegetarian:
-                    meal_types.append(DetailedMeal.Types.VEGETARIAN)
-                if school.special:
-                    meal_types.append(DetailedMeal.Types.SPECIAL)
-                for meal_type in meal_types:
-                    for season in DetailedMeal.Seasons.choices:
-                        for week in DetailedMeal.Weeks.choices:
-                            for day in DetailedMeal.Days.choices:
-                                DetailedMealFactory.create(
-                                    school=school,
-                                    day=day[0],
-                                    week=week[0],
-                                    season=season[0],
-                                    type=meal_type[0],
-                                )
+        stats = generate_dataset(
+            schools=options["schools"],
+            users=options["users"],
+            annual_ratio=options["annual_ratio"],
+            subscriptions_per_school=options["subscriptions"],
+            seed=options["seed"],
+            chunk_size=options["chunk_size"],
+            school_year=options["school_year"],
+        )
+        duration = stats.pop("duration")
+        for name, count in stats.items():
+            self.stdout.write(f"  {name}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Data generated in {duration:.2f}s"))
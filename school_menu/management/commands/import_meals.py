@@ -1,94 +1,103 @@
-from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand
-from tablib import Dataset
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from time import perf_counter
 
-from school_menu.models import DetailedMeal, School
-from school_menu.resources import DetailedMealResource
-from school_menu.utils import validate_dataset
-from tests.school_menu.factories import SchoolFactory
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
-User = get_user_model()
+from school_menu.importers import import_manifest_school, load_manifest
 
 
 class Command(BaseCommand):
-    help = "Import meals from CSV files"
+    help = "Import schools and meals from a manifest (see data/manifest.json)"
 
-    def handle(self, *args, **kwargs):
-        # adding back superuser school
-        self.stdout.write("Adding back superuser data...")
-        superuser = User.objects.get(is_superuser=True)
-        if not School.objects.filter(user=superuser).exists():
-            school = SchoolFactory.create(
-                user=superuser,
-                name="Convitto Carlo Alberto",
-                city="Novara",
-                menu_type=School.Types.DETAILED,
-                no_gluten=True,
-                no_lactose=True,
-                vegetarian=True,
-                special=False,
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "manifest",
+            nargs="?",
+            default="data/manifest.json",
+            help="Path of the JSON manifest (default: data/manifest.json)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of worker processes, 1 imports in this process (default: 4)",
+        )
+        parser.add_argument(
+            "--keep-missing",
+            action="store_true",
+            help="Keep the stored meals missing from the menu files, instead of deleting them",
+        )
+
+    def handle(self, *args, **options):
+        manifest_path = Path(options["manifest"])
+        try:
+            schools = load_manifest(manifest_path)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Invalid manifest {manifest_path}: {e}") from e
+        base_dir = manifest_path.parent
+        keep_missing = options["keep_missing"]
+        workers = max(1, min(options["workers"], len(schools)))
+        if workers > 1 and connection.vendor == "sqlite":
+            # SQLite locks the whole database on write: parallel schools would fail
+            self.stdout.write(self.style.WARNING("SQLite database: using 1 worker"))
+            workers = 1
+
+        self.stdout.write(
+            f"Importing {len(schools)} schools with {workers} worker(s)..."
+        )
+        start_time = perf_counter()
+        if workers == 1:
+            results = (
+                import_manifest_school(spec, base_dir, keep_missing) for spec in schools
             )
+            total_rows, failed = self.report(results)
         else:
-            school = School.objects.get(user=superuser)
-            school.name = "Convitto Carlo Alberto"
-            school.city = "Novara"
-            school.menu_type = School.Types.DETAILED
-            school.no_gluten = True
-            school.no_lactose = True
-            school.vegetarian = True
-            school.special = False
-            school.save()
-
-        seasons = {
-            "menu_estivo": DetailedMeal.Seasons.ESTIVO,
-            "menu_invernale": DetailedMeal.Seasons.INVERNALE,
-        }
-        resource = DetailedMealResource()
-        types = {
-            "STANDARD": DetailedMeal.Types.STANDARD,
-            "NO_GLUTEN": DetailedMeal.Types.GLUTEN_FREE,
-            "NO_LACTOSE": DetailedMeal.Types.LACTOSE_FREE,
-            "VEGETARIAN": DetailedMeal.Types.VEGETARIAN,
-        }
-        for folder, meal_type in types.items():
-            for file_season, season in seasons.items():
-                with open(
-                    f"data/carlo_alberto/{folder}/{file_season}.csv",
-                    encoding="utf-8",
-                ) as f:
-                    dataset = Dataset()
-                    dataset.load(f.read(), format="csv")
-                    validates, message = validate_dataset(dataset, school.menu_type)
-                    result = resource.import_data(
-                        dataset,
-                        dry_run=True,
-                        school=school,
-                        season=season,
-                        type=meal_type,
+            # Each worker sets up Django and opens its own database connection
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context("spawn"),
+                initializer=django.setup,
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        import_manifest_school, spec, base_dir, keep_missing
                     )
+                    for spec in schools
+                ]
+                results = (future.result() for future in as_completed(futures))
+                total_rows, failed = self.report(results)
+        duration = perf_counter() - start_time
 
-                    if validates:
-                        if not result.has_errors():
-                            DetailedMeal.objects.filter(
-                                school=school, season=season, type=meal_type
-                            ).delete()
-                            result = resource.import_data(
-                                dataset,
-                                dry_run=False,
-                                school=school,
-                                season=season,
-                                type=meal_type,
-                            )
-                            self.stdout.write(f"Importing {file_season} [{folder}]...")
-                        else:
-                            self.stdout.write(
-                                self.style.ERROR(
-                                    f"Import failed after validation for {file_season} [{folder}]: something wrong has happened.."
-                                )
-                            )
-                    else:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f"Validation failed for {file_season} [{folder}]: {message}"
-                            )
-                        )
+        summary = (
+            f"Imported {total_rows} rows for {len(schools) - failed} schools "
+            f"in {duration:.2f}s ({total_rows / duration:.0f} rows/s)"
+        )
+        if failed:
+            self.stdout.write(self.style.ERROR(f"{summary}, {failed} failed"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def report(self, results):
+        """Print the result of every school, return total rows and failed schools"""
+        total_rows = 0
+        failed = 0
+        for stats in results:
+            if stats["errors"]:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{stats['school']}: failed"))
+                for error in stats["errors"]:
+                    self.stdout.write(self.style.ERROR(f"  {error}"))
+                continue
+            rows = stats["changed"] + stats["unchanged"]
+            total_rows += rows
+            self.stdout.write(
+                f"{stats['school']}: {stats['files']} files, "
+                f"{stats['changed']} rows changed, {stats['unchanged']} unchanged, "
+                f"{stats['deleted']} deleted "
+                f"in {stats['duration']:.2f}s ({rows / stats['duration']:.0f} rows/s)"
+            )
+        return total_rows, failed
@@ -3,9 +3,14 @@ Management command to warm up the cache.
 
 This command pre-populates the cache with meal data for published schools.
 Useful after deployments or cache clears to improve initial response times.
+Schools not in session or without a menu on the warmed day are skipped,
+checked for all schools at once.
 """
 
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 
 from school_menu.models import School
 from school_menu.utils import (
@@ -13,6 +18,8 @@ from school_menu.utils import (
     get_current_date,
     get_meals,
     get_meals_for_annual_menu,
+    get_schools_in_session,
+    get_schools_with_menu,
     get_season,
 )
 
@@ -50,6 +57,19 @@ class Command(BaseCommand):
         current_week, adjusted_day = get_current_date()
         success_count = 0
         error_count = 0
+        skipped_count = 0
+
+        if not school_id:
+            # The day get_current_date points to (weekends move to Monday)
+            today = timezone.now().date()
+            target_date = today + timedelta(
+                days=(adjusted_day - today.isoweekday()) % 7
+            )
+            schools = list(schools)
+            active_ids = get_schools_with_menu(schools, target_date)
+            active_ids &= get_schools_in_session(schools, target_date)
+            skipped_count = len(schools) - len(active_ids)
+            schools = [school for school in schools if school.pk in active_ids]
 
         for school in schools:
             try:
@@ -78,6 +98,7 @@ class Command(BaseCommand):
         self.stdout.write("\n" + "=" * 50)
         self.stdout.write(
             self.style.SUCCESS(
-                f"✓ Cache warming complete: {success_count} succeeded, {error_count} failed"
+                f"✓ Cache warming complete: {success_count} succeeded, {error_count} failed, "
+                f"{skipped_count} skipped (not in session or no menu)"
             )
         )
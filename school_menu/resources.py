@@ -126,62 +126,6 @@ class SimpleMealResource(resources.ModelResource):
         )
 
 
-class DetailedMealExportResource(resources.ModelResource):
-    day = Field(
-        attribute="day",
-        column_name="giorno",
-        widget=ChoicesWidget(DetailedMeal.Days.choices),
-    )
-    week = Field(attribute="week", column_name="settimana")
-    first_course = Field(attribute="first_course", column_name="primo")
-    second_course = Field(attribute="second_course", column_name="secondo")
-    side_dish = Field(attribute="side_dish", column_name="contorno")
-    fruit = Field(attribute="fruit", column_name="frutta")
-    snack = Field(attribute="snack", column_name="spuntino")
-
-    def after_init_instance(self, instance, new, row, **kwargs):
-        instance.school = kwargs.get("school")
-        instance.season = kwargs.get("season")
-
-    class Meta:
-        model = DetailedMeal
-        fields = (
-            "week",
-            "day",
-            "first_course",
-            "second_course",
-            "side_dish",
-            "fruit",
-            "snack",
-        )
-
-
-class SimpleMealExportResource(resources.ModelResource):
-    day = Field(
-        attribute="day",
-        column_name="giorno",
-        widget=ChoicesWidget(SimpleMeal.Days.choices),
-    )
-    week = Field(attribute="week", column_name="settimana")
-    menu = Field(attribute="menu", column_name="pranzo")
-    morning_snack = Field(attribute="morning_snack", column_name="spuntino")
-    afternoon_snack = Field(attribute="afternoon_snack", column_name="merenda")
-
-    def after_init_instance(self, instance, new, row, **kwargs):
-        instance.school = kwargs.get("school")
-        instance.season = kwargs.get("season")
-
-    class Meta:
-        model = SimpleMeal
-        fields = (
-            "week",
-            "day",
-            "menu",
-            "morning_snack",
-            "afternoon_snack",
-        )
-
-
 class AnnualMenuResource(resources.ModelResource):
     date = Field(attribute="date")
     menu = Field(attribute="menu")
@@ -234,58 +178,3 @@ class AnnualMenuResource(resources.ModelResource):
     class Meta:
         model = AnnualMeal
         fields = ("id", "date", "menu", "day")
-
-
-class AnnualMenuExportResource(resources.ModelResource):
-    date = Field(attribute="date", column_name="data")
-    giorno = Field(attribute="day")
-    primo = Field()
-    secondo = Field()
-    contorno = Field()
-    frutta = Field()
-    altro = Field()
-
-    def dehydrate_giorno(self, obj):
-        weekday_map = {
-            Meal.Days.LUNEDÌ: "Lunedì",
-            Meal.Days.MARTEDÌ: "Martedì",
-            Meal.Days.MERCOLEDÌ: "Mercoledì",
-            Meal.Days.GIOVEDÌ: "Giovedì",
-            Meal.Days.VENERDÌ: "Venerdì",
-        }
-        return weekday_map.get(obj.day, "")
-
-    def dehydrate_primo(self, obj):
-        return obj.menu.split("\n")[0] if obj.menu else ""
-
-    def dehydrate_secondo(self, obj):
-        return (
-            obj.menu.split("\n")[1]
-            if obj.menu and len(obj.menu.split("\n")) > 1
-            else ""
-        )
-
-    def dehydrate_contorno(self, obj):
-        return (
-            obj.menu.split("\n")[2]
-            if obj.menu and len(obj.menu.split("\n")) > 2
-            else ""
-        )
-
-    def dehydrate_frutta(self, obj):
-        return (
-            obj.menu.split("\n")[3]
-            if obj.menu and len(obj.menu.split("\n")) > 3
-            else ""
-        )
-
-    def dehydrate_altro(self, obj):
-        return (
-            obj.menu.split("\n")[4]
-            if obj.menu and len(obj.menu.split("\n")) > 4
-            else ""
-        )
-
-    class Meta:
-        model = AnnualMeal
-        fields = ("date", "giorno", "primo", "secondo", "contorno", "frutta", "altro")
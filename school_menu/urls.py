@@ -38,6 +38,11 @@ urlpatterns = [
         views.export_menu,
         name="export_menu",
     ),
+    path(
+        "export/<int:school_id>/archive/",
+        views.export_menu_archive,
+        name="export_menu_archive",
+    ),
 ]
 
 htmx_urlpatterns = [
@@ -55,6 +60,11 @@ htmx_urlpatterns = [
         views.upload_annual_menu,
         name="upload_annual_menu",
     ),
+    path(
+        "menu/<int:school_id>/upload/archive/",
+        views.upload_menu_archive,
+        name="upload_menu_archive",
+    ),
     path("settings/<int:pk>/menu/", views.menu_settings_partial, name="menu_settings"),
     path("settings/school/", views.school_settings_partial, name="school_settings"),
     path("search-schools/", views.search_schools, name="search_schools"),
@@ -1,18 +1,22 @@
 import csv
 import logging
-from datetime import datetime, timedelta
+import re
+from datetime import date, timedelta
 
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from import_export.widgets import Widget
 
-from notifications.models import AnonymousMenuNotification
 from school_menu.cache import get_cached_or_query
 from school_menu.models import AnnualMeal, DetailedMeal, Meal, School, SimpleMeal
 
 logger = logging.getLogger(__name__)
 
+# Signed cookie with the notification status shown on the public menu pages
+NOTIFICATIONS_STATUS_COOKIE = "notifications_status"
+NOTIFICATIONS_STATUS_SALT = "notifications.status"
+
 
 def detect_csv_format(content: str) -> tuple[str, str]:
     """
@@ -183,6 +187,91 @@ def get_season(school):
     return season
 
 
+def is_school_in_session(school, target_date):
+    """
+    Checks if the school is in session on a given date based on start/end month/day.
+    """
+    # Create comparable tuples for dates (month, day)
+    today_tuple = (target_date.month, target_date.day)
+    start_tuple = (school.start_month, school.start_day)
+    end_tuple = (school.end_month, school.end_day)
+
+    # Case 1: School year is within the same calendar year (e.g., Feb to June)
+    if start_tuple <= end_tuple:
+        return start_tuple <= today_tuple <= end_tuple
+    # Case 2: School year spans across calendar years (e.g., Sept to June)
+    else:
+        return today_tuple >= start_tuple or today_tuple <= end_tuple
+
+
+def get_schools_in_session(schools, target_date):
+    """
+    Return the ids of the schools in session on a given date.
+
+    The school year bounds are fields of School, so no query is run.
+
+    Example:
+        >>> get_schools_in_session(School.objects.all(), date(2025, 9, 15))
+        {1, 2, 5}
+    """
+    return {
+        school.pk for school in schools if is_school_in_session(school, target_date)
+    }
+
+
+def get_schools_with_menu(schools, target_date):
+    """
+    Return the ids of the schools with a menu on a given date, in at most 3 queries.
+
+    A school has a menu when an active AnnualMeal exists on the date or, for
+    that weekday, a SimpleMeal or a DetailedMeal depending on its menu type.
+    Every meal table is queried once for all the schools.
+
+    Args:
+        schools: iterable of School, their menu_type is needed
+        target_date: the date to check
+
+    Returns:
+        set: ids of the schools with a menu
+
+    Example:
+        >>> get_schools_with_menu(School.objects.all(), date(2025, 9, 15))
+        {1, 5}
+    """
+    schools = list(schools)
+    if not schools:
+        return set()
+
+    school_ids = set(
+        AnnualMeal.objects.filter(
+            school_id__in=[school.pk for school in schools],
+            date=target_date,
+            is_active=True,
+        )
+        .order_by()
+        .values_list("school_id", flat=True)
+        .distinct()
+    )
+
+    day_of_week = target_date.weekday() + 1  # Monday is 1, Sunday is 7
+    weekly_school_ids = {SimpleMeal: [], DetailedMeal: []}
+    for school in schools:
+        if school.pk not in school_ids:
+            meal = (
+                SimpleMeal if school.menu_type == School.Types.SIMPLE else DetailedMeal
+            )
+            weekly_school_ids[meal].append(school.pk)
+    for meal, ids in weekly_school_ids.items():
+        if ids:
+            school_ids.update(
+                meal.objects.filter(school_id__in=ids, day=day_of_week)
+                .order_by()
+                .values_list("school_id", flat=True)
+                .distinct()
+            )
+    return school_ids
+
+
 def get_adjusted_year():
     """Get current year if date is after September 1st, otherwise previous year"""
     today = timezone.now()
@@ -271,57 +360,99 @@ def build_types_menu(weekly_meals, school, week=None, season=None):
     return get_cached_or_query(cache_key, query_types, timeout=86400)
 
 
-def validate_dataset(dataset, menu_type):
+MENU_TYPE_NAMES = {
+    "simple": "Menu Semplice",
+    "detailed": "Menu Dettagliato",
+    "annual": "Menu Annuale",
+}
+
+WEEKDAY_NAMES = {"Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì"}
+
+# Same formats accepted by datetime.strptime(value, "%d/%m/%Y")
+DATE_PATTERN = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+
+ANNUAL_MENU_COLUMNS = ["primo", "secondo", "contorno", "frutta", "altro"]
+
+
+def get_menu_columns(menu_kind):
     """
-    Validates menu import dataset for required columns and values.
+    Return the column specification for a menu import file.
+
+    Args:
+        menu_kind: 'simple', 'detailed' or 'annual' (same values as detect_menu_type)
 
     Returns:
-        tuple: (validates, message, filtered_dataset)
-            - validates: bool indicating if dataset is valid
-            - message: error message if not valid, None otherwise
-            - filtered_dataset: dataset with only allowed columns
+        tuple: (required_columns, allowed_columns, max_lengths)
+            - max_lengths maps a column name to the max_length of the model field it is imported into
     """
-    validates = True
-    message = None
+    if menu_kind == "simple":
+        fields = {
+            "pranzo": "menu",
+            "spuntino": "morning_snack",
+            "merenda": "afternoon_snack",
+        }
+        required_columns = ["giorno", "settimana", *fields]
+        allowed_columns = required_columns  # No optional columns for simple menu
+        model = SimpleMeal
+    elif menu_kind == "detailed":
+        fields = {
+            "primo": "first_course",
+            "secondo": "second_course",
+            "contorno": "side_dish",
+            "frutta": "fruit",
+            "spuntino": "snack",
+        }
+        required_columns = ["giorno", "settimana", *fields]
+        allowed_columns = required_columns  # No optional columns for detailed menu
+        model = DetailedMeal
+    else:
+        # Annual menu columns are joined into AnnualMeal.menu, checked as a whole
+        fields = {}
+        required_columns = ["data", *ANNUAL_MENU_COLUMNS]
+        # giorno is optional (auto-calculated from data) so we allow it but don't require it
+        allowed_columns = required_columns + ["giorno"]
+        model = AnnualMeal
+    max_lengths = {
+        column: model._meta.get_field(field).max_length
+        for column, field in fields.items()
+    }
+    return required_columns, allowed_columns, max_lengths
+
+
+def check_menu_dataset(dataset, menu_kind):
+    """
+    Validate a menu import dataset in a single pass and collect every error.
+
+    Header-level problems (wrong menu type, no headers, missing columns) stop the
+    validation because rows cannot be checked; otherwise every row is scanned once
+    and all the invalid cells are reported.
+
+    Args:
+        dataset: tablib Dataset object
+        menu_kind: 'simple', 'detailed' or 'annual'
 
+    Returns:
+        tuple: (errors, filtered_dataset)
+            - errors: list of dicts with keys row, column, value and message,
+              row is the line number in the file (headers are line 1) or None
+              for errors about the whole file
+            - filtered_dataset: dataset with only allowed columns
+    """
     # Detect menu type from CSV headers before validation
     detected_type = detect_menu_type(dataset.headers)
-    expected_type = "simple" if menu_type == School.Types.SIMPLE else "detailed"
-
-    # Check if detected type matches expected type
-    if detected_type and detected_type != expected_type:
-        validates = False
-        type_names = {
-            "simple": "Menu Semplice",
-            "detailed": "Menu Dettagliato",
-            "annual": "Menu Annuale",
-        }
-        detected_name = type_names.get(detected_type, "formato sconosciuto")
-        expected_name = type_names.get(expected_type, "formato sconosciuto")
+    if menu_kind == "annual":
+        # Check if detected type is actually a weekly menu (simple or detailed) instead of annual
+        if detected_type in ("simple", "detailed"):
+            detected_name = MENU_TYPE_NAMES[detected_type]
+            message = f"Il file caricato sembra essere un {detected_name} (con settimane), ma hai selezionato Menu Annuale. Verifica di aver caricato il file corretto."
+            return [_dataset_error(message)], dataset
+    elif detected_type and detected_type != menu_kind:
+        detected_name = MENU_TYPE_NAMES[detected_type]
+        expected_name = MENU_TYPE_NAMES[menu_kind]
         message = f"Il file caricato sembra essere un {detected_name}, ma hai selezionato {expected_name}. Verifica di aver caricato il file corretto."
-        return validates, message, dataset
-
-    # Define required and allowed columns based on menu type
-    if menu_type == School.Types.SIMPLE:
-        required_columns = [
-            "giorno",
-            "settimana",
-            "pranzo",
-            "spuntino",
-            "merenda",
-        ]
-        allowed_columns = required_columns  # No optional columns for simple menu
-    else:
-        required_columns = [
-            "giorno",
-            "settimana",
-            "primo",
-            "secondo",
-            "contorno",
-            "frutta",
-            "spuntino",
-        ]
-        allowed_columns = required_columns  # No optional columns for detailed menu
+        return [_dataset_error(message)], dataset
+
+    required_columns, allowed_columns, max_lengths = get_menu_columns(menu_kind)
 
     # Filter out unnamed, whitespace-only, and extra columns
     filtered_dataset, removed_columns = filter_dataset_columns(dataset, allowed_columns)
@@ -330,45 +461,141 @@ def validate_dataset(dataset, menu_type):
 
     # Handle case where dataset is completely invalid (no headers)
     if columns is None:
-        validates = False
         message = "Formato non valido. Il file non contiene intestazioni valide."
-        return validates, message, filtered_dataset
+        return [_dataset_error(message)], filtered_dataset
 
     # check required headers presence
-    if not all(column in columns for column in required_columns):
-        validates = False
-        missing = [col for col in required_columns if col not in columns]
+    missing = [column for column in required_columns if column not in columns]
+    if missing:
         message = f"Formato non valido. Il file non contiene tutte le colonne richieste. Colonne mancanti: {', '.join(missing)}"
-        return validates, message, filtered_dataset
+        return [_dataset_error(message)], filtered_dataset
+
+    errors = []
+    index = {column: columns.index(column) for column in columns}
+    length_checks = [
+        (column, index[column], max_length)
+        for column, max_length in max_lengths.items()
+    ]
+    if menu_kind == "annual":
+        date_index = index["data"]
+        menu_indexes = [index[column] for column in ANNUAL_MENU_COLUMNS]
+        menu_max_length = AnnualMeal._meta.get_field("menu").max_length
+        menu_columns = ", ".join(f'"{column}"' for column in ANNUAL_MENU_COLUMNS)
+    else:
+        day_index = index["giorno"]
+        week_index = index["settimana"]
+
+    for line, row in enumerate(filtered_dataset, start=2):
+        if menu_kind == "annual":
+            value = row[date_index]
+            if not _is_valid_date(value):
+                errors.append(
+                    _dataset_error(
+                        'Formato non valido. La colonna "data" contiene date in formato non valido. Usa il formato GG/MM/AAAA',
+                        line,
+                        "data",
+                        value,
+                    )
+                )
+            menu = "\n".join(str(row[i]) for i in menu_indexes if row[i])
+            if len(menu) > menu_max_length:
+                errors.append(
+                    _dataset_error(
+                        f"Formato non valido. Il menu composto dalle colonne {menu_columns} supera i {menu_max_length} caratteri.",
+                        line,
+                    )
+                )
+        else:
+            value = row[day_index]
+            if value not in WEEKDAY_NAMES:
+                errors.append(
+                    _dataset_error(
+                        'Formato non valido. La colonna "giorno" contiene valori diversi dai giorni della settimana.',
+                        line,
+                        "giorno",
+                        value,
+                    )
+                )
+            value = row[week_index]
+            try:
+                week = int(value)
+            except ValueError:
+                errors.append(
+                    _dataset_error(
+                        'Formato non valido. La colonna "settimana" contiene valori non numerici.',
+                        line,
+                        "settimana",
+                        value,
+                    )
+                )
+            else:
+                if not 0 < week <= 4:
+                    errors.append(
+                        _dataset_error(
+                            'Formato non valido. La colonna "settimana" contiene valori non compresi fra 1 e 4.',
+                            line,
+                            "settimana",
+                            value,
+                        )
+                    )
+        for column, i, max_length in length_checks:
+            if row[i] and len(str(row[i])) > max_length:
+                errors.append(
+                    _dataset_error(
+                        f'Formato non valido. La colonna "{column}" contiene testi più lunghi di {max_length} caratteri.',
+                        line,
+                        column,
+                    )
+                )
 
-    # check if the day column contains only valid day names
-    days = {"Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì"}
-    day_values = filtered_dataset["giorno"]
-    if not all(day in days for day in day_values):
-        validates = False
-        message = 'Formato non valido. La colonna "giorno" contiene valori diversi dai giorni della settimana.'
+    return errors, filtered_dataset
 
-    # check if week values are 1 to 4
-    weeks = filtered_dataset["settimana"]
+
+def _dataset_error(message, row=None, column=None, value=None):
+    return {"row": row, "column": column, "value": value, "message": message}
+
+
+def _is_valid_date(value):
+    """Check a GG/MM/AAAA date without going through datetime.strptime"""
+    match = DATE_PATTERN.fullmatch(value) if isinstance(value, str) else None
+    if not match:
+        return False
+    day, month, year = match.groups()
     try:
-        weeks = [int(week) for week in weeks]
+        date(int(year), int(month), int(day))
     except ValueError:
-        validates = False
-        message = (
-            'Formato non valido. La colonna "settimana" contiene valori non numerici.'
-        )
-        return validates, message, filtered_dataset
-    if not all(0 < week <= 4 for week in weeks):
-        validates = False
-        message = 'Formato non valido. La colonna "settimana" contiene valori non compresi fra 1 e 4.'
+        return False
+    return True
 
-    # if everything ok return validates = True and no message
-    return validates, message, filtered_dataset
 
+def summarize_dataset_errors(errors):
+    """
+    Build the error message shown to the user from a list of dataset errors.
 
-def validate_annual_dataset(dataset):
+    Each distinct error message is reported once, in the order it was first found.
+    Returns None if there are no errors.
     """
-    Validates annual menu import dataset for required columns and values.
+    if not errors:
+        return None
+    return " ".join(dict.fromkeys(error["message"] for error in errors))
+
+
+def format_dataset_error(error):
+    """Describe where a dataset error is, e.g. 'Riga 3, colonna "giorno": Lun'"""
+    parts = []
+    if error["row"] is not None:
+        parts.append(f"Riga {error['row']}")
+    if error["column"] is not None:
+        parts.append(f'colonna "{error["column"]}"')
+    location = ", ".join(parts)
+    if error["value"] is not None:
+        return f"{location}: {error['value']}"
+    return location
+
+
+def validate_dataset(dataset, menu_type):
+    """
+    Validates menu import dataset for required columns and values.
 
     Returns:
         tuple: (validates, message, filtered_dataset)
@@ -376,58 +603,23 @@ def validate_annual_dataset(dataset):
             - message: error message if not valid, None otherwise
             - filtered_dataset: dataset with only allowed columns
     """
-    validates = True
-    message = None
-
-    # Detect menu type from CSV headers before validation
-    detected_type = detect_menu_type(dataset.headers)
-
-    # Check if detected type is actually a weekly menu (simple or detailed) instead of annual
-    if detected_type in ("simple", "detailed"):
-        validates = False
-        type_names = {
-            "simple": "Menu Semplice",
-            "detailed": "Menu Dettagliato",
-        }
-        detected_name = type_names.get(detected_type, "Menu Settimanale")
-        message = f"Il file caricato sembra essere un {detected_name} (con settimane), ma hai selezionato Menu Annuale. Verifica di aver caricato il file corretto."
-        return validates, message, dataset
-
-    # Define required and allowed columns
-    required_columns = ["data", "primo", "secondo", "contorno", "frutta", "altro"]
-    # giorno is optional (auto-calculated from data) so we allow it but don't require it
-    allowed_columns = required_columns + ["giorno"]
-
-    # Filter out unnamed, whitespace-only, and extra columns
-    filtered_dataset, removed_columns = filter_dataset_columns(dataset, allowed_columns)
-
-    # check required headers presence
-    columns = filtered_dataset.headers
-
-    # Handle case where dataset is completely invalid (no headers)
-    if columns is None:
-        validates = False
-        message = "Formato non valido. Il file non contiene intestazioni valide."
-        return validates, message, filtered_dataset
+    menu_kind = "simple" if menu_type == School.Types.SIMPLE else "detailed"
+    errors, filtered_dataset = check_menu_dataset(dataset, menu_kind)
+    return not errors, summarize_dataset_errors(errors), filtered_dataset
 
-    if not all(column in columns for column in required_columns):
-        validates = False
-        missing = [col for col in required_columns if col not in columns]
-        message = f"Formato non valido. Il file non contiene tutte le colonne richieste. Colonne mancanti: {', '.join(missing)}"
-        return validates, message, filtered_dataset
 
-    # check if data column contain valid data values
-    dates = filtered_dataset["data"]
-    for date_str in dates:
-        try:
-            datetime.strptime(date_str, "%d/%m/%Y")
-        except ValueError:
-            validates = False
-            message = 'Formato non valido. La colonna "data" contiene date in formato non valido. Usa il formato GG/MM/AAAA'
-            return validates, message, filtered_dataset
+def validate_annual_dataset(dataset):
+    """
+    Validates annual menu import dataset for required columns and values.
 
-    # if everything ok return validates = True and no message
-    return validates, message, filtered_dataset
+    Returns:
+        tuple: (validates, message, filtered_dataset)
+            - validates: bool indicating if dataset is valid
+            - message: error message if not valid, None otherwise
+            - filtered_dataset: dataset with only allowed columns
+    """
+    errors, filtered_dataset = check_menu_dataset(dataset, "annual")
+    return not errors, summarize_dataset_errors(errors), filtered_dataset
 
 
 class ChoicesWidget(Widget):
@@ -553,9 +745,42 @@ def fill_missing_dates(school, meal_type):
         current_date += timedelta(days=1)
 
 
-def get_notifications_status(pk, school):
-    if pk:
-        notification = get_object_or_404(AnonymousMenuNotification, pk=pk)
-        if notification.school == school and notification.daily_notification:
-            return True
-    return False
+def set_notifications_status(request, response, notification):
+    """
+    Store the school and daily flag of a subscription in a signed cookie.
+
+    Public menu pages read the notification status from it, without loading
+    the session nor the subscription on every page view: it must be set again
+    whenever the school or the flag of the subscription change.
+
+    Args:
+        request: the request answered by response
+        response: the response setting the cookie
+        notification: the AnonymousMenuNotification of the browser
+    """
+    response.set_signed_cookie(
+        NOTIFICATIONS_STATUS_COOKIE,
+        f"{notification.school_id}:{int(notification.daily_notification)}",
+        salt=NOTIFICATIONS_STATUS_SALT,
+        max_age=365 * 24 * 60 * 60,  # 1 year
+        httponly=True,
+        secure=request.is_secure(),
+        samesite="Lax",
+    )
+
+
+def get_notifications_status(request, school):
+    """
+    Return whether the browser gets the daily notifications of a school.
+
+    Args:
+        request: the request carrying the cookie set by set_notifications_status
+        school: the School of the page
+
+    Returns:
+        bool: False without a valid cookie or for another school
+    """
+    status = request.get_signed_cookie(
+        NOTIFICATIONS_STATUS_COOKIE, default="", salt=NOTIFICATIONS_STATUS_SALT
+    )
+    return status == f"{school.pk}:1"
@@ -6,38 +6,37 @@ from django.core.cache import cache
 from django.db import connection
 from django.db.models import Q
 from django.forms import modelformset_factory
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.response import HttpResponse, TemplateResponse
 from django.urls import reverse
 from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_http_methods
-from tablib import Dataset
 from tablib.exceptions import InvalidDimensions
 
 from contacts.models import MenuReport
-from notifications.tasks import _is_school_in_session
 from school_menu.cache import (
     get_cached_or_query,
-    invalidate_meal_cache,
     invalidate_school_cache,
 )
+from school_menu.exporters import get_export_spec, iter_menu_archive, iter_menu_csv
 from school_menu.forms import (
     DetailedMealForm,
     SchoolForm,
     SimpleMealForm,
     UploadAnnualMenuForm,
+    UploadMenuArchiveForm,
     UploadMenuForm,
 )
-from school_menu.models import AnnualMeal, DetailedMeal, Meal, School, SimpleMeal
-from school_menu.resources import (
-    AnnualMenuExportResource,
-    AnnualMenuResource,
-    DetailedMealExportResource,
-    DetailedMealResource,
-    SimpleMealExportResource,
-    SimpleMealResource,
+from school_menu.importers import (
+    get_file_extension,
+    import_menu_dataset,
+    import_menu_entries,
+    load_menu_file,
+    read_menu_archive,
+    read_menu_workbook,
 )
+from school_menu.models import DetailedMeal, Meal, School, SimpleMeal
 from school_menu.serializers import (
     AnnualMealSerializer,
     DetailedMealSerializer,
@@ -47,8 +46,8 @@ from school_menu.serializers import (
 from school_menu.utils import (
     build_types_menu,
     calculate_week,
-    detect_csv_format,
-    fill_missing_dates,
+    check_menu_dataset,
+    format_dataset_error,
     get_adjusted_year,
     get_alt_menu,
     get_current_date,
@@ -57,8 +56,8 @@ from school_menu.utils import (
     get_notifications_status,
     get_season,
     get_user,
-    validate_annual_dataset,
-    validate_dataset,
+    is_school_in_session,
+    summarize_dataset_errors,
 )
 
 
@@ -76,7 +75,7 @@ def index(request):
         season = get_season(school)
         alt_menu = get_alt_menu(school.user)
         meal_type = "S"
-        if not _is_school_in_session(school, datetime.now()):
+        if not is_school_in_session(school, datetime.now()):
             context = {
                 "not_in_session": True,
                 "start_day": school.start_day,
@@ -118,11 +117,10 @@ def index(request):
 def school_menu(request, slug, meal_type="S"):
     """Return school menu for the given school"""
     school = get_object_or_404(School.objects.select_related("user"), slug=slug)
-    pk = request.session.get("anon_notification_pk")
-    notifications_status = get_notifications_status(pk, school)
+    notifications_status = get_notifications_status(request, school)
     if not school.is_published:
         return render(request, "school-menu.html", {"not_published": True})
-    if not _is_school_in_session(school, datetime.now()):
+    if not is_school_in_session(school, datetime.now()):
         context = {
             "not_in_session": True,
             "start_day": school.start_day,
@@ -172,8 +170,7 @@ def school_menu(request, slug, meal_type="S"):
 def get_menu(request, school_id, week, day, meal_type):
     """get menu for the given school, day, week and type"""
     school = get_object_or_404(School.objects.select_related("user"), pk=school_id)
-    pk = request.session.get("anon_notification_pk")
-    notifications_status = get_notifications_status(pk, school)
+    notifications_status = get_notifications_status(request, school)
     season = get_season(school)
     year = get_adjusted_year()
     alt_menu = get_alt_menu(school.user)
@@ -396,20 +393,11 @@ def upload_menu(request, school_id, meal_type):
         if form.is_valid():
             file = request.FILES["file"]
             season = form.cleaned_data["season"]
-            if menu_type == School.Types.SIMPLE:
-                resource = SimpleMealResource()
-            else:
-                resource = DetailedMealResource()
-            dataset = Dataset()
             try:
-                # Read and detect CSV format (supports both comma and semicolon delimiters)
-                # This allows importing CSVs exported from Numbers, Excel, and other tools
-                content = file.read().decode("utf-8")
-                delimiter, quotechar = detect_csv_format(content)
-                # Load with detected delimiter and quote character
-                dataset.load(
-                    content, format="csv", delimiter=delimiter, quotechar=quotechar
-                )
+                # CSV format is detected (comma or semicolon delimiters), so that
+                # CSVs exported from Numbers, Excel, and other tools can be imported.
+                # XLSX and ODS spreadsheets are streamed row by row
+                dataset = load_menu_file(file)
             except InvalidDimensions as e:
                 messages.add_message(
                     request,
@@ -441,42 +429,36 @@ def upload_menu(request, school_id, meal_type):
                 messages.add_message(
                     request,
                     messages.ERROR,
-                    f"Errore durante la lettura del file CSV. Verifica il formato del file. Errore: {str(e)}",
+                    f"Errore durante la lettura del file. Verifica il formato del file. Errore: {str(e)}",
                 )
                 return HttpResponse(
                     status=204, headers={"HX-Trigger": "menuUploadError"}
                 )
             # Validate and filter dataset (removes unnamed and extra columns)
             # This allows CSVs with trailing commas or additional columns to work correctly
-            validates, message, filtered_dataset = validate_dataset(dataset, menu_type)
-            if not validates:
+            menu_kind = "simple" if menu_type == School.Types.SIMPLE else "detailed"
+            errors, filtered_dataset = check_menu_dataset(dataset, menu_kind)
+            if errors:
                 context = {
                     "form": form,
                     "school": school,
                     "active_menu": active_menu,
-                    "error_message": message,
+                    "error_message": summarize_dataset_errors(errors),
+                    "error_details": [
+                        format_dataset_error(error) for error in errors if error["row"]
+                    ],
                 }
                 return TemplateResponse(request, "upload-menu.html", context)
-            result = resource.import_data(
-                filtered_dataset,
-                dry_run=True,
-                school=school,
-                season=season,
-                type=meal_type,
+            # Single import pass of the changed rows only: failed rows roll the
+            # whole import back and the meal cache is invalidated once at the end
+            result, changed, unchanged = import_menu_dataset(
+                filtered_dataset, school, meal_type, season
             )
-            if not result.has_errors():  # pragma: no cover
-                result = resource.import_data(
-                    filtered_dataset,
-                    dry_run=False,
-                    school=school,
-                    season=season,
-                    type=meal_type,
-                )
-                # Explicitly invalidate cache after bulk import
-                # (django-import-export may use bulk_create which bypasses save())
-                invalidate_meal_cache(school.id)
+            if result is None or not result.has_errors():  # pragma: no cover
                 messages.add_message(
-                    request, messages.SUCCESS, "Menu caricato con successo"
+                    request,
+                    messages.SUCCESS,
+                    f"Menu caricato con successo: {changed} righe modificate, {unchanged} invariate",
                 )
             else:  # pragma: no cover
                 print(result.row_errors())
@@ -503,17 +485,11 @@ def upload_annual_menu(request, school_id, meal_type):
         form = UploadAnnualMenuForm(request.POST, request.FILES)
         if form.is_valid():
             file = request.FILES["file"]
-            resource = AnnualMenuResource()
-            dataset = Dataset()
             try:
-                # Read and detect CSV format (supports both comma and semicolon delimiters)
-                # This allows importing CSVs exported from Numbers, Excel, and other tools
-                content = file.read().decode("utf-8")
-                delimiter, quotechar = detect_csv_format(content)
-                # Load with detected delimiter and quote character
-                dataset.load(
-                    content, format="csv", delimiter=delimiter, quotechar=quotechar
-                )
+                # CSV format is detected (comma or semicolon delimiters), so that
+                # CSVs exported from Numbers, Excel, and other tools can be imported.
+                # XLSX and ODS spreadsheets are streamed row by row
+                dataset = load_menu_file(file)
             except InvalidDimensions as e:
                 messages.add_message(
                     request,
@@ -545,35 +521,35 @@ def upload_annual_menu(request, school_id, meal_type):
                 messages.add_message(
                     request,
                     messages.ERROR,
-                    f"Errore durante la lettura del file CSV. Verifica il formato del file. Errore: {str(e)}",
+                    f"Errore durante la lettura del file. Verifica il formato del file. Errore: {str(e)}",
                 )
                 return HttpResponse(
                     status=204, headers={"HX-Trigger": "menuUploadError"}
                 )
             # Validate and filter dataset (removes unnamed and extra columns)
             # This allows CSVs with trailing commas or additional columns to work correctly
-            validates, message, filtered_dataset = validate_annual_dataset(dataset)
-            if not validates:
+            errors, filtered_dataset = check_menu_dataset(dataset, "annual")
+            if errors:
                 context = {
                     "form": form,
                     "school": school,
                     "active_menu": active_menu,
-                    "error_message": message,
+                    "error_message": summarize_dataset_errors(errors),
+                    "error_details": [
+                        format_dataset_error(error) for error in errors if error["row"]
+                    ],
                 }
                 return TemplateResponse(request, "upload-menu.html", context)
-            result = resource.import_data(
-                filtered_dataset, dry_run=True, school=school, type=meal_type
+            # Single import pass of the changed rows only,
+            # missing dates are filled by the importer
+            result, changed, unchanged = import_menu_dataset(
+                filtered_dataset, school, meal_type, annual=True
             )
-            if not result.has_errors():  # pragma: no cover
-                result = resource.import_data(
-                    filtered_dataset, dry_run=False, school=school, type=meal_type
-                )
-                fill_missing_dates(school, meal_type)
-                # Explicitly invalidate cache after bulk import and fill_missing_dates
-                # (django-import-export may use bulk_create which bypasses save())
-                invalidate_meal_cache(school.id)
+            if result is None or not result.has_errors():  # pragma: no cover
                 messages.add_message(
-                    request, messages.SUCCESS, "Menu caricato con successo"
+                    request,
+                    messages.SUCCESS,
+                    f"Menu caricato con successo: {changed} righe modificate, {unchanged} invariate",
                 )
             else:  # pragma: no cover
                 print(result.row_errors())
@@ -592,6 +568,50 @@ def upload_annual_menu(request, school_id, meal_type):
     return TemplateResponse(request, "upload-menu.html", context)
 
 
+@login_required
+def upload_menu_archive(request, school_id):
+    """Upload the menus of every type and season at once (ZIP archive or workbook)"""
+    school = get_object_or_404(School, pk=school_id, user=request.user)
+    if request.method == "POST":
+        form = UploadMenuArchiveForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Validate every menu before touching the database
+            file = request.FILES["file"]
+            if get_file_extension(file.name) == "zip":
+                entries, errors = read_menu_archive(file, school)
+            else:
+                entries, errors = read_menu_workbook(file, school)
+            if errors:
+                context = {
+                    "form": form,
+                    "school": school,
+                    "error_message": "L'archivio contiene errori, nessun menu è stato caricato.",
+                    "error_details": errors,
+                }
+                return TemplateResponse(request, "upload-menu-archive.html", context)
+            try:
+                changed, unchanged = import_menu_entries(entries, school)
+            except Exception as e:
+                messages.add_message(
+                    request,
+                    messages.ERROR,
+                    f"Errore durante il caricamento dei menu, nessun menu è stato caricato. Errore: {str(e)}",
+                )
+                return HttpResponse(
+                    status=204, headers={"HX-Trigger": "menuUploadError"}
+                )
+            messages.add_message(
+                request,
+                messages.SUCCESS,
+                f"{len(entries)} menu caricati con successo: {changed} righe modificate, {unchanged} invariate",
+            )
+            return HttpResponse(status=204, headers={"HX-Refresh": "true"})
+    else:
+        form = UploadMenuArchiveForm()
+    context = {"form": form, "school": school}
+    return TemplateResponse(request, "upload-menu-archive.html", context)
+
+
 @login_required
 def create_weekly_menu(request, school_id, week, season, meal_type):
     qs = School.objects.all().select_related("user")
@@ -684,28 +704,29 @@ def search_schools(request):
 
 def export_modal_view(request, school_id, meal_type):
     school = get_object_or_404(School, pk=school_id)
+    model = get_export_spec(school)[0]
+    # One query for the (type, season) pairs with meals: clear the default
+    # ordering, otherwise it would be added to the DISTINCT columns
+    available_menus = set(
+        model.objects.filter(school=school)
+        .order_by()
+        .values_list("type", "season")
+        .distinct()
+    )
     if school.annual_menu:
-        model = AnnualMeal
         summer_meals = None
         winter_meals = None
-        annual_meals = model.objects.filter(school=school, type=meal_type).exists()
+        annual_meals = any(menu_type == meal_type for menu_type, _ in available_menus)
     else:
         annual_meals = None
-        if school.menu_type == School.Types.SIMPLE:
-            model = SimpleMeal
-        else:
-            model = DetailedMeal
-        summer_meals = model.objects.filter(
-            school=school, season=School.Seasons.PRIMAVERILE, type=meal_type
-        ).exists()
-        winter_meals = model.objects.filter(
-            school=school, season=School.Seasons.INVERNALE, type=meal_type
-        ).exists()
+        summer_meals = (meal_type, Meal.Seasons.ESTIVO) in available_menus
+        winter_meals = (meal_type, Meal.Seasons.INVERNALE) in available_menus
     context = {
         "school": school,
         "summer_meals": summer_meals,
         "winter_meals": winter_meals,
         "annual_meals": annual_meals,
+        "has_menus": bool(available_menus),
         "active_menu": meal_type,
     }
     return render(request, "export-menu.html", context)
@@ -714,20 +735,18 @@ def export_modal_view(request, school_id, meal_type):
 @login_required
 def export_menu(request, school_id, season, meal_type):
     school = get_object_or_404(School, pk=school_id)
-    if school.annual_menu:
-        model = AnnualMeal
-        resource = AnnualMenuExportResource()
-    elif school.menu_type == School.Types.SIMPLE:
-        model = SimpleMeal
-        resource = SimpleMealExportResource()
-    else:
-        model = DetailedMeal
-        resource = DetailedMealExportResource()
+    return StreamingHttpResponse(
+        iter_menu_csv(school, season, meal_type), content_type="text/csv"
+    )
 
-    meals = model.objects.filter(school=school, season=season, type=meal_type)
-    data = resource.export(meals)
 
-    response = HttpResponse(data.csv, content_type="text/csv")
+@login_required
+def export_menu_archive(request, school_id):
+    school = get_object_or_404(School, pk=school_id)
+    response = StreamingHttpResponse(
+        iter_menu_archive(school), content_type="application/zip"
+    )
+    response["Content-Disposition"] = f'attachment; filename="menu_{school.slug}.zip"'
     return response
 
 
@@ -1,6 +1,6 @@
 import factory
 
-from contacts.models import MenuReport
+from contacts.models import MenuReport, OutboxEmail
 from tests.users.factories import UserFactory
 
 
@@ -14,3 +14,12 @@ class MenuReportFactory(factory.django.DjangoModelFactory):
     email = factory.Faker("email")
     receiver = factory.SubFactory(UserFactory)
     created_at = factory.Faker("date_time_this_year")
+
+
+class OutboxEmailFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = OutboxEmail
+
+    subject = factory.Faker("sentence")
+    body = factory.Faker("text")
+    recipients = factory.LazyFunction(lambda: ["user@example.com"])
@@ -1,5 +1,7 @@
 import pytest
 
+from tests.contacts.factories import OutboxEmailFactory
+
 pytestmark = pytest.mark.django_db
 
 
@@ -9,3 +11,12 @@ class TestMenuReportModel:
         menu_report = menu_report_factory(receiver=user)
 
         assert menu_report.__str__() == f"Segnalazione da {menu_report.name}"
+
+
+class TestOutboxEmailModel:
+    def test_str(self):
+        email = OutboxEmailFactory(
+            subject="Segnalazione", recipients=["a@example.com", "b@example.com"]
+        )
+
+        assert str(email) == "Segnalazione a a@example.com, b@example.com"
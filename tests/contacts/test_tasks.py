@@ -0,0 +1,219 @@
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+from unittest.mock import patch
+
+import pytest
+import time_machine
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.utils import timezone
+
+from contacts.models import OutboxEmail
+from contacts.tasks import (
+    OUTBOX_CLAIM_TIMEOUT,
+    OUTBOX_MAX_ATTEMPTS,
+    get_outbox_retry_delay,
+    queue_email,
+    send_outbox,
+)
+from tests.contacts.factories import OutboxEmailFactory
+
+pytestmark = pytest.mark.django_db
+
+NOW = "2025-10-20 09:00:00+00:00"
+
+
+def flaky_send(failing_recipient):
+    """Return a send_messages fake failing for one recipient only"""
+
+    def send_messages(messages):
+        for message in messages:
+            if failing_recipient in message.to:
+                raise SMTPServerDisconnected("Connection unexpectedly closed")
+            mail.outbox.append(message)
+        return len(messages)
+
+    return send_messages
+
+
+class TestQueueEmail:
+    @patch("contacts.tasks.async_task")
+    def test_email_is_saved_then_queued_on_commit(
+        self, mock_async_task, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            email = queue_email("Oggetto", "Testo", ("user@example.com",))
+            mock_async_task.assert_not_called()
+
+        email.refresh_from_db()
+        assert email.recipients == ["user@example.com"]
+        assert email.from_email == ""
+        assert email.status == OutboxEmail.Status.PENDING
+        mock_async_task.assert_called_once_with("contacts.tasks.send_outbox")
+        assert mail.outbox == []
+
+    @patch("contacts.tasks.async_task", side_effect=ConnectionError("Redis down"))
+    def test_broker_error_is_logged(
+        self, mock_async_task, django_capture_on_commit_callbacks
+    ):
+        with patch("contacts.tasks.logger") as mock_logger:
+            with django_capture_on_commit_callbacks(execute=True):
+                queue_email("Oggetto", "Testo", ["user@example.com"])
+
+        # The email stays in the outbox for the schedule
+        assert OutboxEmail.objects.get().status == OutboxEmail.Status.PENDING
+        mock_logger.warning.assert_called_once()
+
+    def test_email_is_sent_by_the_task(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            queue_email("Oggetto", "Testo", ["user@example.com"], "noreply@example.com")
+
+        email = OutboxEmail.objects.get()
+        assert email.status == OutboxEmail.Status.SENT
+        assert email.attempts == 1
+        assert email.sent_at is not None
+        assert mail.outbox[0].from_email == "noreply@example.com"
+        assert mail.outbox[0].to == ["user@example.com"]
+
+
+class TestSendOutbox:
+    @patch("django.core.mail.backends.smtp.smtplib.SMTP")
+    def test_batch_shares_a_single_connection(self, mock_smtp, settings):
+        settings.EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+        OutboxEmailFactory.create_batch(3)
+
+        assert send_outbox() == (3, 0, 0)
+
+        # One SMTP session for the whole batch
+        mock_smtp.assert_called_once()
+        assert mock_smtp.return_value.sendmail.call_count == 3
+        mock_smtp.return_value.quit.assert_called_once_with()
+
+    def test_batch_size(self):
+        OutboxEmailFactory.create_batch(3)
+
+        assert send_outbox(batch_size=2) == (2, 0, 0)
+        assert (
+            OutboxEmail.objects.filter(status=OutboxEmail.Status.PENDING).count() == 1
+        )
+
+    @time_machine.travel(NOW, tick=False)
+    @patch("contacts.tasks.get_connection")
+    def test_failed_email_is_rescheduled_with_backoff(self, mock_get_connection):
+        mock_get_connection.return_value.send_messages.side_effect = flaky_send(
+            "down@example.com"
+        )
+        failing = OutboxEmailFactory(recipients=["down@example.com"])
+        OutboxEmailFactory()
+
+        # A failure does not stop the rest of the batch
+        assert send_outbox() == (1, 0, 1)
+
+        failing.refresh_from_db()
+        assert failing.status == OutboxEmail.Status.PENDING
+        assert failing.attempts == 1
+        assert failing.next_attempt_at == timezone.now() + timedelta(seconds=60)
+        assert failing.last_error == "Connection unexpectedly closed"
+        # Not due yet
+        assert send_outbox() == (0, 0, 0)
+
+    @patch("contacts.tasks.get_connection")
+    def test_gives_up_after_max_attempts(self, mock_get_connection):
+        mock_get_connection.return_value.send_messages.side_effect = flaky_send(
+            "down@example.com"
+        )
+        email = OutboxEmailFactory(
+            recipients=["down@example.com"], attempts=OUTBOX_MAX_ATTEMPTS - 1
+        )
+
+        with patch("contacts.tasks.logger") as mock_logger:
+            assert send_outbox() == (0, 1, 0)
+
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.Status.FAILED
+        assert email.attempts == OUTBOX_MAX_ATTEMPTS
+        mock_logger.error.assert_called_once()
+
+    @time_machine.travel(NOW, tick=False)
+    @patch("contacts.tasks.get_connection")
+    def test_emails_are_claimed_before_sending(self, mock_get_connection):
+        email = OutboxEmailFactory()
+
+        def send_messages(messages):
+            # Sent outside of the claim: another run does not see the email
+            claimed = OutboxEmail.objects.get(pk=email.pk)
+            assert claimed.attempts == 1
+            assert claimed.next_attempt_at == timezone.now() + timedelta(
+                seconds=OUTBOX_CLAIM_TIMEOUT
+            )
+            assert send_outbox() == (0, 0, 0)
+            return len(messages)
+
+        mock_get_connection.return_value.send_messages.side_effect = send_messages
+
+        assert send_outbox() == (1, 0, 0)
+
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.Status.SENT
+
+    def test_crashed_run_releases_its_claim(self):
+        email = OutboxEmailFactory(
+            attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        assert send_outbox() == (1, 0, 0)
+
+        email.refresh_from_db()
+        assert email.attempts == 2
+
+    def test_sent_and_failed_emails_are_not_sent_again(self):
+        OutboxEmailFactory(status=OutboxEmail.Status.SENT)
+        OutboxEmailFactory(status=OutboxEmail.Status.FAILED)
+
+        assert send_outbox() == (0, 0, 0)
+        assert mail.outbox == []
+
+    def test_retry_delay(self):
+        assert [get_outbox_retry_delay(attempts) for attempts in range(1, 5)] == [
+            60,
+            120,
+            240,
+            480,
+        ]
+        assert get_outbox_retry_delay(10) == 60 * 60
+
+
+class TestFlushOutboxCommand:
+    @patch("contacts.tasks.OUTBOX_BATCH_SIZE", 2)
+    def test_due_emails_are_sent_in_batches(self, capsys):
+        OutboxEmailFactory.create_batch(5)
+        waiting = OutboxEmailFactory(
+            next_attempt_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        with patch("contacts.tasks.get_connection", wraps=get_connection) as spy:
+            call_command("flush_outbox")
+
+        assert len(mail.outbox) == 5
+        # Three batches, the empty run ending the flush opens no connection
+        assert spy.call_count == 3
+        waiting.refresh_from_db()
+        assert waiting.status == OutboxEmail.Status.PENDING
+        assert "5 sent, 0 failed, 0 rescheduled" in capsys.readouterr().out
+
+    @patch("contacts.tasks.get_connection")
+    def test_retry_now_sends_waiting_emails_once(self, mock_get_connection, capsys):
+        mock_get_connection.return_value.send_messages.side_effect = flaky_send(
+            "down@example.com"
+        )
+        OutboxEmailFactory(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        OutboxEmailFactory(
+            recipients=["down@example.com"],
+            next_attempt_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        call_command("flush_outbox", "--retry-now")
+
+        assert len(mail.outbox) == 1
+        assert "1 sent, 0 failed, 1 rescheduled" in capsys.readouterr().out
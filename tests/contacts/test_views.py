@@ -1,7 +1,8 @@
 from django.contrib.messages import get_messages
+from django.core import mail
 from pytest_django.asserts import assertTemplateUsed
 
-from contacts.models import MenuReport
+from contacts.models import MenuReport, OutboxEmail
 from school_menu.test import TestCase
 from tests.contacts.factories import MenuReportFactory
 from tests.school_menu.factories import SchoolFactory
@@ -21,8 +22,16 @@ class ContactView(TestCase):
             "message": "Vel rerum voluptatem aut accusantium ducimus ut optio eligendi sed minus maxime",
         }
 
-        response = self.post("contacts:contact", data=data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post("contacts:contact", data=data)
         self.response_302(response)
+        # Queued in the outbox and sent by the (synchronous) django-q task
+        email = OutboxEmail.objects.get()
+        assert email.status == OutboxEmail.Status.SENT
+        assert (
+            mail.outbox[0].subject == "Contatto da Test Name su menu.webbografico.com"
+        )
+        assert "Rispondi a test@test.com" in mail.outbox[0].body
 
     def test_invalid_data(self):
         data = {}
@@ -52,9 +61,11 @@ class MenuReportView(TestCase):
             "email": "user@test.com",
         }
 
-        response = self.post("contacts:menu_report", school_id=school.pk, data=data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post("contacts:menu_report", school_id=school.pk, data=data)
 
         self.response_302(response)
+        assert mail.outbox[0].to == [user.email]
 
     def test_post_with_get_notified_false(self):
         user = self.make_user()
@@ -142,7 +153,7 @@ class ReportFeedbackView(TestCase):
         report = MenuReportFactory(receiver=school.user)
         data = {"message": "Test message"}
 
-        with self.login(user):
+        with self.login(user), self.captureOnCommitCallbacks(execute=True):
             response = self.post(
                 "contacts:report_feedback", report_id=report.pk, data=data
             )
@@ -150,6 +161,7 @@ class ReportFeedbackView(TestCase):
         self.response_302(response)
         message = list(get_messages(response.wsgi_request))[0].message
         assert message == "Risposta inviata con successo"
+        assert mail.outbox[0].to == [report.email]
 
     def test_post_with_empty_message(self):
         user = self.make_user()
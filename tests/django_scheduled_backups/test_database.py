@@ -0,0 +1,330 @@
+"""Tests for the database backup pipeline."""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import subprocess
+import tarfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from django_scheduled_backups.conf import DEFAULT_SETTINGS
+from django_scheduled_backups.database import (
+    compress_dump,
+    decompress_dump,
+    dump_database,
+    run_database_backup,
+    timed_phase,
+    verify_dump,
+)
+from django_scheduled_backups.models import BackupRun
+
+pytestmark = pytest.mark.django_db
+
+DUMP = b"CREATE TABLE school_menu_meal (id integer);\n" * 1000
+
+
+def postgres_connections():
+    """Return a connections handler mock for a PostgreSQL default database"""
+    connections = MagicMock()
+    connections.__getitem__.return_value.vendor = "postgresql"
+    return connections
+
+
+def postgres_connector():
+    """Return a connector mock with the settings of a PostgreSQL database"""
+    connector = MagicMock()
+    connector.settings = {
+        "NAME": "school_menu",
+        "USER": "menu",
+        "PASSWORD": "secret",
+        "HOST": "db",
+        "PORT": 5432,
+    }
+    return connector
+
+
+def fake_pg_dump(command, env, check, capture_output):
+    """Write a directory format dump where pg_dump would"""
+    directory = next(arg for arg in command if arg.startswith("--file=")).split("=")[1]
+    os.makedirs(directory)
+    with open(os.path.join(directory, "toc.dat"), "wb") as toc:
+        toc.write(b"toc")
+
+
+class TestCompressDump:
+    """Test the streaming compression of dumps."""
+
+    @pytest.mark.parametrize(
+        ("codec", "extension", "decompress"),
+        [
+            ("gzip", "gz", gzip.decompress),
+            ("bz2", "bz2", bz2.decompress),
+            ("xz", "xz", lzma.decompress),
+        ],
+    )
+    def test_codecs_round_trip(self, codec, extension, decompress):
+        output, output_extension = compress_dump(io.BytesIO(DUMP), codec, 1)
+
+        assert output_extension == extension
+        compressed = output.read()
+        assert len(compressed) < len(DUMP)
+        assert decompress(compressed) == DUMP
+
+    @patch("django_scheduled_backups.database.CHUNK_SIZE", 100)
+    def test_dump_is_streamed_in_chunks(self):
+        dump = io.BytesIO(DUMP)
+        dump.seek(500)  # the dump is always read from the start
+
+        output, _ = compress_dump(dump, "gzip", 6)
+
+        assert gzip.decompress(output.read()) == DUMP
+
+    def test_no_compression(self):
+        dump = io.BytesIO(DUMP)
+
+        assert compress_dump(dump, None, 6) == (dump, None)
+
+    def test_unknown_codec(self):
+        with pytest.raises(ImproperlyConfigured, match="Unknown backup compression"):
+            compress_dump(io.BytesIO(DUMP), "rar", 6)
+
+
+class TestDecompressDump:
+    """Test the streaming decompression of backups."""
+
+    @pytest.mark.parametrize("codec", ["gzip", "bz2", "xz"])
+    @patch("django_scheduled_backups.database.CHUNK_SIZE", 100)
+    def test_codecs_round_trip(self, codec):
+        backup, _ = compress_dump(io.BytesIO(DUMP), codec, 1)
+        backup.seek(50)
+
+        assert decompress_dump(backup, codec).read() == DUMP
+        # The backup is left ready for the upload
+        assert backup.tell() == 0
+
+    def test_no_compression(self):
+        backup = io.BytesIO(DUMP)
+        backup.seek(50)
+
+        assert decompress_dump(backup, None) is backup
+        assert backup.tell() == 0
+
+    def test_truncated_backup(self):
+        backup, _ = compress_dump(io.BytesIO(DUMP), "gzip", 6)
+        truncated = io.BytesIO(backup.read()[:-10])
+
+        with pytest.raises(RuntimeError, match="The gzip backup is truncated"):
+            decompress_dump(truncated, "gzip")
+
+
+class TestDumpDatabase:
+    """Test connector and parallel directory format dumps."""
+
+    def test_connector_dump(self, tmp_path):
+        dump, filename, directory = dump_database("default", 4, tmp_path)
+
+        # SQLite has no parallel dumps: the dbbackup connector is used
+        assert b"CREATE TABLE" in dump.read()
+        assert directory is None
+        assert not filename.endswith(".pgdir")
+
+    @patch("django_scheduled_backups.database.connections", postgres_connections())
+    @patch("django_scheduled_backups.database.get_connector")
+    def test_single_job_uses_connector(self, mock_get_connector, tmp_path):
+        connector = mock_get_connector.return_value
+        connector.generate_filename.return_value = "backup.psql"
+
+        dump, filename, directory = dump_database("default", 1, tmp_path)
+
+        assert dump == connector.create_dump.return_value
+        assert (filename, directory) == ("backup.psql", None)
+
+    @patch("django_scheduled_backups.database.connections", postgres_connections())
+    @patch("django_scheduled_backups.database.subprocess.run", side_effect=fake_pg_dump)
+    @patch("django_scheduled_backups.database.get_connector")
+    def test_parallel_postgres_dump(self, mock_get_connector, mock_run, tmp_path):
+        mock_get_connector.return_value = postgres_connector()
+
+        dump, filename, directory = dump_database("default", 4, tmp_path)
+
+        command = mock_run.call_args.args[0]
+        assert command[0] == "pg_dump"
+        assert "--dbname=postgresql://menu@db:5432/school_menu" in command
+        assert "--format=directory" in command
+        assert "--jobs=4" in command
+        assert mock_run.call_args.kwargs["env"]["PGPASSWORD"] == "secret"
+        assert directory == os.path.join(tmp_path, "dump")
+        assert filename.endswith(".pgdir")
+        with tarfile.open(fileobj=dump) as tar:
+            assert tar.extractfile("./toc.dat").read() == b"toc"
+
+    @patch("django_scheduled_backups.database.connections", postgres_connections())
+    @patch("django_scheduled_backups.database.subprocess.run")
+    @patch("django_scheduled_backups.database.get_connector")
+    def test_failed_pg_dump_reports_its_error(
+        self, mock_get_connector, mock_run, tmp_path
+    ):
+        mock_get_connector.return_value = postgres_connector()
+        mock_run.side_effect = subprocess.CalledProcessError(
+            1, "pg_dump", stderr=b"pg_dump: error: connection refused\n"
+        )
+
+        with pytest.raises(
+            RuntimeError, match="pg_dump failed: pg_dump: error: connection refused$"
+        ):
+            dump_database("default", 4, tmp_path)
+
+
+class TestVerifyDump:
+    """Test the restore of dumps into a scratch database."""
+
+    def test_scratch_database_must_differ(self):
+        with pytest.raises(ImproperlyConfigured):
+            verify_dump(io.BytesIO(DUMP), None, "default", "default", 1)
+
+    @patch("django_scheduled_backups.database.get_connector")
+    def test_connector_dump_is_restored(self, mock_get_connector):
+        dump = io.BytesIO(DUMP)
+        dump.seek(100)
+
+        verify_dump(dump, None, "default", "scratch", 1)
+
+        mock_get_connector.assert_called_once_with("scratch")
+        mock_get_connector.return_value.restore_dump.assert_called_once_with(dump)
+        assert dump.tell() == 0
+
+    @patch("django_scheduled_backups.database.subprocess.run")
+    @patch("django_scheduled_backups.database.get_connector")
+    def test_directory_dump_is_restored_in_parallel(self, mock_get_connector, mock_run):
+        mock_get_connector.return_value = postgres_connector()
+
+        verify_dump(io.BytesIO(), "/tmp/dump", "default", "scratch", 4)
+
+        command = mock_run.call_args.args[0]
+        assert command[0] == "pg_restore"
+        assert command[-2:] == ["--jobs=4", "/tmp/dump"]
+        assert "--clean" in command
+
+
+class TestRunDatabaseBackup:
+    """Test the whole backup, phase by phase."""
+
+    @patch("django_scheduled_backups.database.get_storage")
+    def test_backup_is_compressed_uploaded_and_timed(self, mock_get_storage):
+        storage = mock_get_storage.return_value
+        uploaded = {}
+        storage.write_file.side_effect = lambda output, filename: uploaded.update(
+            {filename: output.read()}
+        )
+        backup_run = BackupRun(backup_type="database")
+
+        config = {**DEFAULT_SETTINGS["DATABASE_BACKUP"], "compression": "gzip"}
+
+        filename = run_database_backup(backup_run, config)
+
+        assert filename.endswith(".gz")
+        assert b"CREATE TABLE" in gzip.decompress(uploaded[filename])
+        assert backup_run.size_bytes == len(uploaded[filename])
+        assert backup_run.filename == filename
+        assert backup_run.dump_seconds >= 0
+        assert backup_run.compress_seconds >= 0
+        assert backup_run.upload_seconds >= 0
+        assert backup_run.verify_seconds is None
+        storage.clean_old_backups.assert_called_once_with(
+            content_type="db", database="default"
+        )
+
+    @patch("django_scheduled_backups.database.verify_dump")
+    @patch("django_scheduled_backups.database.get_storage")
+    def test_backup_is_verified(self, mock_get_storage, mock_verify):
+        backup_run = BackupRun(backup_type="database")
+        config = {"verify_database": "scratch", "compression": None, "jobs": 2}
+
+        filename = run_database_backup(backup_run, config)
+
+        dump, directory, database, verify_database, jobs = mock_verify.call_args.args
+        assert (directory, database, verify_database, jobs) == (
+            None,
+            "default",
+            "scratch",
+            2,
+        )
+        assert backup_run.verify_seconds >= 0
+        # Without compression the dump is uploaded as it is
+        mock_get_storage.return_value.write_file.assert_called_once_with(dump, filename)
+
+    @patch("django_scheduled_backups.database.verify_dump")
+    @patch("django_scheduled_backups.database.get_storage")
+    def test_compressed_backup_is_verified(self, mock_get_storage, mock_verify):
+        storage = mock_get_storage.return_value
+        uploaded = {}
+        storage.write_file.side_effect = lambda output, filename: uploaded.update(
+            {filename: output.read()}
+        )
+        restored = []
+        mock_verify.side_effect = lambda dump, *args: restored.append(dump.read())
+        config = {"verify_database": "scratch", "compression": "xz"}
+
+        filename = run_database_backup(BackupRun(backup_type="database"), config)
+
+        # The uploaded backup is the one decompressed and restored
+        assert lzma.decompress(uploaded[filename]) == restored[0]
+        assert b"CREATE TABLE" in restored[0]
+
+    @patch("django_scheduled_backups.database.compress_dump")
+    @patch("django_scheduled_backups.database.verify_dump")
+    @patch("django_scheduled_backups.database.get_storage")
+    def test_broken_compression_fails_the_backup(
+        self, mock_get_storage, mock_verify, mock_compress
+    ):
+        mock_compress.return_value = (io.BytesIO(gzip.compress(DUMP)[:-10]), "gz")
+        backup_run = BackupRun(backup_type="database")
+        config = {"verify_database": "scratch", "compression": "gzip"}
+
+        with pytest.raises(RuntimeError, match="truncated"):
+            run_database_backup(backup_run, config)
+
+        mock_verify.assert_not_called()
+        mock_get_storage.return_value.write_file.assert_not_called()
+        assert backup_run.verify_seconds >= 0
+
+    @patch("django_scheduled_backups.database.connections", postgres_connections())
+    @patch("django_scheduled_backups.database.subprocess.run")
+    @patch("django_scheduled_backups.database.get_connector")
+    @patch("django_scheduled_backups.database.get_storage")
+    def test_directory_backup_is_extracted_and_verified(
+        self, mock_get_storage, mock_get_connector, mock_run
+    ):
+        mock_get_connector.return_value = postgres_connector()
+        restored = {}
+
+        def run(command, env, check, capture_output):
+            if command[0] == "pg_dump":
+                return fake_pg_dump(command, env, check, capture_output)
+            with open(os.path.join(command[-1], "toc.dat"), "rb") as toc:
+                restored[command[-1]] = toc.read()
+
+        mock_run.side_effect = run
+        config = {"verify_database": "scratch", "compression": "gzip", "jobs": 4}
+
+        filename = run_database_backup(BackupRun(backup_type="database"), config)
+
+        assert filename.endswith(".pgdir.gz")
+        # Restored from the tar of the compressed backup, not the dump directory
+        ((directory, toc),) = restored.items()
+        assert directory.endswith("restore")
+        assert toc == b"toc"
+
+    def test_failed_phase_is_timed(self):
+        backup_run = BackupRun(backup_type="database")
+
+        with pytest.raises(RuntimeError):
+            with timed_phase(backup_run, "upload"):
+                raise RuntimeError("Storage unavailable")
+
+        assert backup_run.upload_seconds >= 0
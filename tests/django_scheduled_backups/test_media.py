@@ -0,0 +1,256 @@
+"""Tests for the incremental media backups."""
+
+import hashlib
+import json
+import os
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+import time_machine
+from dbbackup.storage import Storage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+
+from django_scheduled_backups.media import (
+    MANIFESTS_DIR,
+    clean_old_media_backups,
+    get_object_name,
+    iter_media_files,
+    load_latest_manifest,
+    run_media_backup,
+)
+from django_scheduled_backups.models import BackupRun
+
+pytestmark = pytest.mark.django_db
+
+CONFIG = {"incremental": True, "full_every": 3}
+LOGO = b"logo" * 100
+MENU = b"menu" * 50
+
+
+@pytest.fixture
+def media_storage(tmp_path):
+    storage = FileSystemStorage(location=tmp_path / "media")
+    with patch("django_scheduled_backups.media.default_storage", storage):
+        yield storage
+
+
+@pytest.fixture
+def backup_storage(tmp_path):
+    # A dbbackup Storage over a local directory, skipping the configured backend
+    storage = Storage.__new__(Storage)
+    storage.storage = FileSystemStorage(location=tmp_path / "backups")
+    with patch("django_scheduled_backups.media.get_storage", return_value=storage):
+        yield storage
+
+
+def write_media(storage, name, content, mtime=None):
+    """Write a media file, optionally setting its modification time"""
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as media_file:
+        media_file.write(content)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def run_backup(backup_storage, config=CONFIG):
+    """Run a media backup, a minute after the previous one"""
+    backup_run = BackupRun(backup_type="media")
+    runs = BackupRun.objects.count()
+    with time_machine.travel(datetime(2025, 10, 19, 3, runs, tzinfo=UTC)):
+        run_media_backup(backup_run, config)
+    backup_run.save()
+    return backup_run, load_latest_manifest(backup_storage)
+
+
+class TestIterMediaFiles:
+    def test_files_are_listed_recursively(self, media_storage):
+        write_media(media_storage, "logo.png", LOGO)
+        write_media(media_storage, "menu/2025/autunno.pdf", MENU)
+
+        assert sorted(iter_media_files(media_storage)) == [
+            "logo.png",
+            "menu/2025/autunno.pdf",
+        ]
+
+
+class TestRunMediaBackup:
+    def test_first_run_is_a_full_snapshot(self, media_storage, backup_storage):
+        write_media(media_storage, "logo.png", LOGO)
+        write_media(media_storage, "menu/autunno.pdf", MENU)
+        # Same content under another name is stored once
+        write_media(media_storage, "menu/copia.pdf", MENU)
+
+        backup_run, manifest = run_backup(backup_storage)
+
+        assert backup_run.full_snapshot is True
+        assert backup_run.bytes_scanned == len(LOGO) + 2 * len(MENU)
+        assert backup_run.bytes_written == len(LOGO) + len(MENU)
+        assert backup_run.filename.startswith("media/manifests/")
+        assert manifest["full"] is True
+        assert manifest["runs_since_full"] == 0
+        digest = hashlib.sha256(MENU).hexdigest()
+        assert manifest["files"]["menu/autunno.pdf"]["sha256"] == digest
+        assert manifest["files"]["menu/copia.pdf"]["size"] == len(MENU)
+        with backup_storage.read_file(get_object_name(digest)) as stored:
+            assert stored.read() == MENU
+
+    def test_unchanged_files_are_not_read_or_written_again(
+        self, media_storage, backup_storage
+    ):
+        write_media(media_storage, "logo.png", LOGO, mtime=1_700_000_000)
+        write_media(media_storage, "menu/autunno.pdf", MENU, mtime=1_700_000_000)
+        run_backup(backup_storage)
+        write_media(media_storage, "menu/inverno.pdf", b"inverno")
+        # Changed content, same size
+        write_media(media_storage, "logo.png", b"LOGO" * 100)
+
+        backup_run, manifest = run_backup(backup_storage)
+
+        assert backup_run.full_snapshot is False
+        assert backup_run.bytes_scanned == len(b"inverno") + len(LOGO)
+        assert backup_run.bytes_written == len(b"inverno") + len(LOGO)
+        assert manifest["runs_since_full"] == 1
+        assert set(manifest["files"]) == {
+            "logo.png",
+            "menu/autunno.pdf",
+            "menu/inverno.pdf",
+        }
+        assert manifest["files"]["logo.png"]["sha256"] == (
+            hashlib.sha256(b"LOGO" * 100).hexdigest()
+        )
+
+    def test_deleted_files_leave_the_manifest(self, media_storage, backup_storage):
+        write_media(media_storage, "logo.png", LOGO)
+        write_media(media_storage, "menu/autunno.pdf", MENU)
+        run_backup(backup_storage)
+        os.remove(media_storage.path("logo.png"))
+
+        backup_run, manifest = run_backup(backup_storage)
+
+        assert list(manifest["files"]) == ["menu/autunno.pdf"]
+        assert backup_run.bytes_written == 0
+
+    def test_restored_content_is_not_written_again(self, media_storage, backup_storage):
+        write_media(media_storage, "logo.png", LOGO)
+        run_backup(backup_storage)
+        os.remove(media_storage.path("logo.png"))
+        run_backup(backup_storage)
+        write_media(media_storage, "logo.png", LOGO)
+
+        backup_run, _ = run_backup(backup_storage)
+
+        # The content is hashed but its object is already stored
+        assert backup_run.bytes_scanned == len(LOGO)
+        assert backup_run.bytes_written == 0
+
+    def test_full_snapshot_every_full_every_runs(self, media_storage, backup_storage):
+        write_media(media_storage, "logo.png", LOGO, mtime=1_700_000_000)
+        snapshots = [run_backup(backup_storage)[0] for _ in range(4)]
+        assert [run.full_snapshot for run in snapshots] == [True, False, False, True]
+        assert [run.bytes_scanned for run in snapshots] == [len(LOGO), 0, 0, len(LOGO)]
+
+    def test_full_snapshot_writes_back_missing_objects(
+        self, media_storage, backup_storage
+    ):
+        write_media(media_storage, "logo.png", LOGO, mtime=1_700_000_000)
+        run_backup(backup_storage)
+        run_backup(backup_storage)
+        backup_storage.delete_file(get_object_name(hashlib.sha256(LOGO).hexdigest()))
+
+        incremental, _ = run_backup(backup_storage)
+        full, _ = run_backup(backup_storage)
+
+        # Incremental runs trust the manifest, the full snapshot checks the storage
+        assert incremental.bytes_written == 0
+        assert full.full_snapshot is True
+        assert full.bytes_written == len(LOGO)
+
+
+def stored_objects(backup_storage):
+    """Return the contents of every stored object"""
+    root = backup_storage.storage.path("media/objects")
+    return {
+        open(os.path.join(directory, name), "rb").read()
+        for directory, _, names in os.walk(root)
+        for name in names
+    }
+
+
+class TestCleanOldMediaBackups:
+    def test_old_manifests_and_their_objects_are_deleted(
+        self, media_storage, backup_storage
+    ):
+        config = {**CONFIG, "keep_manifests": 2}
+        write_media(media_storage, "logo.png", LOGO)
+        write_media(media_storage, "menu/autunno.pdf", MENU)
+        first, _ = run_backup(backup_storage, config)
+        os.remove(media_storage.path("logo.png"))
+        run_backup(backup_storage, config)
+        # The logo is still referenced by the first manifest
+        assert stored_objects(backup_storage) == {LOGO, MENU}
+
+        latest, _ = run_backup(backup_storage, config)
+
+        manifests = backup_storage.list_directory(MANIFESTS_DIR)
+        assert len(manifests) == 2
+        assert first.filename.split("/")[-1] not in manifests
+        assert stored_objects(backup_storage) == {MENU}
+        assert latest.filename.split("/")[-1] in manifests
+
+    def test_manifests_are_kept_by_default(self, media_storage, backup_storage):
+        write_media(media_storage, "logo.png", LOGO)
+        run_backup(backup_storage)
+        os.remove(media_storage.path("logo.png"))
+        run_backup(backup_storage)
+
+        assert clean_old_media_backups(backup_storage, None) == (0, 0)
+        assert len(backup_storage.list_directory(MANIFESTS_DIR)) == 2
+        assert stored_objects(backup_storage) == {LOGO}
+
+    def test_nothing_to_delete(self, media_storage, backup_storage):
+        os.makedirs(media_storage.location)
+        run_backup(backup_storage)
+
+        assert clean_old_media_backups(backup_storage, 1) == (0, 0)
+
+    def test_backups_without_objects(self, media_storage, backup_storage):
+        os.makedirs(media_storage.location)
+        for _ in range(2):
+            run_backup(backup_storage)
+
+        # An empty media tree stores no object at all
+        assert clean_old_media_backups(backup_storage, 1) == (1, 0)
+
+    def test_at_least_one_manifest_is_kept(self, backup_storage):
+        with pytest.raises(ImproperlyConfigured, match="keep_manifests"):
+            clean_old_media_backups(backup_storage, 0)
+
+
+class TestLoadLatestManifest:
+    def test_no_manifest_before_the_first_backup(self, backup_storage):
+        assert load_latest_manifest(backup_storage) is None
+
+    def test_object_storage_without_directories(self):
+        # S3-like storages list nothing instead of raising for a missing prefix
+        backup_storage = MagicMock()
+        backup_storage.list_directory.return_value = []
+
+        assert load_latest_manifest(backup_storage) is None
+        backup_storage.storage.exists.assert_not_called()
+
+    def test_empty_manifests_directory(self, backup_storage):
+        os.makedirs(backup_storage.storage.path("media/manifests"))
+
+        assert load_latest_manifest(backup_storage) is None
+
+    def test_latest_manifest_is_loaded(self, backup_storage):
+        os.makedirs(backup_storage.storage.path("media/manifests"))
+        for name in ["20251012-030000", "20251019-030000"]:
+            path = backup_storage.storage.path(f"media/manifests/{name}.json")
+            with open(path, "w") as manifest:
+                json.dump({"created_at": name}, manifest)
+
+        assert load_latest_manifest(backup_storage) == {"created_at": "20251019-030000"}
@@ -23,14 +23,14 @@ class TestScheduledDatabaseBackup:
     """Test the scheduled database backup task with email notifications."""
 
     @override_settings(ADMINS=[("Admin", "admin@example.com")])
-    @patch("django_scheduled_backups.tasks.management.call_command")
+    @patch("django_scheduled_backups.tasks.run_database_backup")
     @patch("django_scheduled_backups.tasks.get_setting")
     def test_backup_success_creates_record_and_sends_email(
-        self, mock_get_setting, mock_call_command
+        self, mock_get_setting, mock_run_backup
     ):
         """Test that successful backup creates record and sends email."""
         # Arrange
-        mock_call_command.return_value = None
+        mock_run_backup.return_value = None
         mock_get_setting.side_effect = lambda key, default=None: {
             "EMAIL_ON_SUCCESS": True,
             "EMAIL_ON_FAILURE": True,
@@ -41,7 +41,7 @@ class TestScheduledDatabaseBackup:
         result = scheduled_database_backup()
 
         # Assert
-        mock_call_command.assert_called_once_with("dbbackup", "--clean")
+        mock_run_backup.assert_called_once()
         assert "successful" in result.lower()
 
         # Check database record
@@ -58,14 +58,14 @@ class TestScheduledDatabaseBackup:
         assert "completed successfully" in mail.outbox[0].body
 
     @override_settings(ADMINS=[("Admin", "admin@example.com")])
-    @patch("django_scheduled_backups.tasks.management.call_command")
+    @patch("django_scheduled_backups.tasks.run_database_backup")
     @patch("django_scheduled_backups.tasks.get_setting")
     def test_backup_failure_creates_record_and_sends_email_and_raises(
-        self, mock_get_setting, mock_call_command
+        self, mock_get_setting, mock_run_backup
     ):
         """Test that failed backup creates record, sends email, and re-raises exception."""
         # Arrange
-        mock_call_command.side_effect = Exception("Database connection failed")
+        mock_run_backup.side_effect = Exception("Database connection failed")
         mock_get_setting.side_effect = lambda key, default=None: {
             "EMAIL_ON_SUCCESS": True,
             "EMAIL_ON_FAILURE": True,
@@ -76,7 +76,7 @@ class TestScheduledDatabaseBackup:
         with pytest.raises(Exception, match="Database connection failed"):
             scheduled_database_backup()
 
-        mock_call_command.assert_called_once_with("dbbackup", "--clean")
+        mock_run_backup.assert_called_once()
 
         # Check database record
         backup_run = BackupRun.objects.filter(backup_type="database").first()
@@ -91,12 +91,12 @@ class TestScheduledDatabaseBackup:
         assert "Database connection failed" in mail.outbox[0].body
         assert "⚠️" in mail.outbox[0].body
 
-    @patch("django_scheduled_backups.tasks.management.call_command")
+    @patch("django_scheduled_backups.tasks.run_database_backup")
     @patch("django_scheduled_backups.tasks.get_setting")
-    def test_backup_success_without_email(self, mock_get_setting, mock_call_command):
+    def test_backup_success_without_email(self, mock_get_setting, mock_run_backup):
         """Test that backup works when email notifications are disabled."""
         # Arrange
-        mock_call_command.return_value = None
+        mock_run_backup.return_value = None
         mock_get_setting.side_effect = lambda key, default=None: {
             "EMAIL_ON_SUCCESS": False,
             "EMAIL_ON_FAILURE": True,
@@ -113,12 +113,12 @@ class TestScheduledDatabaseBackup:
         # No email should be sent
         assert len(mail.outbox) == 0
 
-    @patch("django_scheduled_backups.tasks.management.call_command")
+    @patch("django_scheduled_backups.tasks.run_database_backup")
     @patch("django_scheduled_backups.tasks.get_setting")
-    def test_backup_failure_without_email(self, mock_get_setting, mock_call_command):
+    def test_backup_failure_without_email(self, mock_get_setting, mock_run_backup):
         """Test that backup works when failure email notifications are disabled."""
         # Arrange
-        mock_call_command.side_effect = Exception("Backup failed")
+        mock_run_backup.side_effect = Exception("Backup failed")
         mock_get_setting.side_effect = lambda key, default=None: {
             "EMAIL_ON_SUCCESS": True,
             "EMAIL_ON_FAILURE": False,
@@ -135,15 +135,15 @@ class TestScheduledDatabaseBackup:
         # No email should be sent
         assert len(mail.outbox) == 0
 
-    @patch("django_scheduled_backups.tasks.management.call_command")
+    @patch("django_scheduled_backups.tasks.run_database_backup")
     @patch("django_scheduled_backups.tasks.mail_admins")
     @patch("django_scheduled_backups.tasks.get_setting")
     def test_backup_failure_with_email_error_still_raises_backup_error(
-        self, mock_get_setting, mock_mail_admins, mock_call_command
+        self, mock_get_setting, mock_mail_admins, mock_run_backup
     ):
         """Test that if email fails, the original backup error is still raised."""
         # Arrange
-        mock_call_command.side_effect = Exception("Backup failed")
+        mock_run_backup.side_effect = Exception("Backup failed")
         mock_mail_admins.side_effect = Exception("Email send failed")
         mock_get_setting.side_effect = lambda key, default=None: {
             "EMAIL_ON_SUCCESS": True,
@@ -158,6 +158,34 @@ class TestScheduledDatabaseBackup:
         backup_run = BackupRun.objects.filter(backup_type="database").first()
         assert backup_run.status == "failed"
 
+    @override_settings(ADMINS=[("Admin", "admin@example.com")])
+    @patch("django_scheduled_backups.tasks.run_database_backup")
+    def test_backup_success_records_phase_timings(self, mock_run_backup):
+        """Test that the phase timings and size reach the record and the email."""
+
+        def run_backup(backup_run, config):
+            backup_run.dump_seconds = 1.5
+            backup_run.compress_seconds = 0.25
+            backup_run.upload_seconds = 2.0
+            backup_run.size_bytes = 2048
+            backup_run.filename = "backup.psql.gz"
+
+        mock_run_backup.side_effect = run_backup
+
+        scheduled_database_backup()
+
+        backup_run = BackupRun.objects.get(backup_type="database")
+        assert backup_run.dump_seconds == 1.5
+        assert backup_run.verify_seconds is None
+        assert backup_run.size_bytes == 2048
+        assert backup_run.filename == "backup.psql.gz"
+        assert mock_run_backup.call_args.args[1]["compression"] is None
+        body = mail.outbox[0].body
+        assert "Dump: 1.5 seconds" in body
+        assert "Compression: 0.25 seconds" in body
+        assert "Verification" not in body
+        assert "Size: 2048 bytes" in body
+
 
 class TestScheduledMediaBackup:
     """Test the scheduled media backup task with email notifications."""
@@ -257,6 +285,37 @@ class TestScheduledMediaBackup:
         # No email should be sent
         assert len(mail.outbox) == 0
 
+    @override_settings(
+        ADMINS=[("Admin", "admin@example.com")],
+        SCHEDULED_BACKUPS={"MEDIA_BACKUP": {"incremental": True}},
+    )
+    @patch("django_scheduled_backups.tasks.management.call_command")
+    @patch("django_scheduled_backups.tasks.run_media_backup")
+    def test_incremental_media_backup_records_bytes(
+        self, mock_run_backup, mock_call_command
+    ):
+        """Test that incremental backups skip mediabackup and record their bytes."""
+
+        def run_backup(backup_run, config):
+            backup_run.full_snapshot = False
+            backup_run.bytes_scanned = 4096
+            backup_run.bytes_written = 1024
+            backup_run.filename = "media/manifests/20251019-030000.json"
+
+        mock_run_backup.side_effect = run_backup
+
+        scheduled_media_backup()
+
+        mock_call_command.assert_not_called()
+        assert mock_run_backup.call_args.args[1]["full_every"] == 4
+        backup_run = BackupRun.objects.get(backup_type="media")
+        assert backup_run.status == "success"
+        assert (backup_run.bytes_scanned, backup_run.bytes_written) == (4096, 1024)
+        body = mail.outbox[0].body
+        assert "Snapshot: incremental" in body
+        assert "Scanned: 4096 bytes" in body
+        assert "Written: 1024 bytes" in body
+
 
 class TestEmailNotifications:
     """Test email notification functions."""
@@ -370,6 +429,17 @@ class TestBackupRunModel:
         assert duration >= 0
         assert backup_run.duration_seconds == duration
 
+    def test_phase_timings(self):
+        """Test that only the phases that ran are listed, in order."""
+        backup_run = BackupRun(dump_seconds=3.0, upload_seconds=1.0)
+
+        assert [
+            (str(phase), seconds) for phase, seconds in backup_run.phase_timings
+        ] == [
+            ("Dump", 3.0),
+            ("Upload", 1.0),
+        ]
+
     def test_str_representation(self):
         """Test string representation of BackupRun."""
         backup_run = BackupRun.objects.create(
@@ -0,0 +1,284 @@
+"""
+Bulk synthetic data generator
+
+Creates users, schools, weekly and annual meals and anonymous push
+subscriptions with bulk_create in chunks, instead of one factory_boy object
+at a time. Used by the generate_data command and by the performance tests to
+reproduce production-scale datasets (10k+ schools) in seconds.
+
+Output is deterministic for a given seed and school year: names, flags and
+menus come from a seeded random.Random and Faker instance, annual meal dates
+from the school year, which defaults to the current one.
+"""
+
+import random
+from datetime import date, timedelta
+from itertools import islice
+from time import perf_counter
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.template.defaultfilters import slugify
+from faker import Faker
+
+from notifications.models import AnonymousMenuNotification
+from school_menu.models import AnnualMeal, DetailedMeal, Meal, School, SimpleMeal
+from school_menu.utils import get_adjusted_year
+from tests.school_menu.factories import (
+    FIRST_COURSE_LIST,
+    FRUIT_LIST,
+    MEAL_LIST,
+    SCHOOL_PRE,
+    SECOND_COURSE_LIST,
+    SIDE_DISH_LIST,
+    SNACK_LIST,
+    SNACK_LIST_2,
+)
+
+User = get_user_model()
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def chunked(iterable, size):
+    """Yield lists of at most size items from any iterable"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def bulk_create_chunked(model, objects, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Insert objects with bulk_create, chunk_size objects at a time.
+
+    objects can be a generator, so that only one chunk is held in memory.
+
+    Returns:
+        list: created objects with their primary keys
+    """
+    created = []
+    for chunk in chunked(objects, chunk_size):
+        created.extend(model.objects.bulk_create(chunk))
+    return created
+
+
+def count_created_chunked(model, objects, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Same as bulk_create_chunked but only returns the number of created objects"""
+    total = 0
+    for chunk in chunked(objects, chunk_size):
+        total += len(model.objects.bulk_create(chunk))
+    return total
+
+
+def get_meal_types(school):
+    """Return the meal types enabled for a school"""
+    meal_types = [Meal.Types.STANDARD]
+    if school.no_gluten:
+        meal_types.append(Meal.Types.GLUTEN_FREE)
+    if school.no_lactose:
+        meal_types.append(Meal.Types.LACTOSE_FREE)
+    if school.vegetarian:
+        meal_types.append(Meal.Types.VEGETARIAN)
+    if school.special:
+        meal_types.append(Meal.Types.SPECIAL)
+    return meal_types
+
+
+def get_school_year_dates(year):
+    """Return the weekdays of the school year starting in September of year"""
+    current = date(year, 9, 1)
+    end = date(year + 1, 6, 30)
+    dates = []
+    while current <= end:
+        if current.weekday() < 5:
+            dates.append(current)
+        current += timedelta(days=1)
+    return dates
+
+
+def iter_weekly_meals(schools, rng):
+    """Yield SimpleMeal/DetailedMeal objects for every type, season, week and day"""
+    for school in schools:
+        for meal_type in get_meal_types(school):
+            for season in Meal.Seasons.values:
+                for week in Meal.Weeks.values:
+                    for day in Meal.Days.values:
+                        if school.menu_type == School.Types.SIMPLE:
+                            yield SimpleMeal(
+                                school_id=school.pk,
+                                type=meal_type,
+                                season=season,
+                                week=week,
+                                day=day,
+                                menu=rng.choice(MEAL_LIST),
+                                morning_snack=rng.choice(FRUIT_LIST),
+                                afternoon_snack=rng.choice(SNACK_LIST_2),
+                            )
+                        else:
+                            yield DetailedMeal(
+                                school_id=school.pk,
+                                type=meal_type,
+                                season=season,
+                                week=week,
+                                day=day,
+                                first_course=rng.choice(FIRST_COURSE_LIST),
+                                second_course=rng.choice(SECOND_COURSE_LIST),
+                                side_dish=rng.choice(SIDE_DISH_LIST),
+                                fruit=rng.choice(FRUIT_LIST),
+                                snack=rng.choice(SNACK_LIST),
+                            )
+
+
+def iter_annual_meals(schools, rng, dates):
+    """Yield AnnualMeal objects for every type and school day"""
+    for school in schools:
+        for meal_type in get_meal_types(school):
+            for day in dates:
+                yield AnnualMeal(
+                    school_id=school.pk,
+                    type=meal_type,
+                    date=day,
+                    day=day.weekday() + 1,
+                    menu="\n".join(rng.sample(MEAL_LIST, 3)),
+                    snack=rng.choice(SNACK_LIST),
+                )
+
+
+def iter_subscriptions(schools, rng, per_school):
+    """Yield AnonymousMenuNotification objects with unique fake endpoints"""
+    notification_times = [
+        choice for choice, _ in AnonymousMenuNotification.NOTIFICATION_TIME_CHOICES
+    ]
+    for school in schools:
+        for index in range(per_school):
+            endpoint = f"https://push.example.com/{school.pk}/{index}"
+            yield AnonymousMenuNotification(
+                school_id=school.pk,
+                subscription_info={
+                    "endpoint": endpoint,
+                    "keys": {"p256dh": f"p256dh-{index}", "auth": f"auth-{index}"},
+                },
+                # bulk_create skips save(): set the endpoint hash here
+                subscription_endpoint=AnonymousMenuNotification.hash_endpoint(endpoint),
+                daily_notification=rng.random() < 0.9,
+                notification_time=rng.choice(notification_times),
+            )
+
+
+@transaction.atomic
+def generate_dataset(
+    schools=10,
+    users=None,
+    annual_ratio=0.1,
+    subscriptions_per_school=5,
+    seed=42,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    password="1234",
+    school_year=None,
+):
+    """
+    Bulk create a synthetic dataset.
+
+    Every school gets a user (users beyond the number of schools have none),
+    weekly meals for every enabled type, season, week and day, or a full
+    school year of annual meals, and anonymous push subscriptions.
+
+    Args:
+        schools: number of schools
+        users: number of users, defaults to the number of schools
+        annual_ratio: fraction of schools using an annual menu
+        subscriptions_per_school: anonymous push subscriptions per school
+        seed: random seed, the same seed and school_year always generate the
+            same data
+        chunk_size: number of objects per bulk_create query
+        password: password of every generated user
+        school_year: year the school year of annual meals starts in, defaults to
+            the current school year
+
+    Returns:
+        dict: number of created objects per model and duration in seconds
+
+    Example:
+        >>> generate_dataset(schools=10_000, seed=1)
+        {'users': 10000, 'schools': 10000, 'simple_meals': ..., 'duration': 9.8}
+    """
+    start_time = perf_counter()
+    users = schools if users is None else max(users, schools)
+    rng = random.Random(seed)
+    fake = Faker(locale="it_IT")
+    fake.seed_instance(seed)
+    # Hash the password once: hashing is what makes UserFactory slow
+    hashed_password = make_password(password)
+
+    user_objects = bulk_create_chunked(
+        User,
+        (
+            User(email=f"user_{index}@test.com", password=hashed_password)
+            for index in range(users)
+        ),
+        chunk_size,
+    )
+    count_created_chunked(
+        EmailAddress,
+        (
+            EmailAddress(user=user, email=user.email, primary=True, verified=True)
+            for user in user_objects
+        ),
+        chunk_size,
+    )
+
+    def iter_schools():
+        for index, user in enumerate(user_objects[:schools]):
+            name = f"{rng.choice(SCHOOL_PRE)} {fake.word()} {fake.word()}"
+            city = fake.city()
+            yield School(
+                user=user,
+                name=name,
+                city=city,
+                # bulk_create skips save(): slug must be set and unique
+                slug=f"{slugify(f'{name}-{city}')}-{index}",
+                season_choice=rng.choice(School.Seasons.values),
+                menu_type=rng.choice(School.Types.values),
+                week_bias=rng.randint(0, 3),
+                no_gluten=rng.random() < 0.5,
+                no_lactose=rng.random() < 0.5,
+                vegetarian=rng.random() < 0.5,
+                special=rng.random() < 0.2,
+                annual_menu=rng.random() < annual_ratio,
+                is_published=True,
+            )
+
+    school_objects = bulk_create_chunked(School, iter_schools(), chunk_size)
+    weekly_schools = [school for school in school_objects if not school.annual_menu]
+    annual_schools = [school for school in school_objects if school.annual_menu]
+
+    meals = {"simple_meals": 0, "detailed_meals": 0}
+    for chunk in chunked(iter_weekly_meals(weekly_schools, rng), chunk_size):
+        simple = [meal for meal in chunk if isinstance(meal, SimpleMeal)]
+        detailed = [meal for meal in chunk if isinstance(meal, DetailedMeal)]
+        meals["simple_meals"] += len(SimpleMeal.objects.bulk_create(simple))
+        meals["detailed_meals"] += len(DetailedMeal.objects.bulk_create(detailed))
+
+    if school_year is None:
+        school_year = get_adjusted_year()
+    annual_meals = count_created_chunked(
+        AnnualMeal,
+        iter_annual_meals(annual_schools, rng, get_school_year_dates(school_year)),
+        chunk_size,
+    )
+    subscriptions = count_created_chunked(
+        AnonymousMenuNotification,
+        iter_subscriptions(school_objects, rng, subscriptions_per_school),
+        chunk_size,
+    )
+
+    return {
+        "users": len(user_objects),
+        "schools": len(school_objects),
+        **meals,
+        "annual_meals": annual_meals,
+        "subscriptions": subscriptions,
+        "duration": perf_counter() - start_time,
+    }
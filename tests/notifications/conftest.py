@@ -0,0 +1,34 @@
+import base64
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from notifications.push import clear_vapid_headers, close_push_sessions
+
+
+def generate_vapid_private_key():
+    """Return a raw VAPID private key as accepted by py_vapid"""
+    private_value = ec.generate_private_key(ec.SECP256R1()).private_numbers()
+    raw = private_value.private_value.to_bytes(32, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+@pytest.fixture(autouse=True)
+def vapid_settings(settings):
+    """Sign pushes with a real VAPID key, the one in the environment is a dummy"""
+    settings.WEBPUSH_SETTINGS = {
+        **settings.WEBPUSH_SETTINGS,
+        "VAPID_PRIVATE_KEY": generate_vapid_private_key(),
+        "VAPID_ADMIN_EMAIL": "admin@example.com",
+    }
+    clear_vapid_headers()
+    yield settings
+    clear_vapid_headers()
+
+
+@pytest.fixture(autouse=True)
+def push_sessions():
+    """Start every test without pooled sessions nor rate limiter pauses"""
+    close_push_sessions()
+    yield
+    close_push_sessions()
@@ -9,7 +9,12 @@ class AnonymousMenuNotificationFactory(DjangoModelFactory):
         model = AnonymousMenuNotification
 
     school = factory.SubFactory("tests.school_menu.factories.SchoolFactory")
-    subscription_info = factory.LazyFunction(dict)
+    subscription_info = factory.Sequence(
+        lambda n: {
+            "endpoint": f"https://push.example.com/send/{n}",
+            "keys": {"p256dh": "key", "auth": "auth"},
+        }
+    )
 
 
 class BroadcastNotificationFactory(DjangoModelFactory):
@@ -1,12 +1,23 @@
+from datetime import date
 from unittest.mock import patch
 
 import pytest
 from django.contrib.admin.sites import AdminSite
 from django.contrib.messages.storage.fallback import FallbackStorage
-from django.test import RequestFactory
-
-from notifications.admin import BroadcastNotificationAdmin
-from notifications.models import BroadcastNotification
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from notifications.admin import (
+    BroadcastNotificationAdmin,
+    NotificationBatchRunAdmin,
+    PushRetryAdmin,
+)
+from notifications.models import (
+    AnonymousMenuNotification,
+    BroadcastNotification,
+    NotificationBatchRun,
+    PushRetry,
+)
 from tests.notifications.factories import BroadcastNotificationFactory
 from tests.users.factories import UserFactory
 
@@ -46,6 +57,8 @@ class TestBroadcastNotificationAdmin:
             "recipients_count",
             "success_count",
             "failure_count",
+            "expired_count",
+            "retry_count",
         ]
         assert broadcast_admin.list_display == expected_fields
 
@@ -68,6 +81,8 @@ class TestBroadcastNotificationAdmin:
         assert "recipients_count" in readonly
         assert "success_count" in readonly
         assert "failure_count" in readonly
+        assert "expired_count" in readonly
+        assert "last_processed_pk" in readonly
         assert "status" in readonly
 
     def test_fieldsets_structure(self, broadcast_admin):
@@ -192,3 +207,96 @@ class TestBroadcastNotificationAdmin:
         mock_async_task.assert_called_with(
             "notifications.tasks.send_broadcast_notification", broadcast2.pk
         )
+
+
+class TestNotificationBatchRunAdmin:
+    @pytest.fixture
+    def batch_admin(self, admin_site):
+        return NotificationBatchRunAdmin(NotificationBatchRun, admin_site)
+
+    def test_cannot_add(self, batch_admin, admin_request):
+        assert batch_admin.has_add_permission(admin_request) is False
+
+    @patch("notifications.admin.async_task")
+    def test_retry_failed_chunks(self, mock_async_task, batch_admin, admin_request):
+        batch = NotificationBatchRun.objects.create(
+            notification_time=AnonymousMenuNotification.SAME_DAY_12PM,
+            target_date=date(2025, 9, 15),
+            status=NotificationBatchRun.Status.FAILED,
+            chunks={"1-10": "done", "11-20": "failed", "21-25": "failed"},
+        )
+
+        batch_admin.retry_failed_chunks(
+            admin_request, NotificationBatchRun.objects.all()
+        )
+
+        task = "notifications.tasks.send_menu_notification_chunk"
+        assert [call.args for call in mock_async_task.call_args_list] == [
+            (task, batch.pk, 11, 20),
+            (task, batch.pk, 21, 25),
+        ]
+        messages = [str(message) for message in admin_request._messages]
+        assert messages == ["Retrying 2 failed chunk(s)..."]
+
+    def test_changelist_links_trends(self, admin_client):
+        response = admin_client.get(
+            reverse("admin:notifications_notificationbatchrun_changelist")
+        )
+
+        assert response.status_code == 200
+        assert reverse("admin:notifications_notificationbatchrun_trends") in (
+            response.content.decode()
+        )
+
+    @override_settings(Q_CLUSTER={"timeout": 60})
+    def test_trends_groups_runs_and_flags_slow_chunks(self, admin_client):
+        NotificationBatchRun.objects.create(
+            notification_time=AnonymousMenuNotification.SAME_DAY_12PM,
+            target_date=date.today(),
+            status=NotificationBatchRun.Status.COMPLETED,
+            subscribers=1000,
+            slowest_chunk_seconds=54,
+            latency_histogram={"50": 90, "200": 10},
+            failures_by_status={"410": 3, "503": 1},
+        )
+        NotificationBatchRun.objects.create(
+            notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
+            target_date=date.today(),
+            slowest_chunk_seconds=12,
+        )
+        NotificationBatchRun.objects.create(
+            broadcast=BroadcastNotificationFactory(title="Chiusura scuole"),
+            target_date=date.today(),
+        )
+
+        response = admin_client.get(
+            reverse("admin:notifications_notificationbatchrun_trends")
+        )
+
+        assert response.status_code == 200
+        groups = response.context["groups"]
+        assert [label for label, _ in groups] == [
+            "alle 12:00",
+            "alle 9:00",
+            "Broadcast",
+        ]
+        assert [percent for _, rows in groups for _, percent in rows] == [90, 20, None]
+        content = response.content.decode()
+        assert "410: 3, 503: 1" in content
+        assert "Chiusura scuole" in content
+        assert content.count('class="errornote"') == 1
+
+    def test_trends_requires_staff(self, client):
+        response = client.get(
+            reverse("admin:notifications_notificationbatchrun_trends")
+        )
+
+        assert response.status_code == 302
+
+
+class TestPushRetryAdmin:
+    def test_cannot_add(self, admin_site, admin_request):
+        retry_admin = PushRetryAdmin(PushRetry, admin_site)
+
+        assert retry_admin.has_add_permission(admin_request) is False
+        assert "next_attempt_at" in retry_admin.readonly_fields
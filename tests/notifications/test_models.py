@@ -1,9 +1,13 @@
+from datetime import UTC, date, datetime, timedelta
+
 import pytest
 
 from notifications.models import (
     AnonymousMenuNotification,
     BroadcastNotification,
     DailyNotification,
+    NotificationBatchRun,
+    PushRetry,
 )
 from tests.notifications.factories import BroadcastNotificationFactory
 from tests.school_menu.factories import SchoolFactory
@@ -96,6 +100,15 @@ class TestAnonymousMenuNotificationModel:
         endpoint = AnonymousMenuNotification.extract_endpoint(None)
         assert endpoint == ""
 
+    def test_hash_subscription(self):
+        """Test that hash_subscription hashes the endpoint, None without one."""
+        endpoint = "https://fcm.googleapis.com/fcm/send/abc123"
+
+        assert AnonymousMenuNotification.hash_subscription(
+            {"endpoint": endpoint}
+        ) == AnonymousMenuNotification.hash_endpoint(endpoint)
+        assert AnonymousMenuNotification.hash_subscription({}) is None
+
     def test_save_auto_populates_subscription_endpoint(self, school_factory):
         """Test that save() automatically populates subscription_endpoint."""
         school = school_factory()
@@ -254,3 +267,124 @@ class TestBroadcastNotificationModel:
         user.delete()
         broadcast.refresh_from_db()
         assert broadcast.created_by is None
+
+
+class TestNotificationBatchRunModel:
+    def create_batch(self, chunks):
+        return NotificationBatchRun.objects.create(
+            notification_time=AnonymousMenuNotification.SAME_DAY_12PM,
+            target_date=date(2025, 9, 15),
+            chunks=dict.fromkeys(chunks, NotificationBatchRun.CHUNK_PENDING),
+        )
+
+    def test_str(self):
+        batch = self.create_batch([])
+
+        assert str(batch) == "alle 12:00 - 2025-09-15"
+
+    def test_finish_chunk_keeps_running_until_last_chunk(self):
+        batch = self.create_batch(["1-10", "11-20"])
+
+        batch = batch.finish_chunk("1-10", success_count=9, failure_count=1)
+
+        assert batch.status == NotificationBatchRun.Status.RUNNING
+        assert batch.finished_at is None
+        assert batch.chunks == {"1-10": "done", "11-20": "pending"}
+
+        batch = batch.finish_chunk(
+            "11-20", success_count=8, failure_count=2, expired_count=2, retry_count=1
+        )
+
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+        assert batch.finished_at is not None
+        assert (batch.success_count, batch.failure_count) == (17, 3)
+        assert batch.expired_count == 2
+        assert batch.retry_count == 1
+
+    def test_failed_chunk_fails_batch(self):
+        batch = self.create_batch(["1-10"])
+
+        batch = batch.finish_chunk("1-10", failed=True)
+
+        assert batch.status == NotificationBatchRun.Status.FAILED
+        assert batch.count_chunks(NotificationBatchRun.CHUNK_FAILED) == 1
+
+    def test_str_of_broadcast_run(self):
+        broadcast = BroadcastNotificationFactory()
+        run = NotificationBatchRun.objects.create(
+            broadcast=broadcast, target_date=date(2025, 9, 15)
+        )
+
+        assert str(run) == f"Broadcast {broadcast.pk} - 2025-09-15"
+
+    @pytest.mark.parametrize(
+        "seconds, bucket",
+        [(0.004, "10"), (0.01, "10"), (0.0101, "25"), (0.6, "750"), (12, "inf")],
+    )
+    def test_latency_bucket(self, seconds, bucket):
+        assert NotificationBatchRun.latency_bucket(seconds) == bucket
+
+    def test_finish_chunk_merges_metrics(self):
+        batch = self.create_batch(["1-10", "11-20"])
+
+        batch.finish_chunk(
+            "1-10",
+            success_count=2,
+            failure_count=1,
+            latencies=[0.04, 0.06, 0.3],
+            failures_by_status={410: 1},
+            duration=4.5,
+        )
+        batch = batch.finish_chunk(
+            "11-20",
+            failure_count=1,
+            retry_count=1,
+            latencies=[0.045],
+            failures_by_status={410: 1, 503: 1},
+            duration=2.0,
+        )
+
+        assert batch.latency_histogram == {"50": 2, "75": 1, "300": 1}
+        assert batch.failures_by_status == {"410": 2, "503": 1}
+        assert batch.slowest_chunk_seconds == 4.5
+        assert batch.send_seconds == 6.5
+
+    def test_latency_percentiles(self):
+        batch = self.create_batch([])
+        assert batch.p50_latency_ms is None
+
+        batch.latency_histogram = {"200": 10, "50": 90}
+
+        assert batch.p50_latency_ms == 50.0
+        assert batch.p95_latency_ms == 200.0
+        assert batch.latency_percentile(90) == 50.0
+
+        batch.latency_histogram["inf"] = 100
+        assert batch.p95_latency_ms == float("inf")
+
+    def test_duration_and_sends_per_second(self):
+        batch = self.create_batch([])
+        batch.success_count, batch.failure_count, batch.retry_count = 90, 6, 4
+        assert batch.duration is None
+        assert batch.sends_per_second is None
+        assert batch.wall_sends_per_second is None
+
+        # Chunks spread over a send window: 2s of sending in 8s of run
+        batch.send_seconds = 2
+        batch.finished_at = batch.started_at + timedelta(seconds=8)
+
+        assert batch.duration == 8.0
+        assert batch.sends_per_second == 50.0
+        assert batch.wall_sends_per_second == 12.5
+
+
+class TestPushRetryModel:
+    def test_str(self):
+        retry = PushRetry(
+            subscription_endpoint="abc123",
+            payload={},
+            attempts=2,
+            next_attempt_at=datetime(2025, 9, 15, 9, 0, tzinfo=UTC),
+        )
+
+        assert str(retry) == "Retry 2 of abc123 at 2025-09-15 09:00:00+00:00"
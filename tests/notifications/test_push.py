@@ -0,0 +1,403 @@
+import base64
+import json
+import threading
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+import time_machine
+from pywebpush import WebPushException
+
+from notifications.push import (
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    VAPID_HEADER_TTL,
+    VAPID_RENEW_MARGIN,
+    PushThrottled,
+    TokenBucket,
+    clear_vapid_headers,
+    close_push_sessions,
+    get_error_status,
+    get_push_origin,
+    get_push_session,
+    get_rate_limiter,
+    get_retry_after,
+    get_retry_delay,
+    get_vapid_headers,
+    is_expired_subscription,
+    is_retriable_error,
+    send_push,
+    send_pushes,
+)
+from tests.notifications.conftest import generate_vapid_private_key
+
+
+def subscription(endpoint="https://fcm.googleapis.com/fcm/send/abc"):
+    return {"endpoint": endpoint, "keys": {"p256dh": "key", "auth": "auth"}}
+
+
+def web_push_error(status_code, retry_after=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {"Retry-After": retry_after} if retry_after else {}
+    return WebPushException("Push failed", response=response)
+
+
+class FakeClock:
+    """Monotonic clock moved forward by sleep()"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestPushSessions:
+    def test_get_push_origin(self):
+        assert (
+            get_push_origin("https://updates.push.services.mozilla.com/wpush/v2/abc")
+            == "https://updates.push.services.mozilla.com"
+        )
+        assert (
+            get_push_origin("http://127.0.0.1:8080/push/1") == "http://127.0.0.1:8080"
+        )
+
+    def test_one_session_per_origin(self):
+        fcm = get_push_session("https://fcm.googleapis.com/fcm/send/a")
+
+        assert get_push_session("https://fcm.googleapis.com/fcm/send/b") is fcm
+        assert get_push_session("https://web.push.apple.com/abc") is not fcm
+
+    def test_pool_size_follows_concurrency(self, settings):
+        settings.WEBPUSH_SETTINGS = {**settings.WEBPUSH_SETTINGS, "CONCURRENCY": 7}
+
+        session = get_push_session("https://fcm.googleapis.com/fcm/send/a")
+
+        adapter = session.get_adapter("https://fcm.googleapis.com/fcm/send/a")
+        assert adapter._pool_maxsize == 7
+
+    def test_close_push_sessions(self):
+        session = get_push_session("https://fcm.googleapis.com/fcm/send/a")
+
+        close_push_sessions()
+
+        assert get_push_session("https://fcm.googleapis.com/fcm/send/a") is not session
+
+
+def decode_claims(headers):
+    """Return the JWT claims of a VAPID Authorization header"""
+    token = headers["Authorization"].split("t=")[1].split(",")[0]
+    payload = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+
+
+class TestVapidHeaders:
+    def test_claims(self):
+        headers = get_vapid_headers(
+            "https://fcm.googleapis.com/fcm/send/abc", now=1_000_000
+        )
+
+        assert headers["Authorization"].startswith("vapid t=")
+        assert decode_claims(headers) == {
+            "aud": "https://fcm.googleapis.com",
+            "exp": 1_000_000 + VAPID_HEADER_TTL,
+            "sub": "mailto:admin@example.com",
+        }
+
+    @patch("notifications.push.Vapid.sign", autospec=True)
+    def test_signed_once_per_audience(self, mock_sign):
+        mock_sign.side_effect = lambda vapid, claims: {"Authorization": claims["aud"]}
+
+        for index in range(10):
+            get_vapid_headers(f"https://fcm.googleapis.com/fcm/send/{index}")
+            get_vapid_headers(f"https://web.push.apple.com/{index}")
+
+        assert mock_sign.call_count == 2
+
+    @patch("notifications.push.Vapid.sign", autospec=True)
+    def test_renewed_before_expiry(self, mock_sign):
+        mock_sign.side_effect = lambda vapid, claims: {"exp": claims["exp"]}
+        endpoint = "https://fcm.googleapis.com/fcm/send/abc"
+        renew_at = VAPID_HEADER_TTL - VAPID_RENEW_MARGIN
+
+        first = get_vapid_headers(endpoint, now=0)
+
+        assert get_vapid_headers(endpoint, now=renew_at - 1) is first
+        assert get_vapid_headers(endpoint, now=renew_at) == {
+            "exp": renew_at + VAPID_HEADER_TTL
+        }
+
+    def test_new_key_is_used_at_once(self, settings):
+        endpoint = "https://fcm.googleapis.com/fcm/send/abc"
+        old_headers = get_vapid_headers(endpoint)
+
+        settings.WEBPUSH_SETTINGS = {
+            **settings.WEBPUSH_SETTINGS,
+            "VAPID_PRIVATE_KEY": generate_vapid_private_key(),
+        }
+
+        assert get_vapid_headers(endpoint) != old_headers
+
+    @patch("notifications.push.Vapid.sign", autospec=True)
+    def test_clear_vapid_headers(self, mock_sign):
+        endpoint = "https://fcm.googleapis.com/fcm/send/abc"
+        get_vapid_headers(endpoint)
+
+        clear_vapid_headers()
+        get_vapid_headers(endpoint)
+
+        assert mock_sign.call_count == 2
+
+
+class TestSendPush:
+    @patch("notifications.push.webpush")
+    def test_uses_pooled_session_and_timeout(self, mock_webpush, settings):
+        settings.WEBPUSH_SETTINGS = {**settings.WEBPUSH_SETTINGS, "TIMEOUT": 3}
+        info = subscription()
+
+        send_push(info, {"head": "Menu"})
+
+        kwargs = mock_webpush.call_args.kwargs
+        assert kwargs["subscription_info"] == info
+        assert kwargs["data"] == '{"head": "Menu"}'
+        assert kwargs["timeout"] == 3
+        assert kwargs["requests_session"] is get_push_session(info["endpoint"])
+
+    @patch("notifications.push.webpush")
+    def test_sends_cached_vapid_headers(self, mock_webpush):
+        info = subscription()
+
+        send_push(info, {"head": "Menu"})
+
+        kwargs = mock_webpush.call_args.kwargs
+        assert kwargs["headers"] is get_vapid_headers(info["endpoint"])
+        # Already signed: pywebpush must not sign again
+        assert "vapid_claims" not in kwargs
+
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (web_push_error(404), True),
+            (web_push_error(410), True),
+            (web_push_error(500), False),
+            (WebPushException("No response"), False),
+            (ValueError("boom"), False),
+        ],
+    )
+    def test_is_expired_subscription(self, error, expected):
+        assert is_expired_subscription(error) is expected
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+        for _ in range(5):
+            bucket.acquire()
+
+        # 3 tokens at once, then one every 0.5s
+        assert clock.sleeps == [0.5, 0.5]
+
+    def test_pause(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, clock=clock, sleep=clock.sleep)
+
+        bucket.pause(2)
+        bucket.pause(1)  # a shorter pause does not shorten the current one
+        bucket.acquire()
+
+        assert clock.sleeps == [2]
+
+    def test_raises_when_wait_is_too_long(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, clock=clock, sleep=clock.sleep)
+        bucket.pause(30)
+
+        with pytest.raises(PushThrottled) as exc_info:
+            bucket.acquire("https://fcm.googleapis.com", max_wait=5)
+
+        assert exc_info.value.retry_after == 30
+        assert str(exc_info.value) == "https://fcm.googleapis.com throttled for 30.0s"
+        assert clock.sleeps == []
+
+    def test_one_limiter_per_origin(self, settings):
+        settings.WEBPUSH_SETTINGS = {**settings.WEBPUSH_SETTINGS, "RATE_LIMIT": 50}
+        fcm = get_rate_limiter("https://fcm.googleapis.com/fcm/send/a")
+
+        assert fcm.rate == 50
+        assert get_rate_limiter("https://fcm.googleapis.com/fcm/send/b") is fcm
+        assert get_rate_limiter("https://web.push.apple.com/a") is not fcm
+
+        settings.WEBPUSH_SETTINGS = {**settings.WEBPUSH_SETTINGS, "RATE_LIMIT": 20}
+        assert get_rate_limiter("https://fcm.googleapis.com/fcm/send/a").rate == 20
+
+    def test_rate_limit_can_be_disabled(self, settings):
+        settings.WEBPUSH_SETTINGS = {**settings.WEBPUSH_SETTINGS, "RATE_LIMIT": 0}
+
+        assert get_rate_limiter("https://fcm.googleapis.com/fcm/send/a") is None
+
+
+class TestRetryPolicy:
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (web_push_error(429), True),
+            (web_push_error(503), True),
+            (web_push_error(400), False),
+            (web_push_error(410), False),
+            (WebPushException("No response"), False),
+            (PushThrottled("https://fcm.googleapis.com", 10), True),
+            (requests.ConnectionError("Connection refused"), True),
+            (requests.Timeout("Read timed out"), True),
+            (ValueError("boom"), False),
+        ],
+    )
+    def test_is_retriable_error(self, error, expected):
+        assert is_retriable_error(error) is expected
+
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (web_push_error(410), 410),
+            (web_push_error(503), 503),
+            (WebPushException("No response"), None),
+            (PushThrottled("https://fcm.googleapis.com", 10), None),
+        ],
+    )
+    def test_get_error_status(self, error, expected):
+        assert get_error_status(error) == expected
+
+    def test_get_retry_after_seconds(self):
+        assert get_retry_after(web_push_error(429, retry_after="120")) == 120
+        assert get_retry_after(web_push_error(429, retry_after="-5")) == 0
+
+    @time_machine.travel(datetime(2025, 9, 15, 9, 0, tzinfo=UTC), tick=False)
+    def test_get_retry_after_http_date(self):
+        error = web_push_error(503, retry_after="Mon, 15 Sep 2025 09:02:00 GMT")
+
+        assert get_retry_after(error) == 120
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            web_push_error(429),
+            web_push_error(429, retry_after="soon"),
+            WebPushException("No response"),
+            ValueError("boom"),
+        ],
+    )
+    def test_get_retry_after_missing(self, error):
+        assert get_retry_after(error) is None
+
+    def test_get_retry_after_throttled(self):
+        assert get_retry_after(PushThrottled("https://fcm.googleapis.com", 7.5)) == 7.5
+
+    def test_get_retry_delay(self):
+        assert [get_retry_delay(attempts) for attempts in range(1, 4)] == [
+            RETRY_BASE_DELAY,
+            RETRY_BASE_DELAY * 2,
+            RETRY_BASE_DELAY * 4,
+        ]
+        assert get_retry_delay(20) == RETRY_MAX_DELAY
+        assert get_retry_delay(1, retry_after=900) == 900
+
+
+class TestSendPushes:
+    def test_no_messages(self):
+        assert send_pushes([]) == []
+
+    @patch("notifications.push.send_push")
+    def test_results_in_message_order(self, mock_send_push):
+        error = web_push_error(410)
+
+        def send(subscription_info, payload):
+            if subscription_info["endpoint"].endswith("/2"):
+                raise error
+
+        mock_send_push.side_effect = send
+        messages = [
+            (pk, subscription(f"https://push.example.com/{pk}"), {"head": "Menu"})
+            for pk in range(1, 5)
+        ]
+
+        results = send_pushes(messages, concurrency=2)
+
+        assert results == [(1, None), (2, error), (3, None), (4, None)]
+        assert mock_send_push.call_count == 4
+
+    @patch("notifications.push.send_push")
+    def test_sends_concurrently(self, mock_send_push):
+        # Every push waits for the others: it only completes if all 4 are in flight
+        barrier = threading.Barrier(4, timeout=5)
+        mock_send_push.side_effect = lambda *args: barrier.wait()
+        messages = [(pk, subscription(), {}) for pk in range(4)]
+
+        results = send_pushes(messages, concurrency=4)
+
+        assert [error for _, error in results] == [None] * 4
+
+    @patch("notifications.push.send_push")
+    def test_concurrency_is_bounded(self, mock_send_push):
+        in_flight = []
+        peak = []
+        lock = threading.Lock()
+
+        def send(*args):
+            with lock:
+                in_flight.append(1)
+                peak.append(len(in_flight))
+            threading.Event().wait(0.01)
+            with lock:
+                in_flight.pop()
+
+        mock_send_push.side_effect = send
+
+        send_pushes([(pk, subscription(), {}) for pk in range(20)], concurrency=3)
+
+        assert max(peak) <= 3
+
+    @patch("notifications.push.send_push")
+    def test_retry_after_pauses_origin(self, mock_send_push):
+        mock_send_push.side_effect = [web_push_error(429, retry_after="60"), None]
+        messages = [
+            (1, subscription("https://fcm.googleapis.com/fcm/send/1"), {}),
+            (2, subscription("https://fcm.googleapis.com/fcm/send/2"), {}),
+            (3, subscription("https://web.push.apple.com/3"), {}),
+        ]
+
+        results = send_pushes(messages, concurrency=1)
+
+        # The second FCM push is not even attempted, Apple is not affected
+        assert isinstance(results[1][1], PushThrottled)
+        assert results[2] == (3, None)
+        assert mock_send_push.call_count == 2
+
+    @patch("notifications.push.send_push")
+    def test_rate_limit_can_be_disabled(self, mock_send_push, settings):
+        settings.WEBPUSH_SETTINGS = {**settings.WEBPUSH_SETTINGS, "RATE_LIMIT": 0}
+        mock_send_push.side_effect = [web_push_error(429, retry_after="60"), None]
+        messages = [(pk, subscription(), {}) for pk in range(2)]
+
+        results = send_pushes(messages, concurrency=1)
+
+        assert results[1] == (1, None)
+
+    @patch("notifications.push.send_push")
+    def test_collects_latencies(self, mock_send_push):
+        mock_send_push.side_effect = [None, web_push_error(410), None]
+        messages = [(pk, subscription(), {}) for pk in range(3)]
+        latencies = []
+
+        send_pushes(messages, concurrency=2, latencies=latencies)
+
+        # Failed pushes are timed too
+        assert len(latencies) == 3
+        assert all(latency >= 0 for latency in latencies)
@@ -1,31 +1,47 @@
-from datetime import date
+from datetime import UTC, date, datetime, timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
 import time_machine
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_q.models import Schedule
 from pywebpush import WebPushException
 
-from notifications.models import AnonymousMenuNotification, BroadcastNotification
+from notifications.models import (
+    AnonymousMenuNotification,
+    BroadcastNotification,
+    NotificationBatchRun,
+    PushRetry,
+)
+from notifications.push import RETRY_BASE_DELAY, RETRY_MAX_ATTEMPTS, get_retry_delay
 from notifications.tasks import (
-    _has_menu_for_date,
-    _is_school_in_session,
+    PUSH_RETRY_CLAIM_TIMEOUT,
+    _deliver_notifications,
+    _get_send_offsets,
+    _prune_expired_subscriptions,
     _send_menu_notifications,
+    precompute_menu_notification_payloads,
+    process_push_retries,
     send_broadcast_notification,
+    send_menu_notification_chunk,
     send_previous_day_6pm_menu_notification,
     send_same_day_6pm_menu_notification,
     send_same_day_9am_menu_notification,
     send_same_day_12pm_menu_notification,
     send_test_notification,
 )
+from notifications.utils import build_menu_notification_payload
 from school_menu.models import School
+from school_menu.test import TestCase
 from tests.notifications.factories import (
     AnonymousMenuNotificationFactory,
     BroadcastNotificationFactory,
 )
 from tests.school_menu.factories import (
-    AnnualMealFactory,
-    DetailedMealFactory,
     SchoolFactory,
     SimpleMealFactory,
 )
@@ -62,6 +78,17 @@ def school_not_in_session():
     return school
 
 
+def expired_error():
+    return WebPushException("Gone", response=MagicMock(status_code=410))
+
+
+def throttled_error(retry_after=None):
+    headers = {"Retry-After": retry_after} if retry_after else {}
+    return WebPushException(
+        "Too many requests", response=MagicMock(status_code=429, headers=headers)
+    )
+
+
 def create_simple_meals_for_all_seasons_and_weeks(school, day):
     """Helper function to create SimpleMeal for all seasons and weeks."""
     for season in School.Seasons.values:
@@ -70,7 +97,7 @@ def create_simple_meals_for_all_seasons_and_weeks(school, day):
 
 
 @time_machine.travel("2025-08-18")  # A Monday
-@patch("notifications.tasks.send_test_notification")
+@patch("notifications.push.send_push")
 def test_send_menu_notifications_sends_to_correct_time(
     mock_send_test_notification, school_in_session
 ):
@@ -123,13 +150,14 @@ def test_specific_time_tasks_call_helper(mock_send_menu_notifications):
 
 
 @time_machine.travel("2025-08-18")  # A Monday
-@patch("notifications.tasks.webpush")
+@patch("notifications.push.webpush")
 def test_expired_subscription_is_deleted(mock_webpush, school_in_session):
     """Test that an expired subscription is deleted after a WebPushException."""
     subscription = AnonymousMenuNotificationFactory(
         school=school_in_session,
         daily_notification=True,
         notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
+        subscription_info={"endpoint": "https://push.example.com/expired"},
     )
     create_simple_meals_for_all_seasons_and_weeks(
         school_in_session, date.today().weekday() + 1
@@ -141,13 +169,86 @@ def test_expired_subscription_is_deleted(mock_webpush, school_in_session):
         "Subscription expired", response=mock_response
     )
 
-    _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+    batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
 
     assert not AnonymousMenuNotification.objects.filter(id=subscription.id).exists()
+    batch.refresh_from_db()
+    assert batch.expired_count == 1
+
+
+@patch("notifications.push.send_push")
+def test_expired_subscriptions_are_deleted_in_one_statement(mock_send):
+    """Expired endpoints of a batch are pruned together by endpoint hash."""
+    school = SchoolFactory()
+    subscriptions = [
+        AnonymousMenuNotificationFactory(
+            school=school,
+            subscription_info={"endpoint": f"https://push.example.com/{index}"},
+        )
+        for index in range(4)
+    ]
+    errors = {
+        "https://push.example.com/0": expired_error(),
+        "https://push.example.com/2": expired_error(),
+        "https://push.example.com/3": Exception("Push failed"),
+    }
+
+    def send(subscription_info, payload):
+        if error := errors.get(subscription_info["endpoint"]):
+            raise error
+
+    mock_send.side_effect = send
+    messages = [
+        (subscription.subscription_endpoint, subscription.subscription_info, {})
+        for subscription in subscriptions
+    ]
+
+    with CaptureQueriesContext(connection) as queries:
+        result = _deliver_notifications(messages)
+
+    assert result == (1, 3, 2, 0)
+    deletes = [
+        q["sql"] for q in queries.captured_queries if q["sql"].startswith("DELETE")
+    ]
+    assert len(deletes) == 1
+    assert "subscription_endpoint" in deletes[0]
+    assert set(AnonymousMenuNotification.objects.values_list("pk", flat=True)) == {
+        subscriptions[1].pk,
+        subscriptions[3].pk,
+    }
+
+
+def test_prune_expired_subscriptions_without_endpoints():
+    """Nothing is deleted when no expired endpoint hash is known."""
+    AnonymousMenuNotificationFactory()
+
+    with CaptureQueriesContext(connection) as queries:
+        assert _prune_expired_subscriptions([None]) == 0
+
+    assert len(queries) == 0
+    assert AnonymousMenuNotification.objects.count() == 1
+
+
+@patch("notifications.push.webpush")
+def test_send_test_notification_deletes_expired_subscription(mock_webpush):
+    """An expired test notification deletes its subscription by endpoint hash."""
+    subscription_info = {"endpoint": "https://push.example.com/test"}
+    subscription = AnonymousMenuNotificationFactory(subscription_info=subscription_info)
+    other = AnonymousMenuNotificationFactory(
+        subscription_info={"endpoint": "https://push.example.com/other"}
+    )
+    mock_webpush.side_effect = WebPushException(
+        "Subscription expired", response=MagicMock(status_code=404)
+    )
+
+    send_test_notification(subscription_info, {})
+
+    assert not AnonymousMenuNotification.objects.filter(pk=subscription.pk).exists()
+    assert AnonymousMenuNotification.objects.filter(pk=other.pk).exists()
 
 
 @patch("notifications.tasks.logger")
-@patch("notifications.tasks.webpush")
+@patch("notifications.push.webpush")
 def test_send_test_notification_webpush_exception_logs_error(mock_webpush, mock_logger):
     """Test that WebPushException with other status codes logs an error."""
     mock_response = MagicMock()
@@ -155,13 +256,13 @@ def test_send_test_notification_webpush_exception_logs_error(mock_webpush, mock_
     mock_webpush.side_effect = WebPushException("Test error", response=mock_response)
 
     with pytest.raises(WebPushException):
-        send_test_notification({}, {})
+        send_test_notification({"endpoint": "https://push.example.com/test"}, {})
 
     mock_logger.error.assert_called_once()
 
 
 @patch("notifications.tasks.logger")
-@patch("notifications.tasks.webpush")
+@patch("notifications.push.webpush")
 def test_send_test_notification_generic_exception_logs_error_and_raises(
     mock_webpush, mock_logger
 ):
@@ -170,7 +271,7 @@ def test_send_test_notification_generic_exception_logs_error_and_raises(
     mock_webpush.side_effect = Exception(error_message)
 
     with pytest.raises(Exception, match=error_message):
-        send_test_notification({}, {})
+        send_test_notification({"endpoint": "https://push.example.com/test"}, {})
 
     mock_logger.error.assert_called_once_with(
         f"Errore inatteso durante l'invio della notifica: {error_message}"
@@ -178,54 +279,23 @@ def test_send_test_notification_generic_exception_logs_error_and_raises(
 
 
 @patch("notifications.tasks.logger")
-@patch("notifications.tasks.webpush")
+@patch("notifications.push.webpush")
 def test_send_test_notification_success(mock_webpush, mock_logger):
     """Test that a successful notification logs info messages."""
-    send_test_notification({}, {})
+    send_test_notification({"endpoint": "https://push.example.com/test"}, {})
     mock_webpush.assert_called_once()
     assert mock_logger.info.call_count == 2
 
 
-class TestHasMenuForDate:
-    def test_with_annual_meal(self, school_in_session):
-        """Test that it returns True if an AnnualMeal exists."""
-        target_date = date(2025, 8, 2)
-        AnnualMealFactory(school=school_in_session, date=target_date, is_active=True)
-        assert _has_menu_for_date(school_in_session, target_date) is True
-
-    def test_weekend_without_annual_meal(self, school_in_session):
-        """Test that it returns False on a weekend if no AnnualMeal exists."""
-        target_date = date(2025, 8, 3)
-        assert _has_menu_for_date(school_in_session, target_date) is False
-
-    def test_weekday_with_simple_meal(self, school_in_session):
-        """Test that it returns True on a weekday with a SimpleMeal."""
-        target_date = date(2025, 8, 4)
-        SimpleMealFactory(school=school_in_session, day=1)
-        assert _has_menu_for_date(school_in_session, target_date) is True
-
-    def test_weekday_with_detailed_meal(self, school_in_session):
-        """Test that it returns True on a weekday with a DetailedMeal."""
-        school_in_session.menu_type = "D"
-        school_in_session.save()
-        target_date = date(2025, 8, 5)
-        DetailedMealFactory(school=school_in_session, day=2)
-        assert _has_menu_for_date(school_in_session, target_date) is True
-
-    def test_weekday_without_meal(self, school_in_session):
-        """Test that it returns False on a weekday if no meal exists."""
-        target_date = date(2025, 8, 6)
-        assert _has_menu_for_date(school_in_session, target_date) is False
-
-
 @time_machine.travel("2025-08-18")  # A Monday
 @patch("notifications.tasks.settings")
-@patch("notifications.tasks.send_test_notification")
+@patch("notifications.push.send_push")
 def test_send_menu_notifications_school_not_in_session(
     mock_send_notification, mock_settings, school_not_in_session
 ):
     """Test that notifications are not sent if the school is not in session."""
     mock_settings.ENABLE_SCHOOL_DATE_CHECK = True
+    mock_settings.NOTIFICATION_SEND_WINDOW = 0
     AnonymousMenuNotificationFactory(
         school=school_not_in_session,
         notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
@@ -238,12 +308,13 @@ def test_send_menu_notifications_school_not_in_session(
 
 @time_machine.travel("2025-08-18")  # A Monday
 @patch("notifications.tasks.settings")
-@patch("notifications.tasks.send_test_notification")
+@patch("notifications.push.send_push")
 def test_send_menu_notifications_school_in_session(
     mock_send_notification, mock_settings, school_in_session
 ):
     """Test that notifications are sent if the school is in session."""
     mock_settings.ENABLE_SCHOOL_DATE_CHECK = True
+    mock_settings.NOTIFICATION_SEND_WINDOW = 0
     AnonymousMenuNotificationFactory(
         school=school_in_session,
         notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
@@ -257,34 +328,644 @@ def test_send_menu_notifications_school_in_session(
     mock_send_notification.assert_called_once()
 
 
-class TestIsSchoolInSession:
-    def test_school_year_within_same_calendar_year(self):
-        """
-        Test _is_school_in_session for a school year within the same calendar year.
-        """
-        school = SchoolFactory(start_month=2, start_day=1, end_month=6, end_day=30)
-        assert not _is_school_in_session(school, date(2025, 1, 15))
-        assert _is_school_in_session(school, date(2025, 4, 15))
-        assert not _is_school_in_session(school, date(2025, 7, 15))
-
-    def test_school_year_spanning_calendar_years(self):
-        """
-        Test _is_school_in_session for a school year spanning calendar years.
-        """
+class TestSendMenuNotificationsGrouping:
+    def create_subscriptions(self, schools, per_school):
+        for school in schools:
+            AnonymousMenuNotificationFactory.create_batch(
+                per_school,
+                school=school,
+                notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
+            )
+
+    def create_schools(self, count):
+        schools = SchoolFactory.create_batch(
+            count, start_month=1, end_month=12, menu_type=School.Types.SIMPLE
+        )
+        for school in schools:
+            create_simple_meals_for_all_seasons_and_weeks(
+                school, date.today().weekday() + 1
+            )
+        return schools
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.push.send_push")
+    @patch(
+        "notifications.utils.build_menu_notification_payload",
+        wraps=build_menu_notification_payload,
+    )
+    def test_payload_built_once_per_school(self, mock_build, mock_send):
+        schools = self.create_schools(2)
+        self.create_subscriptions(schools, 3)
+
+        _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        assert mock_build.call_count == 2
+        assert mock_send.call_count == 6
+        # Every subscriber of a school gets the same payload
+        payloads = [call.args[1] for call in mock_send.call_args_list]
+        assert payloads[0] is payloads[1] is payloads[2]
+        assert payloads[3]["url"] == schools[1].get_absolute_url()
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.push.send_push")
+    def test_query_count_does_not_grow_with_subscribers(
+        self, mock_send, django_assert_num_queries
+    ):
+        schools = self.create_schools(2)
+        self.create_subscriptions(schools, 2)
+        with CaptureQueriesContext(connection) as few_subscribers:
+            _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        self.create_subscriptions(schools, 20)
+        with django_assert_num_queries(len(few_subscribers)):
+            _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        assert mock_send.call_count == 4 + 44
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.push.send_push")
+    def test_school_without_menu_is_skipped(self, mock_send):
+        school_without_menu = SchoolFactory(start_month=1, end_month=12)
+        schools = self.create_schools(1)
+        self.create_subscriptions([school_without_menu, *schools], 2)
+
+        _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        assert mock_send.call_count == 2
+        for call in mock_send.call_args_list:
+            assert call.args[1]["url"] == schools[0].get_absolute_url()
+
+
+class TestPrecomputeMenuNotificationPayloads:
+    @pytest.fixture(autouse=True)
+    def local_cache(self, settings):
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        yield
+        cache.clear()
+
+    @time_machine.travel("2025-08-19 03:00")  # A Tuesday night
+    @patch("notifications.tasks.get_menu_notification_payload")
+    def test_only_subscribed_kinds_are_computed(self, mock_get_payload, settings):
+        settings.ENABLE_SCHOOL_DATE_CHECK = False
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        other_school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        for weekday in (2, 3):  # Today and tomorrow
+            create_simple_meals_for_all_seasons_and_weeks(school, weekday)
+            create_simple_meals_for_all_seasons_and_weeks(other_school, weekday)
+        SchoolFactory()  # no subscribers
+        for notification_time in (
+            AnonymousMenuNotification.SAME_DAY_9AM,
+            AnonymousMenuNotification.SAME_DAY_12PM,
+            AnonymousMenuNotification.PREVIOUS_DAY_6PM,
+        ):
+            AnonymousMenuNotificationFactory(
+                school=school, notification_time=notification_time
+            )
+        AnonymousMenuNotificationFactory(
+            school=other_school,
+            notification_time=AnonymousMenuNotification.SAME_DAY_6PM,
+        )
+        AnonymousMenuNotificationFactory(
+            school=other_school,
+            notification_time=AnonymousMenuNotification.PREVIOUS_DAY_6PM,
+            daily_notification=False,
+        )
+
+        assert precompute_menu_notification_payloads() == 3
+
+        assert sorted(
+            (call.args[0].pk, call.args[1]) for call in mock_get_payload.call_args_list
+        ) == sorted([(school.pk, False), (school.pk, True), (other_school.pk, False)])
+
+    @time_machine.travel("2025-06-30 03:00")  # The last day of school
+    @patch("notifications.tasks.get_menu_notification_payload")
+    def test_payloads_of_schools_not_in_session_are_skipped(
+        self, mock_get_payload, settings
+    ):
+        settings.ENABLE_SCHOOL_DATE_CHECK = True
         school = SchoolFactory(start_month=9, start_day=1, end_month=6, end_day=30)
-        assert _is_school_in_session(school, date(2025, 10, 15))
-        assert _is_school_in_session(school, date(2026, 3, 15))
-        assert not _is_school_in_session(school, date(2025, 8, 15))
+        for notification_time in (
+            AnonymousMenuNotification.SAME_DAY_9AM,
+            AnonymousMenuNotification.PREVIOUS_DAY_6PM,
+        ):
+            AnonymousMenuNotificationFactory(
+                school=school, notification_time=notification_time
+            )
+        AnonymousMenuNotificationFactory(
+            school=SchoolFactory(start_month=9, end_month=9),
+            notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
+        )
+
+        # Previous day payloads are about tomorrow, already on vacation
+        assert precompute_menu_notification_payloads() == 1
+        mock_get_payload.assert_called_once_with(school, False)
+
+    @time_machine.travel("2025-08-18 03:00")  # A Monday night
+    @patch("notifications.push.send_push")
+    def test_batches_use_precomputed_payloads(self, mock_send):
+        school = SchoolFactory(
+            start_month=1, end_month=12, menu_type=School.Types.SIMPLE
+        )
+        create_simple_meals_for_all_seasons_and_weeks(school, 1)
+        AnonymousMenuNotificationFactory.create_batch(
+            2, school=school, notification_time=AnonymousMenuNotification.SAME_DAY_9AM
+        )
+        precompute_menu_notification_payloads()
+
+        with patch("notifications.utils.build_menu_notification_payload") as mock_build:
+            _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        mock_build.assert_not_called()
+        assert mock_send.call_count == 2
+        assert mock_send.call_args.args[1]["url"] == school.get_absolute_url()
+
+
+class TestNotificationBatchChunks:
+    def create_subscriptions(self, count):
+        school = SchoolFactory(
+            start_month=1, end_month=12, menu_type=School.Types.SIMPLE
+        )
+        return AnonymousMenuNotificationFactory.create_batch(
+            count,
+            school=school,
+            notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
+        )
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.tasks.NOTIFICATION_CHUNK_SIZE", 2)
+    @patch("notifications.tasks.async_task")
+    def test_one_task_per_pk_range(self, mock_async_task):
+        subscriptions = self.create_subscriptions(5)
+        create_simple_meals_for_all_seasons_and_weeks(
+            subscriptions[0].school, date.today().weekday() + 1
+        )
+        pks = sorted(subscription.pk for subscription in subscriptions)
+
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        task = "notifications.tasks.send_menu_notification_chunk"
+        assert [call.args for call in mock_async_task.call_args_list] == [
+            (task, batch.pk, pks[0], pks[1]),
+            (task, batch.pk, pks[2], pks[3]),
+            (task, batch.pk, pks[4], pks[4]),
+        ]
+        assert batch.subscribers == 5
+        assert batch.status == NotificationBatchRun.Status.RUNNING
+        assert batch.count_chunks(NotificationBatchRun.CHUNK_PENDING) == 3
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.tasks.NOTIFICATION_CHUNK_SIZE", 2)
+    @patch("notifications.push.send_push")
+    def test_batch_completes_after_last_chunk(self, mock_send):
+        subscriptions = self.create_subscriptions(5)
+        create_simple_meals_for_all_seasons_and_weeks(
+            subscriptions[0].school, date.today().weekday() + 1
+        )
+        mock_send.side_effect = [None, None, None, Exception("Push failed"), None]
+
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        batch.refresh_from_db()
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+        assert batch.count_chunks(NotificationBatchRun.CHUNK_DONE) == 3
+        assert batch.success_count == 4
+        assert batch.failure_count == 1
+        assert batch.finished_at is not None
+        assert batch.target_date == date(2025, 8, 18)
+        # Every push is timed, the failure had no HTTP response
+        assert sum(batch.latency_histogram.values()) == 5
+        assert batch.failures_by_status == {NotificationBatchRun.NO_RESPONSE: 1}
+        assert batch.slowest_chunk_seconds is not None
+        assert batch.send_seconds >= batch.slowest_chunk_seconds
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.tasks.async_task")
+    def test_schools_not_in_session_are_left_out(
+        self, mock_async_task, settings, django_assert_max_num_queries
+    ):
+        settings.ENABLE_SCHOOL_DATE_CHECK = True
+        subscriptions = self.create_subscriptions(2)
+        for _ in range(5):
+            AnonymousMenuNotificationFactory.create_batch(
+                2,
+                school=SchoolFactory(start_month=9, end_month=12),
+                notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
+            )
+
+        # The session check does not depend on the number of schools
+        with django_assert_max_num_queries(8):
+            batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        pks = sorted(subscription.pk for subscription in subscriptions)
+        mock_async_task.assert_called_once_with(
+            "notifications.tasks.send_menu_notification_chunk", batch.pk, *pks
+        )
+        assert batch.subscribers == 2
+
+    @pytest.mark.parametrize("day", ["2025-08-23 09:00", "2025-08-24 09:00"])
+    @patch("notifications.push.send_push")
+    def test_weekend_slots_send_monday_menu(self, mock_send, day, settings):
+        settings.ENABLE_SCHOOL_DATE_CHECK = True
+        subscriptions = self.create_subscriptions(2)
+        # Only a Monday menu: weekends are not skipped, they show Monday's
+        create_simple_meals_for_all_seasons_and_weeks(subscriptions[0].school, 1)
+
+        with time_machine.travel(day):
+            batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        assert batch.subscribers == 2
+        assert mock_send.call_count == 2
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.tasks.async_task")
+    def test_schools_without_menu_are_chunked(self, mock_async_task):
+        subscriptions = self.create_subscriptions(2)
+
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        # Left out later, when their payload is None
+        pks = sorted(subscription.pk for subscription in subscriptions)
+        mock_async_task.assert_called_once_with(
+            "notifications.tasks.send_menu_notification_chunk", batch.pk, *pks
+        )
+
+    def test_no_subscriptions(self):
+        batch = _send_menu_notifications(AnonymousMenuNotification.PREVIOUS_DAY_6PM)
+
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+        assert batch.chunks == {}
+        assert batch.target_date == timezone.localdate() + timedelta(days=1)
+
+    @time_machine.travel("2025-08-17 22:30:00+00:00", tick=False)
+    def test_target_date_is_the_local_day(self):
+        # 00:30 on the 18th in Rome: the day of the precomputed payloads
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        assert batch.target_date == date(2025, 8, 18)
+
+    @patch("notifications.tasks.async_task")
+    def test_failed_chunk_can_be_retried_alone(self, mock_async_task):
+        subscriptions = self.create_subscriptions(2)
+        pks = sorted(subscription.pk for subscription in subscriptions)
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        with patch(
+            "notifications.tasks._send_menu_notifications_to",
+            side_effect=Exception("Database down"),
+        ):
+            with pytest.raises(Exception, match="Database down"):
+                send_menu_notification_chunk(batch.pk, pks[0], pks[1])
+        batch.refresh_from_db()
+        assert batch.status == NotificationBatchRun.Status.FAILED
+        assert batch.count_chunks(NotificationBatchRun.CHUNK_FAILED) == 1
+
+        with patch(
+            "notifications.tasks._send_menu_notifications_to", return_value=(2, 0, 0, 0)
+        ):
+            send_menu_notification_chunk(batch.pk, pks[0], pks[1])
+        batch.refresh_from_db()
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+        assert batch.success_count == 2
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.push.send_push")
+    @patch("notifications.tasks.async_task")
+    def test_chunk_skips_school_without_menu_anymore(self, mock_async_task, mock_send):
+        subscriptions = self.create_subscriptions(2)
+        school = subscriptions[0].school
+        create_simple_meals_for_all_seasons_and_weeks(school, 1)
+        pks = sorted(subscription.pk for subscription in subscriptions)
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        # The menu is deleted before the chunk runs
+        school.simplemeal_set.all().delete()
+        send_menu_notification_chunk(batch.pk, pks[0], pks[1])
+
+        mock_send.assert_not_called()
+        batch.refresh_from_db()
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+        assert batch.success_count == 0
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.push.send_push")
+    @patch("notifications.tasks.async_task")
+    def test_chunk_skips_school_not_in_session_anymore(
+        self, mock_async_task, mock_send, settings
+    ):
+        settings.ENABLE_SCHOOL_DATE_CHECK = True
+        subscriptions = self.create_subscriptions(2)
+        school = subscriptions[0].school
+        create_simple_meals_for_all_seasons_and_weeks(school, 1)
+        pks = sorted(subscription.pk for subscription in subscriptions)
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        # The school year is changed before the chunk runs
+        School.objects.filter(pk=school.pk).update(start_month=9)
+        send_menu_notification_chunk(batch.pk, pks[0], pks[1])
+
+        mock_send.assert_not_called()
+        batch.refresh_from_db()
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+
+    @time_machine.travel("2025-08-18")  # A Monday
+    @patch("notifications.tasks.get_menu_notification_payload", return_value=None)
+    @patch("notifications.push.send_push")
+    def test_chunk_skips_school_without_payload(self, mock_send, mock_payload):
+        subscriptions = self.create_subscriptions(2)
+        create_simple_meals_for_all_seasons_and_weeks(subscriptions[0].school, 1)
+
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        mock_send.assert_not_called()
+        batch.refresh_from_db()
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+        assert batch.success_count == 0
+
+    @patch("notifications.tasks._send_menu_notifications_to", return_value=(1, 0, 0, 0))
+    @patch("notifications.tasks.async_task")
+    def test_done_chunk_is_not_sent_twice(self, mock_async_task, mock_send_to):
+        subscription = self.create_subscriptions(1)[0]
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_9AM)
+
+        send_menu_notification_chunk(batch.pk, subscription.pk, subscription.pk)
+        send_menu_notification_chunk(batch.pk, subscription.pk, subscription.pk)
+
+        mock_send_to.assert_called_once()
+        batch.refresh_from_db()
+        assert batch.success_count == 1
+
+
+class TestNotificationSendWindow:
+    def create_subscriptions(self, count):
+        school = SchoolFactory(
+            start_month=1, end_month=12, menu_type=School.Types.SIMPLE
+        )
+        create_simple_meals_for_all_seasons_and_weeks(school, 1)
+        subscriptions = AnonymousMenuNotificationFactory.create_batch(
+            count,
+            school=school,
+            notification_time=AnonymousMenuNotification.SAME_DAY_12PM,
+        )
+        return sorted(subscription.pk for subscription in subscriptions)
+
+    @time_machine.travel(datetime(2025, 8, 18, 10, 0, tzinfo=UTC), tick=False)
+    @patch("notifications.tasks.random.uniform", side_effect=lambda a, b: b / 2)
+    @patch("notifications.tasks.async_task")
+    def test_sub_batches_are_spread_over_the_window(
+        self, mock_async_task, mock_uniform, settings
+    ):
+        settings.NOTIFICATION_SEND_WINDOW = 120  # 4 sub-batches, 30s apart
+        pks = self.create_subscriptions(8)
+
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_12PM)
+
+        mock_async_task.assert_not_called()
+        schedules = Schedule.objects.order_by("next_run")
+        assert [
+            (schedule.func, schedule.args, schedule.next_run) for schedule in schedules
+        ] == [
+            (
+                "notifications.tasks.send_menu_notification_chunk",
+                f"{batch.pk}, {pks[index]}, {pks[index + 1]}",
+                timezone.now() + timedelta(seconds=offset),
+            )
+            for index, offset in zip(range(0, 8, 2), (15, 45, 75, 105), strict=True)
+        ]
+        assert all(
+            schedule.schedule_type == Schedule.ONCE and schedule.repeats == -1
+            for schedule in schedules
+        )
+        assert len(batch.chunks) == 4
+        assert batch.subscribers == 8
+
+    @time_machine.travel("2025-08-18 10:00")  # A Monday
+    @patch("notifications.tasks.random.uniform", return_value=0)
+    @patch("notifications.push.send_push")
+    def test_first_sub_batch_is_sent_at_once(self, mock_send, mock_uniform, settings):
+        settings.NOTIFICATION_SEND_WINDOW = 60
+        pks = self.create_subscriptions(3)
+
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_12PM)
+
+        # 2 sub-batches of 2 subscriptions, the second one 30 seconds later
+        assert mock_send.call_count == 2
+        schedule = Schedule.objects.get()
+        assert schedule.args == f"{batch.pk}, {pks[2]}, {pks[2]}"
+        batch.refresh_from_db()
+        assert batch.status == NotificationBatchRun.Status.RUNNING
+
+        send_menu_notification_chunk(batch.pk, pks[2], pks[2])
+
+        assert mock_send.call_count == 3
+        batch.refresh_from_db()
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+
+    @patch("notifications.tasks.NOTIFICATION_CHUNK_SIZE", 2)
+    @patch("notifications.tasks.async_task")
+    def test_chunks_are_never_larger_than_chunk_size(self, mock_async_task, settings):
+        settings.NOTIFICATION_SEND_WINDOW = 60
+        self.create_subscriptions(10)
+
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_12PM)
+
+        assert len(batch.chunks) == 5
+
+    def test_send_offsets_fall_in_their_slot(self):
+        offsets = _get_send_offsets(20, 600)
+
+        assert len(offsets) == 20
+        for index, offset in enumerate(offsets):
+            assert index * 30 <= offset < (index + 1) * 30
+
+    def test_send_offsets_without_window(self):
+        assert _get_send_offsets(3, 0) == [0, 0, 0]
+        assert _get_send_offsets(0, 600) == []
+
+
+@time_machine.travel(datetime(2025, 9, 15, 9, 0, tzinfo=UTC), tick=False)
+class TestPushRetryQueue(TestCase):
+    def create_batch(self):
+        return NotificationBatchRun.objects.create(
+            notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
+            target_date=date(2025, 9, 15),
+            retry_count=1,
+        )
+
+    def create_retry(self, subscription=None, **kwargs):
+        subscription = subscription or AnonymousMenuNotificationFactory()
+        return PushRetry.objects.create(
+            subscription_endpoint=subscription.subscription_endpoint,
+            payload={"head": "Menu"},
+            next_attempt_at=timezone.now(),
+            **kwargs,
+        )
+
+    @patch("notifications.push.send_push")
+    def test_retriable_failures_are_queued(self, mock_send):
+        # One push service each: a Retry-After pauses the whole origin
+        subscriptions = [
+            AnonymousMenuNotificationFactory(
+                subscription_info={"endpoint": f"https://push{n}.example.com/send"}
+            )
+            for n in range(3)
+        ]
+        batch = self.create_batch()
+        errors = {
+            "https://push0.example.com/send": throttled_error(retry_after="600"),
+            "https://push1.example.com/send": WebPushException(
+                "Unavailable", response=MagicMock(status_code=503)
+            ),
+        }
+
+        def send(subscription_info, payload):
+            if error := errors.get(subscription_info["endpoint"]):
+                raise error
+
+        mock_send.side_effect = send
+        messages = [
+            (
+                subscription.subscription_endpoint,
+                subscription.subscription_info,
+                {"n": n},
+            )
+            for n, subscription in enumerate(subscriptions)
+        ]
+
+        result = _deliver_notifications(messages, batch=batch)
+
+        self.assertEqual(result, (1, 0, 0, 2))
+        retries = {
+            retry.subscription_endpoint: retry for retry in PushRetry.objects.all()
+        }
+        self.assertEqual(len(retries), 2)
+        throttled = retries[subscriptions[0].subscription_endpoint]
+        self.assertEqual(throttled.payload, {"n": 0})
+        self.assertEqual(throttled.batch, batch)
+        # Retry-After is longer than the first backoff step
+        self.assertEqual(
+            throttled.next_attempt_at, timezone.now() + timedelta(seconds=600)
+        )
+        unavailable = retries[subscriptions[1].subscription_endpoint]
+        self.assertEqual(
+            unavailable.next_attempt_at,
+            timezone.now() + timedelta(seconds=RETRY_BASE_DELAY),
+        )
+
+    @patch("notifications.push.send_push")
+    def test_successful_retry_updates_counters(self, mock_send):
+        batch = self.create_batch()
+        broadcast = BroadcastNotificationFactory(retry_count=1)
+        self.create_retry(batch=batch)
+        self.create_retry(broadcast=broadcast)
+
+        self.assertEqual(process_push_retries(), (2, 0, 0))
+
+        self.assertFalse(PushRetry.objects.exists())
+        batch.refresh_from_db()
+        broadcast.refresh_from_db()
+        self.assertEqual((batch.success_count, batch.retry_count), (1, 0))
+        self.assertEqual((broadcast.success_count, broadcast.retry_count), (1, 0))
+        self.assertEqual(mock_send.call_args.args[1], {"head": "Menu"})
+
+    @patch("notifications.push.send_push")
+    def test_failed_retry_is_rescheduled_with_backoff(self, mock_send):
+        mock_send.side_effect = throttled_error()
+        retry = self.create_retry(attempts=2)
+
+        self.assertEqual(process_push_retries(), (0, 0, 1))
+
+        retry.refresh_from_db()
+        self.assertEqual(retry.attempts, 3)
+        self.assertEqual(
+            retry.next_attempt_at,
+            timezone.now() + timedelta(seconds=get_retry_delay(3)),
+        )
+        self.assertIn("Too many requests", retry.last_error)
+
+    @patch("notifications.push.send_push")
+    def test_gives_up_after_max_attempts(self, mock_send):
+        mock_send.side_effect = throttled_error()
+        batch = self.create_batch()
+        self.create_retry(attempts=RETRY_MAX_ATTEMPTS, batch=batch)
+
+        self.assertEqual(process_push_retries(), (0, 1, 0))
+
+        self.assertFalse(PushRetry.objects.exists())
+        batch.refresh_from_db()
+        self.assertEqual((batch.failure_count, batch.retry_count), (1, 0))
+
+    @patch("notifications.push.send_push")
+    def test_expired_subscription_is_deleted(self, mock_send):
+        mock_send.side_effect = expired_error()
+        batch = self.create_batch()
+        subscription = AnonymousMenuNotificationFactory()
+        self.create_retry(subscription, batch=batch)
+
+        self.assertEqual(process_push_retries(), (0, 1, 0))
+
+        self.assertFalse(
+            AnonymousMenuNotification.objects.filter(pk=subscription.pk).exists()
+        )
+        batch.refresh_from_db()
+        self.assertEqual((batch.failure_count, batch.expired_count), (1, 1))
+
+    @patch("notifications.push.send_push")
+    def test_deleted_subscription_is_dropped(self, mock_send):
+        subscription = AnonymousMenuNotificationFactory()
+        self.create_retry(subscription)
+        subscription.delete()
+
+        self.assertEqual(process_push_retries(), (0, 1, 0))
+
+        mock_send.assert_not_called()
+        self.assertFalse(PushRetry.objects.exists())
+
+    @patch("notifications.tasks.send_pushes")
+    def test_retries_are_claimed_before_sending(self, mock_send_pushes):
+        retry = self.create_retry()
+        overlapping = []
+
+        def send_pushes(messages):
+            messages = list(messages)
+            # A run overlapping this one finds nothing due
+            overlapping.append(process_push_retries())
+            claimed = PushRetry.objects.get(pk=retry.pk)
+            self.assertEqual(
+                claimed.next_attempt_at,
+                timezone.now() + timedelta(seconds=PUSH_RETRY_CLAIM_TIMEOUT),
+            )
+            return [(key, None) for key, _, _ in messages]
+
+        mock_send_pushes.side_effect = send_pushes
+
+        self.assertEqual(process_push_retries(), (1, 0, 0))
+
+        self.assertEqual(overlapping, [(0, 0, 0)])
+        self.assertFalse(PushRetry.objects.exists())
+
+    @patch("notifications.push.send_push")
+    def test_retries_not_due_are_left(self, mock_send):
+        retry = self.create_retry()
+        retry.next_attempt_at = timezone.now() + timedelta(minutes=1)
+        retry.save()
+
+        self.assertEqual(process_push_retries(), (0, 0, 0))
+
+        mock_send.assert_not_called()
+        self.assertTrue(PushRetry.objects.exists())
 
 
 @time_machine.travel("2025-08-18")  # A Monday
 @patch("notifications.tasks.settings")
-@patch("notifications.tasks.send_test_notification")
+@patch("notifications.push.send_push")
 def test_send_menu_notifications_check_disabled(
     mock_send_notification, mock_settings, school_not_in_session
 ):
     """Test that the school session check is skipped if disabled."""
     mock_settings.ENABLE_SCHOOL_DATE_CHECK = False
+    mock_settings.NOTIFICATION_SEND_WINDOW = 0
     AnonymousMenuNotificationFactory(
         school=school_not_in_session,
         notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
@@ -299,7 +980,7 @@ def test_send_menu_notifications_check_disabled(
 
 
 class TestSendBroadcastNotification:
-    @patch("notifications.tasks.send_test_notification")
+    @patch("notifications.push.send_push")
     def test_send_to_all_subscriptions(self, mock_send_test):
         """Test broadcast sends to all subscriptions with daily_notification=True."""
         school1 = SchoolFactory()
@@ -322,7 +1003,7 @@ class TestSendBroadcastNotification:
         assert broadcast.failure_count == 0
         assert broadcast.sent_at is not None
 
-    @patch("notifications.tasks.send_test_notification")
+    @patch("notifications.push.send_push")
     def test_filter_by_target_schools(self, mock_send_test):
         """Test broadcast filters by target schools."""
         school1 = SchoolFactory()
@@ -342,7 +1023,7 @@ class TestSendBroadcastNotification:
         assert broadcast.recipients_count == 2
         assert broadcast.success_count == 2
 
-    @patch("notifications.tasks.send_test_notification")
+    @patch("notifications.push.send_push")
     def test_respects_daily_notification_flag(self, mock_send_test):
         """Test broadcast respects daily_notification=False."""
         school = SchoolFactory()
@@ -358,7 +1039,7 @@ class TestSendBroadcastNotification:
         broadcast.refresh_from_db()
         assert broadcast.recipients_count == 1
 
-    @patch("notifications.tasks.send_test_notification")
+    @patch("notifications.push.send_push")
     def test_payload_with_url(self, mock_send_test):
         """Test broadcast payload includes URL when provided."""
         school = SchoolFactory()
@@ -378,7 +1059,7 @@ class TestSendBroadcastNotification:
         assert payload["url"] == "https://example.com/test"
         assert payload["icon"] == "/static/img/notification-bell.png"
 
-    @patch("notifications.tasks.send_test_notification")
+    @patch("notifications.push.send_push")
     def test_payload_without_url(self, mock_send_test):
         """Test broadcast payload defaults to / when URL is empty."""
         school = SchoolFactory()
@@ -396,7 +1077,7 @@ class TestSendBroadcastNotification:
         assert payload["url"] == "/"
 
     @patch("notifications.tasks.logger")
-    @patch("notifications.tasks.send_test_notification")
+    @patch("notifications.push.send_push")
     def test_handles_send_failures(self, mock_send_test, mock_logger):
         """Test broadcast handles individual send failures."""
         school = SchoolFactory()
@@ -432,7 +1113,7 @@ class TestSendBroadcastNotification:
         assert broadcast.sent_at is not None
 
     @patch("notifications.tasks.logger")
-    @patch("notifications.tasks.send_test_notification")
+    @patch("notifications.push.send_push")
     def test_logs_completion(self, mock_send_test, mock_logger):
         """Test broadcast logs completion message."""
         school = SchoolFactory()
@@ -443,10 +1124,89 @@ class TestSendBroadcastNotification:
         send_broadcast_notification(broadcast.pk)
 
         mock_logger.info.assert_called_with(
-            "Broadcast 'Test Broadcast' completed with status sent: 1 success, 0 failures"
+            "Broadcast 'Test Broadcast' completed with status sent: "
+            "1 success, 0 failures, 0 expired, 0 queued for retry"
         )
 
-    @patch("notifications.tasks.webpush")
+    @patch("notifications.push.webpush")
+    def test_reports_expired_subscriptions(self, mock_webpush):
+        """Test broadcast deletes and counts the expired subscriptions."""
+        school = SchoolFactory()
+        expired = AnonymousMenuNotificationFactory(
+            school=school, subscription_info={"endpoint": "https://push.example.com/1"}
+        )
+        AnonymousMenuNotificationFactory(
+            school=school, subscription_info={"endpoint": "https://push.example.com/2"}
+        )
+
+        def webpush(subscription_info, **kwargs):
+            if subscription_info["endpoint"].endswith("/1"):
+                raise WebPushException("Gone", response=MagicMock(status_code=410))
+
+        mock_webpush.side_effect = webpush
+
+        broadcast = BroadcastNotificationFactory()
+
+        send_broadcast_notification(broadcast.pk)
+
+        broadcast.refresh_from_db()
+        assert broadcast.success_count == 1
+        assert broadcast.failure_count == 1
+        assert broadcast.expired_count == 1
+        assert not AnonymousMenuNotification.objects.filter(pk=expired.pk).exists()
+
+    @patch("notifications.push.webpush")
+    def test_records_run_metrics(self, mock_webpush):
+        """Test every broadcast execution is recorded as a run with its metrics."""
+        AnonymousMenuNotificationFactory(
+            subscription_info={"endpoint": "https://push.example.com/1"}
+        )
+        AnonymousMenuNotificationFactory(
+            subscription_info={"endpoint": "https://push.example.com/2"}
+        )
+
+        def webpush(subscription_info, **kwargs):
+            if subscription_info["endpoint"].endswith("/1"):
+                raise WebPushException("Gone", response=MagicMock(status_code=410))
+
+        mock_webpush.side_effect = webpush
+        broadcast = BroadcastNotificationFactory()
+
+        send_broadcast_notification(broadcast.pk)
+
+        run = broadcast.runs.get()
+        assert run.status == NotificationBatchRun.Status.COMPLETED
+        assert run.finished_at is not None
+        assert run.notification_time == ""
+        assert run.subscribers == 2
+        assert (run.success_count, run.failure_count, run.expired_count) == (1, 1, 1)
+        assert sum(run.latency_histogram.values()) == 2
+        assert run.failures_by_status == {"410": 1}
+        assert run.slowest_chunk_seconds is not None
+        assert len(run.chunks) == 1
+        assert run.send_seconds == run.slowest_chunk_seconds
+
+    @patch("notifications.push.send_push")
+    def test_throttled_sends_are_queued_for_retry(self, mock_send):
+        """Test broadcast to a throttling push service is not marked as failed."""
+        AnonymousMenuNotificationFactory.create_batch(2, daily_notification=True)
+        mock_send.side_effect = throttled_error()
+
+        broadcast = BroadcastNotificationFactory()
+
+        send_broadcast_notification(broadcast.pk)
+
+        broadcast.refresh_from_db()
+        assert broadcast.status == BroadcastNotification.Status.SENT
+        assert (broadcast.success_count, broadcast.failure_count) == (0, 0)
+        assert broadcast.retry_count == 2
+        assert PushRetry.objects.filter(broadcast=broadcast).count() == 2
+        run = broadcast.runs.get()
+        assert run.retry_count == 2
+        assert run.failures_by_status == {"429": 2}
+        assert PushRetry.objects.filter(batch=run).count() == 2
+
+    @patch("notifications.push.webpush")
     def test_broadcast_status_failed_when_all_fail(self, mock_webpush):
         """Test broadcast status is FAILED when all sends fail."""
         school = SchoolFactory()
@@ -454,7 +1214,7 @@ class TestSendBroadcastNotification:
         AnonymousMenuNotificationFactory(school=school, daily_notification=True)
 
         mock_response = MagicMock()
-        mock_response.status_code = 500
+        mock_response.status_code = 400
         mock_webpush.side_effect = WebPushException(
             "Send failed", response=mock_response
         )
@@ -470,7 +1230,7 @@ class TestSendBroadcastNotification:
         assert broadcast.failure_count == 2
         assert broadcast.sent_at is not None
 
-    @patch("notifications.tasks.webpush")
+    @patch("notifications.push.webpush")
     def test_broadcast_status_failed_when_majority_fail(self, mock_webpush):
         """Test broadcast status is FAILED when majority of sends fail."""
         school = SchoolFactory()
@@ -479,7 +1239,7 @@ class TestSendBroadcastNotification:
         AnonymousMenuNotificationFactory(school=school, daily_notification=True)
 
         mock_response = MagicMock()
-        mock_response.status_code = 500
+        mock_response.status_code = 400
 
         # 2 fail, 1 succeeds
         mock_webpush.side_effect = [
@@ -498,7 +1258,7 @@ class TestSendBroadcastNotification:
         assert broadcast.success_count == 1
         assert broadcast.failure_count == 2
 
-    @patch("notifications.tasks.webpush")
+    @patch("notifications.push.webpush")
     def test_broadcast_status_sent_when_majority_succeed(self, mock_webpush):
         """Test broadcast status is SENT when majority succeed despite some failures."""
         school = SchoolFactory()
@@ -507,7 +1267,7 @@ class TestSendBroadcastNotification:
         AnonymousMenuNotificationFactory(school=school, daily_notification=True)
 
         mock_response = MagicMock()
-        mock_response.status_code = 500
+        mock_response.status_code = 400
 
         # 1 fails, 2 succeed
         mock_webpush.side_effect = [
@@ -543,6 +1303,94 @@ class TestSendBroadcastNotification:
         broadcast.refresh_from_db()
         assert broadcast.status == BroadcastNotification.Status.FAILED
 
+    @patch("notifications.tasks.BROADCAST_CHUNK_SIZE", 2)
+    @patch("notifications.push.send_push")
+    def test_crashed_broadcast_resumes_from_checkpoint(self, mock_send):
+        """Test a broadcast interrupted halfway only sends the remaining chunks."""
+        subscriptions = AnonymousMenuNotificationFactory.create_batch(
+            3, daily_notification=True
+        )
+        broadcast = BroadcastNotificationFactory()
+
+        with patch(
+            "notifications.tasks._deliver_notifications",
+            side_effect=[(2, 0, 0, 0), Exception("Worker crash")],
+        ):
+            with pytest.raises(Exception, match="Worker crash"):
+                send_broadcast_notification(broadcast.pk)
+
+        broadcast.refresh_from_db()
+        assert broadcast.status == BroadcastNotification.Status.FAILED
+        assert broadcast.runs.get().status == NotificationBatchRun.Status.FAILED
+        assert broadcast.last_processed_pk == subscriptions[1].pk
+        assert (broadcast.recipients_count, broadcast.success_count) == (2, 2)
+
+        send_broadcast_notification(broadcast.pk)
+
+        mock_send.assert_called_once()
+        assert mock_send.call_args.args[0] == subscriptions[2].subscription_info
+        broadcast.refresh_from_db()
+        assert broadcast.status == BroadcastNotification.Status.SENT
+        assert broadcast.last_processed_pk == subscriptions[2].pk
+        assert (broadcast.recipients_count, broadcast.success_count) == (3, 3)
+
+    @patch("notifications.tasks.BROADCAST_CHUNK_SIZE", 2)
+    @patch("notifications.push.send_push")
+    def test_streams_subscriptions_in_chunks(self, mock_send):
+        """Test broadcast delivers and checkpoints chunk by chunk."""
+        AnonymousMenuNotificationFactory.create_batch(5, daily_notification=True)
+        broadcast = BroadcastNotificationFactory()
+
+        with patch(
+            "notifications.tasks._deliver_notifications",
+            wraps=_deliver_notifications,
+        ) as mock_deliver:
+            send_broadcast_notification(broadcast.pk)
+
+        assert mock_deliver.call_count == 3
+        assert mock_send.call_count == 5
+        broadcast.refresh_from_db()
+        assert (broadcast.recipients_count, broadcast.success_count) == (5, 5)
+
+    @patch("notifications.push.send_push")
+    def test_sent_broadcast_is_not_sent_again(self, mock_send):
+        """Test a broadcast queued twice is only sent once."""
+        AnonymousMenuNotificationFactory(daily_notification=True)
+        broadcast = BroadcastNotificationFactory()
+
+        send_broadcast_notification(broadcast.pk)
+        send_broadcast_notification(broadcast.pk)
+
+        mock_send.assert_called_once()
+
+    @patch("notifications.push.send_push")
+    def test_finished_broadcast_sent_again_starts_over(self, mock_send):
+        """Test a completed but failed broadcast is sent again from scratch."""
+        subscription = AnonymousMenuNotificationFactory(daily_notification=True)
+        broadcast = BroadcastNotificationFactory(
+            status=BroadcastNotification.Status.FAILED,
+            sent_at=timezone.now(),
+            last_processed_pk=subscription.pk,
+            recipients_count=1,
+            failure_count=1,
+            retry_count=1,
+        )
+        PushRetry.objects.create(
+            subscription_endpoint=subscription.subscription_endpoint,
+            payload={},
+            next_attempt_at=timezone.now(),
+            broadcast=broadcast,
+        )
+
+        send_broadcast_notification(broadcast.pk)
+
+        mock_send.assert_called_once()
+        broadcast.refresh_from_db()
+        assert broadcast.status == BroadcastNotification.Status.SENT
+        assert (broadcast.recipients_count, broadcast.success_count) == (1, 1)
+        assert (broadcast.failure_count, broadcast.retry_count) == (0, 0)
+        assert not PushRetry.objects.exists()
+
     def test_broadcast_handles_nonexistent_broadcast(self):
         """Test task handles gracefully when broadcast doesn't exist."""
         send_broadcast_notification(99999)
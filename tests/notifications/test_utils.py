@@ -1,11 +1,19 @@
-from datetime import timedelta
+from datetime import date, timedelta
 from unittest.mock import patch
 
 import pytest
+import time_machine
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
 from django.utils import timezone
 
-from notifications.utils import build_menu_notification_payload
+from notifications.utils import (
+    NOTIFICATION_ICON,
+    build_menu_notification_payload,
+    get_menu_notification_payload,
+)
+from school_menu.cache import get_notification_payload_cache_key
 from school_menu.models import AnnualMeal, DetailedMeal, School, SimpleMeal
 
 User = get_user_model()
@@ -259,3 +267,87 @@ def test_build_menu_notification_payload_annual_menu_empty_parts(annual_school):
     payload = build_menu_notification_payload(annual_school)
     assert payload is not None
     assert payload["body"] == "Nessun menu previsto."
+
+
+@pytest.fixture
+def local_cache(settings):
+    """Use a real cache: the test environment one is a DummyCache"""
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    yield
+    cache.clear()
+
+
+@pytest.mark.usefixtures("local_cache")
+class TestGetMenuNotificationPayload:
+    @pytest.fixture(autouse=True)
+    def load_urlconf(self):
+        # get_absolute_url() may import the URLconf first, and notifications.views
+        # would then bind the patched build_menu_notification_payload for good
+        reverse("notifications:save_subscription")
+
+    @patch(
+        "notifications.utils.build_menu_notification_payload",
+        return_value={"head": "Menu Test School", "body": "Pasta"},
+    )
+    def test_payload_is_built_once_per_day(self, mock_build, school):
+        first = get_menu_notification_payload(school)
+        second = get_menu_notification_payload(school)
+
+        mock_build.assert_called_once_with(school, False)
+        assert (
+            first
+            == second
+            == {
+                "head": "Menu Test School",
+                "body": "Pasta",
+                "icon": NOTIFICATION_ICON,
+                "url": school.get_absolute_url(),
+            }
+        )
+        # Callers get their own copy
+        assert first is not second
+
+    @patch("notifications.utils.build_menu_notification_payload", return_value=None)
+    def test_missing_menu_is_cached(self, mock_build, school):
+        assert get_menu_notification_payload(school) is None
+        assert get_menu_notification_payload(school) is None
+
+        mock_build.assert_called_once()
+
+    @patch(
+        "notifications.utils.build_menu_notification_payload",
+        side_effect=lambda school, is_previous_day: {"head": str(is_previous_day)},
+    )
+    def test_same_day_and_previous_day_are_cached_apart(self, mock_build, school):
+        assert get_menu_notification_payload(school)["head"] == "False"
+        assert get_menu_notification_payload(school, True)["head"] == "True"
+        assert mock_build.call_count == 2
+
+    @time_machine.travel("2025-09-15 23:30:00+00:00", tick=False)
+    @patch(
+        "notifications.utils.build_menu_notification_payload",
+        return_value={"head": "Menu"},
+    )
+    def test_key_uses_the_local_date(self, mock_build, school):
+        # 01:30 on the 16th in Rome, still the 15th in UTC
+        get_menu_notification_payload(school)
+
+        key = get_notification_payload_cache_key(school.id, date(2025, 9, 16), False)
+        assert cache.get(key)["head"] == "Menu"
+
+    @patch(
+        "notifications.utils.build_menu_notification_payload",
+        side_effect=lambda school, is_previous_day: {"head": f"Menu {school.name}"},
+    )
+    def test_school_changes_drop_the_payloads(self, mock_build, school):
+        get_menu_notification_payload(school)
+        get_menu_notification_payload(school, True)
+
+        school.name = "Nuovo nome"
+        school.save()
+
+        assert get_menu_notification_payload(school)["head"] == "Menu Nuovo nome"
+        assert get_menu_notification_payload(school, True)["head"] == "Menu Nuovo nome"
+        assert mock_build.call_count == 4
@@ -4,10 +4,14 @@ from unittest.mock import patch
 import pytest
 import time_machine
 from django.contrib.messages import get_messages
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pywebpush import WebPushException
 
 from notifications.models import AnonymousMenuNotification
+from school_menu.utils import get_notifications_status
 
 pytestmark = pytest.mark.django_db
 
@@ -572,3 +576,122 @@ def test_save_subscription_shows_updated_message(client, school_factory):
     # Should have 2 messages total (1 from first, 1 from second)
     assert len(messages) == 2
     assert "aggiornate" in str(messages[1])
+
+
+# Tests for the single statement upsert and the notification status cookie
+
+
+def get_status(response, school):
+    """Return the notification status of school read from the response cookies"""
+    request = RequestFactory().get("/")
+    request.COOKIES = {name: cookie.value for name, cookie in response.cookies.items()}
+    return get_notifications_status(request, school)
+
+
+def test_save_subscription_upserts_in_one_statement(client, school_factory):
+    school = school_factory()
+    url = reverse("notifications:save_subscription")
+    data = {
+        "school": school.pk,
+        "subscription_info": '{"endpoint": "https://example.com/push/endpoint6", "keys": {"p256dh": "a", "auth": "b"}}',
+        "notification_time": AnonymousMenuNotification.SAME_DAY_12PM,
+    }
+    client.post(url, data)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(url, data)
+
+    subscription_queries = [
+        query["sql"]
+        for query in queries.captured_queries
+        if "notifications_anonymousmenunotification" in query["sql"]
+    ]
+    assert len(subscription_queries) == 1
+    assert "ON CONFLICT" in subscription_queries[0]
+    assert AnonymousMenuNotification.objects.get().school == school
+    assert get_status(response, school) is True
+
+
+def test_save_subscription_sets_session_pk(client, school_factory):
+    school = school_factory()
+    response = client.post(
+        reverse("notifications:save_subscription"),
+        {
+            "school": school.pk,
+            "subscription_info": '{"endpoint": "https://example.com/push/endpoint7", "keys": {"p256dh": "a", "auth": "b"}}',
+            "notification_time": AnonymousMenuNotification.SAME_DAY_12PM,
+        },
+    )
+
+    notification = AnonymousMenuNotification.objects.get()
+    assert client.session["anon_notification_pk"] == notification.pk
+    assert notification.created_at is not None
+    assert response.cookies["notifications_status"]["httponly"]
+
+
+def test_toggle_daily_notification_updates_status_cookie(client, school_factory):
+    school = school_factory()
+    notification = AnonymousMenuNotification.objects.create(
+        school=school, subscription_info="test", daily_notification=True
+    )
+    session = client.session
+    session["anon_notification_pk"] = notification.pk
+    session.save()
+
+    response = client.post(reverse("notifications:toggle_daily_notification"))
+
+    assert get_status(response, school) is False
+
+
+def test_change_school_updates_status_cookie(client, school_factory):
+    school1 = school_factory()
+    school2 = school_factory()
+    notification = AnonymousMenuNotification.objects.create(
+        school=school1, subscription_info="test"
+    )
+    url = reverse("notifications:change_school", kwargs={"pk": notification.pk})
+    response = client.post(
+        url,
+        {
+            "school": school2.pk,
+            "subscription_info": '{"endpoint": "test"}',
+            "notification_time": notification.notification_time,
+        },
+    )
+
+    assert get_status(response, school1) is False
+    assert get_status(response, school2) is True
+
+
+def test_delete_subscription_clears_status_cookie(client, school_factory):
+    notification = AnonymousMenuNotification.objects.create(
+        school=school_factory(), subscription_info="test"
+    )
+    session = client.session
+    session["anon_notification_pk"] = notification.pk
+    session.save()
+
+    response = client.post(reverse("notifications:delete_subscription"))
+
+    assert response.cookies["notifications_status"].value == ""
+
+
+def test_notification_settings_refreshes_status_cookie(client, school_factory):
+    """Subscriptions saved before the status cookie get it on the settings page"""
+    school = school_factory()
+    notification = AnonymousMenuNotification.objects.create(
+        school=school, subscription_info="test"
+    )
+    session = client.session
+    session["anon_notification_pk"] = notification.pk
+    session.save()
+
+    response = client.get(reverse("notifications:notification_settings"))
+
+    assert get_status(response, school) is True
+
+
+def test_notification_settings_without_subscription_sets_no_status(client):
+    response = client.get(reverse("notifications:notification_settings"))
+
+    assert "notifications_status" not in response.cookies
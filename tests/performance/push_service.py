@@ -0,0 +1,177 @@
+"""
+Local Web Push service emulator
+
+A small RFC 8030 push service to benchmark notification delivery end to end:
+pushes are really encrypted, signed with VAPID and sent over HTTP by
+notifications.push, the emulator only replaces FCM/Mozilla/Apple.
+
+It accepts POST /push/<subscription> requests carrying the TTL,
+Content-Encoding: aes128gcm and VAPID Authorization headers, answers after a
+configurable latency and can inject the errors real push services return
+(404/410 for expired subscriptions, 429 throttling, 5xx outages). Errors are
+picked from the subscription path, so a run is reproducible: the same
+subscriptions always fail with the same status.
+
+With decrypt=True every accepted payload is decrypted with the subscription
+keys and kept in `payloads`, to verify what users would actually receive.
+
+Example:
+    >>> with PushServiceEmulator(latency=0.02, error_rates={410: 0.01}) as service:
+    ...     subscription_info = service.subscribe("1")
+    ...     send_pushes([(1, subscription_info, {"head": "Menu"})])
+    ...     service.statuses
+    Counter({201: 1})
+"""
+
+import base64
+import json
+import os
+import threading
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+
+import http_ece
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class PushServiceHandler(BaseHTTPRequestHandler):
+    """Handle the RFC 8030 push requests of a PushServiceEmulator"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.emulator.lock:
+            self.server.emulator.connections += 1
+
+    def do_POST(self):
+        emulator = self.server.emulator
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if (
+            not self.path.startswith("/push/")
+            or "TTL" not in self.headers
+            or self.headers.get("Content-Encoding") != "aes128gcm"
+            or not self.headers.get("Authorization", "").startswith("vapid ")
+        ):
+            status = 400
+        else:
+            sleep(emulator.latency)
+            status = emulator.get_status(self.path)
+
+        if status == 201 and emulator.decrypt:
+            payload = json.loads(
+                http_ece.decrypt(
+                    body,
+                    private_key=emulator.private_key,
+                    auth_secret=emulator.auth_secret,
+                    version="aes128gcm",
+                )
+            )
+            with emulator.lock:
+                emulator.payloads.append(payload)
+        with emulator.lock:
+            emulator.statuses[status] += 1
+
+        self.send_response(status)
+        if status == 201:
+            self.send_header("Location", f"/message/{self.path.rsplit('/', 1)[-1]}")
+        if status == 429 and emulator.retry_after is not None:
+            self.send_header("Retry-After", str(emulator.retry_after))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PushServiceEmulator:
+    """
+    A local push service running in a background thread.
+
+    Args:
+        latency: seconds every push takes to be answered
+        error_rates: share of the subscriptions answered with each error
+            status, e.g. {410: 0.01, 503: 0.005}
+        decrypt: decrypt the accepted payloads into `payloads`
+        retry_after: Retry-After header (seconds) sent with 429 responses
+    """
+
+    def __init__(self, latency=0.0, error_rates=None, decrypt=False, retry_after=None):
+        self.latency = latency
+        self.error_rates = error_rates or {}
+        self.decrypt = decrypt
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        # Every subscription shares the same keys: the sender still encrypts
+        # every push with its own ephemeral key, like with real browsers
+        self.private_key = ec.generate_private_key(ec.SECP256R1())
+        self.auth_secret = os.urandom(16)
+        self.server = None
+        self.thread = None
+        self.reset()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return sum(self.statuses.values())
+
+    def start(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PushServiceHandler)
+        self.server.daemon_threads = True
+        self.server.emulator = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def reset(self):
+        """Forget the requests received so far"""
+        self.connections = 0
+        self.statuses = Counter()
+        self.payloads = []
+
+    def subscribe(self, name):
+        """Return the subscription_info of a browser subscribed to this service"""
+        p256dh = self.private_key.public_key().public_bytes(
+            serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+        )
+        return {
+            "endpoint": f"{self.url}/push/{name}",
+            "keys": {"p256dh": b64url(p256dh), "auth": b64url(self.auth_secret)},
+        }
+
+    def get_status(self, path):
+        """Return the status a push to path is answered with, 201 when accepted"""
+        # Stable position of the subscription in [0, 1)
+        position = zlib.crc32(path.encode()) % 10_000 / 10_000
+        threshold = 0
+        for status, rate in sorted(self.error_rates.items()):
+            threshold += rate
+            if position < threshold:
+                return status
+        return 201
+
+    def expected_statuses(self, names):
+        """Return the statuses pushes to the given subscriptions get"""
+        return Counter(self.get_status(f"/push/{name}") for name in names)
@@ -118,6 +118,8 @@ echo "════════════════════════
 echo ""
 
 run_test "test_task_performance.py" "Background Task Tests"
+run_test "test_push_performance.py" "Web Push Delivery Tests"
+run_test "test_notification_load.py" "Notification Load Benchmark"
 
 # Calculate test duration
 end_time=$(date +%s)
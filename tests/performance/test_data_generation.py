@@ -0,0 +1,141 @@
+"""
+Synthetic dataset generation performance tests
+
+This module checks that tests.generators can build production-scale datasets
+quickly enough to be used by benchmarks, and that the generated data is
+reproducible for a given seed.
+
+Expected results:
+- 1000 schools with weekly menus, annual menus and subscriptions in seconds
+- The number of queries grows with the number of chunks, not of objects
+- The same seed always generates the same schools and menus
+"""
+
+from datetime import date
+from pathlib import Path
+
+import pytest
+import time_machine
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from notifications.models import AnonymousMenuNotification
+from school_menu.models import AnnualMeal, DetailedMeal, School, SimpleMeal
+from tests.generators import generate_dataset
+
+pytestmark = [pytest.mark.performance]
+
+User = get_user_model()
+
+# Path for baseline metrics logging
+BASELINE_METRICS_FILE = Path(__file__).parent / "baseline_metrics.txt"
+
+BENCHMARK_SCHOOLS = 1000
+
+
+def log_generation_results(test_name, stats):
+    """
+    Log generation results to baseline_metrics.txt for tracking over time
+
+    Args:
+        test_name: Name of the test
+        stats: Dictionary containing generation statistics
+    """
+    with open(BASELINE_METRICS_FILE, "a") as f:
+        f.write(f"\n{'=' * 80}\n")
+        f.write(f"Data Generation Performance Test: {test_name}\n")
+        f.write(f"{'=' * 80}\n")
+        for key, value in stats.items():
+            f.write(f"{key}: {value}\n")
+        f.write(f"{'=' * 80}\n\n")
+
+
+def print_generation_results(test_name, stats):
+    """
+    Print generation results to console
+
+    Args:
+        test_name: Name of the test
+        stats: Dictionary containing generation statistics
+    """
+    print(f"\n{'=' * 80}")
+    print(f"Data Generation Performance Test: {test_name}")
+    print(f"{'=' * 80}")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+    print(f"{'=' * 80}\n")
+
+
+def snapshot():
+    """Return the generated schools and menus in a comparable form"""
+    return {
+        "schools": list(
+            School.objects.order_by("slug").values_list(
+                "slug", "menu_type", "annual_menu", "no_gluten", "special"
+            )
+        ),
+        "simple": list(
+            SimpleMeal.objects.order_by(
+                "school__slug", "type", "season", "week", "day"
+            ).values_list("school__slug", "type", "season", "week", "day", "menu")
+        ),
+        "annual": list(
+            AnnualMeal.objects.order_by("school__slug", "type", "date").values_list(
+                "school__slug", "type", "date", "menu"
+            )
+        ),
+    }
+
+
+@pytest.mark.django_db
+class TestDataGenerationPerformance:
+    """Benchmark bulk generation of a realistic dataset"""
+
+    def test_generate_1000_schools(self):
+        with CaptureQueriesContext(connection) as context:
+            stats = generate_dataset(schools=BENCHMARK_SCHOOLS, seed=1)
+
+        objects = sum(count for name, count in stats.items() if name != "duration")
+        stats["queries"] = len(context.captured_queries)
+        stats["objects_per_second"] = f"{objects / stats['duration']:.0f}"
+        print_generation_results("generate_1000_schools", stats)
+        log_generation_results("generate_1000_schools", stats)
+
+        assert School.objects.count() == BENCHMARK_SCHOOLS
+        assert stats["simple_meals"] == SimpleMeal.objects.count()
+        assert stats["detailed_meals"] == DetailedMeal.objects.count()
+        assert stats["annual_meals"] == AnnualMeal.objects.count() > 0
+        assert AnonymousMenuNotification.objects.count() == BENCHMARK_SCHOOLS * 5
+        # One bulk insert per chunk: far fewer queries than objects
+        assert stats["queries"] < objects / 100
+        assert stats["duration"] < 30
+
+    def test_same_seed_generates_same_data(self):
+        with time_machine.travel("2025-06-30 09:00"):
+            generate_dataset(schools=20, annual_ratio=0.5, seed=7, school_year=2024)
+        first = snapshot()
+        User.objects.all().delete()
+
+        with time_machine.travel("2025-09-01 09:00"):
+            generate_dataset(schools=20, annual_ratio=0.5, seed=7, school_year=2024)
+
+        assert snapshot() == first
+        assert AnnualMeal.objects.earliest("date").date == date(2024, 9, 2)
+
+    @time_machine.travel("2025-10-15 09:00")
+    def test_annual_meals_default_to_current_school_year(self):
+        generate_dataset(schools=20, annual_ratio=0.5, seed=7)
+
+        assert AnnualMeal.objects.earliest("date").date == date(2025, 9, 1)
+
+    def test_every_school_has_its_menus(self):
+        generate_dataset(schools=50, annual_ratio=0.2, seed=3)
+
+        schools_without_menu = School.objects.exclude(
+            pk__in=SimpleMeal.objects.values("school")
+        ).exclude(pk__in=DetailedMeal.objects.values("school"))
+        schools_without_menu = schools_without_menu.exclude(
+            pk__in=AnnualMeal.objects.values("school")
+        )
+        assert not schools_without_menu.exists()
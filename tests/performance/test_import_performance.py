@@ -0,0 +1,206 @@
+"""
+Menu import performance tests
+
+This module measures the cost of parsing and validating large menu files.
+Annual menus in particular can reach thousands of rows, so validation must
+scale linearly and stay well below the request timeout.
+
+Expected results:
+- A 10k-row CSV is validated in a single pass over the rows
+- Validation of 10k rows completes in well under a second
+- XLSX workbooks are streamed: peak memory stays a small multiple of the file size
+"""
+
+import csv
+import io
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from openpyxl import Workbook
+from tablib import Dataset
+
+from school_menu.importers import load_menu_file
+from school_menu.utils import check_menu_dataset, detect_csv_format
+
+pytestmark = [pytest.mark.performance]
+
+# Path for baseline metrics logging
+BASELINE_METRICS_FILE = Path(__file__).parent / "baseline_metrics.txt"
+
+SYNTHETIC_ROWS = 10_000
+
+
+def log_import_results(test_name, stats):
+    """
+    Log import results to baseline_metrics.txt for tracking over time
+
+    Args:
+        test_name: Name of the test
+        stats: Dictionary containing import statistics
+    """
+    with open(BASELINE_METRICS_FILE, "a") as f:
+        f.write(f"\n{'=' * 80}\n")
+        f.write(f"Import Performance Test: {test_name}\n")
+        f.write(f"{'=' * 80}\n")
+        for key, value in stats.items():
+            f.write(f"{key}: {value}\n")
+        f.write(f"{'=' * 80}\n\n")
+
+
+def print_import_results(test_name, stats):
+    """
+    Print import results to console
+
+    Args:
+        test_name: Name of the test
+        stats: Dictionary containing import statistics
+    """
+    print(f"\n{'=' * 80}")
+    print(f"Import Performance Test: {test_name}")
+    print(f"{'=' * 80}")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+    print(f"{'=' * 80}\n")
+
+
+def build_weekly_csv(rows):
+    """Build a synthetic detailed menu CSV with the given number of rows"""
+    days = ["Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì"]
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(
+        ["giorno", "settimana", "primo", "secondo", "contorno", "frutta", "spuntino"]
+    )
+    for i in range(rows):
+        writer.writerow(
+            [
+                days[i % 5],
+                (i // 5) % 4 + 1,
+                f"Pasta al pomodoro {i}",
+                f"Pollo arrosto {i}",
+                "Insalata, carote",
+                "Frutta di stagione",
+                "Yogurt",
+            ]
+        )
+    return output.getvalue()
+
+
+def build_annual_csv(rows):
+    """Build a synthetic annual menu CSV with the given number of rows"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["data", "primo", "secondo", "contorno", "frutta", "altro"])
+    start = date(2000, 1, 3)
+    for i in range(rows):
+        day = start + timedelta(days=i)
+        writer.writerow(
+            [
+                day.strftime("%d/%m/%Y"),
+                f"Pasta al pomodoro {i}",
+                f"Pollo arrosto {i}",
+                "Insalata",
+                "Mela",
+                "Pane",
+            ]
+        )
+    return output.getvalue()
+
+
+def load_dataset(content):
+    delimiter, quotechar = detect_csv_format(content)
+    dataset = Dataset()
+    dataset.load(content, format="csv", delimiter=delimiter, quotechar=quotechar)
+    return dataset
+
+
+class TestDatasetValidationPerformance:
+    """Benchmark single-pass validation on a 10k-row synthetic CSV"""
+
+    @pytest.mark.parametrize(
+        "menu_kind, build_csv",
+        [("detailed", build_weekly_csv), ("annual", build_annual_csv)],
+    )
+    def test_validate_10k_rows(self, benchmark, menu_kind, build_csv):
+        dataset = load_dataset(build_csv(SYNTHETIC_ROWS))
+
+        errors, filtered_dataset = benchmark(check_menu_dataset, dataset, menu_kind)
+
+        assert errors == []
+        assert len(filtered_dataset) == SYNTHETIC_ROWS
+
+    def test_validate_10k_rows_reports_every_error(self):
+        content = build_weekly_csv(SYNTHETIC_ROWS).replace("Lunedì", "Lun")
+        dataset = load_dataset(content)
+
+        start_time = perf_counter()
+        errors, _ = check_menu_dataset(dataset, "detailed")
+        duration_ms = (perf_counter() - start_time) * 1000
+
+        stats = {
+            "Rows": SYNTHETIC_ROWS,
+            "Errors reported": len(errors),
+            "Validation duration": f"{duration_ms:.2f}ms",
+        }
+        log_import_results("validate_10k_rows_with_errors", stats)
+        print_import_results("validate_10k_rows_with_errors", stats)
+
+        # Every Monday row is reported, not just the first one
+        assert len(errors) == SYNTHETIC_ROWS // 5
+        assert errors[0]["row"] == 2
+        assert errors[-1]["row"] == SYNTHETIC_ROWS - 3
+
+
+def build_annual_xlsx(rows):
+    """Build a synthetic annual menu XLSX workbook with the given number of rows"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("STANDARD")
+    sheet.append(["data", "primo", "secondo", "contorno", "frutta", "altro"])
+    start = datetime(2000, 1, 3)
+    for i in range(rows):
+        sheet.append(
+            [
+                start + timedelta(days=i),
+                f"Pasta al pomodoro {i}",
+                f"Pollo arrosto {i}",
+                "Insalata",
+                "Mela",
+                "Pane",
+            ]
+        )
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class TestSpreadsheetImportPerformance:
+    """Measure streaming import of a 10k-row annual XLSX workbook"""
+
+    def test_stream_10k_rows_xlsx(self):
+        content = build_annual_xlsx(SYNTHETIC_ROWS)
+
+        tracemalloc.start()
+        start_time = perf_counter()
+        dataset = load_menu_file(SimpleUploadedFile("menu.xlsx", content))
+        errors, _ = check_menu_dataset(dataset, "annual")
+        duration_ms = (perf_counter() - start_time) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = {
+            "Rows": SYNTHETIC_ROWS,
+            "File size": f"{len(content) / 1024:.0f}KB",
+            "Load + validation duration": f"{duration_ms:.2f}ms",
+            "Peak memory": f"{peak / 1024 / 1024:.2f}MB",
+        }
+        log_import_results("stream_10k_rows_xlsx", stats)
+        print_import_results("stream_10k_rows_xlsx", stats)
+
+        assert errors == []
+        assert len(dataset) == SYNTHETIC_ROWS
+        # Only the resulting Dataset is held in memory, not the workbook model
+        assert peak < 50 * 1024 * 1024
@@ -0,0 +1,255 @@
+"""
+Notification load benchmark
+
+This module runs the real notification tasks, _send_menu_notifications and
+send_broadcast_notification, against the local push service emulator (see
+push_service.py): nothing is mocked, so the numbers include the database
+reads, the payload encryption, VAPID, HTTP and the delivery concurrency.
+
+The emulator answers after PUSH_LATENCY seconds and rejects a stable share of
+the subscriptions with the errors real push services return (ERROR_RATES).
+
+Sizes default to 1000 subscriptions; larger runs are selected with the
+PUSH_LOAD_SIZES environment variable, e.g.:
+
+    PUSH_LOAD_SIZES=1000,10000,100000 pytest -m performance \
+        tests/performance/test_notification_load.py
+
+Expected results:
+- Every subscription gets exactly one push, errors are accounted as the
+  push service answered them (expired, queued for retry or failed)
+- Sends/sec is bounded by WEBPUSH_SETTINGS["CONCURRENCY"] / PUSH_LATENCY, the
+  gap to that bound is the CPU cost of encryption and of the tasks themselves
+"""
+
+import os
+from datetime import date
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+import time_machine
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from notifications.models import (
+    AnonymousMenuNotification,
+    BroadcastNotification,
+    NotificationBatchRun,
+    PushRetry,
+)
+from notifications.push import clear_vapid_headers, close_push_sessions
+from notifications.tasks import _send_menu_notifications, send_broadcast_notification
+from school_menu.models import School
+from tests.notifications.factories import BroadcastNotificationFactory
+from tests.performance.push_service import PushServiceEmulator, b64url
+from tests.school_menu.factories import SchoolFactory, SimpleMealFactory
+
+pytestmark = [pytest.mark.django_db, pytest.mark.performance]
+
+# Path for baseline metrics logging
+BASELINE_METRICS_FILE = Path(__file__).parent / "baseline_metrics.txt"
+
+LOAD_SIZES = [
+    int(size) for size in os.environ.get("PUSH_LOAD_SIZES", "1000").split(",")
+]
+PUSH_LATENCY = 0.02  # seconds, a fast push service round trip
+ERROR_RATES = {404: 0.005, 410: 0.01, 429: 0.005, 503: 0.005}
+SCHOOLS = 10
+# Payloads are decrypted and checked up to this many subscriptions
+DECRYPT_LIMIT = 1000
+EXPIRED_STATUS_CODES = (404, 410)
+MONDAY_MORNING = "2025-09-15 08:00:00+00:00"  # 10:00 in Rome
+
+
+def log_load_results(test_name, stats):
+    """
+    Log load results to baseline_metrics.txt for tracking over time
+
+    Args:
+        test_name: Name of the test
+        stats: Dictionary containing load statistics
+    """
+    with open(BASELINE_METRICS_FILE, "a") as f:
+        f.write(f"\n{'=' * 80}\n")
+        f.write(f"Notification Load Test: {test_name}\n")
+        f.write(f"{'=' * 80}\n")
+        for key, value in stats.items():
+            f.write(f"{key}: {value}\n")
+        f.write(f"{'=' * 80}\n\n")
+
+
+def print_load_results(test_name, stats):
+    """
+    Print load results to console
+
+    Args:
+        test_name: Name of the test
+        stats: Dictionary containing load statistics
+    """
+    print(f"\n{'=' * 80}")
+    print(f"Notification Load Test: {test_name}")
+    print(f"{'=' * 80}")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+    print(f"{'=' * 80}\n")
+
+
+def generate_vapid_private_key():
+    """Return a raw VAPID private key as accepted by pywebpush"""
+    private_value = ec.generate_private_key(ec.SECP256R1()).private_numbers()
+    return b64url(private_value.private_value.to_bytes(32, "big"))
+
+
+@pytest.fixture
+def push_settings(settings):
+    settings.WEBPUSH_SETTINGS = {
+        **settings.WEBPUSH_SETTINGS,
+        "VAPID_PRIVATE_KEY": generate_vapid_private_key(),
+        "VAPID_ADMIN_EMAIL": "admin@example.com",
+        # The emulator is a single origin: do not measure the rate limiter
+        "RATE_LIMIT": 0,
+    }
+    settings.ENABLE_SCHOOL_DATE_CHECK = False
+    clear_vapid_headers()
+    return settings
+
+
+@pytest.fixture(params=LOAD_SIZES, ids=lambda size: f"{size}_subscriptions")
+def size(request):
+    return request.param
+
+
+@pytest.fixture
+def push_service(size):
+    with PushServiceEmulator(
+        latency=PUSH_LATENCY, error_rates=ERROR_RATES, decrypt=size <= DECRYPT_LIMIT
+    ) as service:
+        yield service
+        close_push_sessions()
+
+
+def create_subscriptions(service, count):
+    """
+    Subscribe count browsers of the emulator to SCHOOLS schools with a menu
+    for today, in bulk: the factories would take longer than the benchmark.
+
+    Returns:
+        list: the subscription names, to compute the expected push statuses
+    """
+    schools = SchoolFactory.create_batch(SCHOOLS, menu_type=School.Types.SIMPLE)
+    for school in schools:
+        for season in School.Seasons.values:
+            for week in range(1, 5):
+                SimpleMealFactory(
+                    school=school,
+                    day=date.today().weekday() + 1,
+                    season=season,
+                    week=week,
+                )
+
+    names = [str(index) for index in range(count)]
+    subscriptions = []
+    for index, name in enumerate(names):
+        subscription_info = service.subscribe(name)
+        subscriptions.append(
+            AnonymousMenuNotification(
+                school=schools[index % SCHOOLS],
+                subscription_info=subscription_info,
+                subscription_endpoint=AnonymousMenuNotification.hash_subscription(
+                    subscription_info
+                ),
+                daily_notification=True,
+                notification_time=AnonymousMenuNotification.SAME_DAY_12PM,
+            )
+        )
+    AnonymousMenuNotification.objects.bulk_create(subscriptions, batch_size=1000)
+    return names
+
+
+def get_load_stats(size, service, run, duration):
+    """Return the statistics of a run of the given size"""
+    return {
+        "subscriptions": size,
+        "wall_time_s": round(duration, 2),
+        "sends_per_second": round(service.requests / duration),
+        "push_service_statuses": dict(sorted(service.statuses.items())),
+        "p50_latency_ms": run.p50_latency_ms,
+        "p95_latency_ms": run.p95_latency_ms,
+        "slowest_chunk_s": round(run.slowest_chunk_seconds, 2),
+        "connections": service.connections,
+    }
+
+
+def assert_accounted(service, names, counters):
+    """Check every subscription got one push and every answer was accounted"""
+    expected = service.expected_statuses(names)
+    assert service.statuses == expected
+    success_count, failure_count, expired_count, retry_count = counters
+    assert success_count == expected[201]
+    assert retry_count == expected[429] + expected[503]
+    assert failure_count == sum(expected[code] for code in EXPIRED_STATUS_CODES)
+    assert expired_count == failure_count
+    assert PushRetry.objects.count() == retry_count
+    assert AnonymousMenuNotification.objects.count() == len(names) - expired_count
+    if service.decrypt:
+        assert len(service.payloads) == expected[201]
+        assert all(payload["head"].startswith("Menu ") for payload in service.payloads)
+
+
+class TestNotificationLoad:
+    """Benchmark the notification tasks against the push service emulator"""
+
+    @time_machine.travel(MONDAY_MORNING)
+    def test_menu_notification_batch(self, size, push_service, push_settings):
+        names = create_subscriptions(push_service, size)
+
+        start_time = perf_counter()
+        batch = _send_menu_notifications(AnonymousMenuNotification.SAME_DAY_12PM)
+        duration = perf_counter() - start_time
+
+        batch.refresh_from_db()
+        stats = get_load_stats(size, push_service, batch, duration)
+        stats["chunks"] = len(batch.chunks)
+        print_load_results("menu_notification_batch", stats)
+        log_load_results("menu_notification_batch", stats)
+
+        assert batch.status == NotificationBatchRun.Status.COMPLETED
+        assert_accounted(
+            push_service,
+            names,
+            (
+                batch.success_count,
+                batch.failure_count,
+                batch.expired_count,
+                batch.retry_count,
+            ),
+        )
+
+    @time_machine.travel(MONDAY_MORNING)
+    def test_broadcast(self, size, push_service, push_settings):
+        names = create_subscriptions(push_service, size)
+        broadcast = BroadcastNotificationFactory(title="Menu di oggi")
+
+        start_time = perf_counter()
+        send_broadcast_notification(broadcast.pk)
+        duration = perf_counter() - start_time
+
+        broadcast.refresh_from_db()
+        run = broadcast.runs.get()
+        stats = get_load_stats(size, push_service, run, duration)
+        stats["checkpoints"] = len(run.chunks)
+        print_load_results("broadcast", stats)
+        log_load_results("broadcast", stats)
+
+        assert broadcast.status == BroadcastNotification.Status.SENT
+        assert broadcast.recipients_count == size
+        assert_accounted(
+            push_service,
+            names,
+            (
+                broadcast.success_count,
+                broadcast.failure_count,
+                broadcast.expired_count,
+                broadcast.retry_count,
+            ),
+        )
@@ -0,0 +1,172 @@
+"""
+Web Push delivery performance tests
+
+This module benchmarks notifications.push against the local push service
+emulator (see push_service.py) answering after a fixed latency. Messages are
+really encrypted and signed with VAPID, only the network round trip is
+simulated.
+
+Expected results:
+- Throughput scales with concurrency: a batch takes about
+  (messages / concurrency) x latency instead of messages x latency
+- Keep-alive pooling: connections opened never exceed the concurrency
+- VAPID headers are signed once per push service per batch, not per message
+"""
+
+from pathlib import Path
+from time import perf_counter
+from unittest.mock import patch
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from py_vapid import Vapid
+
+from notifications.push import (
+    clear_vapid_headers,
+    close_push_sessions,
+    get_vapid_headers,
+    send_pushes,
+)
+from tests.performance.push_service import PushServiceEmulator, b64url
+
+pytestmark = [pytest.mark.performance]
+
+# Path for baseline metrics logging
+BASELINE_METRICS_FILE = Path(__file__).parent / "baseline_metrics.txt"
+
+PUSH_LATENCY = 0.02  # seconds, a fast push service round trip
+MESSAGES = 64
+
+
+def log_push_results(test_name, stats):
+    """
+    Log push results to baseline_metrics.txt for tracking over time
+
+    Args:
+        test_name: Name of the test
+        stats: Dictionary containing push statistics
+    """
+    with open(BASELINE_METRICS_FILE, "a") as f:
+        f.write(f"\n{'=' * 80}\n")
+        f.write(f"Push Performance Test: {test_name}\n")
+        f.write(f"{'=' * 80}\n")
+        for key, value in stats.items():
+            f.write(f"{key}: {value}\n")
+        f.write(f"{'=' * 80}\n\n")
+
+
+def print_push_results(test_name, stats):
+    """
+    Print push results to console
+
+    Args:
+        test_name: Name of the test
+        stats: Dictionary containing push statistics
+    """
+    print(f"\n{'=' * 80}")
+    print(f"Push Performance Test: {test_name}")
+    print(f"{'=' * 80}")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+    print(f"{'=' * 80}\n")
+
+
+def generate_vapid_private_key():
+    """Return a raw VAPID private key as accepted by pywebpush"""
+    private_value = ec.generate_private_key(ec.SECP256R1()).private_numbers()
+    return b64url(private_value.private_value.to_bytes(32, "big"))
+
+
+@pytest.fixture
+def push_server():
+    with PushServiceEmulator(latency=PUSH_LATENCY) as server:
+        yield server
+        close_push_sessions()
+
+
+@pytest.fixture
+def vapid_settings(settings):
+    settings.WEBPUSH_SETTINGS = {
+        **settings.WEBPUSH_SETTINGS,
+        "VAPID_PRIVATE_KEY": generate_vapid_private_key(),
+        "VAPID_ADMIN_EMAIL": "admin@example.com",
+    }
+    return settings
+
+
+def build_messages(server, count):
+    payload = {"head": "Menu di oggi", "body": "Pasta al pomodoro\nPollo\nMela"}
+    return [(index, server.subscribe(index), payload) for index in range(count)]
+
+
+class TestPushDeliveryPerformance:
+    """Benchmark concurrent delivery against a local stub push service"""
+
+    def run_batch(self, server, concurrency):
+        close_push_sessions()
+        clear_vapid_headers()
+        server.reset()
+        messages = build_messages(server, MESSAGES)
+
+        start_time = perf_counter()
+        results = send_pushes(messages, concurrency=concurrency)
+        duration = perf_counter() - start_time
+
+        assert [error for _, error in results] == [None] * MESSAGES
+        assert server.statuses == {201: MESSAGES}
+        return {
+            "concurrency": concurrency,
+            "duration_s": round(duration, 3),
+            "pushes_per_second": round(MESSAGES / duration),
+            "connections": server.connections,
+        }
+
+    def test_throughput_scales_with_concurrency(self, push_server, vapid_settings):
+        runs = [self.run_batch(push_server, concurrency) for concurrency in (1, 4, 16)]
+
+        stats = {
+            f"concurrency_{run['concurrency']}": (
+                f"{run['pushes_per_second']} pushes/s in {run['duration_s']}s, "
+                f"{run['connections']} connection(s)"
+            )
+            for run in runs
+        }
+        stats["latency_ms"] = PUSH_LATENCY * 1000
+        stats["messages"] = MESSAGES
+        print_push_results("throughput_scales_with_concurrency", stats)
+        log_push_results("throughput_scales_with_concurrency", stats)
+
+        serial, _, concurrent = runs
+        assert concurrent["pushes_per_second"] > 4 * serial["pushes_per_second"]
+        # Connections are reused: at most one per worker
+        for run in runs:
+            assert run["connections"] <= run["concurrency"]
+
+    def test_vapid_signed_once_per_batch(self, push_server, vapid_settings):
+        messages = build_messages(push_server, MESSAGES)
+        endpoint = messages[0][1]["endpoint"]
+        clear_vapid_headers()
+
+        start_time = perf_counter()
+        get_vapid_headers(endpoint)
+        sign_ms = (perf_counter() - start_time) * 1000
+        start_time = perf_counter()
+        get_vapid_headers(endpoint)
+        cached_ms = (perf_counter() - start_time) * 1000
+
+        clear_vapid_headers()
+        with patch.object(Vapid, "sign", autospec=True, side_effect=Vapid.sign) as sign:
+            results = send_pushes(messages, concurrency=16)
+
+        stats = {
+            "messages": MESSAGES,
+            "signatures": sign.call_count,
+            "sign_ms": round(sign_ms, 3),
+            "cached_ms": round(cached_ms, 3),
+        }
+        print_push_results("vapid_signed_once_per_batch", stats)
+        log_push_results("vapid_signed_once_per_batch", stats)
+
+        assert [error for _, error in results] == [None] * MESSAGES
+        assert sign.call_count == 1
+        assert cached_ms < sign_ms
@@ -96,7 +96,7 @@ class TestNotificationTaskPerformance:
                     daily_notification=True,
                     notification_time=AnonymousMenuNotification.SAME_DAY_9AM,
                     subscription_info={
-                        "endpoint": f"https://example.com/subscriber_{j}",
+                        "endpoint": f"https://example.com/subscriber_{school.pk}_{j}",
                         "keys": {"p256dh": "test_key", "auth": "test_auth"},
                     },
                 )
@@ -113,9 +113,9 @@ class TestNotificationTaskPerformance:
         }
 
         with (
-            patch("notifications.tasks.send_test_notification"),
+            patch("notifications.push.send_push"),
             patch(
-                "notifications.tasks.build_menu_notification_payload",
+                "notifications.utils.build_menu_notification_payload",
                 return_value=mock_payload,
             ),
         ):
@@ -203,7 +203,7 @@ class TestNotificationTaskPerformance:
                         daily_notification=True,
                         notification_time=notification_time,
                         subscription_info={
-                            "endpoint": f"https://example.com/{notification_time}_{j}",
+                            "endpoint": f"https://example.com/{notification_time}_{school.pk}_{j}",
                             "keys": {"p256dh": "test_key", "auth": "test_auth"},
                         },
                     )
@@ -216,9 +216,9 @@ class TestNotificationTaskPerformance:
             }
 
             with (
-                patch("notifications.tasks.send_test_notification"),
+                patch("notifications.push.send_push"),
                 patch(
-                    "notifications.tasks.build_menu_notification_payload",
+                    "notifications.utils.build_menu_notification_payload",
                     return_value=mock_payload,
                 ),
             ):
@@ -288,9 +288,9 @@ class TestNotificationTaskPerformance:
         }
 
         with (
-            patch("notifications.tasks.send_test_notification"),
+            patch("notifications.push.send_push"),
             patch(
-                "notifications.tasks.build_menu_notification_payload",
+                "notifications.utils.build_menu_notification_payload",
                 return_value=mock_payload,
             ),
         ):
@@ -0,0 +1,52 @@
+import pytest
+import time_machine
+from django.contrib.admin.sites import site
+from django.urls import reverse
+
+from school_menu.admin import SchoolAdmin
+from school_menu.models import School
+from tests.school_menu.factories import SchoolFactory, SimpleMealFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestSchoolAdmin:
+    @time_machine.travel("2025-10-14 10:00")  # A Tuesday
+    def test_changelist_flags_schools_in_session_with_menu(
+        self, admin_client, django_assert_max_num_queries
+    ):
+        active = SchoolFactory(
+            name="Attiva", menu_type=School.Types.SIMPLE, start_month=9, end_month=6
+        )
+        for season in School.Seasons.values:
+            for week in range(1, 5):
+                SimpleMealFactory(school=active, day=2, season=season, week=week)
+        SchoolFactory(
+            name="Senza menu", menu_type=School.Types.SIMPLE, start_month=9, end_month=6
+        )
+        for _ in range(5):
+            SchoolFactory(menu_type=School.Types.SIMPLE, start_month=1, end_month=6)
+
+        # The flags are computed for the whole page at once
+        with django_assert_max_num_queries(12):
+            response = admin_client.get(reverse("admin:school_menu_school_changelist"))
+
+        assert response.status_code == 200
+        schools = {school.name: school for school in response.context["cl"].result_list}
+        # Both columns read the same prefetched (in_session, has_menu)
+        assert schools["Attiva"].today == (True, True)
+        assert schools["Senza menu"].today == (True, False)
+        assert sum(school.today[0] for school in schools.values()) == 2
+        assert sum(school.today[1] for school in schools.values()) == 1
+
+    @time_machine.travel("2025-10-14 10:00")  # A Tuesday
+    def test_columns_without_prefetch(self, django_assert_num_queries):
+        school = SchoolFactory(
+            menu_type=School.Types.SIMPLE, start_month=9, end_month=6
+        )
+        model_admin = SchoolAdmin(School, site)
+
+        # Computed once for both columns, the weekly menu checked with one query
+        with django_assert_num_queries(2):
+            assert model_admin.in_session_today(school) is True
+            assert model_admin.menu_today(school) is False
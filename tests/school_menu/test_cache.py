@@ -1,14 +1,18 @@
 """Tests for cache utility functions."""
 
 import logging
+from datetime import date
 from unittest.mock import MagicMock, patch
 
 import pytest
 from django.core.cache import cache
+from django.db import transaction
 
 from school_menu.cache import (
+    defer_meal_cache_invalidation,
     get_cached_or_query,
     get_meal_cache_key,
+    get_notification_payload_cache_key,
     get_school_menu_cache_key,
     get_types_menu_cache_key,
     invalidate_meal_cache,
@@ -72,6 +76,18 @@ class TestCacheKeyGeneration:
         key = get_school_menu_cache_key(school_slug=school_slug)
         assert key == expected_key
 
+    @pytest.mark.parametrize(
+        "is_previous_day,expected_key",
+        [
+            (True, "notification_payload:1:2025-09-15:previous_day"),
+            (False, "notification_payload:1:2025-09-15:same_day"),
+        ],
+    )
+    def test_get_notification_payload_cache_key(self, is_previous_day, expected_key):
+        """Test notification payload cache key generation."""
+        key = get_notification_payload_cache_key(1, date(2025, 9, 15), is_previous_day)
+        assert key == expected_key
+
 
 class TestCacheInvalidation:
     """Test cache invalidation functions."""
@@ -188,19 +204,20 @@ class TestCacheInvalidation:
             result = invalidate_meal_cache(school_id)
 
             # Verify delete_pattern was called with correct patterns
-            assert mock_cache.delete_pattern.call_count == 5
+            assert mock_cache.delete_pattern.call_count == 6
             expected_patterns = [
                 f"*meal:{school_id}:*",
                 f"*meals:{school_id}:*",
                 f"*annual_meals:{school_id}:*",
                 f"*types_menu:{school_id}*",
                 "*json_api*",
+                f"*notification_payload:{school_id}:*",
             ]
             for pattern in expected_patterns:
                 mock_cache.delete_pattern.assert_any_call(pattern)
 
-            # Verify it returns the total number of deleted keys (5 per pattern * 5 patterns)
-            assert result == 25
+            # Verify it returns the total number of deleted keys (5 per pattern * 6 patterns)
+            assert result == 30
 
     def test_invalidate_school_cache_fallback(self):
         """
@@ -238,6 +255,93 @@ class TestCacheInvalidation:
         assert True
 
 
+class TestDeferMealCacheInvalidation:
+    """Test postponing meal cache invalidation to the end of a block."""
+
+    def test_invalidates_each_school_once_on_exit(
+        self, django_capture_on_commit_callbacks
+    ):
+        with patch("school_menu.cache.cache") as mock_cache:
+            mock_cache.delete_pattern = MagicMock(return_value=0)
+            with django_capture_on_commit_callbacks(execute=True):
+                with defer_meal_cache_invalidation():
+                    for _ in range(10):
+                        assert invalidate_meal_cache(1) == 0
+                    invalidate_meal_cache(2)
+                    mock_cache.delete_pattern.assert_not_called()
+
+        # 6 patterns per school, invalidated once each
+        assert mock_cache.delete_pattern.call_count == 12
+
+    def test_nested_blocks_invalidate_on_outermost_exit(
+        self, django_capture_on_commit_callbacks
+    ):
+        with patch("school_menu.cache.cache") as mock_cache:
+            mock_cache.delete_pattern = MagicMock(return_value=0)
+            with django_capture_on_commit_callbacks(execute=True):
+                with defer_meal_cache_invalidation():
+                    with defer_meal_cache_invalidation():
+                        invalidate_meal_cache(1)
+                    mock_cache.delete_pattern.assert_not_called()
+                    invalidate_meal_cache(1)
+
+        assert mock_cache.delete_pattern.call_count == 6
+
+    def test_invalidates_on_error(self, django_capture_on_commit_callbacks):
+        with patch("school_menu.cache.cache") as mock_cache:
+            mock_cache.delete_pattern = MagicMock(return_value=0)
+            with django_capture_on_commit_callbacks(execute=True):
+                with pytest.raises(ValueError):
+                    with defer_meal_cache_invalidation():
+                        invalidate_meal_cache(1)
+                        raise ValueError("boom")
+
+            assert mock_cache.delete_pattern.call_count == 6
+            # Deferral is no longer active after the block
+            invalidate_meal_cache(1)
+            assert mock_cache.delete_pattern.call_count == 12
+
+    def test_invalidates_after_the_commit(self, django_capture_on_commit_callbacks):
+        with patch("school_menu.cache.cache") as mock_cache:
+            mock_cache.delete_pattern = MagicMock(return_value=0)
+            with django_capture_on_commit_callbacks() as callbacks:
+                with transaction.atomic():
+                    with defer_meal_cache_invalidation():
+                        invalidate_meal_cache(1)
+                    # Other requests must not cache the meals being written
+                    mock_cache.delete_pattern.assert_not_called()
+
+        assert len(callbacks) == 1
+        mock_cache.delete_pattern.assert_not_called()
+
+    def test_rolled_back_block_does_not_invalidate(
+        self, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks() as callbacks:
+            with pytest.raises(ValueError):
+                with transaction.atomic():
+                    with defer_meal_cache_invalidation():
+                        invalidate_meal_cache(1)
+                    raise ValueError("boom")
+
+        assert callbacks == []
+
+    def test_meal_saves_are_collapsed(self, school, django_capture_on_commit_callbacks):
+        from school_menu.models import SimpleMeal
+
+        with patch("school_menu.cache.cache") as mock_cache:
+            mock_cache.delete_pattern = MagicMock(return_value=0)
+            with django_capture_on_commit_callbacks(execute=True):
+                with defer_meal_cache_invalidation():
+                    for week in range(1, 5):
+                        SimpleMeal.objects.create(
+                            school=school, week=week, day=1, season=1, type="S"
+                        )
+
+        # Four saves, a single invalidation (6 patterns)
+        assert mock_cache.delete_pattern.call_count == 6
+
+
 class TestGetCachedOrQuery:
     """Test the get_cached_or_query helper function."""
 
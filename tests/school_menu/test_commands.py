@@ -0,0 +1,102 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.utils import timezone
+
+from contacts.models import MenuReport
+from notifications.models import AnonymousMenuNotification
+from school_menu.models import AnnualMeal, DetailedMeal, School, SimpleMeal
+from tests.contacts.factories import MenuReportFactory
+from tests.notifications.factories import AnonymousMenuNotificationFactory
+from tests.school_menu.factories import (
+    AnnualMealFactory,
+    DetailedMealFactory,
+    SchoolFactory,
+    SimpleMealFactory,
+)
+from tests.users.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+class TestCheckUsersCommand:
+    def test_inactive_users_are_notified_over_one_connection(self, settings):
+        now = timezone.now()
+        inactive = UserFactory.create_batch(3, last_login=now - timedelta(days=370))
+        UserFactory(last_login=now - timedelta(days=400))
+        UserFactory(last_login=now - timedelta(days=10))
+
+        with patch(
+            "school_menu.management.commands.check_users.get_connection",
+            wraps=get_connection,
+        ) as spy:
+            call_command("check_users")
+
+        spy.assert_called_once_with()
+        assert User.objects.count() == 4
+        notices = [
+            email for email in mail.outbox if email.subject.startswith("Notifica")
+        ]
+        assert sorted(email.to[0] for email in notices) == sorted(
+            user.email for user in inactive
+        )
+        assert mail.outbox[-1].to == [settings.ADMIN_EMAIL]
+        assert "Utenti cancellati: 1\nUtenti avvisati: 3" in mail.outbox[-1].body
+
+    @patch("school_menu.management.commands.check_users.invalidate_school_list_cache")
+    @patch("school_menu.management.commands.check_users.invalidate_school_page")
+    @patch("school_menu.management.commands.check_users.invalidate_meal_cache")
+    def test_inactive_users_are_deleted_in_chunks(
+        self, mock_meal_cache, mock_school_page, mock_school_list
+    ):
+        now = timezone.now()
+        deleted = UserFactory.create_batch(3, last_login=now - timedelta(days=400))
+        schools = [SchoolFactory(user=user) for user in deleted[:2]]
+        for school in schools:
+            SimpleMealFactory(school=school)
+            DetailedMealFactory(school=school)
+            AnnualMealFactory(school=school)
+            AnonymousMenuNotificationFactory(school=school)
+        MenuReportFactory(receiver=deleted[2])
+        active = UserFactory(last_login=now - timedelta(days=10))
+        kept = SchoolFactory(user=active)
+        SimpleMealFactory(school=kept)
+        out = StringIO()
+
+        call_command("check_users", "--chunk-size", "2", stdout=out)
+
+        assert list(User.objects.all()) == [active]
+        assert list(School.objects.all()) == [kept]
+        assert SimpleMeal.objects.get().school == kept
+        assert not DetailedMeal.objects.exists()
+        assert not AnnualMeal.objects.exists()
+        assert not AnonymousMenuNotification.objects.exists()
+        assert not MenuReport.objects.exists()
+        # One invalidation per deleted school, the school list once
+        assert sorted(
+            call.args[0] for call in mock_meal_cache.call_args_list
+        ) == sorted(school.pk for school in schools)
+        assert mock_school_page.call_count == 2
+        mock_school_list.assert_called_once_with()
+        output = out.getvalue()
+        assert "Chunk 1/2: deleted 2 users and 2 schools" in output
+        assert "Chunk 2/2: deleted 1 users and 0 schools" in output
+        assert "Deleted 3 users and 2 schools in" in output
+        assert "Utenti cancellati: 3" in mail.outbox[-1].body
+
+    @patch("school_menu.management.commands.check_users.invalidate_school_list_cache")
+    def test_no_inactive_users(self, mock_school_list):
+        UserFactory(last_login=timezone.now())
+
+        call_command("check_users", stdout=StringIO())
+
+        assert User.objects.count() == 1
+        mock_school_list.assert_not_called()
@@ -277,7 +277,7 @@ Lunedi,1,Pasta,Yogurt,Mela
             }
 
             # Mock to raise InvalidDimensions
-            with mock.patch("school_menu.views.Dataset.load") as mock_load:
+            with mock.patch("school_menu.importers.Dataset.load") as mock_load:
                 mock_load.side_effect = InvalidDimensions("CSV structure is invalid")
                 response = self.post(url, data=data)
 
@@ -313,7 +313,7 @@ Lunedi,1,Pasta,Yogurt,Mela
             }
 
             # Mock the dataset.load to raise ValueError with "quote" in message
-            with mock.patch("school_menu.views.Dataset.load") as mock_load:
+            with mock.patch("school_menu.importers.Dataset.load") as mock_load:
                 mock_load.side_effect = ValueError("Invalid quote character in CSV")
                 response = self.post(url, data=data)
 
@@ -350,7 +350,7 @@ Lunedi,1,Pasta,Yogurt,Mela
             }
 
             # Mock to raise ValueError without "quote" or "delimiter"
-            with mock.patch("school_menu.views.Dataset.load") as mock_load:
+            with mock.patch("school_menu.importers.Dataset.load") as mock_load:
                 mock_load.side_effect = ValueError("Some other parsing error")
                 response = self.post(url, data=data)
 
@@ -384,7 +384,7 @@ Lunedi,1,Pasta,Yogurt,Mela
             }
 
             # Mock to raise a generic exception
-            with mock.patch("school_menu.views.Dataset.load") as mock_load:
+            with mock.patch("school_menu.importers.Dataset.load") as mock_load:
                 mock_load.side_effect = RuntimeError("Unexpected error")
                 response = self.post(url, data=data)
 
@@ -419,7 +419,7 @@ Lunedi,1,Pasta,Yogurt,Mela
             }
 
             # Mock to raise InvalidDimensions
-            with mock.patch("school_menu.views.Dataset.load") as mock_load:
+            with mock.patch("school_menu.importers.Dataset.load") as mock_load:
                 mock_load.side_effect = InvalidDimensions("CSV structure is invalid")
                 response = self.post(url, data=data)
 
@@ -452,7 +452,7 @@ Lunedi,1,Pasta,Yogurt,Mela
             }
 
             # Mock to raise ValueError with "delimiter"
-            with mock.patch("school_menu.views.Dataset.load") as mock_load:
+            with mock.patch("school_menu.importers.Dataset.load") as mock_load:
                 mock_load.side_effect = ValueError("Invalid delimiter in CSV")
                 response = self.post(url, data=data)
 
@@ -487,7 +487,7 @@ Lunedi,1,Pasta,Yogurt,Mela
             }
 
             # Mock to raise ValueError without "quote" or "delimiter"
-            with mock.patch("school_menu.views.Dataset.load") as mock_load:
+            with mock.patch("school_menu.importers.Dataset.load") as mock_load:
                 mock_load.side_effect = ValueError("Some other parsing error")
                 response = self.post(url, data=data)
 
@@ -520,7 +520,7 @@ Lunedi,1,Pasta,Yogurt,Mela
             }
 
             # Mock to raise a generic exception
-            with mock.patch("school_menu.views.Dataset.load") as mock_load:
+            with mock.patch("school_menu.importers.Dataset.load") as mock_load:
                 mock_load.side_effect = RuntimeError("Unexpected error")
                 response = self.post(url, data=data)
 
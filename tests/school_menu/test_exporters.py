@@ -0,0 +1,251 @@
+import io
+import zipfile
+from datetime import date
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from school_menu.exporters import iter_menu_archive, iter_menu_csv, iter_menu_rows
+from school_menu.importers import (
+    import_menu_dataset,
+    import_menu_entries,
+    load_csv_dataset,
+    read_menu_archive,
+)
+from school_menu.models import AnnualMeal, DetailedMeal, Meal, School, SimpleMeal
+from tests.school_menu.factories import SchoolFactory
+
+pytestmark = pytest.mark.django_db
+
+WINTER = Meal.Seasons.INVERNALE
+
+
+def export(school, **kwargs):
+    return "".join(iter_menu_csv(school, WINTER, Meal.Types.STANDARD, **kwargs))
+
+
+class TestIterMenuCsv:
+    def test_simple_menu(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        SimpleMeal.objects.create(
+            school=school,
+            week=2,
+            day=Meal.Days.MARTEDÌ,
+            season=WINTER,
+            menu='Pasta, "al sugo"\nPane',
+            morning_snack="",
+            afternoon_snack="Yogurt",
+        )
+
+        assert export(school) == (
+            "settimana,giorno,pranzo,spuntino,merenda\r\n"
+            '2,Martedì,"Pasta, ""al sugo""\nPane",,Yogurt\r\n'
+        )
+
+    def test_detailed_menu_filters_season_and_type(self):
+        school = SchoolFactory(menu_type=School.Types.DETAILED)
+        DetailedMeal.objects.create(
+            school=school,
+            week=1,
+            day=Meal.Days.LUNEDÌ,
+            season=WINTER,
+            first_course="Pasta",
+            second_course="Pollo",
+            side_dish="Carote",
+            fruit="Mela",
+            snack="Yogurt",
+        )
+        DetailedMeal.objects.create(
+            school=school, week=1, day=Meal.Days.LUNEDÌ, season=Meal.Seasons.ESTIVO
+        )
+        DetailedMeal.objects.create(
+            school=school, week=1, day=1, season=WINTER, type=Meal.Types.VEGETARIAN
+        )
+
+        assert export(school) == (
+            "settimana,giorno,primo,secondo,contorno,frutta,spuntino\r\n"
+            "1,Lunedì,Pasta,Pollo,Carote,Mela,Yogurt\r\n"
+        )
+
+    def test_empty_menu_exports_header_only(self):
+        school = SchoolFactory(menu_type=School.Types.DETAILED)
+
+        assert export(school) == (
+            "settimana,giorno,primo,secondo,contorno,frutta,spuntino\r\n"
+        )
+
+    def test_annual_menu_splits_courses(self):
+        school = SchoolFactory(annual_menu=True)
+        AnnualMeal.objects.create(
+            school=school,
+            date=date(2025, 1, 3),
+            day=Meal.Days.VENERDÌ,
+            season=WINTER,
+            menu="Pasta\nPollo, patate\n\nMela\nPane\nextra",
+        )
+        AnnualMeal.objects.create(
+            school=school, date=date(2025, 1, 4), day=6, season=WINTER, menu=""
+        )
+
+        # Ordered by -date, extra courses beyond the columns are dropped
+        assert export(school) == (
+            "data,giorno,primo,secondo,contorno,frutta,altro\r\n"
+            "04/01/2025,,,,,,\r\n"
+            '03/01/2025,Venerdì,Pasta,"Pollo, patate",,Mela,Pane\r\n'
+        )
+
+    def test_chunks(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        for day in Meal.Days.values:
+            SimpleMeal.objects.create(
+                school=school, week=1, day=day, season=WINTER, menu="Pasta"
+            )
+
+        chunks = list(iter_menu_csv(school, WINTER, Meal.Types.STANDARD, chunk_rows=2))
+
+        # header + 5 rows in chunks of 2 rows
+        assert len(chunks) == 3
+        assert "".join(chunks) == export(school)
+        assert chunks[0].count("\r\n") == 2
+
+    def test_export_can_be_imported_again(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        SimpleMeal.objects.create(
+            school=school,
+            week=1,
+            day=Meal.Days.LUNEDÌ,
+            season=WINTER,
+            menu="Pasta, pomodoro",
+            morning_snack="Mela",
+            afternoon_snack="Yogurt",
+        )
+
+        dataset = load_csv_dataset(export(school))
+        _, changed, unchanged = import_menu_dataset(
+            dataset, school, Meal.Types.STANDARD, WINTER
+        )
+
+        assert (changed, unchanged) == (0, 1)
+
+
+class TestIterMenuRows:
+    def test_returns_header_first(self):
+        school = SchoolFactory(annual_menu=True)
+
+        rows = list(iter_menu_rows(school, WINTER, Meal.Types.STANDARD))
+
+        assert rows == [
+            ["data", "giorno", "primo", "secondo", "contorno", "frutta", "altro"]
+        ]
+
+
+def read_archive(school, **kwargs):
+    content = b"".join(iter_menu_archive(school, **kwargs))
+    return zipfile.ZipFile(io.BytesIO(content))
+
+
+class TestIterMenuArchive:
+    def test_one_csv_per_type_and_season(self):
+        school = SchoolFactory(menu_type=School.Types.DETAILED, no_gluten=True)
+        for meal_type in (Meal.Types.STANDARD, Meal.Types.GLUTEN_FREE):
+            for season in Meal.Seasons.values:
+                for day in Meal.Days.values:
+                    DetailedMeal.objects.create(
+                        school=school,
+                        week=1,
+                        day=day,
+                        season=season,
+                        type=meal_type,
+                        first_course=f"Pasta {meal_type}{season}{day}",
+                    )
+
+        archive = read_archive(school, chunk_rows=2)
+
+        assert archive.namelist() == [
+            "NO_GLUTEN/estivo.csv",
+            "NO_GLUTEN/invernale.csv",
+            "STANDARD/estivo.csv",
+            "STANDARD/invernale.csv",
+        ]
+        # Every entry is the same CSV as the single menu export
+        content = archive.read("NO_GLUTEN/invernale.csv").decode()
+        assert content == "".join(
+            iter_menu_csv(school, Meal.Seasons.INVERNALE, Meal.Types.GLUTEN_FREE)
+        )
+
+    def test_single_query(self, django_assert_num_queries):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE, vegetarian=True)
+        for meal_type in (Meal.Types.STANDARD, Meal.Types.VEGETARIAN):
+            for season in Meal.Seasons.values:
+                SimpleMeal.objects.create(
+                    school=school, week=1, day=1, season=season, type=meal_type
+                )
+
+        with django_assert_num_queries(1):
+            archive = read_archive(school)
+
+        assert len(archive.namelist()) == 4
+
+    def test_annual_menus_grouped_by_type(self):
+        school = SchoolFactory(annual_menu=True)
+        for season in Meal.Seasons.values:
+            AnnualMeal.objects.create(
+                school=school,
+                date=date(2025, 1, season),
+                day=season,
+                season=season,
+                menu=f"Pasta {season}",
+            )
+
+        archive = read_archive(school)
+
+        assert archive.namelist() == ["STANDARD.csv"]
+        assert archive.read("STANDARD.csv").decode() == (
+            "data,giorno,primo,secondo,contorno,frutta,altro\r\n"
+            "02/01/2025,Martedì,Pasta 2,,,,\r\n"
+            "01/01/2025,Lunedì,Pasta 1,,,,\r\n"
+        )
+
+    def test_empty_archive(self):
+        school = SchoolFactory()
+
+        assert read_archive(school).namelist() == []
+
+    def test_archive_can_be_uploaded_again(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        for season in Meal.Seasons.values:
+            SimpleMeal.objects.create(
+                school=school,
+                week=1,
+                day=Meal.Days.LUNEDÌ,
+                season=season,
+                menu="Pasta",
+            )
+        content = b"".join(iter_menu_archive(school))
+
+        entries, errors = read_menu_archive(
+            SimpleUploadedFile("menu.zip", content), school
+        )
+        changed, unchanged = import_menu_entries(entries, school)
+
+        assert errors == []
+        assert (changed, unchanged) == (0, 2)
+
+    def test_annual_archive_can_be_uploaded_again(self):
+        school = SchoolFactory(annual_menu=True)
+        for day in (1, 2):
+            AnnualMeal.objects.create(
+                school=school,
+                date=date(2025, 1, day + 5),
+                day=day,
+                menu="Pasta\nPollo\nPatate\nMela\nPane",
+            )
+        content = b"".join(iter_menu_archive(school))
+
+        entries, errors = read_menu_archive(
+            SimpleUploadedFile("menu.zip", content), school
+        )
+        changed, unchanged = import_menu_entries(entries, school)
+
+        assert errors == []
+        assert (changed, unchanged) == (0, 2)
@@ -165,7 +165,9 @@ class TestUploadMenuForm:
 
         # Assert the form is invalid
         assert form.is_valid() is False
-        assert form.errors == {"file": ["Il file deve essere in formato csv"]}
+        assert form.errors == {
+            "file": ["Il file deve essere in formato csv, xlsx o ods"]
+        }
 
     def def_form_no_file(self):
         # Initialize the form with mock data and file
@@ -239,7 +241,9 @@ class TestAnnualMenuForm:
 
         # Assert the form is invalid
         assert form.is_valid() is False
-        assert form.errors == {"file": ["Il file deve essere in formato csv"]}
+        assert form.errors == {
+            "file": ["Il file deve essere in formato csv, xlsx o ods"]
+        }
 
     def def_form_no_file(self):
         # Initialize the form with mock data and file
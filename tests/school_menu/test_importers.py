@@ -0,0 +1,891 @@
+import io
+import json
+import re
+import zipfile
+from datetime import date, datetime
+from unittest.mock import patch
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from openpyxl import Workbook
+
+from school_menu.importers import (
+    ARCHIVE_MAX_FILES,
+    cell_to_text,
+    delete_missing_meals,
+    diff_menu_dataset,
+    get_import_resource,
+    get_manifest_user,
+    get_menu_kind,
+    import_manifest_school,
+    import_menu_dataset,
+    import_menu_entries,
+    load_csv_dataset,
+    load_manifest,
+    load_menu_file,
+    parse_archive_name,
+    read_menu_archive,
+    read_menu_workbook,
+    rows_to_dataset,
+)
+from school_menu.models import AnnualMeal, DetailedMeal, Meal, School, SimpleMeal
+from school_menu.resources import (
+    AnnualMenuResource,
+    DetailedMealResource,
+    SimpleMealResource,
+)
+from school_menu.utils import check_menu_dataset
+from tests.school_menu.factories import SchoolFactory
+from tests.users.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+SIMPLE_CSV = "giorno,settimana,pranzo,spuntino,merenda\nLunedì,1,Pasta al Pomodoro,Mela,Yogurt\nMartedì,1,Risotto,Pera,Cracker\n"
+DETAILED_CSV = "giorno,settimana,primo,secondo,contorno,frutta,spuntino\nLunedì,1,Pasta,Pollo,Insalata,Mela,Yogurt\n"
+ANNUAL_CSV = "data,primo,secondo,contorno,frutta,altro\n01/01/2024,Pasta,Pollo,Insalata,Mela,Pane\n"
+
+
+def build_zip(files):
+    """Build an in-memory ZIP archive from a {name: content} dict"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for name, content in files.items():
+            zip_file.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def build_xlsx(sheets, name="menu.xlsx"):
+    """Build an uploaded XLSX workbook from a {sheet_name: rows} dict"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def ods_cell(value, repeat=1):
+    """Build the XML of an ODS cell, typed like LibreOffice does"""
+    attrs = f' table:number-columns-repeated="{repeat}"' if repeat > 1 else ""
+    if value is None:
+        return f"<table:table-cell{attrs}/>"
+    if isinstance(value, date):
+        return f'<table:table-cell{attrs} office:value-type="date" office:date-value="{value.isoformat()}"><text:p>{value:%d/%m/%y}</text:p></table:table-cell>'
+    if isinstance(value, int | float):
+        return f'<table:table-cell{attrs} office:value-type="float" office:value="{value}"><text:p>{value}</text:p></table:table-cell>'
+    paragraphs = "".join(f"<text:p>{line}</text:p>" for line in value.split("\n"))
+    return f'<table:table-cell{attrs} office:value-type="string">{paragraphs}</table:table-cell>'
+
+
+def build_ods(sheets, name="menu.ods"):
+    """Build an uploaded ODS spreadsheet from a {sheet_name: rows} dict"""
+    tables = "".join(
+        f'<table:table table:name="{title}">'
+        + "".join(
+            f"<table:table-row>{''.join(ods_cell(value) for value in row)}"
+            + f"{ods_cell(None, repeat=1000)}</table:table-row>"
+            for row in rows
+        )
+        + '<table:table-row table:number-rows-repeated="1000000">'
+        + f"{ods_cell(None, repeat=1024)}</table:table-row>"
+        + "</table:table>"
+        for title, rows in sheets.items()
+    )
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        "<office:document-content"
+        ' xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+        ' xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"'
+        ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
+        f"<office:body><office:spreadsheet>{tables}</office:spreadsheet></office:body>"
+        "</office:document-content>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as ods:
+        ods.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet")
+        ods.writestr("content.xml", content)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+SIMPLE_ROWS = [
+    ["giorno", "settimana", "pranzo", "spuntino", "merenda"],
+    ["Lunedì", 1, "Pasta al Pomodoro", "Mela", "Yogurt"],
+    ["Martedì", 1.0, "Risotto", "Pera", "Cracker"],
+]
+ANNUAL_ROWS = [
+    ["data", "primo", "secondo", "contorno", "frutta", "altro"],
+    [datetime(2024, 1, 1), "Pasta", "Pollo", "Insalata", "Mela", "Pane"],
+]
+
+
+class TestMenuKind:
+    @pytest.mark.parametrize(
+        "menu_type, annual_menu, kind, resource_class",
+        [
+            (School.Types.SIMPLE, False, "simple", SimpleMealResource),
+            (School.Types.DETAILED, False, "detailed", DetailedMealResource),
+            (School.Types.DETAILED, True, "annual", AnnualMenuResource),
+        ],
+    )
+    def test_kind_and_resource(self, menu_type, annual_menu, kind, resource_class):
+        school = SchoolFactory(menu_type=menu_type, annual_menu=annual_menu)
+
+        assert get_menu_kind(school) == kind
+        assert isinstance(get_import_resource(school), resource_class)
+
+
+class TestParseArchiveName:
+    @pytest.mark.parametrize(
+        "name, annual, expected",
+        [
+            (
+                "STANDARD/invernale.csv",
+                False,
+                (Meal.Types.STANDARD, Meal.Seasons.INVERNALE),
+            ),
+            (
+                "menu/NO_GLUTEN/menu_estivo.csv",
+                False,
+                (Meal.Types.GLUTEN_FREE, Meal.Seasons.ESTIVO),
+            ),
+            (
+                "no_lactose_Invernale.csv",
+                False,
+                (Meal.Types.LACTOSE_FREE, Meal.Seasons.INVERNALE),
+            ),
+            (
+                "VEGETARIAN_menu_estivo.csv",
+                False,
+                (Meal.Types.VEGETARIAN, Meal.Seasons.ESTIVO),
+            ),
+            ("SPECIAL.csv", True, (Meal.Types.SPECIAL, None)),
+            ("STANDARD/2024.csv", True, (Meal.Types.STANDARD, None)),
+            ("STANDARD/primavera.csv", False, None),
+            ("STANDARD.csv", False, None),
+            ("menu.csv", False, None),
+            ("STANDARDS.csv", True, None),
+        ],
+    )
+    def test_parse(self, name, annual, expected):
+        assert parse_archive_name(name, annual=annual) == expected
+
+
+class TestImportMenuDataset:
+    def test_simple_menu_invalidates_cache_once(
+        self, django_capture_on_commit_callbacks
+    ):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        dataset = load_csv_dataset(SIMPLE_CSV)
+
+        with (
+            patch("school_menu.cache.cache") as mock_cache,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            result, changed, unchanged = import_menu_dataset(
+                dataset, school, Meal.Types.STANDARD, Meal.Seasons.INVERNALE
+            )
+
+        assert not result.has_errors()
+        assert (changed, unchanged) == (2, 0)
+        assert SimpleMeal.objects.filter(school=school).count() == 2
+        # One invalidation = 6 patterns, instead of 6 per saved row
+        assert mock_cache.delete_pattern.call_count == 6
+
+    def test_annual_menu_fills_missing_dates(self):
+        school = SchoolFactory(annual_menu=True)
+        dataset = load_csv_dataset(ANNUAL_CSV)
+
+        with patch("school_menu.importers.fill_missing_dates") as mock_fill:
+            result, _, _ = import_menu_dataset(dataset, school, Meal.Types.STANDARD)
+
+        assert not result.has_errors()
+        assert AnnualMeal.objects.filter(school=school).count() == 1
+        mock_fill.assert_called_once_with(school, Meal.Types.STANDARD)
+
+
+class TestDiffMenuDataset:
+    def test_reupload_skips_writes_and_invalidation(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        import_menu_dataset(
+            load_csv_dataset(SIMPLE_CSV),
+            school,
+            Meal.Types.STANDARD,
+            Meal.Seasons.INVERNALE,
+        )
+
+        with (
+            patch("school_menu.cache.cache") as mock_cache,
+            patch(
+                "school_menu.importers.SimpleMealResource.import_data"
+            ) as mock_import,
+        ):
+            result, changed, unchanged = import_menu_dataset(
+                load_csv_dataset(SIMPLE_CSV),
+                school,
+                Meal.Types.STANDARD,
+                Meal.Seasons.INVERNALE,
+            )
+
+        assert (result, changed, unchanged) == (None, 0, 2)
+        mock_import.assert_not_called()
+        mock_cache.delete_pattern.assert_not_called()
+
+    def test_only_changed_rows_are_written(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        import_menu_dataset(
+            load_csv_dataset(SIMPLE_CSV),
+            school,
+            Meal.Types.STANDARD,
+            Meal.Seasons.INVERNALE,
+        )
+        content = SIMPLE_CSV.replace("Risotto", "Risotto ai funghi")
+        content += "Mercoledì,1,Minestrone,Banana,Yogurt\n"
+
+        changed_dataset, unchanged = diff_menu_dataset(
+            load_csv_dataset(content),
+            school,
+            Meal.Types.STANDARD,
+            Meal.Seasons.INVERNALE,
+        )
+
+        assert unchanged == 1
+        assert changed_dataset["pranzo"] == ["Risotto ai funghi", "Minestrone"]
+
+        result, changed, unchanged = import_menu_dataset(
+            load_csv_dataset(content),
+            school,
+            Meal.Types.STANDARD,
+            Meal.Seasons.INVERNALE,
+        )
+        assert (changed, unchanged) == (2, 1)
+        assert SimpleMeal.objects.filter(school=school).count() == 3
+
+    def test_other_type_and_season_are_not_compared(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        import_menu_dataset(
+            load_csv_dataset(SIMPLE_CSV),
+            school,
+            Meal.Types.STANDARD,
+            Meal.Seasons.INVERNALE,
+        )
+
+        for meal_type, season in [
+            (Meal.Types.STANDARD, Meal.Seasons.ESTIVO),
+            (Meal.Types.VEGETARIAN, Meal.Seasons.INVERNALE),
+        ]:
+            changed_dataset, unchanged = diff_menu_dataset(
+                load_csv_dataset(SIMPLE_CSV), school, meal_type, season
+            )
+            assert (len(changed_dataset), unchanged) == (2, 0)
+
+    def test_missing_columns_are_not_compared(self):
+        school = SchoolFactory(menu_type=School.Types.DETAILED)
+        import_menu_dataset(
+            load_csv_dataset(DETAILED_CSV),
+            school,
+            Meal.Types.STANDARD,
+            Meal.Seasons.INVERNALE,
+        )
+        content = "giorno,settimana,primo\nLunedì,1,Pasta\n"
+
+        changed_dataset, unchanged = diff_menu_dataset(
+            load_csv_dataset(content),
+            school,
+            Meal.Types.STANDARD,
+            Meal.Seasons.INVERNALE,
+        )
+
+        assert (len(changed_dataset), unchanged) == (0, 1)
+
+    def test_annual_menu(self):
+        school = SchoolFactory(annual_menu=True)
+        import_menu_dataset(load_csv_dataset(ANNUAL_CSV), school, Meal.Types.STANDARD)
+        content = ANNUAL_CSV + "2/1/2024,Riso,,Carote,Pera,\n"
+
+        changed_dataset, unchanged = diff_menu_dataset(
+            load_csv_dataset(content), school, Meal.Types.STANDARD
+        )
+
+        assert unchanged == 1
+        assert changed_dataset["data"] == ["2/1/2024"]
+
+        import_menu_dataset(load_csv_dataset(content), school, Meal.Types.STANDARD)
+        meal = AnnualMeal.objects.get(school=school, date=date(2024, 1, 2))
+        assert meal.menu == "Riso\nCarote\nPera"
+        # The stored menu joins the non empty courses: the row is now unchanged
+        _, unchanged = diff_menu_dataset(
+            load_csv_dataset(content), school, Meal.Types.STANDARD
+        )
+        assert unchanged == 2
+
+
+class TestReadMenuArchive:
+    def test_reads_every_menu(self):
+        school = SchoolFactory(menu_type=School.Types.DETAILED)
+        archive = build_zip(
+            {
+                "STANDARD/invernale.csv": DETAILED_CSV,
+                "STANDARD/estivo.csv": DETAILED_CSV,
+                "NO_GLUTEN_invernale.csv": DETAILED_CSV,
+                "__MACOSX/STANDARD/._invernale.csv": "junk",
+                ".hidden.csv": "junk",
+                "README.txt": "ignored",
+            }
+        )
+
+        entries, errors = read_menu_archive(archive, school)
+
+        assert errors == []
+        assert [
+            (name, meal_type, season) for name, meal_type, season, _ in entries
+        ] == [
+            ("STANDARD/invernale.csv", Meal.Types.STANDARD, Meal.Seasons.INVERNALE),
+            ("STANDARD/estivo.csv", Meal.Types.STANDARD, Meal.Seasons.ESTIVO),
+            ("NO_GLUTEN_invernale.csv", Meal.Types.GLUTEN_FREE, Meal.Seasons.INVERNALE),
+        ]
+        assert DetailedMeal.objects.count() == 0
+
+    def test_collects_errors_of_every_file(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        archive = build_zip(
+            {
+                "STANDARD/invernale.csv": SIMPLE_CSV,
+                "STANDARD_invernale.csv": SIMPLE_CSV,
+                "menu.csv": SIMPLE_CSV,
+                "NO_GLUTEN/estivo.csv": SIMPLE_CSV.replace("Lunedì", "Lun"),
+                "VEGETARIAN/estivo.csv": b"\xff\xfe",
+            }
+        )
+
+        entries, errors = read_menu_archive(archive, school)
+
+        assert len(entries) == 1
+        assert errors[0].startswith("STANDARD_invernale.csv: menu già presente")
+        assert errors[1].startswith("menu.csv: nome non riconosciuto")
+        assert errors[2].startswith("NO_GLUTEN/estivo.csv: ")
+        assert errors[3] == 'NO_GLUTEN/estivo.csv: Riga 2, colonna "giorno": Lun'
+        assert errors[4].startswith("VEGETARIAN/estivo.csv: file non valido")
+
+    @pytest.mark.parametrize(
+        "archive, message",
+        [
+            (
+                io.BytesIO(b"not a zip"),
+                "Il file caricato non è un archivio ZIP valido.",
+            ),
+            (build_zip({"README.txt": "no csv"}), "L'archivio non contiene file CSV."),
+            (
+                build_zip(
+                    {f"STANDARD_{i}.csv": "" for i in range(ARCHIVE_MAX_FILES + 1)}
+                ),
+                f"L'archivio contiene troppi file (massimo {ARCHIVE_MAX_FILES}).",
+            ),
+        ],
+    )
+    def test_rejects_invalid_archives(self, archive, message):
+        school = SchoolFactory()
+
+        assert read_menu_archive(archive, school) == ([], [message])
+
+    def test_rejects_oversized_archives(self):
+        school = SchoolFactory()
+        archive = build_zip({"STANDARD/invernale.csv": SIMPLE_CSV})
+
+        with patch("school_menu.importers.ARCHIVE_MAX_SIZE", 10):
+            entries, errors = read_menu_archive(archive, school)
+
+        assert entries == []
+        assert errors == ["L'archivio è troppo grande."]
+
+
+class TestImportMenuEntries:
+    def test_imports_all_entries_with_single_invalidation(
+        self, django_capture_on_commit_callbacks
+    ):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        archive = build_zip(
+            {
+                f"{folder}/{season}.csv": SIMPLE_CSV
+                for folder in ["STANDARD", "NO_GLUTEN", "NO_LACTOSE", "VEGETARIAN"]
+                for season in ["estivo", "invernale"]
+            }
+        )
+        entries, errors = read_menu_archive(archive, school)
+        assert errors == []
+
+        with (
+            patch("school_menu.cache.cache") as mock_cache,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            changed, unchanged = import_menu_entries(entries, school)
+
+        assert (changed, unchanged) == (16, 0)
+        assert SimpleMeal.objects.filter(school=school).count() == 16
+        assert mock_cache.delete_pattern.call_count == 6
+
+    def test_rolls_back_every_entry_on_error(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        archive = build_zip(
+            {
+                "STANDARD/invernale.csv": SIMPLE_CSV,
+                "STANDARD/estivo.csv": SIMPLE_CSV,
+            }
+        )
+        entries, _ = read_menu_archive(archive, school)
+
+        def import_then_fail(dataset, *args, **kwargs):
+            # The first file is imported for real, the second one fails
+            if SimpleMeal.objects.filter(school=school).exists():
+                raise Exception("row error")
+            return import_menu_dataset(dataset, *args, **kwargs)
+
+        with patch(
+            "school_menu.importers.import_menu_dataset", side_effect=import_then_fail
+        ):
+            with pytest.raises(Exception, match="row error"):
+                import_menu_entries(entries, school)
+
+        assert SimpleMeal.objects.filter(school=school).count() == 0
+
+
+class TestSpreadsheetRows:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            (None, ""),
+            ("Pasta", "Pasta"),
+            (1, "1"),
+            (2.0, "2"),
+            (2.5, "2.5"),
+            (date(2024, 1, 5), "05/01/2024"),
+            (datetime(2024, 1, 5, 0, 0), "05/01/2024"),
+        ],
+    )
+    def test_cell_to_text(self, value, expected):
+        assert cell_to_text(value) == expected
+
+    def test_rows_to_dataset(self):
+        rows = [
+            [None, None],
+            ["giorno", "settimana", None],
+            ["Lunedì", 1, "extra", "ignored"],
+            [None, None, None],
+            ["Martedì"],
+        ]
+
+        dataset = rows_to_dataset(rows)
+
+        assert dataset.headers == ["giorno", "settimana"]
+        assert dataset.dict == [
+            {"giorno": "Lunedì", "settimana": "1"},
+            {"giorno": "Martedì", "settimana": ""},
+        ]
+
+    def test_rows_to_dataset_empty(self):
+        dataset = rows_to_dataset([[None, None]])
+
+        assert dataset.headers is None
+        assert len(dataset) == 0
+
+
+class TestLoadMenuFile:
+    def test_csv(self):
+        file = SimpleUploadedFile("menu.csv", SIMPLE_CSV.encode("utf-8"))
+
+        dataset = load_menu_file(file)
+
+        assert dataset.headers == SIMPLE_ROWS[0]
+        assert len(dataset) == 2
+
+    @pytest.mark.parametrize("build", [build_xlsx, build_ods])
+    def test_spreadsheet_reads_first_sheet(self, build):
+        file = build({"Menu": SIMPLE_ROWS, "Altro": [["foo"]]})
+
+        dataset = load_menu_file(file)
+
+        assert dataset.headers == SIMPLE_ROWS[0]
+        assert dataset[0] == ("Lunedì", "1", "Pasta al Pomodoro", "Mela", "Yogurt")
+        assert dataset[1] == ("Martedì", "1", "Risotto", "Pera", "Cracker")
+        errors, _ = check_menu_dataset(dataset, "simple")
+        assert errors == []
+
+    @pytest.mark.parametrize("build", [build_xlsx, build_ods])
+    def test_spreadsheet_annual_dates(self, build):
+        file = build({"Menu": ANNUAL_ROWS})
+
+        dataset = load_menu_file(file)
+
+        assert dataset["data"] == ["01/01/2024"]
+        errors, _ = check_menu_dataset(dataset, "annual")
+        assert errors == []
+
+    def test_ods_multiline_and_repeated_cells(self):
+        rows = [["giorno", "pranzo"], ["Lunedì", "Pasta\nPane"]]
+        file = build_ods({"Menu": rows})
+
+        dataset = load_menu_file(file)
+
+        # Trailing repeated empty cells and rows are not expanded
+        assert dataset.headers == ["giorno", "pranzo"]
+        assert dataset.dict == [{"giorno": "Lunedì", "pranzo": "Pasta\nPane"}]
+
+    def test_ods_repeated_rows(self):
+        file = build_ods({"Menu": [["giorno"]]})
+        content = zipfile.ZipFile(file).read("content.xml").decode()
+        content = content.replace(
+            "<table:table-row>", '<table:table-row table:number-rows-repeated="3">'
+        )
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as ods:
+            ods.writestr("content.xml", content)
+
+        dataset = load_menu_file(SimpleUploadedFile("menu.ods", buffer.getvalue()))
+
+        assert dataset.headers == ["giorno"]
+        assert dataset["giorno"] == ["giorno", "giorno"]
+
+    @staticmethod
+    def repeat_ods_row(repeat, attribute):
+        """Build an ODS menu whose 'Lunedì' row or cell is repeated"""
+        file = build_ods({"Menu": [["giorno"], ["Lunedì"]]})
+        content = zipfile.ZipFile(file).read("content.xml").decode()
+        cell = '<table:table-cell office:value-type="string"><text:p>Lunedì'
+        if attribute == "number-rows-repeated":
+            row = f'<table:table-row table:{attribute}="{repeat}">{cell}'
+        else:
+            row = "<table:table-row>" + cell.replace(
+                "<table:table-cell", f'<table:table-cell table:{attribute}="{repeat}"'
+            )
+        content = content.replace(f"<table:table-row>{cell}", row)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as ods:
+            ods.writestr("content.xml", content)
+        return SimpleUploadedFile("menu.ods", buffer.getvalue())
+
+    def test_ods_repeated_non_empty_rows(self):
+        file = self.repeat_ods_row(3, "number-rows-repeated")
+
+        dataset = load_menu_file(file)
+
+        assert dataset["giorno"] == ["Lunedì"] * 3
+
+    @pytest.mark.parametrize(
+        "attribute", ["number-rows-repeated", "number-columns-repeated"]
+    )
+    def test_ods_non_empty_repeat_over_limit_is_rejected(self, attribute):
+        file = self.repeat_ods_row(1000000000, attribute)
+
+        with pytest.raises(ValueError, match="troppo grande"):
+            load_menu_file(file)
+
+    @pytest.mark.parametrize("build", [build_xlsx, build_ods])
+    def test_spreadsheet_too_many_rows(self, build):
+        file = build({"Menu": [["giorno"], ["Lunedì"], ["Martedì"]]})
+
+        with patch("school_menu.importers.SPREADSHEET_MAX_ROWS", 1):
+            with pytest.raises(ValueError, match="troppo grande"):
+                load_menu_file(file)
+
+    def test_spreadsheet_rows_up_to_the_limit(self):
+        file = build_xlsx({"Menu": [["giorno"], ["Lunedì"], ["Martedì"]]})
+
+        with patch("school_menu.importers.SPREADSHEET_MAX_ROWS", 2):
+            dataset = load_menu_file(file)
+
+        assert dataset["giorno"] == ["Lunedì", "Martedì"]
+
+    def test_ods_too_large(self):
+        file = build_ods({"Menu": SIMPLE_ROWS})
+
+        with patch("school_menu.importers.ARCHIVE_MAX_SIZE", 10):
+            with pytest.raises(ValueError, match="troppo grande"):
+                load_menu_file(file)
+
+
+class TestReadMenuWorkbook:
+    @pytest.mark.parametrize("build", [build_xlsx, build_ods])
+    def test_reads_every_sheet(self, build):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+        file = build(
+            {
+                "STANDARD_invernale": SIMPLE_ROWS,
+                "NO_GLUTEN_estivo": SIMPLE_ROWS,
+                "Foglio1": SIMPLE_ROWS,
+            }
+        )
+
+        entries, errors = read_menu_workbook(file, school)
+
+        assert [
+            (name, meal_type, season) for name, meal_type, season, _ in entries
+        ] == [
+            ("STANDARD_invernale", Meal.Types.STANDARD, Meal.Seasons.INVERNALE),
+            ("NO_GLUTEN_estivo", Meal.Types.GLUTEN_FREE, Meal.Seasons.ESTIVO),
+        ]
+        assert errors == [
+            "Foglio1: nome non riconosciuto. Usa il formato TIPO_stagione (es. STANDARD_invernale)."
+        ]
+
+        import_menu_entries(entries, school)
+        assert SimpleMeal.objects.filter(school=school).count() == 4
+
+    def test_invalid_workbook(self):
+        school = SchoolFactory()
+        file = SimpleUploadedFile("menu.xlsx", b"not a workbook")
+
+        entries, errors = read_menu_workbook(file, school)
+
+        assert entries == []
+        assert errors[0].startswith("Il foglio di calcolo non è valido.")
+
+
+class TestManifest:
+    def write_manifest(self, tmp_path, schools):
+        path = tmp_path / "manifest.json"
+        path.write_text(json.dumps({"schools": schools}), encoding="utf-8")
+        return path
+
+    def test_load_manifest(self, tmp_path):
+        schools = [
+            {"name": "Scuola", "city": "Novara", "files": [{"path": "a.csv"}]},
+            {
+                "name": "Asilo",
+                "city": "Novara",
+                "user": "asilo@example.com",
+                "files": [{"path": "b.csv"}],
+            },
+        ]
+
+        assert load_manifest(self.write_manifest(tmp_path, schools)) == schools
+
+    @pytest.mark.parametrize(
+        "schools, message",
+        [
+            ([], "non empty 'schools' list"),
+            (
+                [{"name": "A", "city": "B", "files": [{"path": "a.csv"}], "foo": 1}],
+                "unknown keys ['foo']",
+            ),
+            ([{"name": "A", "files": [{"path": "a.csv"}]}], "are required"),
+            ([{"name": "A", "city": "B", "files": [{"menu": "STANDARD"}]}], "'path'"),
+            (
+                [
+                    {"name": "A", "city": "B", "files": [{"path": "a.csv"}]},
+                    {"name": "C", "city": "D", "files": [{"path": "c.csv"}]},
+                ],
+                "School C: user already used",
+            ),
+        ],
+    )
+    def test_load_invalid_manifest(self, tmp_path, schools, message):
+        with pytest.raises(ValueError, match=re.escape(message)):
+            load_manifest(self.write_manifest(tmp_path, schools))
+
+    def test_get_manifest_user(self):
+        superuser = UserFactory(is_superuser=True)
+
+        assert get_manifest_user(None) == superuser
+        assert get_manifest_user(superuser.email) == superuser
+        user = get_manifest_user("new@example.com")
+        assert user.email == "new@example.com"
+        assert not user.has_usable_password()
+
+    def test_get_manifest_user_without_superuser(self):
+        with pytest.raises(ValueError, match="No superuser"):
+            get_manifest_user(None)
+
+    def test_import_manifest_school(self, tmp_path):
+        (tmp_path / "STANDARD").mkdir()
+        (tmp_path / "STANDARD" / "menu_estivo.csv").write_text(SIMPLE_CSV)
+        (tmp_path / "asilo.csv").write_text(SIMPLE_CSV)
+        spec = {
+            "name": "Asilo",
+            "city": "Novara",
+            "user": "asilo@example.com",
+            "menu_type": School.Types.SIMPLE,
+            "vegetarian": True,
+            "files": [
+                {"path": "STANDARD/menu_estivo.csv"},
+                {"path": "asilo.csv", "menu": "VEGETARIAN_invernale"},
+            ],
+        }
+
+        stats = import_manifest_school(spec, tmp_path)
+
+        assert stats["errors"] == []
+        assert (stats["files"], stats["changed"], stats["unchanged"]) == (2, 4, 0)
+        school = School.objects.get(user__email="asilo@example.com")
+        assert school.vegetarian is True
+        assert (
+            SimpleMeal.objects.filter(
+                school=school, type=Meal.Types.VEGETARIAN, season=Meal.Seasons.INVERNALE
+            ).count()
+            == 2
+        )
+
+        # Running the same manifest again only updates the school
+        stats = import_manifest_school(spec, tmp_path)
+        assert (stats["changed"], stats["unchanged"]) == (0, 4)
+        assert School.objects.filter(user__email="asilo@example.com").count() == 1
+
+    def test_import_manifest_school_with_invalid_file(self, tmp_path):
+        (tmp_path / "menu.csv").write_text(SIMPLE_CSV.replace("Lunedì", "Lun"))
+        spec = {
+            "name": "Asilo",
+            "city": "Novara",
+            "user": "asilo@example.com",
+            "menu_type": School.Types.SIMPLE,
+            "files": [{"path": "menu.csv", "menu": "STANDARD_estivo"}],
+        }
+
+        stats = import_manifest_school(spec, tmp_path)
+
+        assert 'menu.csv: Riga 2, colonna "giorno": Lun' in stats["errors"]
+        assert not School.objects.filter(name="Asilo").exists()
+
+    def test_import_manifest_school_rolls_back_on_error(self, tmp_path):
+        (tmp_path / "menu.csv").write_text(SIMPLE_CSV)
+        spec = {
+            "name": "Asilo",
+            "city": "Novara",
+            "menu_type": School.Types.SIMPLE,
+            "files": [{"path": "menu.csv", "menu": "STANDARD_estivo"}],
+        }
+
+        # No superuser for a school without "user"
+        stats = import_manifest_school(spec, tmp_path)
+
+        assert stats["errors"] == ["No superuser found for a school without 'user'"]
+        assert SimpleMeal.objects.count() == 0
+
+    def test_import_manifest_school_deletes_missing_meals(self, tmp_path):
+        (tmp_path / "estivo.csv").write_text(SIMPLE_CSV)
+        (tmp_path / "invernale.csv").write_text(SIMPLE_CSV)
+        spec = {
+            "name": "Asilo",
+            "city": "Novara",
+            "user": "asilo@example.com",
+            "menu_type": School.Types.SIMPLE,
+            "files": [
+                {"path": "estivo.csv", "menu": "STANDARD_estivo"},
+                {"path": "invernale.csv", "menu": "STANDARD_invernale"},
+            ],
+        }
+        import_manifest_school(spec, tmp_path)
+        school = School.objects.get(name="Asilo")
+        # Another meal type, not in the manifest, is left alone
+        SimpleMeal.objects.create(
+            school=school,
+            week=1,
+            day=1,
+            season=Meal.Seasons.ESTIVO,
+            type=Meal.Types.VEGETARIAN,
+        )
+        # Tuesday is dropped from the summer menu
+        (tmp_path / "estivo.csv").write_text(SIMPLE_CSV.rsplit("Martedì", 1)[0])
+
+        stats = import_manifest_school(spec, tmp_path)
+
+        assert (stats["changed"], stats["unchanged"], stats["deleted"]) == (0, 3, 1)
+        assert set(
+            SimpleMeal.objects.filter(school=school).values_list(
+                "season", "type", "day"
+            )
+        ) == {
+            (Meal.Seasons.ESTIVO, Meal.Types.STANDARD, 1),
+            (Meal.Seasons.INVERNALE, Meal.Types.STANDARD, 1),
+            (Meal.Seasons.INVERNALE, Meal.Types.STANDARD, 2),
+            (Meal.Seasons.ESTIVO, Meal.Types.VEGETARIAN, 1),
+        }
+
+    def test_import_manifest_school_can_keep_missing_meals(self, tmp_path):
+        (tmp_path / "menu.csv").write_text(SIMPLE_CSV)
+        spec = {
+            "name": "Asilo",
+            "city": "Novara",
+            "user": "asilo@example.com",
+            "menu_type": School.Types.SIMPLE,
+            "files": [{"path": "menu.csv", "menu": "STANDARD_estivo"}],
+        }
+        import_manifest_school(spec, tmp_path)
+        (tmp_path / "menu.csv").write_text(SIMPLE_CSV.rsplit("Martedì", 1)[0])
+
+        stats = import_manifest_school(spec, tmp_path, keep_missing=True)
+
+        assert stats["deleted"] == 0
+        assert SimpleMeal.objects.count() == 2
+
+    def test_import_manifest_school_deletes_missing_annual_meals(self, tmp_path):
+        header = ANNUAL_CSV.splitlines()[0]
+        monday, wednesday = (
+            f"{day}/01/2024,Pasta,Pollo,Insalata,Mela,Pane" for day in ("01", "03")
+        )
+        (tmp_path / "menu.csv").write_text(f"{header}\n{monday}\n{wednesday}\n")
+        spec = {
+            "name": "Asilo",
+            "city": "Novara",
+            "user": "asilo@example.com",
+            "annual_menu": True,
+            "files": [{"path": "menu.csv", "menu": "STANDARD"}],
+        }
+        import_manifest_school(spec, tmp_path)
+        # Tuesday is filled in as an inactive day and kept by the next import
+        assert AnnualMeal.objects.filter(is_active=False).count() == 1
+        assert import_manifest_school(spec, tmp_path)["deleted"] == 0
+        (tmp_path / "menu.csv").write_text(f"{header}\n{monday}\n")
+
+        stats = import_manifest_school(spec, tmp_path)
+
+        assert stats["deleted"] == 2
+        assert list(AnnualMeal.objects.values_list("date", flat=True)) == [
+            date(2024, 1, 1)
+        ]
+
+    def test_empty_annual_menu_deletes_every_meal(self):
+        school = SchoolFactory(annual_menu=True)
+        for day in (1, 2):
+            AnnualMeal.objects.create(
+                school=school,
+                type=Meal.Types.STANDARD,
+                date=date(2024, 1, day),
+                day=day,
+                is_active=day == 1,
+            )
+        dataset = load_csv_dataset(ANNUAL_CSV.splitlines()[0] + "\n")
+
+        assert delete_missing_meals(dataset, school, Meal.Types.STANDARD) == 2
+
+    def test_import_manifest_school_invalidates_after_the_commit(
+        self, tmp_path, django_capture_on_commit_callbacks
+    ):
+        (tmp_path / "menu.csv").write_text(SIMPLE_CSV)
+        spec = {
+            "name": "Asilo",
+            "city": "Novara",
+            "user": "asilo@example.com",
+            "menu_type": School.Types.SIMPLE,
+            "files": [{"path": "menu.csv", "menu": "STANDARD_estivo"}],
+        }
+
+        def meal_patterns():
+            return [
+                call.args[0]
+                for call in mock_cache.delete_pattern.call_args_list
+                if call.args[0].startswith("*meal:")
+            ]
+
+        with patch("school_menu.cache.cache") as mock_cache:
+            with django_capture_on_commit_callbacks() as callbacks:
+                import_manifest_school(spec, tmp_path)
+                # Not even by the save of the school
+                assert meal_patterns() == []
+
+            assert len(callbacks) == 1
+            callbacks[0]()
+
+        school = School.objects.get(name="Asilo")
+        assert meal_patterns() == [f"*meal:{school.id}:*"]
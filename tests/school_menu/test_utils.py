@@ -3,31 +3,40 @@ from unittest import mock
 from unittest.mock import MagicMock
 
 import pytest
-from django.http import Http404
-from django.test import TestCase
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
 from tablib import Dataset
 
 from school_menu.models import AnnualMeal, School, SimpleMeal
 from school_menu.utils import (
+    NOTIFICATIONS_STATUS_COOKIE,
     ChoicesWidget,
     build_types_menu,
     calculate_week,
+    check_menu_dataset,
     detect_csv_format,
     detect_menu_type,
     fill_missing_dates,
     filter_dataset_columns,
+    format_dataset_error,
     get_alt_menu,
     get_current_date,
     get_meals_for_annual_menu,
     get_notifications_status,
+    get_schools_in_session,
+    get_schools_with_menu,
     get_season,
     get_user,
+    is_school_in_session,
+    set_notifications_status,
+    summarize_dataset_errors,
     validate_annual_dataset,
     validate_dataset,
 )
 from tests.notifications.factories import AnonymousMenuNotificationFactory
 from tests.school_menu.factories import (
     AnnualMealFactory,
+    DetailedMealFactory,
     SchoolFactory,
     SimpleMealFactory,
 )
@@ -689,6 +698,120 @@ class TestValidateAnnualDataset:
         )
 
 
+class TestCheckMenuDataset:
+    def test_collects_every_error_with_coordinates(self):
+        dataset = Dataset()
+        dataset.headers = ["giorno", "settimana", "pranzo", "spuntino", "merenda"]
+        dataset.append(["Lunedì", 1, "Pasta", "Yogurt", "Mela"])
+        dataset.append(["Lun", 5, "Pasta", "Yogurt", "Mela"])
+        dataset.append(["Martedì", "prima", "Riso", "Yogurt", "Mela"])
+
+        errors, filtered_dataset = check_menu_dataset(dataset, "simple")
+
+        assert [(e["row"], e["column"], e["value"]) for e in errors] == [
+            (3, "giorno", "Lun"),
+            (3, "settimana", 5),
+            (4, "settimana", "prima"),
+        ]
+        assert filtered_dataset.headers == dataset.headers
+
+    def test_summary_reports_each_error_once(self):
+        dataset = Dataset()
+        dataset.headers = ["giorno", "settimana", "pranzo", "spuntino", "merenda"]
+        dataset.append(["Lun", 1, "Pasta", "Yogurt", "Mela"])
+        dataset.append(["Mar", 5, "Pasta", "Yogurt", "Mela"])
+
+        validates, message, _ = validate_dataset(dataset, School.Types.SIMPLE)
+
+        assert validates is False
+        assert message == (
+            'Formato non valido. La colonna "giorno" contiene valori diversi dai giorni della settimana. '
+            'Formato non valido. La colonna "settimana" contiene valori non compresi fra 1 e 4.'
+        )
+
+    def test_text_longer_than_model_field(self):
+        dataset = Dataset()
+        dataset.headers = [
+            "giorno",
+            "settimana",
+            "primo",
+            "secondo",
+            "contorno",
+            "frutta",
+            "spuntino",
+        ]
+        dataset.append(["Lunedì", 1, "P" * 201, "Pollo", "", "Mela", "Yogurt"])
+
+        errors, _ = check_menu_dataset(dataset, "detailed")
+
+        assert len(errors) == 1
+        assert errors[0]["row"] == 2
+        assert errors[0]["column"] == "primo"
+        assert errors[0]["message"] == (
+            'Formato non valido. La colonna "primo" contiene testi più lunghi di 200 caratteri.'
+        )
+
+    def test_annual_collects_every_invalid_date(self):
+        dataset = Dataset()
+        dataset.headers = ["data", "primo", "secondo", "contorno", "frutta", "altro"]
+        dataset.append(["28/12/2024", "Pasta", "Pollo", "", "Mela", ""])
+        dataset.append(["31/02/2025", "Pasta", "Pollo", "", "Mela", ""])
+        dataset.append(["2025-03-01", "Pasta", "Pollo", "", "Mela", ""])
+        dataset.append(["3/3/2025", "Pasta", "Pollo", "", "Mela", ""])
+
+        errors, _ = check_menu_dataset(dataset, "annual")
+
+        assert [(e["row"], e["value"]) for e in errors] == [
+            (3, "31/02/2025"),
+            (4, "2025-03-01"),
+        ]
+
+    def test_annual_menu_longer_than_model_field(self):
+        dataset = Dataset()
+        dataset.headers = ["data", "primo", "secondo", "contorno", "frutta", "altro"]
+        dataset.append(["28/12/2024", "P" * 300, "S" * 300, "", "", ""])
+
+        errors, _ = check_menu_dataset(dataset, "annual")
+
+        assert len(errors) == 1
+        assert errors[0]["row"] == 2
+        assert errors[0]["column"] is None
+        assert "supera i 600 caratteri" in errors[0]["message"]
+
+    def test_header_errors_have_no_row(self):
+        dataset = Dataset()
+        dataset.headers = ["giorno", "settimana", "pranzo"]
+        dataset.append(["Lun", 9, "Pasta"])
+
+        errors, _ = check_menu_dataset(dataset, "simple")
+
+        assert len(errors) == 1
+        assert errors[0]["row"] is None
+        assert "Colonne mancanti" in errors[0]["message"]
+
+
+class TestDatasetErrorFormatting:
+    def test_summarize_no_errors(self):
+        assert summarize_dataset_errors([]) is None
+
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (
+                {"row": 3, "column": "giorno", "value": "Lun", "message": "x"},
+                'Riga 3, colonna "giorno": Lun',
+            ),
+            ({"row": 4, "column": None, "value": None, "message": "x"}, "Riga 4"),
+            (
+                {"row": None, "column": "data", "value": None, "message": "x"},
+                'colonna "data"',
+            ),
+        ],
+    )
+    def test_format_dataset_error(self, error, expected):
+        assert format_dataset_error(error) == expected
+
+
 class TestChoicesWidget:
     @pytest.fixture
     def choices_widget(self):
@@ -823,14 +946,26 @@ class TestFillMissingDates(TestCase):
 
 
 class TestGetNotificationsStatus(TestCase):
-    def test_get_notifications_status_no_pk(self):
+    def get_request(self, notification=None):
+        """Return a request carrying the status cookie of a subscription"""
+        request = RequestFactory().get("/")
+        if notification:
+            response = HttpResponse()
+            set_notifications_status(request, response, notification)
+            request.COOKIES[NOTIFICATIONS_STATUS_COOKIE] = response.cookies[
+                NOTIFICATIONS_STATUS_COOKIE
+            ].value
+        return request
+
+    def test_get_notifications_status_no_cookie(self):
         school = SchoolFactory()
-        assert get_notifications_status(None, school) is False
+        assert get_notifications_status(self.get_request(), school) is False
 
-    def test_get_notifications_status_not_found(self):
+    def test_get_notifications_status_tampered_cookie(self):
         school = SchoolFactory()
-        with pytest.raises(Http404):
-            get_notifications_status(999, school)
+        request = self.get_request()
+        request.COOKIES[NOTIFICATIONS_STATUS_COOKIE] = f"{school.pk}:1"
+        assert get_notifications_status(request, school) is False
 
     def test_get_notifications_status_school_mismatch(self):
         school1 = SchoolFactory()
@@ -838,21 +973,25 @@ class TestGetNotificationsStatus(TestCase):
         notification = AnonymousMenuNotificationFactory(
             school=school1, daily_notification=True
         )
-        assert get_notifications_status(notification.pk, school2) is False
+        request = self.get_request(notification)
+        assert get_notifications_status(request, school2) is False
 
     def test_get_notifications_status_daily_notification_false(self):
         school = SchoolFactory()
         notification = AnonymousMenuNotificationFactory(
             school=school, daily_notification=False
         )
-        assert get_notifications_status(notification.pk, school) is False
+        request = self.get_request(notification)
+        assert get_notifications_status(request, school) is False
 
     def test_get_notifications_status_success(self):
         school = SchoolFactory()
         notification = AnonymousMenuNotificationFactory(
             school=school, daily_notification=True
         )
-        assert get_notifications_status(notification.pk, school) is True
+        request = self.get_request(notification)
+        with self.assertNumQueries(0):
+            assert get_notifications_status(request, school) is True
 
 
 class TestDetectCSVFormat:
@@ -1073,3 +1212,100 @@ class TestFilterDatasetColumns:
         assert len(filtered_dataset) == 2
         assert filtered_dataset[0] == (1, "Lunedì", "Pasta", "Pollo")
         assert filtered_dataset[1] == (2, "Martedì", "Riso", "Pesce")
+
+
+class TestIsSchoolInSession:
+    def test_school_year_within_same_calendar_year(self):
+        """
+        Test is_school_in_session for a school year within the same calendar year.
+        """
+        school = SchoolFactory(start_month=2, start_day=1, end_month=6, end_day=30)
+        assert not is_school_in_session(school, date(2025, 1, 15))
+        assert is_school_in_session(school, date(2025, 4, 15))
+        assert not is_school_in_session(school, date(2025, 7, 15))
+
+    def test_school_year_spanning_calendar_years(self):
+        """
+        Test is_school_in_session for a school year spanning calendar years.
+        """
+        school = SchoolFactory(start_month=9, start_day=1, end_month=6, end_day=30)
+        assert is_school_in_session(school, date(2025, 10, 15))
+        assert is_school_in_session(school, date(2026, 3, 15))
+        assert not is_school_in_session(school, date(2025, 8, 15))
+
+    def test_get_schools_in_session(self, django_assert_num_queries):
+        in_session = SchoolFactory(start_month=9, end_month=6)
+        SchoolFactory(start_month=2, end_month=6)
+        schools = list(School.objects.all())
+
+        with django_assert_num_queries(0):
+            assert get_schools_in_session(schools, date(2025, 10, 15)) == {
+                in_session.pk
+            }
+
+
+class TestGetSchoolsWithMenu:
+    @pytest.fixture
+    def school(self):
+        return SchoolFactory(menu_type=School.Types.SIMPLE)
+
+    def test_with_annual_meal(self, school):
+        """Test that a school with an AnnualMeal on the date has a menu."""
+        target_date = date(2025, 8, 2)
+        AnnualMealFactory(school=school, date=target_date, is_active=True)
+        assert get_schools_with_menu([school], target_date) == {school.pk}
+
+    def test_weekend_without_annual_meal(self, school):
+        """Test that a school has no menu on a weekend without an AnnualMeal."""
+        target_date = date(2025, 8, 3)
+        assert get_schools_with_menu([school], target_date) == set()
+
+    def test_weekday_with_simple_meal(self, school):
+        """Test that a school has a menu on a weekday with a SimpleMeal."""
+        target_date = date(2025, 8, 4)
+        SimpleMealFactory(school=school, day=1)
+        assert get_schools_with_menu([school], target_date) == {school.pk}
+
+    def test_weekday_with_detailed_meal(self, school):
+        """Test that a detailed menu school has a menu with a DetailedMeal."""
+        school.menu_type = School.Types.DETAILED
+        school.save()
+        target_date = date(2025, 8, 5)
+        DetailedMealFactory(school=school, day=2)
+        assert get_schools_with_menu([school], target_date) == {school.pk}
+
+    def test_weekday_without_meal(self, school):
+        """Test that a school has no menu on a weekday without meals."""
+        target_date = date(2025, 8, 6)
+        assert get_schools_with_menu([school], target_date) == set()
+
+    def test_no_schools(self, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            assert get_schools_with_menu([], date(2025, 8, 4)) == set()
+
+    def test_all_schools_in_three_queries(self, django_assert_num_queries):
+        """Test the query count does not grow with the number of schools."""
+        monday = date(2025, 8, 4)
+        expected = set()
+        for _ in range(3):
+            simple = SchoolFactory(menu_type=School.Types.SIMPLE)
+            SimpleMealFactory(school=simple, day=1)
+            SimpleMealFactory(school=simple, day=1)
+            detailed = SchoolFactory(menu_type=School.Types.DETAILED)
+            DetailedMealFactory(school=detailed, day=1)
+            annual = SchoolFactory(menu_type=School.Types.DETAILED)
+            AnnualMealFactory(school=annual, date=monday, is_active=True)
+            expected |= {simple.pk, detailed.pk, annual.pk}
+            # A meal on another day and an inactive annual meal do not count
+            SimpleMealFactory(
+                school=SchoolFactory(menu_type=School.Types.SIMPLE), day=2
+            )
+            AnnualMealFactory(
+                school=SchoolFactory(menu_type=School.Types.SIMPLE),
+                date=monday,
+                is_active=False,
+            )
+        schools = list(School.objects.all())
+
+        with django_assert_num_queries(3):
+            assert get_schools_with_menu(schools, monday) == expected
@@ -1,15 +1,30 @@
+import io
+import zipfile
 from datetime import date, datetime
+from unittest.mock import patch
 
 import time_machine
 from django.contrib.messages import get_messages
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from openpyxl import Workbook
 from pytest_django.asserts import assertTemplateUsed
 
 from contacts.models import MenuReport
 from school_menu.models import AnnualMeal, DetailedMeal, Meal, School, SimpleMeal
 from school_menu.test import TestCase
-from school_menu.utils import calculate_week, get_current_date, get_season
+from school_menu.utils import (
+    NOTIFICATIONS_STATUS_COOKIE,
+    calculate_week,
+    get_current_date,
+    get_season,
+    set_notifications_status,
+)
+from tests.notifications.factories import AnonymousMenuNotificationFactory
 from tests.school_menu.factories import (
     AnnualMealFactory,
     DetailedMealFactory,
@@ -140,6 +155,30 @@ class IndexView(TestCase):
         assert response.context["school"] == school
         assert response.context["meal"] == meal
 
+    @time_machine.travel("2025-10-14")
+    def test_notifications_status_read_from_cookie(self):
+        school = SchoolFactory(
+            menu_type=School.Types.SIMPLE, start_month=9, end_month=6
+        )
+        notification = AnonymousMenuNotificationFactory(school=school)
+        cookie_response = HttpResponse()
+        set_notifications_status(
+            RequestFactory().get("/"), cookie_response, notification
+        )
+        self.client.cookies[NOTIFICATIONS_STATUS_COOKIE] = cookie_response.cookies[
+            NOTIFICATIONS_STATUS_COOKIE
+        ].value
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get("school_menu:school_menu", slug=school.slug)
+
+        self.response_200(response)
+        assert response.context["notifications_status"] is True
+        assert not any(
+            "notifications_anonymousmenunotification" in query["sql"]
+            for query in queries.captured_queries
+        )
+
     @time_machine.travel("2025-08-20")
     def test_get_when_school_not_in_session(self):
         user = self.make_user()
@@ -602,6 +641,55 @@ class TestUploadMenuView(TestCase):
         assert "HX-Refresh" in response.headers
         assert SimpleMeal.objects.filter(school=school).count() == 1
 
+    def test_upload_menu_post_same_file_reports_unchanged_rows(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user, menu_type=School.Types.SIMPLE)
+        csv_content = "giorno,settimana,pranzo,spuntino,merenda\nLunedì,1,Pasta al Pomodoro,Mela,Yogurt"
+
+        with self.login(user):
+            url = reverse(
+                "school_menu:upload_menu",
+                kwargs={"school_id": school.id, "meal_type": Meal.Types.STANDARD},
+            )
+            for _ in range(2):
+                data = {
+                    "file": SimpleUploadedFile(
+                        "simple_menu.csv", csv_content.encode("utf-8")
+                    ),
+                    "season": School.Seasons.INVERNALE,
+                }
+                response = self.post(url, data=data)
+
+        assert response.status_code == 204
+        messages = [str(m) for m in get_messages(response.wsgi_request)]
+        assert messages == [
+            "Menu caricato con successo: 1 righe modificate, 0 invariate",
+            "Menu caricato con successo: 0 righe modificate, 1 invariate",
+        ]
+
+    def test_upload_menu_post_xlsx_success(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user, menu_type=School.Types.SIMPLE)
+        workbook = Workbook()
+        workbook.active.append(["giorno", "settimana", "pranzo", "spuntino", "merenda"])
+        workbook.active.append(["Lunedì", 1, "Pasta al Pomodoro", "Mela", "Yogurt"])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+
+        with self.login(user):
+            url = reverse(
+                "school_menu:upload_menu",
+                kwargs={"school_id": school.id, "meal_type": Meal.Types.STANDARD},
+            )
+            data = {
+                "file": SimpleUploadedFile("simple_menu.xlsx", buffer.getvalue()),
+                "season": School.Seasons.INVERNALE,
+            }
+            response = self.post(url, data=data)
+
+        assert response.status_code == 204
+        assert SimpleMeal.objects.get(school=school).menu == "Pasta al Pomodoro"
+
     def test_upload_menu_post_invalid_data(self):
         user = self.make_user()
         school = SchoolFactory(user=user)
@@ -673,6 +761,37 @@ class TestUploadMenuView(TestCase):
         )
         assert SimpleMeal.objects.filter(school=school).count() == 0
 
+    def test_upload_menu_post_lists_every_invalid_row(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user, menu_type=School.Types.SIMPLE)
+
+        with self.login(user):
+            url = reverse(
+                "school_menu:upload_menu",
+                kwargs={"school_id": school.id, "meal_type": Meal.Types.STANDARD},
+            )
+            csv_content = (
+                "giorno,settimana,pranzo,spuntino,merenda\n"
+                "Lun,1,Pasta,Mela,Yogurt\n"
+                "Martedì,7,Riso,Mela,Yogurt"
+            )
+            data = {
+                "file": SimpleUploadedFile(
+                    "simple_menu.csv",
+                    csv_content.encode("utf-8"),
+                    content_type="text/csv",
+                ),
+                "season": School.Seasons.INVERNALE,
+            }
+            response = self.post(url, data=data)
+
+        assert response.status_code == 200
+        assert response.context["error_details"] == [
+            'Riga 2, colonna "giorno": Lun',
+            'Riga 3, colonna "settimana": 7',
+        ]
+        assert SimpleMeal.objects.filter(school=school).count() == 0
+
     def test_upload_menu_post_generic_exception(self):
         user = self.make_user()
         school = SchoolFactory(user=user)
@@ -1000,6 +1119,173 @@ class TestUploadAnnualMenuView(TestCase):
         assert "Pasta al Pomodoro, Ragù" in meal.menu
 
 
+class TestUploadMenuArchiveView(TestCase):
+    def build_archive(self, files):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zip_file:
+            for name, content in files.items():
+                zip_file.writestr(name, content)
+        return SimpleUploadedFile(
+            "menu.zip", buffer.getvalue(), content_type="application/zip"
+        )
+
+    def test_get(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user)
+
+        with self.login(user):
+            response = self.get(
+                reverse(
+                    "school_menu:upload_menu_archive", kwargs={"school_id": school.id}
+                )
+            )
+
+        assert response.status_code == 200
+        assertTemplateUsed(response, "upload-menu-archive.html")
+        assert "form" in response.context
+
+    def test_other_user_school_not_found(self):
+        user = self.make_user()
+        school = SchoolFactory()
+
+        with self.login(user):
+            response = self.get(
+                reverse(
+                    "school_menu:upload_menu_archive", kwargs={"school_id": school.id}
+                )
+            )
+
+        assert response.status_code == 404
+
+    def test_post_imports_every_menu(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user, menu_type=School.Types.SIMPLE)
+        csv_content = (
+            "giorno,settimana,pranzo,spuntino,merenda\nLunedì,1,Pasta,Mela,Yogurt"
+        )
+        archive = self.build_archive(
+            {
+                "STANDARD/invernale.csv": csv_content,
+                "STANDARD/estivo.csv": csv_content,
+                "NO_GLUTEN/invernale.csv": csv_content,
+            }
+        )
+
+        with self.login(user):
+            url = reverse(
+                "school_menu:upload_menu_archive", kwargs={"school_id": school.id}
+            )
+            response = self.post(url, data={"file": archive})
+
+        assert response.status_code == 204
+        assert "HX-Refresh" in response.headers
+        assert SimpleMeal.objects.filter(school=school).count() == 3
+        assert SimpleMeal.objects.filter(
+            school=school, type=Meal.Types.GLUTEN_FREE
+        ).exists()
+        message = list(get_messages(response.wsgi_request))[0]
+        assert (
+            str(message)
+            == "3 menu caricati con successo: 3 righe modificate, 0 invariate"
+        )
+
+    def test_post_workbook_imports_every_sheet(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user, menu_type=School.Types.SIMPLE)
+        workbook = Workbook()
+        workbook.active.title = "STANDARD_invernale"
+        workbook.create_sheet("VEGETARIAN_estivo")
+        for sheet in workbook.worksheets:
+            sheet.append(["giorno", "settimana", "pranzo", "spuntino", "merenda"])
+            sheet.append(["Lunedì", 1, "Pasta", "Mela", "Yogurt"])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+
+        with self.login(user):
+            url = reverse(
+                "school_menu:upload_menu_archive", kwargs={"school_id": school.id}
+            )
+            data = {"file": SimpleUploadedFile("menu.xlsx", buffer.getvalue())}
+            response = self.post(url, data=data)
+
+        assert response.status_code == 204
+        assert SimpleMeal.objects.filter(
+            school=school, type=Meal.Types.VEGETARIAN, season=Meal.Seasons.ESTIVO
+        ).exists()
+        assert SimpleMeal.objects.filter(school=school).count() == 2
+
+    def test_post_with_errors_imports_nothing(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user, menu_type=School.Types.SIMPLE)
+        csv_content = (
+            "giorno,settimana,pranzo,spuntino,merenda\nLunedì,1,Pasta,Mela,Yogurt"
+        )
+        archive = self.build_archive(
+            {
+                "STANDARD/invernale.csv": csv_content,
+                "STANDARD/estivo.csv": csv_content.replace("Lunedì", "Lun"),
+            }
+        )
+
+        with self.login(user):
+            url = reverse(
+                "school_menu:upload_menu_archive", kwargs={"school_id": school.id}
+            )
+            response = self.post(url, data={"file": archive})
+
+        assert response.status_code == 200
+        assertTemplateUsed(response, "upload-menu-archive.html")
+        assert "nessun menu è stato caricato" in response.context["error_message"]
+        assert (
+            'STANDARD/estivo.csv: Riga 2, colonna "giorno": Lun'
+            in response.context["error_details"]
+        )
+        assert SimpleMeal.objects.filter(school=school).count() == 0
+
+    def test_post_import_error(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user, menu_type=School.Types.SIMPLE)
+        csv_content = (
+            "giorno,settimana,pranzo,spuntino,merenda\nLunedì,1,Pasta,Mela,Yogurt"
+        )
+        archive = self.build_archive({"STANDARD/invernale.csv": csv_content})
+
+        with self.login(user):
+            url = reverse(
+                "school_menu:upload_menu_archive", kwargs={"school_id": school.id}
+            )
+            with patch(
+                "school_menu.views.import_menu_entries",
+                side_effect=Exception("row error"),
+            ):
+                response = self.post(url, data={"file": archive})
+
+        assert response.status_code == 204
+        assert response.headers["HX-Trigger"] == "menuUploadError"
+        message = list(get_messages(response.wsgi_request))[0]
+        assert "row error" in str(message)
+
+    def test_post_invalid_extension(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user)
+
+        with self.login(user):
+            url = reverse(
+                "school_menu:upload_menu_archive", kwargs={"school_id": school.id}
+            )
+            data = {
+                "file": SimpleUploadedFile(
+                    "menu.csv", b"giorno,settimana", content_type="text/csv"
+                )
+            }
+            response = self.post(url, data=data)
+
+        assert response.status_code == 200
+        assert response.context["form"].errors["file"] == [
+            "Il file deve essere in formato zip, xlsx o ods"
+        ]
+
+
 class CreateWeeklyMenuView(TestCase):
     def test_get(self):
         user_factory = UserFactory  # noqa
@@ -1185,6 +1471,73 @@ class TestExportModalView(TestCase):
         assert response.context["school"] == school
         assert response.context["annual_meals"] is True
 
+    def test_availability_uses_a_single_query(self):
+        school = SchoolFactory(menu_type=School.Types.DETAILED)
+        for season in Meal.Seasons.values:
+            DetailedMealFactory.create_batch(
+                3, school=school, season=season, type=Meal.Types.STANDARD
+            )
+        DetailedMealFactory(
+            school=school, season=Meal.Seasons.ESTIVO, type=Meal.Types.VEGETARIAN
+        )
+
+        # school + distinct (type, season) pairs
+        with self.assertNumQueries(2):
+            response = self.get(
+                "school_menu:export_modal", school.pk, Meal.Types.VEGETARIAN
+            )
+
+        assert response.context["summer_meals"] is True
+        assert response.context["winter_meals"] is False
+        assert response.context["has_menus"] is True
+
+    def test_annual_availability_ignores_ordering(self):
+        school = SchoolFactory(annual_menu=True)
+        AnnualMealFactory.create_batch(3, school=school, type=Meal.Types.STANDARD)
+
+        response = self.get(
+            "school_menu:export_modal", school.pk, Meal.Types.VEGETARIAN
+        )
+
+        assert response.context["annual_meals"] is False
+        assert response.context["has_menus"] is True
+
+    def test_no_menus(self):
+        school = SchoolFactory(menu_type=School.Types.SIMPLE)
+
+        response = self.get("school_menu:export_modal", school.pk, Meal.Types.STANDARD)
+
+        assert response.context["has_menus"] is False
+        assert "export_menu_archive" not in response.content.decode()
+
+
+class TestExportMenuArchiveView(TestCase):
+    def test_get(self):
+        user = self.make_user()
+        school = SchoolFactory(user=user, menu_type=School.Types.SIMPLE)
+        SimpleMealFactory(
+            school=school, season=Meal.Seasons.ESTIVO, type=Meal.Types.STANDARD
+        )
+        SimpleMealFactory(
+            school=school, season=Meal.Seasons.INVERNALE, type=Meal.Types.GLUTEN_FREE
+        )
+
+        with self.login(user):
+            response = self.get("school_menu:export_menu_archive", school_id=school.pk)
+
+        self.response_200(response)
+        assert response["Content-Type"] == "application/zip"
+        assert f"menu_{school.slug}.zip" in response["Content-Disposition"]
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        assert archive.namelist() == ["NO_GLUTEN/invernale.csv", "STANDARD/estivo.csv"]
+
+    def test_requires_login(self):
+        school = SchoolFactory()
+
+        response = self.get("school_menu:export_menu_archive", school_id=school.pk)
+
+        self.response_302(response)
+
 
 class TestExportMenuView(TestCase):
     def test_get_simple_menu(self):
@@ -1210,8 +1563,14 @@ class TestExportMenuView(TestCase):
 
         self.response_200(response)
         assert response["Content-Type"] == "text/csv"
-        assert b"Pasta" in response.content
-        assert b"Apple" in response.content
+        content = b"".join(response.streaming_content)
+        assert (
+            content
+            == (
+                "settimana,giorno,pranzo,spuntino,merenda\r\n"
+                "1,Lunedì,Pasta,Apple,Orange\r\n"
+            ).encode()
+        )
 
     def test_get_detailed_menu(self):
         user = self.make_user()
@@ -1236,10 +1595,11 @@ class TestExportMenuView(TestCase):
 
         self.response_200(response)
         assert response["Content-Type"] == "text/csv"
-        assert b"Soup" in response.content
-        assert b"Fish" in response.content
-        assert b"Salad" in response.content
-        assert b"Fruit" in response.content
+        content = b"".join(response.streaming_content)
+        assert b"Soup" in content
+        assert b"Fish" in content
+        assert b"Salad" in content
+        assert b"Fruit" in content
 
     def test_get_annual_menu(self):
         user = self.make_user()
@@ -1258,7 +1618,7 @@ class TestExportMenuView(TestCase):
 
         self.response_200(response)
         assert response["Content-Type"] == "text/csv"
-        assert first_course in response.content.decode("utf-8")
+        assert first_course in b"".join(response.streaming_content).decode("utf-8")
 
 
 class JsonSchoolsListView(TestCase):